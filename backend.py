@@ -114,6 +114,12 @@ except ImportError:
     UNIFIED_SYSTEM_AVAILABLE = False
     print("⚠️ Système unifié non disponible, utilisation du système legacy")
 
+
+def unified_store_available() -> bool:
+    """Système unifié importé et store utilisable (fichier JSON ou backend SQLite)"""
+    return UNIFIED_SYSTEM_AVAILABLE and get_unified_task_manager().is_available()
+
+
 def process_email_explicit(input_data):
     """Traitement d'email avec tâches explicites"""
     try:
@@ -509,7 +515,7 @@ def get_tasks_statistics():
     """
     try:
         # 🚀 UTILISER LE SYSTÈME UNIFIÉ: Même source que /all-tasks
-        if UNIFIED_SYSTEM_AVAILABLE and os.path.exists(UNIFIED_TASKS_FILE):
+        if unified_store_available():
             unified_manager = get_unified_task_manager()
             all_tasks = unified_manager.load_all_tasks()
         else:
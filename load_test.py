@@ -0,0 +1,432 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+🏋️ TEST DE CHARGE HORS LIGNE
+============================
+
+Mesure le débit et les latences du pipeline sans OpenRouter : les appels
+LLM partent vers le fournisseur simulé (src/services/mock_llm_server.py),
+démarré ici sauf si --mock-url est donné.
+
+Phases :
+1. emails   : emails.json synthétique → pipeline.traiter_emails
+2. reunions : meetings.json synthétique → pipeline.traiter_reunions
+3. http     : requêtes concurrentes sur /email-explicite, /email-implicite,
+              /traiter_emails et /meetings/transcription-simple (--api)
+
+Les phases emails et reunions écrivent tout dans un dossier temporaire
+(tâches, logs, caches, mémo, cache LLM) : data/ n'est jamais modifié ni lu.
+La phase http vise une API lancée à part, avec ses propres données.
+Latences LLM mesurées côté mock (une valeur par réponse),
+latences HTTP mesurées côté client (aller-retour complet).
+
+Utilisation :
+    python load_test.py --emails 200 --reunions 20 --mode groupee --latence lognormale:0.8,0.4
+    python load_test.py --emails 100 --taux-429 0.1 --sortie rapport_charge.json
+
+Phase HTTP : lancer l'API sur le mock du test, puis
+    OPENROUTER_BASE_URL=http://127.0.0.1:8089/v1 python main.py
+    python load_test.py --emails 0 --reunions 0 --api http://127.0.0.1:8000 --requetes-http 200
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Ajouter les chemins nécessaires
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src", "core"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src", "utils"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src", "services"))
+
+from mock_llm_server import ReponsesSimulees, ServeurLLMSimule, charger_taches, resume_latences
+
+PORT_MOCK_API = 8089
+
+PERSONNES = ["Karim", "Samia", "Mohamed", "Lisa", "Sophie", "Paul", "Marie", "Ahmed"]
+SERVICES = [("it", "IT"), ("finance", "Finance"), ("rh", "RH"), ("marketing", "Marketing"),
+            ("commercial", "Commercial")]
+MODELES_EMAILS = [
+    ("Demande - {sujet}", "Bonjour,\n\n{p1} doit finaliser {sujet} avant {jour}. {p2} prépare la présentation "
+                          "associée et envoie le compte rendu à l'équipe.\n\nCordialement,\n{p3}"),
+    ("URGENT : {sujet}", "URGENT : incident sur {sujet}. {p1}, merci de corriger le problème avant ce soir, "
+                         "{p2} prévient le client.\n\n--\n{p3}\nService {service}"),
+    ("Point {sujet}", "Salut {p1},\n\nIl faudrait penser à relancer le fournisseur pour {sujet} et "
+                      "planifier un point avec {p2} {jour}.\n\nMerci !"),
+    ("RE: {sujet}", "Ok pour moi, {p1} s'en occupe {jour}.\n\nLe {date} a écrit {p2} :\n> Qui peut reprendre "
+                    "{sujet} ?\n> Il faut aussi mettre à jour la documentation.\n> {p3}"),
+    ("Info - {sujet}", "Bonjour à tous,\n\nPour information, {sujet} est validé. Aucune action requise de "
+                       "votre part.\n\nBonne journée,\n{p1}"),
+]
+SUJETS = ["le budget 2025", "le rapport mensuel", "la migration serveur", "le recrutement stagiaire",
+          "la campagne produit", "le contrat client", "la facture fournisseur", "le plan de formation"]
+JOURS = ["demain", "vendredi", "lundi prochain", "la fin du mois", "jeudi matin"]
+
+
+# =====================================
+# Données synthétiques
+# =====================================
+
+def generer_emails(nombre: int, graine: int = 42) -> List[Dict]:
+    """Emails non traités variés (explicites, implicites, urgents, fils de réponse, informatifs), tous distincts"""
+    rng = random.Random(graine)
+    aujourd_hui = datetime.now()
+    emails = []
+    for i in range(nombre):
+        objet, modele = rng.choice(MODELES_EMAILS)
+        code_service, service = rng.choice(SERVICES)
+        p1, p2, p3 = rng.sample(PERSONNES, 3)
+        valeurs = {"sujet": rng.choice(SUJETS), "jour": rng.choice(JOURS), "p1": p1, "p2": p2, "p3": p3,
+                   "service": service, "date": (aujourd_hui - timedelta(days=1)).strftime("%d/%m/%Y")}
+        emails.append({
+            "id": f"email_charge_{i + 1:05d}",
+            "expediteur": f"{p3.lower()}@{code_service}.entreprise.com",
+            "destinataire": f"{p1.lower()}@entreprise.com",
+            "objet": f"{objet.format(**valeurs)} #{i + 1}",
+            # Référence unique : pas de doublon absorbé par le cache anti-doublon
+            "texte": f"{modele.format(**valeurs)}\n\nRéf. dossier {graine}-{i + 1}",
+            "date_reception": (aujourd_hui - timedelta(minutes=i)).strftime("%Y-%m-%d"),
+            "statut_traitement": "non_traité"
+        })
+    return emails
+
+
+def generer_reunions(nombre: int, graine: int = 42) -> List[Dict]:
+    """Réunions non traitées au format de data/meetings.json"""
+    rng = random.Random(graine + 1)
+    reunions = []
+    for i in range(nombre):
+        _, service = rng.choice(SERVICES)
+        organisateur, *presents = rng.sample(PERSONNES, 4)
+        repliques = [f"{organisateur}: Faisons le point sur {rng.choice(SUJETS)}."]
+        for personne in presents:
+            repliques.append(f"{personne}: Je m'occupe de {rng.choice(SUJETS)} d'ici {rng.choice(JOURS)}.")
+        repliques.append(f"{organisateur}: Parfait, prochaine réunion {rng.choice(JOURS)} (séance {i + 1}).")
+        reunions.append({
+            "id": f"meeting_charge_{i + 1:04d}",
+            "titre": f"Réunion {service} #{i + 1}",
+            "date_reunion": datetime.now().strftime("%Y-%m-%d"),
+            "heure_debut": "10:00",
+            "heure_fin": "11:00",
+            "duree_minutes": 60,
+            "lieu": "Teams",
+            "organisateur": {"nom": organisateur, "email": f"{organisateur.lower()}@entreprise.com",
+                             "role": "Responsable"},
+            "participants": [{"nom": p, "email": f"{p.lower()}@entreprise.com", "role": "Membre", "present": True}
+                             for p in presents],
+            "ordre_du_jour": ["Suivi des actions", "Répartition des tâches"],
+            "transcription": " ".join(repliques),
+            "departement": service,
+            "projet_associe": "Test de charge",
+            "priorite_meeting": "moyenne",
+            "type_reunion": "suivi",
+            "statut_traitement": "non_traité",
+            "date_ajout": datetime.now().isoformat(timespec="seconds")
+        })
+    return reunions
+
+
+# =====================================
+# Statistiques du mock (local ou distant)
+# =====================================
+
+def _requete_json(url: str, corps: Optional[Dict] = None, timeout: float = 120.0):
+    """(code HTTP, réponse JSON ou texte) ; les erreurs HTTP sont retournées, pas levées"""
+    donnees = json.dumps(corps).encode("utf-8") if corps is not None else None
+    requete = urllib.request.Request(url, data=donnees, headers={"Content-Type": "application/json"},
+                                     method="POST" if corps is not None else "GET")
+    try:
+        with urllib.request.urlopen(requete, timeout=timeout) as reponse:
+            brut = reponse.read()
+            code = reponse.status
+    except urllib.error.HTTPError as e:
+        brut, code = e.read(), e.code
+    try:
+        return code, json.loads(brut or b"null")
+    except ValueError:
+        return code, brut.decode("utf-8", errors="replace")
+
+
+def stats_mock(base_url: str, reinitialiser: bool = False) -> Dict:
+    if reinitialiser:
+        _requete_json(f"{base_url}/stats/reset", {})
+        return {}
+    return _requete_json(f"{base_url}/stats")[1]
+
+
+# =====================================
+# Phases pipeline
+# =====================================
+
+def preparer_pipeline(base_url: str, dossier: str, avec_cache_llm: bool):
+    """
+    Importer le pipeline pointé sur le mock, avec toutes ses données dans dossier.
+    Les variables d'environnement doivent précéder l'import (lues au chargement).
+    """
+    os.environ["OPENROUTER_BASE_URL"] = base_url
+    os.environ.setdefault("OPENROUTER_API_KEY", "mock-key")
+    os.environ["LLM_CACHE_ENABLED"] = "1" if avec_cache_llm else "0"
+    os.environ["STORAGE_BACKEND"] = "json"
+    chemin = lambda nom: os.path.join(dossier, "data", nom)
+    # Bases lues à l'import : cache LLM et SQLite dans le dossier temporaire
+    os.environ["LLM_CACHE_PATH"] = chemin("llm_cache.db")
+    os.environ["SQLITE_DB_PATH"] = chemin("ai_task.db")
+    # Certains modules ouvrent "data/..." (relatif au dossier courant) dès l'import
+    os.makedirs(os.path.join(dossier, "data"), exist_ok=True)
+    os.chdir(dossier)
+
+    import cache_emails
+    import department_classifier
+    import email_classifier
+    import meeting_processor
+    import pipeline
+
+    pipeline.EMAIL_FILE = chemin("emails.json")
+    pipeline.DATA_FILE = chemin("tasks.json")
+    pipeline.LOG_FILE = chemin("logs.json")
+    pipeline.UNIFIED_TASKS_FILE = chemin("unified_tasks.json")
+    pipeline.UNIFIED_SYSTEM_AVAILABLE = False
+    cache_emails.CACHE_FILE = chemin("emails_cache.json")
+    # Pré-classifieur entraîné sur l'historique du test, pas sur data/emails.json
+    email_classifier.EMAILS_FILE = chemin("emails.json")
+    email_classifier._pre_classifieur = None
+    # Mémo vide : chaque test part du même état (pas d'amorçage depuis les tâches existantes)
+    department_classifier._classifier = department_classifier.DepartmentClassifier(
+        memo_file=chemin("department_memo.json"))
+    processeur = meeting_processor.get_meeting_processor()
+    processeur.meetings_file = chemin("meetings.json")
+    processeur.tasks_file = chemin("meeting_tasks.json")
+    processeur.logs_file = chemin("meeting_logs.json")
+    meeting_processor.UNIFIED_SYSTEM_AVAILABLE = False
+
+    for nom, contenu in (("tasks.json", []), ("logs.json", []), ("emails_cache.json", {"emails_hashes": {}}),
+                         ("meeting_tasks.json", []), ("meeting_logs.json", [])):
+        with open(chemin(nom), "w", encoding="utf-8") as f:
+            json.dump(contenu, f)
+    return pipeline
+
+
+def _rapport_phase(nom: str, elements: int, duree: float, stats: Dict, **details) -> Dict:
+    appels = stats.get("requetes", 0)
+    return {
+        "phase": nom,
+        "elements": elements,
+        "duree_s": round(duree, 3),
+        "debit_elements_s": round(elements / duree, 2) if duree else 0.0,
+        "appels_llm": appels,
+        "debit_appels_s": round(appels / duree, 2) if duree else 0.0,
+        "appels_par_type": stats.get("par_type", {}),
+        "erreurs_injectees": {"429": stats.get("erreurs_429", 0), "503": stats.get("erreurs_503", 0)},
+        "latence_llm_s": stats.get("latence_s", resume_latences([])),
+        **details
+    }
+
+
+def _executer(fonction, verbeux: bool, **kwargs):
+    """Appel chronométré ; la sortie console du pipeline est masquée sauf --verbeux"""
+    sortie = contextlib.nullcontext() if verbeux else contextlib.redirect_stdout(io.StringIO())
+    with sortie:
+        debut = time.perf_counter()
+        resultat = fonction(**kwargs)
+        duree = time.perf_counter() - debut
+    return resultat, duree
+
+
+def phase_emails(pipeline, base_url: str, dossier: str, args) -> Dict:
+    emails = generer_emails(args.emails, args.graine)
+    with open(os.path.join(dossier, "data", "emails.json"), "w", encoding="utf-8") as f:
+        json.dump(emails, f, ensure_ascii=False)
+
+    stats_mock(base_url, reinitialiser=True)
+    resultat, duree = _executer(
+        pipeline.traiter_emails, args.verbeux,
+        use_rate_limiting=args.rate_limiting,
+        use_cache=False,
+        use_async_processing=not args.sync,
+        max_concurrency=args.concurrence,
+        extraction_mode=args.mode
+    )
+    return _rapport_phase(
+        "emails", len(emails), duree, stats_mock(base_url),
+        mode=args.mode,
+        taches_ajoutees=resultat.get("taches_ajoutees", 0),
+        emails_reportes=resultat.get("emails_reportes", 0)
+    )
+
+
+def phase_reunions(pipeline, base_url: str, dossier: str, args) -> Dict:
+    reunions = generer_reunions(args.reunions, args.graine)
+    with open(os.path.join(dossier, "data", "meetings.json"), "w", encoding="utf-8") as f:
+        json.dump(reunions, f, ensure_ascii=False)
+
+    stats_mock(base_url, reinitialiser=True)
+    resultat, duree = _executer(pipeline.traiter_reunions, args.verbeux, use_cache=False)
+    return _rapport_phase(
+        "reunions", len(reunions), duree, stats_mock(base_url),
+        taches_ajoutees=resultat.get("tasks_extracted", 0),
+        erreurs=resultat.get("errors", 0)
+    )
+
+
+# =====================================
+# Phase HTTP
+# =====================================
+
+def _requetes_http(nombre: int, graine: int) -> List[tuple]:
+    """(endpoint, corps) en tourniquet sur les endpoints d'extraction"""
+    emails = generer_emails(nombre, graine + 2)
+    reunions = generer_reunions(nombre, graine + 3)
+    requetes = []
+    for i in range(nombre):
+        email = emails[i]
+        genre = i % 4
+        if genre in (0, 1):
+            endpoint = "/email-explicite" if genre == 0 else "/email-implicite"
+            requetes.append((endpoint, {key: email[key] for key in
+                                        ("texte", "expediteur", "destinataire", "objet", "date_reception")}))
+        elif genre == 2:
+            requetes.append(("/traiter_emails", {"email": email["texte"], "use_cache": False}))
+        else:
+            reunion = reunions[i]
+            requetes.append(("/meetings/transcription-simple", {
+                "transcription": reunion["transcription"],
+                "meeting_title": reunion["titre"],
+                "meeting_date": reunion["date_reunion"],
+                "participants": [p["nom"] for p in reunion["participants"]]
+            }))
+    return requetes
+
+
+def phase_http(api_url: str, base_url: str, args) -> Dict:
+    requetes = _requetes_http(args.requetes_http, args.graine)
+
+    def envoyer(requete):
+        endpoint, corps = requete
+        debut = time.perf_counter()
+        try:
+            code, _ = _requete_json(f"{api_url.rstrip('/')}{endpoint}", corps)
+        except (urllib.error.URLError, OSError):
+            code = "connexion"
+        return endpoint, code, time.perf_counter() - debut
+
+    stats_mock(base_url, reinitialiser=True)
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers_http) as executeur:
+        resultats = list(executeur.map(envoyer, requetes))
+    duree = time.perf_counter() - debut
+
+    par_endpoint = {}
+    for endpoint, code, latence in resultats:
+        entree = par_endpoint.setdefault(endpoint, {"codes": {}, "latences": []})
+        entree["codes"][str(code)] = entree["codes"].get(str(code), 0) + 1
+        entree["latences"].append(latence)
+    return _rapport_phase(
+        "http", len(requetes), duree, stats_mock(base_url),
+        workers=args.workers_http,
+        latence_http_s=resume_latences([latence for _, _, latence in resultats]),
+        endpoints={endpoint: {"codes": entree["codes"], "latence_s": resume_latences(entree["latences"])}
+                   for endpoint, entree in par_endpoint.items()}
+    )
+
+
+# =====================================
+# Affichage
+# =====================================
+
+def afficher_phase(rapport: Dict):
+    llm = rapport["latence_llm_s"]
+    print(f"\n📊 Phase {rapport['phase']} : {rapport['elements']} éléments en {rapport['duree_s']}s")
+    print(f"   🚀 Débit: {rapport['debit_elements_s']} éléments/s, {rapport['debit_appels_s']} appels LLM/s "
+          f"({rapport['appels_llm']} appels, {rapport['appels_par_type']})")
+    print(f"   ⏱️ Latence LLM p50/p95/p99: {llm['p50']}s / {llm['p95']}s / {llm['p99']}s")
+    print(f"   ⚠️ Erreurs injectées: {rapport['erreurs_injectees']}")
+    if "taches_ajoutees" in rapport:
+        print(f"   ✅ Tâches ajoutées: {rapport['taches_ajoutees']}")
+    if rapport.get("emails_reportes"):
+        print(f"   ⏳ Emails reportés: {rapport['emails_reportes']}")
+    if "latence_http_s" in rapport:
+        http = rapport["latence_http_s"]
+        print(f"   🌐 Latence HTTP p50/p95/p99: {http['p50']}s / {http['p95']}s / {http['p99']}s")
+        for endpoint, entree in rapport["endpoints"].items():
+            print(f"      {endpoint}: codes {entree['codes']}, p95 {entree['latence_s']['p95']}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge hors ligne du pipeline (LLM simulé)")
+    parser.add_argument("--emails", type=int, default=100, help="emails synthétiques (0 : phase ignorée)")
+    parser.add_argument("--reunions", type=int, default=10, help="réunions synthétiques (0 : phase ignorée)")
+    parser.add_argument("--mode", default="classique", choices=["classique", "fusionnee", "groupee"])
+    parser.add_argument("--sync", action="store_true", help="traitement séquentiel (sans moteur asynchrone)")
+    parser.add_argument("--rate-limiting", action="store_true", help="mode rate limiting + queue")
+    parser.add_argument("--concurrence", type=int, default=None, help="appels LLM simultanés (défaut : AIMD)")
+    parser.add_argument("--avec-cache-llm", action="store_true", help="garder le cache des réponses LLM")
+    parser.add_argument("--latence", default="lognormale:0.8,0.4", help="loi de latence du mock")
+    parser.add_argument("--taux-429", type=float, default=0.0)
+    parser.add_argument("--taux-erreur", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--taches", help="fichier JSON de tâches modèles pour le mock")
+    parser.add_argument("--mock-url", help="mock déjà lancé (ex : http://127.0.0.1:8089/v1)")
+    parser.add_argument("--api", help="URL de l'API pour la phase HTTP (ex : http://127.0.0.1:8000)")
+    parser.add_argument("--requetes-http", type=int, default=100)
+    parser.add_argument("--workers-http", type=int, default=10)
+    parser.add_argument("--sortie", help="fichier JSON du rapport")
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--verbeux", action="store_true", help="afficher la sortie du pipeline")
+    args = parser.parse_args()
+    sortie = os.path.abspath(args.sortie) if args.sortie else None
+
+    simulateur = None
+    base_url = args.mock_url
+    if not base_url:
+        simulateur = ServeurLLMSimule(args.latence, args.taux_429, args.taux_erreur, args.retry_after,
+                                      args.graine, ReponsesSimulees(charger_taches(args.taches)))
+        # Port fixe quand l'API doit joindre le même mock
+        base_url = simulateur.demarrer(port=PORT_MOCK_API if args.api else 0)
+    print(f"🧪 Mock LLM: {base_url}")
+
+    rapport = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "configuration": {cle: valeur for cle, valeur in vars(args).items() if cle != "verbeux"},
+        "phases": []
+    }
+    try:
+        if args.emails > 0 or args.reunions > 0:
+            with tempfile.TemporaryDirectory(prefix="load_test_") as dossier:
+                repertoire = os.getcwd()
+                pipeline = preparer_pipeline(base_url, dossier, args.avec_cache_llm)
+                try:
+                    if args.emails > 0:
+                        rapport["phases"].append(phase_emails(pipeline, base_url, dossier, args))
+                        afficher_phase(rapport["phases"][-1])
+                    if args.reunions > 0:
+                        rapport["phases"].append(phase_reunions(pipeline, base_url, dossier, args))
+                        afficher_phase(rapport["phases"][-1])
+                finally:
+                    os.chdir(repertoire)
+        if args.api:
+            print(f"\n🌐 Phase HTTP sur {args.api} (API lancée avec OPENROUTER_BASE_URL={base_url})")
+            rapport["phases"].append(phase_http(args.api, base_url, args))
+            afficher_phase(rapport["phases"][-1])
+    finally:
+        if simulateur is not None:
+            simulateur.arreter()
+
+    if sortie:
+        with open(sortie, "w", encoding="utf-8") as f:
+            json.dump(rapport, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Rapport: {sortie}")
+
+
+if __name__ == "__main__":
+    main()
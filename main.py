@@ -10,7 +10,7 @@ Version: 2.0.0 - Production Ready
 Usage: python -m uvicorn main:app --reload --port 8000
 """
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from pydantic import BaseModel, validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
@@ -45,6 +45,9 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src", "services"))
 
 # Chemins déjà ajoutés ci-dessus
 
+# Règles de filtrage partagées avec le TaskStore et le backend SQLite (une seule copie)
+from task_query import normalize_filter_value, parse_date_string, extract_department_from_task
+
 # Imports des modules existants  
 try:
     import agent_task
@@ -53,6 +56,7 @@ try:
         resume_email,
         identifier_departement,
         deduire_priorite,
+        completer_priorites,
         suggere_taches_implicites
     )
     import pipeline
@@ -68,6 +72,14 @@ try:
         nettoyer_cache_ancien,
         obtenir_info_cache
     )
+    from llm_cache import get_llm_cache
+    from llm_json import parser_taches, statistiques_parsing
+    from email_classifier import get_pre_classifieur, statistiques_pre_classification
+    from department_classifier import statistiques_departements
+    from priority_engine import statistiques_priorites
+    from token_budget import statistiques_tokens
+    from adaptive_concurrency import statistiques_concurrence
+    from llm_resilience import statistiques_resilience
     import rate_limiter
     from rate_limiter import RateLimiter
     import email_queue
@@ -93,11 +105,17 @@ if not MODULES_DISPONIBLES:
     def resume_email(texte):
         return "Résumé non disponible"
     
-    def identifier_departement(texte):
+    def identifier_departement(texte, expediteur=None, destinataire=None, objet=""):
         return "Non identifié"
     
-    def deduire_priorite(description):
+    def deduire_priorite(description, deadline=None, email=None):
         return "moyenne"
+
+    def completer_priorites(taches, email=None):
+        for tache in taches:
+            if not str(tache.get("priorite") or "").strip():
+                tache["priorite"] = "moyenne"
+        return taches
     
     def suggere_taches_implicites(texte):
         return json.dumps([{"description": "Suggestion de tâches non disponible", "responsable": "système", "priorite": "moyenne"}])
@@ -123,6 +141,39 @@ if not MODULES_DISPONIBLES:
     
     def obtenir_info_cache(hash_email):
         return None
+
+    def get_llm_cache():
+        return None
+
+    def parser_taches(texte):
+        taches = json.loads(texte)
+        if not isinstance(taches, list):
+            raise ValueError("Résultat IA n'est pas une liste")
+        return taches
+
+    def statistiques_parsing():
+        return {}
+
+    def get_pre_classifieur():
+        return None
+
+    def statistiques_pre_classification():
+        return {"enabled": False}
+
+    def statistiques_departements():
+        return {"enabled": False}
+
+    def statistiques_priorites():
+        return {"enabled": False}
+
+    def statistiques_tokens():
+        return {}
+
+    def statistiques_concurrence():
+        return {"enabled": False}
+
+    def statistiques_resilience():
+        return {"disjoncteur": {"etat": "inconnu"}}
     
     def get_background_service():
         class MockService:
@@ -398,12 +449,23 @@ UNIFIED_TASKS_FILE = os.path.join(DATA_DIR, "unified_tasks.json")
 try:
     sys.path.append("src/utils")
     from unified_task_manager import get_unified_task_manager
+    from cursor_pagination import empreinte_requete
+    from query_cache import QueryCache
+    from etag import calculer_etag, etag_correspond
+    # ⚡ Cache des réponses /all-tasks, /tasks/stats, /tasks/tags (invalidé par version du store)
+    query_cache = QueryCache()
     UNIFIED_SYSTEM_AVAILABLE = True
     print("✅ Système unifié disponible")
 except ImportError:
     UNIFIED_SYSTEM_AVAILABLE = False
     print("⚠️ Système unifié non disponible, utilisation du système legacy")
 
+
+def unified_store_available() -> bool:
+    """Système unifié importé et store utilisable (fichier JSON ou backend SQLite)"""
+    return UNIFIED_SYSTEM_AVAILABLE and get_unified_task_manager().is_available()
+
+
 # Créer les fichiers s'ils n'existent pas
 for file_path in [DATA_FILE, LOG_FILE]:
     if not os.path.exists(file_path):
@@ -416,6 +478,9 @@ async def lifespan(app: FastAPI):
     """Gestion du cycle de vie de l'application"""
     print("🚀 Démarrage de l'application AI Task Extraction...")
     
+    # Modèle de pré-classification entraîné en arrière-plan (hors des requêtes)
+    get_pre_classifieur()
+    
     try:
         service = get_background_service()
         if service.start_service():
@@ -553,17 +618,14 @@ def handle_email_explicit(input: EmailInput):
         
         # Traitement IA
         result_text = extract_tasks_from_email(input.texte)
-        tasks = json.loads(result_text)
-        
-        if not isinstance(tasks, list):
-            raise ValueError("Résultat IA n'est pas une liste")
+        tasks = parser_taches(result_text)
         
         # Enrichissement des données
         resume = resume_email(input.texte)
         if input.departement:
             departement_info = {"nom": input.departement, "origine": "Utilisateur"}
         else:
-            nom_dept = identifier_departement(input.texte)
+            nom_dept = identifier_departement(input.texte, input.expediteur, input.destinataire, input.objet)
             departement_info = {"nom": nom_dept, "origine": "AI"}
 
         origine_email = {
@@ -580,6 +642,8 @@ def handle_email_explicit(input: EmailInput):
             data = json.load(f)
 
         nouvelles_taches_ajoutees = []
+        # Priorités manquantes : moteur local sur toutes les tâches de l'email
+        completer_priorites(tasks, origine_email)
 
         for task in tasks:
             # Enrichissement des tâches
@@ -587,8 +651,6 @@ def handle_email_explicit(input: EmailInput):
                 task["deadline"] = "inconnue"
             if not task.get("responsable"):
                 task["responsable"] = "non précisé"
-            if not task.get("priorite") or task["priorite"].strip() == "":
-                task["priorite"] = deduire_priorite(task["description"])
 
             task["id"] = str(uuid.uuid4())
             task["confiance_ia"] = 1.0
@@ -682,17 +744,14 @@ def handle_email_implicite(input: EmailInput):
         
         # Traitement IA pour tâches implicites
         result_text = suggere_taches_implicites(input.texte)
-        tasks = json.loads(result_text)
-        
-        if not isinstance(tasks, list):
-            raise ValueError("Résultat IA n'est pas une liste")
+        tasks = parser_taches(result_text)
         
         # Enrichissement des données
         resume = resume_email(input.texte)
         if input.departement:
             departement_info = {"nom": input.departement, "origine": "Utilisateur"}
         else:
-            nom_dept = identifier_departement(input.texte)
+            nom_dept = identifier_departement(input.texte, input.expediteur, input.destinataire, input.objet)
             departement_info = {"nom": nom_dept, "origine": "AI"}
 
         origine_email = {
@@ -708,12 +767,11 @@ def handle_email_implicite(input: EmailInput):
             data = json.load(f)
 
         nouvelles_taches_ajoutees = []
+        completer_priorites(tasks, origine_email)
 
         for task in tasks:
             if not task.get("responsable"):
                 task["responsable"] = "inconnu"
-            if not task.get("priorite"):
-                task["priorite"] = deduire_priorite(task["description"])
             if not task.get("confiance_ia"):
                 task["confiance_ia"] = 0.6
 
@@ -789,15 +847,23 @@ def api_traiter_emails_unifie(
     use_rate_limiting: bool = False,
     use_batch_processing: bool = True,
     use_cache: bool = True,
-    use_optimized_prompts: bool = True
+    use_optimized_prompts: bool = True,
+    use_async_processing: bool = True,
+    max_concurrency: Optional[int] = Query(None, ge=1, le=64, description="Appels IA simultanés maximum (défaut: fenêtre adaptative)"),
+    extraction_mode: str = Query("classique", description="classique (appels séparés), fusionnee (un seul appel par email) ou groupee (plusieurs emails courts par appel)")
     ):
     """🚀 ENDPOINT UNIFIÉ: Traitement emails avec toutes les améliorations"""
+    if extraction_mode not in ("classique", "fusionnee", "groupee"):
+        raise HTTPException(status_code=400, detail=f"Mode d'extraction inconnu: {extraction_mode}")
     try:
         resultat = traiter_emails(
             use_rate_limiting=use_rate_limiting,
             use_batch_processing=use_batch_processing,
             use_cache=use_cache,
-            use_optimized_prompts=use_optimized_prompts
+            use_optimized_prompts=use_optimized_prompts,
+            use_async_processing=use_async_processing,
+            max_concurrency=max_concurrency,
+            extraction_mode=extraction_mode
         )
         
         optimisations_actives = []
@@ -809,6 +875,12 @@ def api_traiter_emails_unifie(
             optimisations_actives.append("Rate limiting + Queue")
         if use_optimized_prompts:
             optimisations_actives.append("Prompts IA optimisés")
+        if use_async_processing and not use_rate_limiting:
+            optimisations_actives.append("Traitement concurrent")
+        if extraction_mode == "fusionnee":
+            optimisations_actives.append("Extraction fusionnée (1 appel IA par email)")
+        if extraction_mode == "groupee":
+            optimisations_actives.append("Extraction groupée (1 appel IA par lot d'emails)")
         
         return {
             "status": "success",
@@ -837,6 +909,24 @@ def traiter_emails_post(input: EmailSimple):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur traitement: {str(e)}")
 
+# =====================================
+# 🏷️ RÉPONSES CONDITIONNELLES (ETag / 304)
+# =====================================
+
+def conditional_response(request: Request, response: Response, *version_parts) -> Optional[Response]:
+    """
+    Comparer If-None-Match à l'ETag dérivé de la version des données.
+    Retourne une réponse 304 vide si le client est à jour, sinon pose
+    l'ETag sur la réponse et retourne None (le handler continue).
+    """
+    etag = calculer_etag(*version_parts)
+    if etag_correspond(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    # Le navigateur revalide à chaque requête (If-None-Match automatique)
+    response.headers["Cache-Control"] = "no-cache"
+    return None
+
 # =====================================
 # ENDPOINTS MONITORING
 # =====================================
@@ -858,10 +948,20 @@ def system_health():
             "writable": os.access(file_name, os.W_OK) if os.path.exists(file_name) else False
         }
     
+    resilience = statistiques_resilience()
+    
     return {
-        "system_status": "healthy",
+        # Disjoncteur LLM ouvert ou en essai : les emails sont remis en attente
+        "system_status": "healthy" if resilience["disjoncteur"]["etat"] in ("ferme", "inconnu") else "degraded",
         "service_status": status,
         "files_status": files_status,
+        "query_cache": query_cache.get_stats() if UNIFIED_SYSTEM_AVAILABLE else None,
+        "llm_json_parsing": statistiques_parsing(),
+        "email_pre_classification": statistiques_pre_classification(),
+        "department_inference": statistiques_departements(),
+        "priority_inference": statistiques_priorites(),
+        "input_tokens": statistiques_tokens(),
+        "llm_resilience": resilience,
         "timestamp": datetime.now().isoformat()
     }
 
@@ -874,6 +974,8 @@ def get_rate_limit_status():
         return {
             "status": "success",
             "rate_limit_stats": stats,
+            # Fenêtre AIMD courante des appels IA simultanés
+            "adaptive_concurrency": statistiques_concurrence(),
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -883,6 +985,21 @@ def get_rate_limit_status():
             "timestamp": datetime.now().isoformat()
         }
 
+@app.get("/monitoring/query_cache")
+def get_query_cache_status():
+    """Statistiques du cache de résultats (/all-tasks, /tasks/stats, /tasks/tags)"""
+    if not UNIFIED_SYSTEM_AVAILABLE:
+        return {
+            "status": "error",
+            "message": "Système unifié non disponible",
+            "timestamp": datetime.now().isoformat()
+        }
+    return {
+        "status": "success",
+        "query_cache_stats": query_cache.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
 @app.get("/monitoring/queue")
 def get_queue_status():
     """Statut de la file d'attente"""
@@ -897,9 +1014,24 @@ def get_queue_status():
 # ENDPOINTS CACHE
 # =====================================
 
+def _llm_cache_statistics():
+    """Statistiques du cache des réponses LLM (hits, misses, octets économisés)"""
+    llm_cache = get_llm_cache()
+    return llm_cache.get_stats() if llm_cache is not None else {"enabled": False}
+
+def _single_flight_statistics():
+    """Traitements regroupés : emails et prompts identiques déjà en vol"""
+    if not MODULES_DISPONIBLES:
+        return None
+    import llm_client
+    return {
+        "emails": pipeline.emails_en_vol.get_stats(),
+        "llm_calls": llm_client.appels_en_vol.get_stats()
+    }
+
 @app.get("/cache/stats")
 def get_cache_statistics():
-    """Statistiques du cache d'emails"""
+    """Statistiques du cache d'emails et du cache des réponses LLM"""
     try:
         stats = obtenir_statistiques_cache()
         stats["cache_file_exists"] = os.path.exists("data/emails_cache.json")
@@ -909,6 +1041,8 @@ def get_cache_statistics():
         return {
             "status": "success",
             "cache_statistics": stats,
+            "llm_response_cache": _llm_cache_statistics(),
+            "single_flight": _single_flight_statistics(),
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -920,15 +1054,18 @@ def get_cache_statistics():
 
 @app.post("/cache/cleanup")
 def cleanup_cache(retention_days: int = 30):
-    """Nettoyage du cache"""
+    """Nettoyage du cache (et des réponses LLM expirées)"""
     try:
         nettoyer_cache_ancien(retention_days)
         stats_apres = obtenir_statistiques_cache()
+        llm_cache = get_llm_cache()
+        llm_expirees = llm_cache.purge_expired() if llm_cache is not None else 0
         
         return {
             "status": "success",
             "message": f"Cache nettoyé - emails plus anciens que {retention_days} jours supprimés",
             "stats_apres_nettoyage": stats_apres,
+            "llm_responses_expired": llm_expirees,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -939,17 +1076,21 @@ def cleanup_cache(retention_days: int = 30):
         }
 
 @app.delete("/cache/clear")
-def clear_cache():
-    """Vider complètement le cache"""
+def clear_cache(include_llm_responses: bool = False):
+    """Vider complètement le cache (les réponses LLM seulement sur demande)"""
     try:
         cache_file = "data/emails_cache.json"
         if os.path.exists(cache_file):
             with open(cache_file, "w", encoding="utf-8") as f:
                 json.dump({}, f)
+        llm_cache = get_llm_cache()
+        if include_llm_responses and llm_cache is not None:
+            llm_cache.clear()
         
         return {
             "status": "success",
             "message": "Cache vidé avec succès",
+            "llm_responses_cleared": include_llm_responses and llm_cache is not None,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -963,52 +1104,6 @@ def clear_cache():
 # ENDPOINTS SYSTÈME
 # =====================================
 
-def normalize_filter_value(field, value):
-    """
-    🔧 Normalise les valeurs de filtre pour accepter les variantes
-    Solution simple pour filtrage intelligent
-    """
-    if not value:
-        return ""
-    
-    value_lower = value.lower().strip()
-    
-    # Mappings pour filtrage intelligent
-    STATUS_MAPPING = {
-        "à faire": "pending",
-        "a faire": "pending", 
-        "en cours": "in_progress",
-        "en_cours": "in_progress",
-        "terminé": "completed",
-        "termine": "completed",
-        "fini": "completed",
-        "annulé": "cancelled",
-        "annule": "cancelled"
-    }
-    
-    PRIORITY_MAPPING = {
-        "haute": "high",
-        "elevé": "high", 
-        "élevé": "high",
-        "urgent": "high",
-        "moyenne": "medium",
-        "normale": "medium",
-        "normal": "medium", 
-        "moyen": "medium",
-        "critique": "critical",
-        "prioritaire": "critical",
-        "basse": "low",
-        "faible": "low",
-        "bas": "low"
-    }
-    
-    if field == "status":
-        return STATUS_MAPPING.get(value_lower, value_lower)
-    elif field == "priority":
-        return PRIORITY_MAPPING.get(value_lower, value_lower)
-    else:
-        return value_lower
-
 def smart_filter_match(task_value, filter_value, field_type):
     """
     🧠 Comparaison intelligente pour le filtrage
@@ -1027,30 +1122,6 @@ def smart_filter_match(task_value, filter_value, field_type):
 # 🎯 PHASE 2 - FONCTIONS DE FILTRAGE AVANCÉ
 # =====================================
 
-def parse_date_string(date_str):
-    """
-    📅 Parse une date en format YYYY-MM-DD ou ISO
-    Retourne None si parsing échoue
-    """
-    if not date_str or date_str == "null":
-        return None
-    
-    try:
-        # Essayer format YYYY-MM-DD
-        if len(date_str) == 10 and date_str.count('-') == 2:
-            return datetime.strptime(date_str, "%Y-%m-%d")
-        
-        # Essayer format ISO complet
-        if 'T' in date_str:
-            # Enlever les microsecondes si présentes
-            if '.' in date_str:
-                date_str = date_str.split('.')[0]
-            return datetime.fromisoformat(date_str.replace('Z', ''))
-        
-        return None
-    except:
-        return None
-
 def filter_by_date_range(tasks, deadline_before=None, deadline_after=None, created_after=None, created_before=None):
     """
     📅 Filtrer les tâches par plages de dates
@@ -1116,31 +1187,6 @@ def filter_by_source(tasks, source):
     source_lower = source.lower().strip()
     return [task for task in tasks if task.get('source', '').lower() == source_lower]
 
-def extract_department_from_task(task):
-    """
-    🏢 Extraire le département d'une tâche depuis les métadonnées
-    """
-    metadata = task.get('source_metadata', {})
-    
-    # Pour les emails
-    if 'original_email' in metadata:
-        email_data = metadata['original_email']
-        dept = email_data.get('departement')
-        
-        if isinstance(dept, dict) and 'nom' in dept:
-            return dept['nom']
-        elif isinstance(dept, str):
-            return dept
-    
-    # Pour les meetings  
-    if 'meeting' in metadata or task.get('origine_meeting'):
-        meeting_data = task.get('origine_meeting', {})
-        dept = meeting_data.get('departement')
-        if dept:
-            return dept
-    
-    return None
-
 def filter_by_department(tasks, department):
     """
     🏢 Filtrer les tâches par département
@@ -1341,9 +1387,8 @@ def sort_tasks(tasks, sort_by=None, order="asc"):
         
         # Tri par date (deadline, created_at)
         elif sort_by in ["deadline", "created_at"]:
-            field_name = "echeance" if sort_by == "deadline" else "date_creation"
             return sorted(tasks,
-                         key=lambda x: x.get(field_name, "") or "9999-12-31",
+                         key=lambda x: x.get(sort_by, "") or "9999-12-31",
                          reverse=reverse)
         
         # Tri alphabétique (responsable, description)
@@ -1490,6 +1535,8 @@ def get_available_sort_fields():
 
 @app.get("/all-tasks")
 def get_all_tasks(
+    request: Request,
+    response: Response,
     format: str = "unified",
     # Phase 1 - Filtres simples (existants)
     status: str = None,
@@ -1513,7 +1560,9 @@ def get_all_tasks(
     order: str = "asc",             # Ordre de tri (asc ou desc)
     # Phase 7 - Filtres par tags (nouveaux) 🏷️
     tag: str = None,                # Filtrer par un tag spécifique
-    tags: List[str] = Query([])     # Filtrer par plusieurs tags (ET logique)
+    tags: List[str] = Query([]),    # Filtrer par plusieurs tags (ET logique)
+    # Pagination par curseur (keyset) 📜
+    cursor: str = None              # Jeton next_cursor de la page précédente
 ):
     """
     🎯 PHASE 1-7: Récupérer toutes les tâches avec filtres, recherche, pagination, tri et tags
@@ -1547,10 +1596,74 @@ def get_all_tasks(
     Filtres Tags Phase 7 (nouveaux) 🏷️:
     - tag: Filtrer par un tag spécifique (ex: "urgent")
     - tags: Filtrer par plusieurs tags avec ET logique (ex: ["urgent", "bug"])
-    """
+    
+    Pagination par curseur 📜 (format unifié):
+    - cursor: Jeton `next_cursor` renvoyé par la page précédente (page est alors ignoré).
+      Parcours stable même si des tâches sont ajoutées entre deux pages.
+    """
+    query_params = {
+        "format": format,
+        "status": status,
+        "priority": priority,
+        "assignee": assignee,
+        "validated": validated,
+        "deadline_before": deadline_before,
+        "deadline_after": deadline_after,
+        "created_after": created_after,
+        "created_before": created_before,
+        "source": source,
+        "department": department,
+        "search": search,
+        "search_in": search_in,
+        "page": page,
+        "limit": limit,
+        "sort_by": sort_by,
+        "order": order,
+        "tag": tag,
+        "tags": tags,
+        "cursor": cursor
+    }
+    # ⚡ Cache des résultats : même requête + même version du store = simple lecture
+    if unified_store_available():
+        store = get_unified_task_manager().store
+        # 🏷️ 304 avant tout filtrage : l'URL identifie la requête, la version les données
+        not_modified = conditional_response(request, response, "all-tasks", store.etag_token())
+        if not_modified:
+            return not_modified
+        version = store.current_version()
+        return query_cache.get_or_compute(
+            "all-tasks", query_params, version,
+            lambda: _build_all_tasks_response(**query_params)
+        )
+    return _build_all_tasks_response(**query_params)
+
+def _build_all_tasks_response(
+    format: str = "unified",
+    status: str = None,
+    priority: str = None,
+    assignee: str = None,
+    validated: bool = None,
+    deadline_before: str = None,
+    deadline_after: str = None,
+    created_after: str = None,
+    created_before: str = None,
+    source: str = None,
+    department: str = None,
+    search: str = None,
+    search_in: str = "description",
+    page: int = 1,
+    limit: int = 20,
+    sort_by: str = None,
+    order: str = "asc",
+    tag: str = None,
+    tags: List[str] = None,
+    cursor: str = None
+):
+    """Construire la réponse de /all-tasks (voir get_all_tasks pour les paramètres)"""
+    tags = tags or []
     try:
         # 🚀 SYSTÈME UNIFIÉ: Format moderne par défaut
-        if UNIFIED_SYSTEM_AVAILABLE and os.path.exists(UNIFIED_TASKS_FILE):
+        if unified_store_available():
             unified_manager = get_unified_task_manager()
             
             if format == "legacy":
@@ -1654,63 +1767,64 @@ def get_all_tasks(
                 }
             else:
                 # Mode par défaut : format unifié (emails + meetings) avec filtres intelligents
-                unified_tasks = unified_manager.load_all_tasks()
-                total_before_filter = len(unified_tasks)
-                
-                # 🧠 FILTRAGE INTELLIGENT PHASE 1: Appliquer filtres simples avec support variantes
-                filtered_tasks = unified_tasks
-                
-                if status:
-                    filtered_tasks = [t for t in filtered_tasks if smart_filter_match(t.get('statut', ''), status, 'status')]
-                if priority:
-                    filtered_tasks = [t for t in filtered_tasks if smart_filter_match(t.get('priorite', ''), priority, 'priority')]
-                if assignee:
-                    filtered_tasks = [t for t in filtered_tasks if assignee.lower() in t.get('responsable', '').lower()]
-                if validated is not None:
-                    filtered_tasks = [t for t in filtered_tasks if t.get('validated', False) == validated]
-                
-                # 🏷️ FILTRAGE PAR TAGS PHASE 7: Mode unifié
-                if tag:
-                    filtered_tasks = [t for t in filtered_tasks if tag in t.get('tags', [])]
-                if tags:
-                    filtered_tasks = [t for t in filtered_tasks if all(tag_filter in t.get('tags', []) for tag_filter in tags)]
+                total_before_filter = unified_manager.store.count()
                 
-                # 🚀 FILTRAGE AVANCÉ PHASE 2: Appliquer nouveaux filtres
-                filtered_tasks = filter_by_date_range(
-                    filtered_tasks, 
-                    deadline_before=deadline_before,
-                    deadline_after=deadline_after,
-                    created_after=created_after,
-                    created_before=created_before
+                # 📜 Un curseur n'est valable que pour les mêmes filtres et le même tri
+                cursor_scope = empreinte_requete(
+                    status=status, priority=priority, assignee=assignee, validated=validated,
+                    deadline_before=deadline_before, deadline_after=deadline_after,
+                    created_after=created_after, created_before=created_before,
+                    source=source, department=department, search=search, search_in=search_in,
+                    tag=tag, tags=tags
                 )
                 
-                if source:
-                    filtered_tasks = filter_by_source(filtered_tasks, source)
-                
-                if department:
-                    filtered_tasks = filter_by_department(filtered_tasks, department)
-                
-                # 🔍 FILTRAGE RECHERCHE PHASE 3: Appliquer recherche textuelle
+                # 🔍 RECHERCHE PHASE 3: index inversé, les ids trouvés restreignent les candidats
+                search_ids = None
                 if search:
-                    # Parser les champs de recherche
-                    search_fields = []
                     if search_in == "all":
                         search_fields = ["all"]
                     elif search_in == "responsable":
                         search_fields = ["responsable"]
                     else:  # défaut: description
                         search_fields = ["description"]
-                    
-                    filtered_tasks = filter_by_search(filtered_tasks, search, search_fields)
+                    search_ids = unified_manager.search_task_ids(search, search_fields)
+                
+                # 🏷️ FILTRAGE PAR TAGS PHASE 7: intersection des ensembles de l'index des tags
+                candidate_ids = search_ids
+                if tag or tags:
+                    tag_ids = unified_manager.task_ids_with_tags(([tag] if tag else []) + list(tags))
+                    candidate_ids = tag_ids if candidate_ids is None else candidate_ids & tag_ids
+                
+                # 🧠 FILTRAGE PHASES 1 & 2: évalués par le stockage (index mémoire ou SQL)
+                filtered_tasks = unified_manager.query_tasks(
+                    candidate_ids=candidate_ids,
+                    status=status,
+                    priority=priority,
+                    assignee=assignee,
+                    validated=validated,
+                    source=source,
+                    department=department,
+                    deadline_before=deadline_before,
+                    deadline_after=deadline_after,
+                    created_after=created_after,
+                    created_before=created_before
+                )
+
                 
                 # 📄 PHASE 4: TRI ET PAGINATION pour mode unifié
                 # Appliquer le tri
-                if sort_by == "relevance" and search:
-                    # Tri par pertinence de recherche
-                    filtered_tasks = sort_by_relevance(filtered_tasks, search)
+                # Seules les tâches jusqu'à la page demandée sont ordonnées
+                page_size = 20 if limit < 1 else min(limit, 100)
+                page_window = max(page, 1) * page_size
+                if cursor:
+                    # Mode curseur : l'ordre est lu dans l'index de tri lors de la pagination
+                    pass
+                elif sort_by == "relevance" and search:
+                    # Pertinence BM25F
+                    filtered_tasks = unified_manager.rank_tasks(search, filtered_tasks, page_window)
                 elif sort_by:
-                    # Tri standard
-                    filtered_tasks = sort_tasks(filtered_tasks, sort_by, order)
+                    # Tri via les clés pré-triées (tas pour les sous-ensembles filtrés)
+                    filtered_tasks = unified_manager.sort_tasks(filtered_tasks, sort_by, order, page_window)
                 
                 # Statistiques par source sur les tâches filtrées (avant pagination)
                 sources = {}
@@ -1725,8 +1839,21 @@ def get_all_tasks(
                     "filtered_out": total_before_filter - len(filtered_tasks)
                 }
                 
-                # Appliquer la pagination
-                pagination_result = paginate_tasks(filtered_tasks, page, limit)
+                # Appliquer la pagination (curseur ou offset)
+                if cursor:
+                    try:
+                        pagination_result = unified_manager.cursor_page(
+                            filtered_tasks, sort_by, order, page_size, cursor, cursor_scope
+                        )
+                    except ValueError as e:
+                        raise HTTPException(status_code=400, detail=str(e))
+                else:
+                    pagination_result = paginate_tasks(filtered_tasks, page, limit)
+                    # Curseur pour continuer en mode keyset depuis cette page
+                    pagination_result["pagination"]["next_cursor"] = (
+                        unified_manager.next_cursor(pagination_result["tasks"], sort_by, order, cursor_scope)
+                        if pagination_result["pagination"]["has_next"] else None
+                    )
                 paginated_tasks = pagination_result["tasks"]
                 pagination_info = pagination_result["pagination"]
                 
@@ -1864,6 +1991,8 @@ def get_all_tasks(
                 "system": "legacy"
             }
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lecture tâches: {str(e)}")
 
@@ -2076,22 +2205,58 @@ async def process_transcription_simple(data: TranscriptionSimple):
         raise HTTPException(status_code=500, detail=f"Erreur traitement transcription: {str(e)}")
 
 @app.get("/tasks/stats")
-def get_tasks_statistics():
+def get_tasks_statistics(request: Request, response: Response):
     """
     🎯 Récupérer les statistiques globales des tâches (KPI corrects)
     
     Retourne les vraies métriques basées sur TOUTES les tâches de la base
     """
+    # ⚡ Recalcul uniquement si le store a changé depuis le dernier appel
+    if unified_store_available():
+        store = get_unified_task_manager().store
+        not_modified = conditional_response(request, response, "tasks-stats", store.etag_token())
+        if not_modified:
+            return not_modified
+        version = store.current_version()
+        return query_cache.get_or_compute("tasks-stats", {}, version, _compute_tasks_statistics)
+    return _compute_tasks_statistics()
+
+def _compute_tasks_statistics():
+    """Calculer les statistiques globales des tâches"""
     try:
-        # 🚀 UTILISER LE SYSTÈME UNIFIÉ: Même source que /all-tasks
-        if UNIFIED_SYSTEM_AVAILABLE and os.path.exists(UNIFIED_TASKS_FILE):
-            unified_manager = get_unified_task_manager()
-            all_tasks = unified_manager.load_all_tasks()
-        else:
-            # Fallback: utiliser l'ancien système
-            with open(DATA_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            all_tasks = data if isinstance(data, list) else []
+        # 🚀 UTILISER LE SYSTÈME UNIFIÉ: compteurs incrémentaux, sans parcours des tâches
+        if unified_store_available():
+            summary = get_unified_task_manager().get_statistics_summary()
+            by_status = summary["by_status"]
+            by_priority = summary["by_priority"]
+            return {
+                "total": summary["total"],
+                "by_status": {
+                    "completed": by_status.get("completed", 0),
+                    "in_progress": by_status.get("in_progress", 0),
+                    "pending": by_status.get("pending", 0),
+                    "rejected": by_status.get("rejected", 0)
+                },
+                "by_priority": {
+                    "urgent": by_priority.get("urgent", 0),
+                    "high": by_priority.get("high", 0),
+                    "medium": by_priority.get("medium", 0),
+                    "low": by_priority.get("low", 0)
+                },
+                "completion_rate": summary["completion_rate"],
+                # Ventilations supplémentaires (mêmes compteurs, aucun coût de parcours)
+                "by_source": summary["by_source"],
+                "by_department": summary["by_department"],
+                "validated": summary["validated"],
+                "tasks_with_tags": summary["tasks_with_tags"],
+                "status_by_priority": summary["status_by_priority"],
+                "department_completion": summary["department_completion"]
+            }
+        
+        # Fallback: utiliser l'ancien système
+        with open(DATA_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        all_tasks = data if isinstance(data, list) else []
         
         # Calculer les statistiques
         total_tasks = len(all_tasks)
@@ -2104,30 +2269,26 @@ def get_tasks_statistics():
                 "completion_rate": 0.0
             }
         
-        completed_tasks = len([t for t in all_tasks if t.get('statut') == 'completed'])
-        in_progress_tasks = len([t for t in all_tasks if t.get('statut') == 'in_progress'])
-        pending_tasks = len([t for t in all_tasks if t.get('statut') == 'pending'])
-        rejected_tasks = len([t for t in all_tasks if t.get('statut') == 'rejected'])
-        
-        # Statistiques par priorité
-        high_priority_tasks = len([t for t in all_tasks if t.get('priorite') == 'high'])
-        urgent_priority_tasks = len([t for t in all_tasks if t.get('priorite') == 'urgent'])
-        medium_priority_tasks = len([t for t in all_tasks if t.get('priorite') == 'medium'])
-        low_priority_tasks = len([t for t in all_tasks if t.get('priorite') == 'low'])
+        status_counts = {}
+        priority_counts = {}
+        for task in all_tasks:
+            status_counts[task.get('statut')] = status_counts.get(task.get('statut'), 0) + 1
+            priority_counts[task.get('priorite')] = priority_counts.get(task.get('priorite'), 0) + 1
+        completed_tasks = status_counts.get('completed', 0)
         
         return {
             "total": total_tasks,
             "by_status": {
                 "completed": completed_tasks,
-                "in_progress": in_progress_tasks,
-                "pending": pending_tasks,
-                "rejected": rejected_tasks
+                "in_progress": status_counts.get('in_progress', 0),
+                "pending": status_counts.get('pending', 0),
+                "rejected": status_counts.get('rejected', 0)
             },
             "by_priority": {
-                "urgent": urgent_priority_tasks,
-                "high": high_priority_tasks,
-                "medium": medium_priority_tasks,
-                "low": low_priority_tasks
+                "urgent": priority_counts.get('urgent', 0),
+                "high": priority_counts.get('high', 0),
+                "medium": priority_counts.get('medium', 0),
+                "low": priority_counts.get('low', 0)
             },
             "completion_rate": round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1)
         }
@@ -2135,8 +2296,26 @@ def get_tasks_statistics():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur récupération statistiques: {str(e)}")
 
+@app.post("/tasks/stats/rebuild")
+def rebuild_tasks_statistics():
+    """🔧 Reconstruire les compteurs de statistiques depuis zéro"""
+    if not UNIFIED_SYSTEM_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Système unifié non disponible")
+    try:
+        manager = get_unified_task_manager()
+        summary = manager.rebuild_statistics()
+        return {
+            "message": "Statistiques reconstruites",
+            "total": summary["total"],
+            "statistics": manager.statistics.get_stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur reconstruction statistiques: {str(e)}")
+
 @app.get("/meetings")
 async def list_meetings(
+    request: Request,
+    response: Response,
     departement: str = None,
     type_reunion: str = None,
     statut: str = None
@@ -2144,6 +2323,10 @@ async def list_meetings(
     """Liste les réunions avec filtres optionnels"""
     try:
         processor = get_meeting_processor()
+        # 🏷️ 304 si les fichiers réunions n'ont pas changé
+        not_modified = conditional_response(request, response, "meetings", processor.data_signature())
+        if not_modified:
+            return not_modified
         meetings = processor.load_meetings()
         
         # Appliquer filtres
@@ -2204,10 +2387,13 @@ async def get_meeting_tasks(meeting_id: str):
         raise HTTPException(status_code=500, detail=f"Erreur récupération tâches réunion: {str(e)}")
 
 @app.get("/meetings/stats/global")
-async def get_meetings_statistics():
+async def get_meetings_statistics(request: Request, response: Response):
     """Statistiques globales des réunions"""
     try:
         processor = get_meeting_processor()
+        not_modified = conditional_response(request, response, "meetings-stats", processor.data_signature())
+        if not_modified:
+            return not_modified
         meetings = processor.load_meetings()
         meeting_tasks = processor.load_meeting_tasks()
         
@@ -2303,7 +2489,7 @@ async def create_task_with_tags(task_data: TaskCreate):
         raise HTTPException(status_code=500, detail=f"Erreur création tâche: {str(e)}")
 
 @app.get("/tasks/tags")
-async def get_all_tags():
+async def get_all_tags(request: Request, response: Response):
     """
     🏷️ Récupérer tous les tags utilisés dans le système
     
@@ -2312,28 +2498,33 @@ async def get_all_tags():
     - Nombre d'utilisation de chaque tag
     - Tags triés par popularité
     """
+    # ⚡ Recalcul uniquement si le store a changé depuis le dernier appel
+    if UNIFIED_SYSTEM_AVAILABLE:
+        store = get_unified_task_manager().store
+        not_modified = conditional_response(request, response, "tasks-tags", store.etag_token())
+        if not_modified:
+            return not_modified
+        version = store.current_version()
+        return query_cache.get_or_compute("tasks-tags", {}, version, _compute_all_tags)
+    return _compute_all_tags()
+
+def _compute_all_tags():
+    """Compter les tags de toutes les tâches unifiées (lus depuis l'index des tags)"""
     try:
         if not UNIFIED_SYSTEM_AVAILABLE:
             raise HTTPException(status_code=503, detail="Système unifié non disponible")
         
-        # Récupérer toutes les tâches
         unified_manager = get_unified_task_manager()
-        all_tasks = unified_manager.load_all_tasks()
-        
-        # Compter les tags
-        tag_counts = {}
-        for task in all_tasks:
-            task_tags = task.get('tags', [])
-            for tag in task_tags:
-                tag_counts[tag] = tag_counts.get(tag, 0) + 1
+        tag_index = unified_manager.tag_index
         
-        # Trier par popularité
-        sorted_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)
+        # Trier par popularité (sur les tags distincts, pas sur les tâches)
+        sorted_tags = tag_index.by_popularity()
+        tag_counts = dict(sorted_tags)
         
         return {
             "message": "Tags récupérés avec succès",
             "total_unique_tags": len(tag_counts),
-            "total_tasks_with_tags": len([t for t in all_tasks if t.get('tags')]),
+            "total_tasks_with_tags": tag_index.tasks_with_tags(),
             "tags": {
                 "by_popularity": sorted_tags,
                 "alphabetical": sorted(tag_counts.keys()),
@@ -2347,7 +2538,7 @@ async def get_all_tags():
         raise HTTPException(status_code=500, detail=f"Erreur récupération tags: {str(e)}")
 
 @app.get("/tasks/tags/{tag_name}/tasks")
-async def get_tasks_by_tag(tag_name: str, limit: int = 20, page: int = 1):
+async def get_tasks_by_tag(tag_name: str, limit: int = 20, page: int = 1, cursor: str = None):
     """
     🔍 Récupérer toutes les tâches avec un tag spécifique
     
@@ -2355,6 +2546,7 @@ async def get_tasks_by_tag(tag_name: str, limit: int = 20, page: int = 1):
     - tag_name: Nom du tag à rechercher
     - limit: Nombre de tâches par page (défaut: 20)
     - page: Numéro de page (défaut: 1)
+    - cursor: Jeton next_cursor de la page précédente (pagination stable, page ignoré)
     """
     try:
         if not UNIFIED_SYSTEM_AVAILABLE:
@@ -2363,12 +2555,24 @@ async def get_tasks_by_tag(tag_name: str, limit: int = 20, page: int = 1):
         # Normaliser le tag recherché
         normalized_tag = tag_name.strip().lower().replace(' ', '-').replace('_', '-')
         
-        # Récupérer toutes les tâches avec ce tag
+        # Tâches portant ce tag : lecture directe de l'index (ordre du fichier)
         unified_manager = get_unified_task_manager()
-        all_tasks = unified_manager.load_all_tasks()
+        tagged_tasks = unified_manager.get_tasks_with_tags([normalized_tag])
+        cursor_scope = empreinte_requete(tag=normalized_tag)
         
-        # Filtrer par tag
-        tagged_tasks = [task for task in all_tasks if normalized_tag in task.get('tags', [])]
+        # 📜 Pagination par curseur : reprise après la dernière tâche vue
+        if cursor:
+            try:
+                cursor_result = unified_manager.cursor_page(tagged_tasks, None, "asc", limit, cursor, cursor_scope)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return {
+                "message": f"Tâches avec tag '{tag_name}' récupérées",
+                "tag": normalized_tag,
+                "total_tasks": len(tagged_tasks),
+                "tasks": cursor_result["tasks"],
+                "pagination": cursor_result["pagination"]
+            }
         
         # Pagination
         start_idx = (page - 1) * limit
@@ -2385,7 +2589,9 @@ async def get_tasks_by_tag(tag_name: str, limit: int = 20, page: int = 1):
                 "total_pages": total_pages,
                 "total_items": len(tagged_tasks),
                 "has_next": page < total_pages,
-                "has_prev": page > 1
+                "has_prev": page > 1,
+                "next_cursor": unified_manager.next_cursor(page_tasks, None, "asc", cursor_scope)
+                if page < total_pages else None
             }
         }
         
@@ -2414,17 +2620,14 @@ async def get_popular_tags(limit: int = 10):
         if not UNIFIED_SYSTEM_AVAILABLE:
             raise HTTPException(status_code=503, detail="Système unifié non disponible")
         
-        # Récupérer tous les tags
-        response = await get_all_tags()
-        all_tags_data = response["tags"]["by_popularity"]
-        
-        # Limiter aux plus populaires
-        popular_tags = all_tags_data[:limit]
+        # Top-k depuis le tas de popularité (sans trier tous les tags)
+        tag_index = get_unified_task_manager().tag_index
+        popular_tags = tag_index.top(max(limit, 0))
         
         return {
             "message": f"Top {limit} tags populaires",
             "popular_tags": popular_tags,
-            "total_tags_available": len(all_tags_data)
+            "total_tags_available": len(tag_index.counts())
         }
         
     except HTTPException:
@@ -2446,55 +2649,52 @@ async def get_tag_suggestions(description: str = None, task_id: str = None):
         if not UNIFIED_SYSTEM_AVAILABLE:
             raise HTTPException(status_code=503, detail="Système unifié non disponible")
         
-        # Récupérer tags existants pour suggestions
-        response = await get_all_tags()
-        existing_tags = list(response["tags"]["counts"].keys())
+        # Un seul accès à l'index des tags pour toute la requête
+        unified_manager = get_unified_task_manager()
+        tag_index = unified_manager.tag_index
+        existing_tags = list(tag_index.counts().keys())
         
         suggestions = []
         
-        # Si description fournie, analyser pour suggérer
-        if description:
-            description_lower = description.lower()
-            
-            # Mots-clés → tags suggérés
-            keyword_mapping = {
-                "urgent": ["urgent", "prioritaire", "asap"],
-                "bug": ["bug", "erreur", "problème"],
-                "feature": ["feature", "fonctionnalité", "nouveau"],
-                "réunion": ["réunion", "meeting", "rendez-vous"],
-                "rapport": ["rapport", "document", "analysis"],
-                "client": ["client", "customer", "externe"],
-                "interne": ["interne", "équipe", "team"],
-                "sécurité": ["sécurité", "security", "protection"],
-                "performance": ["performance", "optimisation", "vitesse"],
-                "test": ["test", "testing", "qa"]
-            }
+        # Si task_id fourni, analyser aussi la description de la tâche
+        descriptions = [description] if description else []
+        if task_id:
+            task = unified_manager.store.get(task_id)
+            if task and task.get('description'):
+                descriptions.append(task['description'])
+        
+        # Mots-clés → tags suggérés
+        keyword_mapping = {
+            "urgent": ["urgent", "prioritaire", "asap"],
+            "bug": ["bug", "erreur", "problème"],
+            "feature": ["feature", "fonctionnalité", "nouveau"],
+            "réunion": ["réunion", "meeting", "rendez-vous"],
+            "rapport": ["rapport", "document", "analysis"],
+            "client": ["client", "customer", "externe"],
+            "interne": ["interne", "équipe", "team"],
+            "sécurité": ["sécurité", "security", "protection"],
+            "performance": ["performance", "optimisation", "vitesse"],
+            "test": ["test", "testing", "qa"]
+        }
+        
+        for text in descriptions:
+            description_lower = text.lower()
             
             for keyword, tags in keyword_mapping.items():
                 if any(word in description_lower for word in tags):
                     suggestions.extend(tags)
             
             # Ajouter suggestions basées sur tags existants similaires
+            words = description_lower.split()
             for existing_tag in existing_tags:
-                if any(word in existing_tag for word in description_lower.split()):
+                if any(word in existing_tag for word in words):
                     suggestions.append(existing_tag)
         
-        # Si task_id fourni, analyser la tâche
-        if task_id:
-            unified_manager = get_unified_task_manager()
-            task = unified_manager.get_task_by_id(task_id)
-            if task:
-                task_desc = task.get('description', '')
-                # Récursif pour analyser description de la tâche
-                desc_suggestions = await get_tag_suggestions(description=task_desc)
-                suggestions.extend(desc_suggestions.get('suggested_tags', []))
-        
         # Éliminer doublons et limiter
         unique_suggestions = list(set(suggestions))[:10]
         
         # Ajouter quelques tags populaires
-        popular_response = await get_popular_tags(limit=5)
-        popular_tags = [tag[0] for tag in popular_response["popular_tags"]]
+        popular_tags = [tag for tag, _ in tag_index.top(5)]
         
         return {
             "message": "Suggestions de tags générées",
@@ -2647,8 +2847,44 @@ async def remove_tag_from_task(task_id: str, tag_name: str):
 # GESTION INDIVIDUELLE DES TÂCHES
 # =====================================
 
+@app.get("/tasks/changes")
+def get_task_changes(
+    since: Optional[str] = Query(None, description="Version du store (ou jeton 'instance:version') de la dernière synchronisation"),
+    since_timestamp: Optional[str] = Query(None, description="Alternative : date ISO de la dernière synchronisation")
+):
+    """
+    🔄 Synchronisation différentielle : tâches changées depuis une version
+    
+    Retourne les tâches insérées et mises à jour (corps complets) et les ids
+    supprimés depuis `since`. Si le client est trop en retard (rétention du
+    journal dépassée, redémarrage du serveur), resync_required=True : il doit
+    recharger /all-tasks puis repartir de `version_token`.
+    """
+    if not UNIFIED_SYSTEM_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Système unifié non disponible")
+    if since is None and since_timestamp is None:
+        raise HTTPException(status_code=400, detail="Paramètre 'since' ou 'since_timestamp' requis")
+    
+    timestamp = None
+    if since is None:
+        try:
+            timestamp = datetime.fromisoformat(since_timestamp).timestamp()
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Date invalide: {since_timestamp}")
+    
+    try:
+        changes = get_unified_task_manager().get_changes_since(since, timestamp)
+        changes["counts"] = {
+            "inserted": len(changes["inserted"]),
+            "updated": len(changes["updated"]),
+            "deleted": len(changes["deleted"])
+        }
+        return changes
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur synchronisation: {str(e)}")
+
 @app.get("/tasks/{task_id}")
-async def get_task_detail(task_id: str):
+async def get_task_detail(task_id: str, request: Request, response: Response):
     """
     🔍 Récupérer le détail complet d'une tâche par son ID
     
@@ -2663,8 +2899,15 @@ async def get_task_detail(task_id: str):
         if not UNIFIED_SYSTEM_AVAILABLE:
             raise HTTPException(status_code=503, detail="Système unifié non disponible")
         
-        # Récupérer la tâche depuis le système unifié
+        # 🏷️ ETag : version du store + jour courant (age_days en dépend)
         unified_manager = get_unified_task_manager()
+        not_modified = conditional_response(
+            request, response, "task", task_id, unified_manager.store.etag_token(), datetime.now().date()
+        )
+        if not_modified:
+            return not_modified
+        
+        # Récupérer la tâche depuis le système unifié
         task = unified_manager.get_task_by_id(task_id)
         
         if not task:
@@ -3435,7 +3678,7 @@ async def upload_document(
                 try:
                     # Utiliser la logique d'extraction existante
                     tasks_data = extract_tasks_from_email(extracted_text)
-                    tasks_extracted = json.loads(tasks_data) if tasks_data else []
+                    tasks_extracted = parser_taches(tasks_data) if tasks_data else []
 
                     # Enrichissement des tâches extraites du document
                     for task in tasks_extracted:
@@ -22,6 +22,7 @@ from utils.cache_emails import (
     obtenir_statistiques_cache,
     nettoyer_cache_ancien
 )
+from utils.llm_cache import get_llm_cache
 
 router = APIRouter()
 
@@ -38,9 +39,12 @@ def get_cache_statistics():
         if stats["cache_file_exists"]:
             stats["cache_file_size"] = os.path.getsize(cache_file)
         
+        llm_cache = get_llm_cache()
+        
         return {
             "status": "success",
             "cache_statistics": stats,
+            "llm_response_cache": llm_cache.get_stats() if llm_cache is not None else {"enabled": False},
             "timestamp": datetime.now().isoformat()
         }
     
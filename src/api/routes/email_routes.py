@@ -8,6 +8,7 @@ Endpoints pour le traitement intelligent des emails avec toutes optimisations.
 
 from fastapi import APIRouter, HTTPException, Query
 from datetime import datetime
+from typing import Optional
 import json
 import uuid
 import os
@@ -23,6 +24,7 @@ from core.agent_task import (
     resume_email,
     identifier_departement,
     deduire_priorite,
+    completer_priorites,
     suggere_taches_implicites,
     extract_tasks_optimized,
     suggere_taches_implicites_optimized,
@@ -34,6 +36,7 @@ from utils.cache_emails import (
     marquer_email_traite,
     obtenir_info_cache
 )
+from utils.llm_json import parser_taches
 
 router = APIRouter()
 
@@ -84,7 +87,10 @@ def api_traiter_emails_unifie(
     use_rate_limiting: bool = Query(False, description="Activer protection rate limiting"),
     use_batch_processing: bool = Query(True, description="Activer traitement par batch"),
     use_cache: bool = Query(True, description="Activer cache anti-doublon"),
-    use_optimized_prompts: bool = Query(True, description="Activer prompts optimisés")
+    use_optimized_prompts: bool = Query(True, description="Activer prompts optimisés"),
+    use_async_processing: bool = Query(True, description="Traiter les emails en parallèle (asyncio)"),
+    max_concurrency: Optional[int] = Query(None, ge=1, le=64, description="Appels IA simultanés maximum (défaut: fenêtre adaptative)"),
+    extraction_mode: str = Query("classique", description="classique (appels séparés), fusionnee (un seul appel par email) ou groupee (plusieurs emails courts par appel)")
 ):
     """
     🚀 ENDPOINT UNIFIÉ: Traitement emails intelligent avec toutes les améliorations.
@@ -95,13 +101,18 @@ def api_traiter_emails_unifie(
     ✅ 3. Rate limiting + Queue (protection surcharge)
     ✅ 4. Optimisation prompts IA (qualité + économies)
     """
+    if extraction_mode not in ("classique", "fusionnee", "groupee"):
+        raise HTTPException(status_code=400, detail=f"Mode d'extraction inconnu: {extraction_mode}")
     try:
         # Appel de la fonction pipeline unifiée
         resultat = traiter_emails(
             use_rate_limiting=use_rate_limiting,
             use_batch_processing=use_batch_processing,
             use_cache=use_cache,
-            use_optimized_prompts=use_optimized_prompts
+            use_optimized_prompts=use_optimized_prompts,
+            use_async_processing=use_async_processing,
+            max_concurrency=max_concurrency,
+            extraction_mode=extraction_mode
         )
         
         # Construire la réponse avec détails des optimisations actives
@@ -114,6 +125,12 @@ def api_traiter_emails_unifie(
             optimisations_actives.append("Rate limiting + Queue")
         if use_optimized_prompts:
             optimisations_actives.append("Prompts IA optimisés")
+        if use_async_processing and not use_rate_limiting:
+            optimisations_actives.append("Traitement concurrent")
+        if extraction_mode == "fusionnee":
+            optimisations_actives.append("Extraction fusionnée (1 appel IA par email)")
+        if extraction_mode == "groupee":
+            optimisations_actives.append("Extraction groupée (1 appel IA par lot d'emails)")
         
         return ProcessingResponse(
             status="success",
@@ -178,9 +195,7 @@ def handle_email_explicit(input: EmailInput):
     result_text = extract_tasks_optimized(input.texte, use_optimized_prompts=True)
 
     try:
-        tasks = json.loads(result_text)
-        if not isinstance(tasks, list):
-            raise ValueError("Résultat IA n'est pas une liste")
+        tasks = parser_taches(result_text)
     except Exception as e:
         ecrire_log(
             email_objet=input.objet,
@@ -199,7 +214,7 @@ def handle_email_explicit(input: EmailInput):
     if input.departement:
         departement_info = {"nom": input.departement, "origine": "Utilisateur"}
     else:
-        nom_dept = identifier_departement(input.texte)
+        nom_dept = identifier_departement(input.texte, input.expediteur, input.destinataire, input.objet)
         departement_info = {"nom": nom_dept, "origine": "AI"}
 
     origine_email = {
@@ -216,6 +231,8 @@ def handle_email_explicit(input: EmailInput):
         data = json.load(f)
 
     nouvelles_taches_ajoutees = []
+    # Priorités manquantes : moteur local sur toutes les tâches de l'email
+    completer_priorites(tasks, origine_email)
 
     for task in tasks:
         # Nettoyage des champs
@@ -223,8 +240,6 @@ def handle_email_explicit(input: EmailInput):
             task["deadline"] = "inconnue"
         if not task.get("responsable"):
             task["responsable"] = "non précisé"
-        if not task.get("priorite") or task["priorite"].strip() == "":
-            task["priorite"] = deduire_priorite(task["description"])
 
         # Enrichissement
         task["id"] = str(uuid.uuid4())
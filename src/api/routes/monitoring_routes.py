@@ -25,6 +25,7 @@ def get_rate_limit_status():
     """📊 Statut du rate limiter."""
     try:
         from utils.rate_limiter import RateLimiter
+        from utils.adaptive_concurrency import statistiques_concurrence
         
         # Créer un rate limiter temporaire pour les stats
         limiter = RateLimiter()
@@ -33,6 +34,7 @@ def get_rate_limit_status():
         return {
             "status": "success",
             "rate_limit_stats": stats,
+            "adaptive_concurrency": statistiques_concurrence(),
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -1,23 +1,55 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import os
-import openai
-from dotenv import load_dotenv
 from datetime import datetime
 import json
 
-# Charger la clé API depuis .env
-load_dotenv()
-api_key = os.getenv("OPENROUTER_API_KEY")
-
-# Configurer le client OpenRouter
-client = openai.OpenAI(
-    api_key=api_key,
-    base_url="https://openrouter.ai/api/v1"
-)
+# Client OpenRouter partagé (appels bloquants et asynchrones, voir llm_client.py)
+from llm_client import client, completer
+from extraction_schema import valider_extraction_fusionnee, valider_extraction_groupee
+from llm_json import extraire_json, parser_taches
+from email_classifier import get_pre_classifieur
+from department_classifier import get_department_classifier
+from priority_engine import get_moteur_priorite
+from token_budget import preparer_entree, preparer_morceaux
+
+# Chaque fonction IA existe en deux versions qui partagent le même prompt :
+# - version bloquante (historique) : extract_tasks_from_email(texte)
+# - version asynchrone : extract_tasks_from_email_async(texte, llm) avec llm = ClientLLMAsync
+#
+# ✂️ Le texte envoyé est d'abord nettoyé et mis au budget de tokens du type d'appel
+# (token_budget.py) : tronqué pour un appel unique, découpé en morceaux pour
+# l'extraction de tâches (un appel par morceau, listes de tâches fusionnées).
+#
+# 🛡️ Les erreurs du fournisseur sont rejouées (backoff, Retry-After) et coupées
+# par le disjoncteur dans llm_client.py : une erreur qui arrive ici est définitive
+# et remonte, elle n'est pas renvoyée avec un autre prompt.
+
+def _fusionner_reponses(reponses) -> str:
+    """Réponses JSON des morceaux d'un texte découpé → une seule liste de tâches"""
+    taches = []
+    for reponse in reponses:
+        try:
+            taches.extend(extraire_json(reponse, attendu=list))
+        except ValueError as e:
+            print(f"⚠️ Morceau ignoré (réponse IA illisible): {e}")
+    return json.dumps(taches, ensure_ascii=False)
+
+def _par_morceaux(texte: str, type_appel: str, extraire) -> str:
+    morceaux = preparer_morceaux(texte, type_appel)
+    if len(morceaux) == 1:
+        return extraire(morceaux[0])
+    return _fusionner_reponses([extraire(morceau) for morceau in morceaux])
+
+async def _par_morceaux_async(texte: str, type_appel: str, extraire) -> str:
+    morceaux = preparer_morceaux(texte, type_appel)
+    if len(morceaux) == 1:
+        return await extraire(morceaux[0])
+    return _fusionner_reponses(await asyncio.gather(*(extraire(morceau) for morceau in morceaux)))
 
 # ✅ Fonction 1 : Extraire les tâches d’un email explicite
-def extract_tasks_from_email(text_email: str):
-    prompt = f"""
+def _prompt_extraction(text_email: str) -> str:
+    return f"""
         Lis cet email et extrais toutes les tâches clairement mentionnées.
 
         Donne chaque tâche sous forme de liste JSON, avec les champs suivants :
@@ -31,66 +63,122 @@ def extract_tasks_from_email(text_email: str):
         Email :
     {text_email}
         """
-    response = client.chat.completions.create(
-        model="openai/gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
 
-    return response.choices[0].message.content
+def extract_tasks_from_email(text_email: str):
+    return _par_morceaux(text_email, "explicite", lambda morceau: completer(_prompt_extraction(morceau)))
+
+async def extract_tasks_from_email_async(text_email: str, llm):
+    return await _par_morceaux_async(text_email, "explicite",
+                                     lambda morceau: llm.completer(_prompt_extraction(morceau)))
 
 # ✅ Fonction 2 : Résumer le contenu de l’email (2 lignes max)
-def resume_email(text_email: str):
-    prompt = f"""
+def _prompt_resume(text_email: str) -> str:
+    return f"""
         Lis cet email et donne un court résumé de 1 ou 2 phrases maximum.
         Rends uniquement le texte résumé, sans autre commentaire.
 
         Email :
-    {text_email}
+    {preparer_entree(text_email, "resume")}
         """
-    response = client.chat.completions.create(
-        model="openai/gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
 
-    return response.choices[0].message.content.strip()
+def resume_email(text_email: str):
+    return completer(_prompt_resume(text_email)).strip()
+
+async def resume_email_async(text_email: str, llm):
+    return (await llm.completer(_prompt_resume(text_email))).strip()
 
 # ✅ Fonction 3 : Identifier le département concerné par l’email
-def identifier_departement(text_email: str):
-    prompt = f"""
+def _prompt_departement(text_email: str) -> str:
+    return f"""
         Lis cet email et déduis le département concerné (ex: RH, Finance, IT, Marketing).
         Retourne uniquement le nom du département, sans phrase autour.
 
         Email :
-    {text_email}
+    {preparer_entree(text_email, "departement")}
         """
-    response = client.chat.completions.create(
-        model="openai/gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
 
-    return response.choices[0].message.content.strip()
+def _departement_local(text_email: str, expediteur, destinataire, objet: str):
+    """Département déduit sans IA (department_classifier.py), None si l'IA doit trancher"""
+    classifier = get_department_classifier()
+    if classifier is None:
+        return None
+    nom, _ = classifier.identifier(text_email, expediteur, destinataire, objet)
+    return nom
+
+def _memoriser_departement(expediteur, destinataire, nom: str):
+    """La réponse de l'IA enrichit le mémo expéditeur/destinataire → département"""
+    classifier = get_department_classifier()
+    if classifier is not None:
+        classifier.enregistrer(expediteur, destinataire, nom)
+
+def identifier_departement(text_email: str, expediteur=None, destinataire=None, objet: str = ""):
+    nom = _departement_local(text_email, expediteur, destinataire, objet)
+    if nom is not None:
+        return nom
+    nom = completer(_prompt_departement(text_email)).strip()
+    _memoriser_departement(expediteur, destinataire, nom)
+    return nom
+
+async def identifier_departement_async(text_email: str, llm, expediteur=None, destinataire=None, objet: str = ""):
+    nom = _departement_local(text_email, expediteur, destinataire, objet)
+    if nom is not None:
+        return nom
+    nom = (await llm.completer(_prompt_departement(text_email))).strip()
+    _memoriser_departement(expediteur, destinataire, nom)
+    return nom
 
 
 # ✅ Fonction 4 : Déduire la priorité d'une tâche (basée sur sa description)
-def deduire_priorite(description: str):
-    prompt = f"""
+def _prompt_priorite(description: str) -> str:
+    return f"""
         Lis la description suivante d'une tâche et donne sa priorité : élevée, moyenne ou faible.
         Retourne uniquement le mot : élevée, moyenne ou faible.
 
         Description :
     {description}
         """
-    response = client.chat.completions.create(
-        model="openai/gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
 
-    return response.choices[0].message.content.strip().lower()
+# Moteur local (priority_engine.py) d'abord : l'IA ne voit que les tâches sans
+# aucun signal, et seulement si PRIORITY_LLM_FALLBACK=1
+def deduire_priorite(description: str, deadline=None, email=None):
+    priorite = get_moteur_priorite().deduire(description, deadline, email)
+    if priorite is not None:
+        return priorite
+    return completer(_prompt_priorite(description)).strip().lower()
+
+async def deduire_priorite_async(description: str, llm, deadline=None, email=None):
+    priorite = get_moteur_priorite().deduire(description, deadline, email)
+    if priorite is not None:
+        return priorite
+    return (await llm.completer(_prompt_priorite(description))).strip().lower()
+
+def _sans_priorite(taches):
+    return [tache for tache in taches if not str(tache.get("priorite") or "").strip()]
+
+def completer_priorites(taches, email=None):
+    """Renseigner les priorités manquantes de toutes les tâches d'un email en un passage"""
+    sans_priorite = _sans_priorite(taches)
+    for tache, priorite in zip(sans_priorite, get_moteur_priorite().deduire_priorites(sans_priorite, email)):
+        tache["priorite"] = priorite if priorite is not None else \
+            completer(_prompt_priorite(tache["description"])).strip().lower()
+    return taches
+
+async def completer_priorites_async(taches, llm, email=None):
+    sans_priorite = _sans_priorite(taches)
+    priorites = get_moteur_priorite().deduire_priorites(sans_priorite, email)
+    a_confier = [tache for tache, priorite in zip(sans_priorite, priorites) if priorite is None]
+    reponses = await asyncio.gather(*(llm.completer(_prompt_priorite(tache["description"])) for tache in a_confier))
+    for tache, priorite in zip(sans_priorite, priorites):
+        if priorite is not None:
+            tache["priorite"] = priorite
+    for tache, reponse in zip(a_confier, reponses):
+        tache["priorite"] = reponse.strip().lower()
+    return taches
 
 
 # ✅ Fonction 4 : Suggérer des tâches implicites à partir d’un email
-def suggere_taches_implicites(text_email: str):
-    prompt = f"""
+def _prompt_implicites(text_email: str) -> str:
+    return f"""
         Lis attentivement cet email.
         Même s’il ne contient pas d’ordres clairs, déduis toutes les tâches possibles que l’équipe devrait faire, en fonction du contexte.
         Pour chaque tâche, donne les éléments suivants :
@@ -104,16 +192,17 @@ def suggere_taches_implicites(text_email: str):
     {text_email}
         """
 
-    response = client.chat.completions.create(
-        model="openai/gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
+def suggere_taches_implicites(text_email: str):
+    return _par_morceaux(text_email, "implicite", lambda morceau: completer(_prompt_implicites(morceau)).strip())
 
-    return response.choices[0].message.content.strip()
+async def suggere_taches_implicites_async(text_email: str, llm):
+    async def extraire(morceau):
+        return (await llm.completer(_prompt_implicites(morceau))).strip()
+    return await _par_morceaux_async(text_email, "implicite", extraire)
 
 # Fonction IA : Filtrer un email pour déterminer son type
-def filtrer_email(text_email: str):
-    prompt = f"""
+def _prompt_filtrage(text_email: str) -> str:
+    return f"""
         Lis cet email et détermine s’il contient des instructions ou demandes claires d’action.
         Si oui, réponds uniquement : "explicite".
         Si non, réponds uniquement : "implicite".
@@ -125,17 +214,30 @@ def filtrer_email(text_email: str):
         Ne donne aucune explication. Retourne seulement "explicite" ou "implicite".
 
         Email :
-    {text_email}
+    {preparer_entree(text_email, "filtrage")}
         """
 
-    response = client.chat.completions.create(
-        model="openai/gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
-
-    result = response.choices[0].message.content.strip().lower()
+def _classer_localement(text_email: str, objet: str):
+    """Étiquette du pré-classifieur local (email_classifier.py), None si l'IA doit trancher"""
+    pre_classifieur = get_pre_classifieur()
+    if pre_classifieur is None:
+        return None
+    label, _ = pre_classifieur.classer(text_email, objet)
+    return label
+
+def filtrer_email(text_email: str, objet: str = ""):
+    label = _classer_localement(text_email, objet)
+    if label is not None:
+        return label
+    result = completer(_prompt_filtrage(text_email)).strip().lower()
     return result  # "explicite" ou "implicite"
 
+async def filtrer_email_async(text_email: str, llm, objet: str = ""):
+    label = _classer_localement(text_email, objet)
+    if label is not None:
+        return label
+    return (await llm.completer(_prompt_filtrage(text_email))).strip().lower()
+
 
 # 🚀 AMÉLIORATION #4: OPTIMISATION DES PROMPTS IA
 # ================================================
@@ -205,19 +307,8 @@ def optimiser_prompt_pour_extraction(texte_email: str, type_extraction: str) ->
     return prompt_final
 
 
-def extract_tasks_optimized(texte_email: str, use_optimized_prompts: bool = True) -> str:
-    """
-    🎯 EXTRACTION TÂCHES AVEC PROMPTS OPTIMISÉS.
-    Version améliorée de extract_tasks_from_email.
-    
-    Args:
-        texte_email: Contenu de l'email
-        use_optimized_prompts: Utiliser les prompts optimisés (True) ou standard (False)
-        
-    Returns:
-        str: JSON des tâches extraites
-    """
-    
+def _prompt_extraction_optimisee(texte_email: str, use_optimized_prompts: bool) -> str:
+    """Prompt d'extraction explicite (optimisé ou standard)"""
     if use_optimized_prompts:
         # Nouveau prompt optimisé
         prompt = optimiser_prompt_pour_extraction(texte_email, "explicite")
@@ -237,35 +328,40 @@ def extract_tasks_optimized(texte_email: str, use_optimized_prompts: bool = True
         Email : {texte_email}
         """
     
-    try:
-        response = client.chat.completions.create(
-            model="openai/gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=800,  # Optimisé pour réduire les coûts
-            temperature=0.1  # Plus déterministe
-        )
-        
-        return response.choices[0].message.content.strip()
-    
-    except Exception as e:
-        print(f"⚠️ Erreur extraction optimisée: {e}")
-        # Fallback vers méthode standard
-        return extract_tasks_from_email(texte_email)
+    return prompt
 
+# Optimisé pour réduire les coûts, plus déterministe
+PARAMS_EXTRACTION_OPTIMISEE = {"max_tokens": 800, "temperature": 0.1}
 
-def suggere_taches_implicites_optimized(texte_email: str, use_optimized_prompts: bool = True) -> str:
+def extract_tasks_optimized(texte_email: str, use_optimized_prompts: bool = True) -> str:
     """
-    💡 SUGGESTIONS TÂCHES IMPLICITES AVEC PROMPTS OPTIMISÉS.
-    Version améliorée de suggere_taches_implicites.
+    🎯 EXTRACTION TÂCHES AVEC PROMPTS OPTIMISÉS.
+    Version améliorée de extract_tasks_from_email.
     
     Args:
         texte_email: Contenu de l'email
-        use_optimized_prompts: Utiliser les prompts optimisés
+        use_optimized_prompts: Utiliser les prompts optimisés (True) ou standard (False)
         
     Returns:
-        str: JSON des tâches implicites suggérées
+        str: JSON des tâches extraites
     """
-    
+    def extraire(morceau):
+        prompt = _prompt_extraction_optimisee(morceau, use_optimized_prompts)
+        return completer(prompt, **PARAMS_EXTRACTION_OPTIMISEE, valider=parser_taches).strip()
+
+    return _par_morceaux(texte_email, "explicite", extraire)
+
+async def extract_tasks_optimized_async(texte_email: str, llm, use_optimized_prompts: bool = True) -> str:
+    """Version asynchrone de extract_tasks_optimized (même prompt)"""
+    async def extraire(morceau):
+        prompt = _prompt_extraction_optimisee(morceau, use_optimized_prompts)
+        return (await llm.completer(prompt, **PARAMS_EXTRACTION_OPTIMISEE, valider=parser_taches)).strip()
+
+    return await _par_morceaux_async(texte_email, "explicite", extraire)
+
+
+def _prompt_implicites_optimise(texte_email: str, use_optimized_prompts: bool) -> str:
+    """Prompt de suggestion de tâches implicites (optimisé ou standard)"""
     if use_optimized_prompts:
         # Nouveau prompt optimisé
         prompt = optimiser_prompt_pour_extraction(texte_email, "implicite")
@@ -285,35 +381,41 @@ def suggere_taches_implicites_optimized(texte_email: str, use_optimized_prompts:
         Email : {texte_email}
         """
     
-    try:
-        response = client.chat.completions.create(
-            model="openai/gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=600,  # Optimisé pour réduire les coûts
-            temperature=0.2  # Légèrement plus créatif pour suggestions
-        )
-        
-        return response.choices[0].message.content.strip()
-    
-    except Exception as e:
-        print(f"⚠️ Erreur suggestions optimisées: {e}")
-        # Fallback vers méthode standard
-        return suggere_taches_implicites(texte_email)
+    return prompt
 
+# Optimisé pour réduire les coûts, légèrement plus créatif pour suggestions
+PARAMS_IMPLICITES_OPTIMISES = {"max_tokens": 600, "temperature": 0.2}
 
-def resume_email_optimized(texte_email: str, use_optimized_prompts: bool = True) -> str:
+def suggere_taches_implicites_optimized(texte_email: str, use_optimized_prompts: bool = True) -> str:
     """
-    📝 RÉSUMÉ EMAIL AVEC PROMPTS OPTIMISÉS.
-    Version améliorée de resume_email.
+    💡 SUGGESTIONS TÂCHES IMPLICITES AVEC PROMPTS OPTIMISÉS.
+    Version améliorée de suggere_taches_implicites.
     
     Args:
         texte_email: Contenu de l'email
         use_optimized_prompts: Utiliser les prompts optimisés
         
     Returns:
-        str: Résumé optimisé de l'email
+        str: JSON des tâches implicites suggérées
     """
-    
+    def extraire(morceau):
+        prompt = _prompt_implicites_optimise(morceau, use_optimized_prompts)
+        return completer(prompt, **PARAMS_IMPLICITES_OPTIMISES).strip()
+
+    return _par_morceaux(texte_email, "implicite", extraire)
+
+async def suggere_taches_implicites_optimized_async(texte_email: str, llm, use_optimized_prompts: bool = True) -> str:
+    """Version asynchrone de suggere_taches_implicites_optimized"""
+    async def extraire(morceau):
+        prompt = _prompt_implicites_optimise(morceau, use_optimized_prompts)
+        return (await llm.completer(prompt, **PARAMS_IMPLICITES_OPTIMISES)).strip()
+
+    return await _par_morceaux_async(texte_email, "implicite", extraire)
+
+
+def _prompt_resume_optimise(texte_email: str, use_optimized_prompts: bool) -> str:
+    """Prompt de résumé adapté à la longueur de l'email (nettoyé et mis au budget)"""
+    texte_email = preparer_entree(texte_email, "resume")
     if use_optimized_prompts:
         # Prompt optimisé court et efficace
         longueur = len(texte_email)
@@ -327,18 +429,156 @@ def resume_email_optimized(texte_email: str, use_optimized_prompts: bool = True)
         # Ancien prompt standard
         prompt = f"Résume ce email en quelques phrases : {texte_email}"
     
-    try:
-        response = client.chat.completions.create(
-            model="openai/gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=150,  # Résumé concis
-            temperature=0.0  # Déterministe
-        )
+    return prompt
+
+# Résumé concis, déterministe
+PARAMS_RESUME_OPTIMISE = {"max_tokens": 150, "temperature": 0.0}
+
+def resume_email_optimized(texte_email: str, use_optimized_prompts: bool = True) -> str:
+    """
+    📝 RÉSUMÉ EMAIL AVEC PROMPTS OPTIMISÉS.
+    Version améliorée de resume_email.
+    
+    Args:
+        texte_email: Contenu de l'email
+        use_optimized_prompts: Utiliser les prompts optimisés
         
-        return response.choices[0].message.content.strip()
+    Returns:
+        str: Résumé optimisé de l'email
+    """
+    prompt = _prompt_resume_optimise(texte_email, use_optimized_prompts)
+    return completer(prompt, **PARAMS_RESUME_OPTIMISE).strip()
+
+async def resume_email_optimized_async(texte_email: str, llm, use_optimized_prompts: bool = True) -> str:
+    """Version asynchrone de resume_email_optimized"""
+    prompt = _prompt_resume_optimise(texte_email, use_optimized_prompts)
+    return (await llm.completer(prompt, **PARAMS_RESUME_OPTIMISE)).strip()
+
+
+
+# 🧩 EXTRACTION FUSIONNÉE : type, tâches, résumé et département en un seul appel
+# ==============================================================================
+
+# Réponse JSON complète : plus de tokens qu'une extraction seule, toujours déterministe
+PARAMS_EXTRACTION_FUSIONNEE = {"max_tokens": 1000, "temperature": 0.1}
+
+def _prompt_extraction_fusionnee(texte_email: str) -> str:
+    """Prompt unique remplaçant filtrage + extraction + résumé + département + priorités"""
+    return f"""Analyse cet email et réponds avec UN SEUL objet JSON strict, sans texte autour.
+
+    Format JSON requis:
+    {{"type":"explicite|implicite",
+      "taches":[{{"description":"...","responsable":"...","deadline":"...","priorite":"élevée|moyenne|faible","confiance_ia":0.0-1.0}}],
+      "resume":"...",
+      "departement":"..."}}
+
+    Règles:
+        - type: "explicite" si l'email contient des demandes d'action claires, sinon "implicite"
+        - taches: tâches demandées (explicite) ou sous-entendues (implicite), liste vide si aucune
+        - responsable: qui doit faire (nom/service, "inconnu" sinon) ; deadline: date ou "inconnue"
+        - priorite: obligatoire pour chaque tâche (élevée, moyenne ou faible)
+        - confiance_ia: certitude de 0.0 à 1.0 (tâches implicites)
+        - resume: 1 à 3 phrases
+        - departement: département concerné (ex: RH, Finance, IT, Marketing)
+
+Email:
+{preparer_entree(texte_email, "fusionnee")}
+
+JSON:"""
+
+def extraction_fusionnee(texte_email: str) -> dict:
+    """
+    🧩 EXTRACTION FUSIONNÉE : un seul appel IA par email.
     
-    except Exception as e:
-        print(f"⚠️ Erreur résumé optimisé: {e}")
-        # Fallback vers méthode standard
-        return resume_email(texte_email)
+    Returns:
+        dict: {"type", "taches", "resume", "departement"} validé par le schéma
+        
+    Raises:
+        ValueError: réponse non JSON ou non conforme au schéma
+    """
+    result_text = completer(_prompt_extraction_fusionnee(texte_email), **PARAMS_EXTRACTION_FUSIONNEE,
+                            valider=_lire_extraction_fusionnee)
+    return _lire_extraction_fusionnee(result_text)
+
+async def extraction_fusionnee_async(texte_email: str, llm) -> dict:
+    """Version asynchrone de extraction_fusionnee"""
+    result_text = await llm.completer(_prompt_extraction_fusionnee(texte_email), **PARAMS_EXTRACTION_FUSIONNEE,
+                                      valider=_lire_extraction_fusionnee)
+    return _lire_extraction_fusionnee(result_text)
+
+def _lire_extraction_fusionnee(result_text: str) -> dict:
+    # Balises markdown, texte autour ou réponse tronquée : JSON réparé (llm_json.py)
+    return valider_extraction_fusionnee(extraire_json(result_text, attendu=dict))
+
+# 📦 EXTRACTION GROUPÉE : plusieurs emails courts, un seul appel
+# La taille des lots dépend d'un budget de tokens (prompt) et du nombre
+# maximal d'extractions qu'une réponse peut contenir.
+EXTRACTION_GROUPEE_BUDGET_TOKENS = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "3000"))
+EXTRACTION_GROUPEE_MAX_EMAILS = int(os.getenv("LLM_BATCH_MAX_EMAILS", "12"))
+TOKENS_REPONSE_PAR_EMAIL = 250
+
+def _params_extraction_groupee(nb_emails: int) -> dict:
+    """max_tokens proportionnel au nombre d'emails du lot"""
+    return {"max_tokens": 200 + TOKENS_REPONSE_PAR_EMAIL * nb_emails, "temperature": 0.1}
+
+def _prompt_extraction_groupee(emails) -> str:
+    """emails : liste de (identifiant, texte), chaque email délimité par son identifiant"""
+    blocs = "\n".join(
+        f"<<<EMAIL {email_id}>>>\n{preparer_entree(texte, 'groupee')}\n<<<FIN {email_id}>>>" for email_id, texte in emails
+    )
+    return f"""Analyse chacun des emails ci-dessous indépendamment et réponds avec UN SEUL objet JSON strict,
+    sans texte autour, dont les clés sont les identifiants des emails.
 
+    Format JSON requis:
+    {{"<identifiant>": {{"type":"explicite|implicite",
+      "taches":[{{"description":"...","responsable":"...","deadline":"...","priorite":"élevée|moyenne|faible","confiance_ia":0.0-1.0}}],
+      "resume":"...",
+      "departement":"..."}}}}
+
+    Règles:
+        - une entrée par email, avec exactement l'identifiant indiqué ({", ".join(email_id for email_id, _ in emails)})
+        - ne mélange jamais les tâches de deux emails
+        - type: "explicite" si l'email contient des demandes d'action claires, sinon "implicite"
+        - taches: liste vide si aucune ; priorite obligatoire (élevée, moyenne ou faible)
+        - resume: 1 à 2 phrases ; departement: département concerné (ex: RH, Finance, IT)
+
+Emails:
+{blocs}
+
+JSON:"""
+
+def extraction_groupee(emails) -> tuple:
+    """
+    📦 EXTRACTION GROUPÉE : un seul appel IA pour plusieurs emails.
+    
+    Args:
+        emails: liste de (identifiant, texte)
+        
+    Returns:
+        tuple: (extractions valides par identifiant, erreur par identifiant à retraiter seul)
+        
+    Raises:
+        ValueError: réponse non JSON (tout le lot est à retraiter)
+    """
+    result_text = completer(_prompt_extraction_groupee(emails), **_params_extraction_groupee(len(emails)),
+                            valider=_validateur_groupe(emails))
+    return _lire_extraction_groupee(result_text, emails)
+
+async def extraction_groupee_async(emails, llm) -> tuple:
+    """Version asynchrone de extraction_groupee"""
+    result_text = await llm.completer(_prompt_extraction_groupee(emails), **_params_extraction_groupee(len(emails)),
+                                      valider=_validateur_groupe(emails))
+    return _lire_extraction_groupee(result_text, emails)
+
+def _validateur_groupe(emails):
+    """Réponse groupée mise en cache seulement si chaque email du lot est valide"""
+    def valider(result_text: str):
+        _, erreurs = _lire_extraction_groupee(result_text, emails)
+        if erreurs:
+            raise ValueError(f"{len(erreurs)} extraction(s) invalide(s) dans le lot")
+    return valider
+
+def _lire_extraction_groupee(result_text: str, emails) -> tuple:
+    # Une réponse groupée tronquée garde les emails complets ; les autres sont retraités seuls
+    data = extraire_json(result_text, attendu=dict)
+    return valider_extraction_groupee(data, [email_id for email_id, _ in emails])
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+🤖 CLIENT LLM - Appels OpenRouter synchrones et asynchrones
+==========================================================
+
+Point d'entrée unique des appels chat.completions :
+- completer() : appel bloquant (fonctions historiques de agent_task.py)
+- ClientLLMAsync : openai.AsyncOpenAI + nombre borné d'appels simultanés.
+  Avec 500 emails, la durée totale dépend de la limite de parallélisme, pas
+  de la somme des latences. Sans limite explicite, la fenêtre est pilotée par
+  le contrôleur AIMD (adaptive_concurrency.py) d'après les latences et les
+  429 / timeouts du fournisseur ; sinon limite fixe (max_concurrency).
+- executer_coroutine() : lance le moteur asynchrone depuis du code
+  synchrone, y compris lorsqu'une boucle asyncio tourne déjà (endpoint async).
+
+Les deux chemins consultent d'abord le cache disque des réponses
+(llm_cache.py) : un appel déterministe déjà payé n'est jamais renvoyé au
+modèle, et seule une réponse validée par l'appelant est mémorisée.
+Les prompts identiques en vol au même moment (threads des watchers ou
+handlers asynchrones) sont regroupés en un seul appel (single_flight.py).
+Les erreurs du fournisseur sont rejouées avec backoff puis coupées par le
+disjoncteur (llm_resilience.py) ; le SDK ne fait plus ses propres essais.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional
+
+import openai
+from dotenv import load_dotenv
+
+from llm_cache import cle_reponse, get_llm_cache, reponse_deterministe
+from single_flight import SingleFlight
+from adaptive_concurrency import get_controleur_concurrence
+from llm_resilience import executer_avec_resilience, executer_avec_resilience_async
+
+# Charger la clé API depuis .env
+load_dotenv()
+api_key = os.getenv("OPENROUTER_API_KEY")
+
+# Surcharge possible vers tout fournisseur OpenAI-compatible (ex : mock_llm_server.py)
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+DEFAULT_MODEL = "openai/gpt-3.5-turbo"
+
+# Nombre maximum d'appels LLM en vol simultanément (mode asynchrone) ;
+# fenêtre initiale du contrôleur adaptatif quand il est actif
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Attente maximale avant de revérifier la fenêtre (libérations d'autres clients)
+ATTENTE_FENETRE_S = 0.05
+
+# Configurer le client OpenRouter (appels bloquants) ; nouveaux essais : llm_resilience.py
+client = openai.OpenAI(
+    api_key=api_key,
+    base_url=OPENROUTER_BASE_URL,
+    max_retries=0
+)
+
+# Appels en vol par empreinte de prompt, partagés entre threads et boucles
+appels_en_vol = SingleFlight("llm_calls")
+
+
+def _parametres_appel(prompt: str, model: str, max_tokens: Optional[int],
+                      temperature: Optional[float]) -> Dict:
+    """Arguments de chat.completions.create (les valeurs None ne sont pas envoyées)"""
+    params = {"model": model, "messages": [{"role": "user", "content": prompt}]}
+    if max_tokens is not None:
+        params["max_tokens"] = max_tokens
+    if temperature is not None:
+        params["temperature"] = temperature
+    return params
+
+
+def _reponse_valide(content: str, valider: Optional[Callable]) -> bool:
+    if valider is None:
+        return True
+    try:
+        valider(content)
+    except ValueError:
+        return False
+    return True
+
+
+def _lire_cache(prompt: str, model: str, max_tokens: Optional[int],
+                temperature: Optional[float], valider: Optional[Callable] = None):
+    """
+    (cache, clé, réponse en cache ou None) ; cache None s'il est désactivé
+    ou si l'appel n'est pas déterministe (température par défaut ou > 0.1)
+    """
+    key = cle_reponse(model, prompt, temperature, max_tokens)
+    cache = get_llm_cache() if reponse_deterministe(temperature) else None
+    if cache is None:
+        return None, key, None
+    cached = cache.get(key)
+    if cached is not None and not _reponse_valide(cached, valider):
+        # Réponse inexploitable mémorisée auparavant : oubliée et redemandée
+        cache.supprimer(key)
+        cached = None
+    return cache, key, cached
+
+
+def _ecrire_cache(cache, key: Optional[str], content: Optional[str], model: str, prompt: str,
+                  valider: Optional[Callable] = None):
+    if cache is not None and content and _reponse_valide(content, valider):
+        cache.put(key, content, model=model, prompt_size=len(prompt.encode("utf-8")))
+
+
+def completer(prompt: str, max_tokens: Optional[int] = None,
+              temperature: Optional[float] = None, model: str = DEFAULT_MODEL,
+              valider: Optional[Callable] = None) -> str:
+    """
+    Appel bloquant : contenu brut de la réponse du modèle.
+    valider(contenu) lève ValueError si la réponse est inexploitable : elle est
+    alors retournée quand même, mais jamais mémorisée dans le cache.
+    """
+    cache, key, cached = _lire_cache(prompt, model, max_tokens, temperature, valider)
+    if cached is not None:
+        return cached
+
+    def essai():
+        controleur = get_controleur_concurrence()
+        start = time.perf_counter()
+        try:
+            response = client.chat.completions.create(**_parametres_appel(prompt, model, max_tokens, temperature))
+        except Exception as e:
+            # Les appels bloquants ne sont pas bornés par la fenêtre mais l'informent
+            if controleur is not None:
+                controleur.signaler_echec(e)
+            raise
+        if controleur is not None:
+            controleur.signaler_succes(time.perf_counter() - start)
+        return response
+
+    def appeler():
+        response = executer_avec_resilience(essai)
+        content = response.choices[0].message.content
+        _ecrire_cache(cache, key, content, model, prompt, valider)
+        return content
+
+    content, _ = appels_en_vol.do(key, appeler)
+    return content
+
+
+class ClientLLMAsync:
+    """
+    Client asynchrone à parallélisme borné.
+    À créer dans la boucle qui l'utilise (le pool HTTP lui est lié) et à
+    fermer avec close() en fin de traitement.
+    max_concurrency explicite : limite fixe ; sinon fenêtre du contrôleur AIMD
+    partagé (LLM_MAX_CONCURRENCY si LLM_ADAPTIVE_CONCURRENCY=0).
+    """
+
+    def __init__(self, max_concurrency: int = None, async_client=None):
+        self.controleur = get_controleur_concurrence() if max_concurrency is None else None
+        self.max_concurrency = max(1, max_concurrency or LLM_MAX_CONCURRENCY)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._fenetre_liberee = asyncio.Condition()
+        self.client = async_client or openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=OPENROUTER_BASE_URL,
+            max_retries=0
+        )
+        self._in_flight = 0
+        self.stats = {
+            "calls": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "max_in_flight": 0,
+            "total_latency": 0.0
+        }
+
+    async def completer(self, prompt: str, max_tokens: Optional[int] = None,
+                        temperature: Optional[float] = None, model: str = DEFAULT_MODEL,
+                        valider: Optional[Callable] = None) -> str:
+        """
+        Appel non bloquant, au plus max_concurrency (ou la fenêtre AIMD) en vol.
+        Les réponses en cache et les appels regroupés avec un prompt identique
+        déjà en vol ne consomment pas de place. valider : voir completer().
+        """
+        cache, key, cached = _lire_cache(prompt, model, max_tokens, temperature, valider)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+        content, partage = await appels_en_vol.do_async(
+            key, lambda: self._appeler(cache, key, prompt, max_tokens, temperature, model, valider)
+        )
+        if partage:
+            self.stats["coalesced"] += 1
+        return content
+
+    @asynccontextmanager
+    async def _place(self):
+        """Une place en vol : sémaphore fixe, ou fenêtre AIMD partagée"""
+        if self.controleur is None:
+            async with self.semaphore:
+                yield
+            return
+        async with self._fenetre_liberee:
+            while not self.controleur.acquerir():
+                try:
+                    await asyncio.wait_for(self._fenetre_liberee.wait(), ATTENTE_FENETRE_S)
+                except asyncio.TimeoutError:
+                    pass
+        try:
+            yield
+        finally:
+            self.controleur.liberer()
+            async with self._fenetre_liberee:
+                self._fenetre_liberee.notify_all()
+
+    async def _appeler(self, cache, key: str, prompt: str, max_tokens: Optional[int],
+                       temperature: Optional[float], model: str, valider: Optional[Callable] = None) -> str:
+        # Disjoncteur consulté place obtenue ; l'attente entre deux essais se fait place rendue
+        params = _parametres_appel(prompt, model, max_tokens, temperature)
+        response = await executer_avec_resilience_async(lambda: self._essai(params), place=self._place)
+        content = response.choices[0].message.content
+        _ecrire_cache(cache, key, content, model, prompt, valider)
+        return content
+
+    async def _essai(self, params: Dict):
+        self._in_flight += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+        start = time.perf_counter()
+        try:
+            response = await self.client.chat.completions.create(**params)
+            self.stats["calls"] += 1
+            if self.controleur is not None:
+                self.controleur.signaler_succes(time.perf_counter() - start)
+            return response
+        except Exception as e:
+            self.stats["errors"] += 1
+            if self.controleur is not None:
+                self.controleur.signaler_echec(e)
+            raise
+        finally:
+            self.stats["total_latency"] += time.perf_counter() - start
+            self._in_flight -= 1
+
+    async def close(self):
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            await close()
+
+    def get_stats(self) -> Dict:
+        calls = self.stats["calls"] + self.stats["errors"]
+        return {
+            **self.stats,
+            "total_latency": round(self.stats["total_latency"], 2),
+            "average_latency": round(self.stats["total_latency"] / calls, 3) if calls else 0.0,
+            "max_concurrency": self.controleur.limite if self.controleur is not None else self.max_concurrency,
+            "adaptive": self.controleur is not None
+        }
+
+
+def executer_coroutine(coroutine):
+    """Exécuter une coroutine depuis du code synchrone (thread dédié si une boucle tourne déjà)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
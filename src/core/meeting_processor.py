@@ -31,6 +31,8 @@ try:
         est_email_deja_traite,
         marquer_email_traite
     )
+    from llm_json import parser_taches
+    from token_budget import mesurer_reduction
     # 🔄 NOUVEAU: Import du gestionnaire unifié pour PHASE 2
     try:
         from unified_task_manager import get_unified_task_manager
@@ -41,6 +43,13 @@ try:
 except ImportError as e:
     print(f"⚠️ Import error: {e}")
 
+# 🗄️ Backend SQLite optionnel (STORAGE_BACKEND=sqlite)
+try:
+    from sqlite_storage import get_storage
+except ImportError:
+    def get_storage():
+        return None
+
 logger = logging.getLogger(__name__)
 
 # Chemins des fichiers
@@ -57,9 +66,26 @@ class MeetingProcessor:
         self.tasks_file = MEETING_TASKS_FILE
         self.logs_file = MEETING_LOGS_FILE
         
+    def data_signature(self) -> tuple:
+        """Signature des données réunions (change à chaque écriture) : base des ETags"""
+        storage = get_storage()
+        if storage is not None:
+            return ("sqlite",) + storage.change_token()
+        signature = []
+        for path in (self.meetings_file, self.tasks_file):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+    
     def load_meetings(self) -> List[Dict]:
-        """Charge les réunions depuis meetings.json"""
+        """Charge les réunions depuis meetings.json (ou la base SQLite)"""
         try:
+            storage = get_storage()
+            if storage is not None:
+                return storage.load_documents("meetings")
             if os.path.exists(self.meetings_file):
                 with open(self.meetings_file, 'r', encoding='utf-8') as f:
                     return json.load(f)
@@ -71,6 +97,10 @@ class MeetingProcessor:
     def save_meetings(self, meetings: List[Dict]):
         """Sauvegarde les réunions"""
         try:
+            storage = get_storage()
+            if storage is not None:
+                storage.save_documents("meetings", meetings)
+                return
             with open(self.meetings_file, 'w', encoding='utf-8') as f:
                 json.dump(meetings, f, ensure_ascii=False, indent=4)
         except Exception as e:
@@ -79,6 +109,9 @@ class MeetingProcessor:
     def load_meeting_tasks(self) -> List[Dict]:
         """Charge les tâches de réunions"""
         try:
+            storage = get_storage()
+            if storage is not None:
+                return storage.load_documents("meeting_tasks")
             if os.path.exists(self.tasks_file):
                 with open(self.tasks_file, 'r', encoding='utf-8') as f:
                     return json.load(f)
@@ -91,8 +124,12 @@ class MeetingProcessor:
         """Sauvegarde les tâches de réunions - Compatible ancien + nouveau système"""
         try:
             # LEGACY: Sauvegarder dans l'ancien format (préservé)
-            with open(self.tasks_file, 'w', encoding='utf-8') as f:
-                json.dump(tasks, f, ensure_ascii=False, indent=4)
+            storage = get_storage()
+            if storage is not None:
+                storage.save_documents("meeting_tasks", tasks)
+            else:
+                with open(self.tasks_file, 'w', encoding='utf-8') as f:
+                    json.dump(tasks, f, ensure_ascii=False, indent=4)
             
             # 🔄 NOUVEAU: Sauvegarder aussi dans le système unifié si disponible
             if UNIFIED_SYSTEM_AVAILABLE:
@@ -203,10 +240,8 @@ TRANSCRIPTION DE LA RÉUNION:
             
             # 4.1 Parser le JSON retourné par l'IA
             try:
-                tasks = json.loads(tasks_json) if isinstance(tasks_json, str) else tasks_json
-                if not isinstance(tasks, list):
-                    tasks = []
-            except json.JSONDecodeError as e:
+                tasks = parser_taches(tasks_json)
+            except ValueError as e:
                 logger.warning(f"⚠️ Erreur parsing JSON IA: {e}")
                 tasks = []
             
@@ -251,7 +286,8 @@ TRANSCRIPTION DE LA RÉUNION:
             meeting["actions_identifiees"] = [task["description"] for task in enriched_tasks]
             
             # 9. Logger résultat
-            self.log_meeting_processing(meeting["id"], len(enriched_tasks), "succès")
+            self.log_meeting_processing(meeting["id"], len(enriched_tasks), "succès",
+                                        tokens_entree=mesurer_reduction(pseudo_email["texte"]))
             
             logger.info(f"✅ Réunion traitée: {len(enriched_tasks)} tâches extraites")
             
@@ -330,14 +366,10 @@ TRANSCRIPTION DE LA RÉUNION:
                 "message": f"Erreur globale: {e}"
             }
     
-    def log_meeting_processing(self, meeting_id: str, nb_taches: int, statut: str, erreur: str = ""):
+    def log_meeting_processing(self, meeting_id: str, nb_taches: int, statut: str, erreur: str = "",
+                               tokens_entree: Dict = None):
         """Enregistre le traitement dans les logs"""
         try:
-            logs = []
-            if os.path.exists(self.logs_file):
-                with open(self.logs_file, 'r', encoding='utf-8') as f:
-                    logs = json.load(f)
-            
             log_entry = {
                 "horodatage": datetime.now().isoformat(),
                 "meeting_id": meeting_id,
@@ -346,7 +378,19 @@ TRANSCRIPTION DE LA RÉUNION:
                 "erreur": erreur,
                 "type_traitement": "meeting_processing"
             }
+            if tokens_entree is not None:
+                log_entry["tokens_entree"] = tokens_entree
             
+            storage = get_storage()
+            if storage is not None:
+                # Ajout d'une seule ligne, sans relire l'historique
+                storage.append_document("meeting_logs", log_entry)
+                return
+            
+            logs = []
+            if os.path.exists(self.logs_file):
+                with open(self.logs_file, 'r', encoding='utf-8') as f:
+                    logs = json.load(f)
             logs.append(log_entry)
             
             with open(self.logs_file, 'w', encoding='utf-8') as f:
@@ -357,6 +401,10 @@ TRANSCRIPTION DE LA RÉUNION:
     
     def get_meeting_by_id(self, meeting_id: str) -> Dict:
         """Récupère une réunion par son ID"""
+        storage = get_storage()
+        if storage is not None:
+            found = storage.find_documents("meetings", meeting_id)
+            return found[0] if found else None
         meetings = self.load_meetings()
         for meeting in meetings:
             if meeting["id"] == meeting_id:
@@ -365,6 +413,9 @@ TRANSCRIPTION DE LA RÉUNION:
     
     def get_tasks_by_meeting(self, meeting_id: str) -> List[Dict]:
         """Récupère les tâches d'une réunion spécifique"""
+        storage = get_storage()
+        if storage is not None:
+            return storage.find_documents("meeting_tasks", meeting_id)
         tasks = self.load_meeting_tasks()
         return [task for task in tasks if task.get("meeting_id") == meeting_id]
     
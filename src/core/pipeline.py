@@ -1,3 +1,5 @@
+import asyncio
+import copy
 import json
 import os
 from datetime import datetime
@@ -16,11 +18,46 @@ from agent_task import (
     resume_email,
     identifier_departement,
     deduire_priorite,
+    completer_priorites,
     # 🚀 NOUVELLES FONCTIONS OPTIMISÉES
     extract_tasks_optimized,
     suggere_taches_implicites_optimized,
-    resume_email_optimized
+    resume_email_optimized,
+    # ⚡ Versions asynchrones (même prompts)
+    filtrer_email_async,
+    extract_tasks_from_email_async,
+    suggere_taches_implicites_async,
+    resume_email_async,
+    identifier_departement_async,
+    deduire_priorite_async,
+    completer_priorites_async,
+    extract_tasks_optimized_async,
+    suggere_taches_implicites_optimized_async,
+    resume_email_optimized_async,
+    # 🧩 Extraction fusionnée (un seul appel par email)
+    extraction_fusionnee,
+    extraction_fusionnee_async,
+    # 📦 Extraction groupée (plusieurs emails par appel)
+    extraction_groupee,
+    extraction_groupee_async,
+    EXTRACTION_GROUPEE_BUDGET_TOKENS,
+    EXTRACTION_GROUPEE_MAX_EMAILS
 )
+from extraction_schema import EXTRACTION_CLASSIQUE, EXTRACTION_FUSIONNEE, EXTRACTION_GROUPEE, MODES_EXTRACTION
+# 🩹 Lecture tolérante du JSON des réponses IA
+from llm_json import parser_taches
+# 🏷️ Pré-classification locale explicite/implicite (évite l'appel filtrer_email)
+from email_classifier import get_pre_classifieur
+# 🏢 Mémo expéditeur/destinataire → département (évite l'appel identifier_departement)
+from department_classifier import get_department_classifier
+# ✂️ Tokens d'entrée avant / après nettoyage (journalisés pour mesurer les économies)
+from token_budget import mesurer_reduction
+# ⚡ Client LLM asynchrone à parallélisme borné
+from llm_client import ClientLLMAsync, executer_coroutine
+# 🛡️ Fournisseur indisponible (essais épuisés, circuit ouvert) : email remis en attente
+from llm_resilience import CircuitOuvertError, fournisseur_indisponible, get_disjoncteur
+# 🛫 Regroupement des traitements concurrents d'un même email
+from single_flight import SingleFlight
 # Import du nouveau système de cache pour détecter les emails redondants
 from cache_emails import (
     calculer_hash_email,
@@ -43,6 +80,12 @@ except ImportError:
     UNIFIED_SYSTEM_AVAILABLE = False
     print("⚠️ Système unifié non disponible, utilisation du système legacy")
 
+
+def unified_store_available() -> bool:
+    """Système unifié importé et store utilisable (fichier JSON ou backend SQLite)"""
+    return UNIFIED_SYSTEM_AVAILABLE and get_unified_task_manager().is_available()
+
+
 # Configuration des fichiers de données
 # Chemin absolu basé sur le répertoire racine du projet
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -51,11 +94,41 @@ EMAIL_FILE = os.path.join(BASE_DIR, "data", "emails.json")
 LOG_FILE = os.path.join(BASE_DIR, "data", "logs.json")
 UNIFIED_TASKS_FILE = os.path.join(BASE_DIR, "data", "unified_tasks.json")
 
+# Mode rate limiting : remises en file d'un email pendant une panne avant report au prochain passage
+MAX_REPORTS_PAR_EMAIL = 2
+
+def _compteurs_pre_classification():
+    pre_classifieur = get_pre_classifieur()
+    if pre_classifieur is None:
+        return None
+    stats = pre_classifieur.get_stats()
+    return stats["decisions_locales"], stats["appels_llm"]
+
+
+def _bilan_pre_classification(compteurs_depart):
+    """Appels filtrer_email évités par le pré-classifieur pendant ce traitement"""
+    compteurs = _compteurs_pre_classification()
+    if compteurs is None or compteurs_depart is None:
+        return {"actif": False}
+    return {
+        "actif": True,
+        "appels_filtrage_evites": compteurs[0] - compteurs_depart[0],
+        "appels_filtrage_ia": compteurs[1] - compteurs_depart[1]
+    }
+
+
+# Emails en cours d'extraction (watcher, monitoring et /traiter-emails partagent ce registre) :
+# un email déjà en vol n'est pas renvoyé au modèle, l'appelant attend le résultat du premier
+emails_en_vol = SingleFlight("emails")
+
 def traiter_emails(
     use_rate_limiting=False,
     use_batch_processing=True,
     use_cache=True,
-    use_optimized_prompts=True
+    use_optimized_prompts=True,
+    use_async_processing=True,
+    max_concurrency=None,
+    extraction_mode=EXTRACTION_CLASSIQUE
     ):
     """
     🚀 FONCTION PRINCIPALE UNIFIÉE: Traitement des emails avec toutes améliorations.
@@ -65,6 +138,12 @@ def traiter_emails(
         use_batch_processing (bool): Active le traitement par batch intelligent  
         use_cache (bool): Active le cache anti-doublon pour économies IA
         use_optimized_prompts (bool): Active les prompts IA optimisés
+        use_async_processing (bool): Mode classique : emails traités en parallèle (asyncio)
+        max_concurrency (int): Appels IA simultanés maximum (défaut: fenêtre adaptative AIMD)
+        extraction_mode (str): "classique" (filtrage, extraction, résumé, département :
+                               appels séparés), "fusionnee" (un seul appel JSON par email)
+                               ou "groupee" (plusieurs emails courts par appel, lots
+                               dimensionnés par budget de tokens)
                                  
     Intègre TOUTES les optimisations pour la production :
     ✅ 1. Cache anti-doublon (économies IA) 
@@ -73,6 +152,8 @@ def traiter_emails(
     ✅ 4. Optimisation prompts IA (qualité + économies)
     """
     print("🚀 Démarrage traitement intelligent des emails...")
+    if extraction_mode not in MODES_EXTRACTION:
+        raise ValueError(f"Mode d'extraction inconnu: {extraction_mode} (attendu: {', '.join(MODES_EXTRACTION)})")
     
     # Afficher les optimisations actives
     optimisations = []
@@ -84,6 +165,12 @@ def traiter_emails(
         optimisations.append("Rate limiting + Queue")
     if use_optimized_prompts:
         optimisations.append("Prompts optimisés")
+    if use_async_processing and not use_rate_limiting:
+        optimisations.append("Traitement concurrent")
+    if extraction_mode == EXTRACTION_FUSIONNEE:
+        optimisations.append("Extraction fusionnée")
+    if extraction_mode == EXTRACTION_GROUPEE:
+        optimisations.append("Extraction groupée")
     
     print(f"� Optimisations actives: {', '.join(optimisations)}")
     
@@ -93,14 +180,18 @@ def traiter_emails(
         return traiter_emails_avec_rate_limiting(
             use_batch_processing=use_batch_processing,
             use_cache=use_cache,
-            use_optimized_prompts=use_optimized_prompts
+            use_optimized_prompts=use_optimized_prompts,
+            extraction_mode=extraction_mode
         )
     else:
         print("⚡ Mode classique (performances maximales)")
         return traiter_emails_mode_classique(
             use_batch_processing=use_batch_processing,
             use_cache=use_cache,
-            use_optimized_prompts=use_optimized_prompts
+            use_optimized_prompts=use_optimized_prompts,
+            use_async_processing=use_async_processing,
+            max_concurrency=max_concurrency,
+            extraction_mode=extraction_mode
         )
 
 
@@ -148,16 +239,47 @@ def resumer_email_avec_options(texte_email: str, use_optimized_prompts: bool) ->
         return resume_email(texte_email)
 
 
+async def extraire_taches_avec_options_async(texte_email: str, type_detecte: str,
+                                             use_optimized_prompts: bool, llm) -> str:
+    """Version asynchrone de extraire_taches_avec_options"""
+    if type_detecte == "explicite":
+        if use_optimized_prompts:
+            return await extract_tasks_optimized_async(texte_email, llm, use_optimized_prompts=True)
+        return await extract_tasks_from_email_async(texte_email, llm)
+    if use_optimized_prompts:
+        return await suggere_taches_implicites_optimized_async(texte_email, llm, use_optimized_prompts=True)
+    return await suggere_taches_implicites_async(texte_email, llm)
+
+
+async def resumer_email_avec_options_async(texte_email: str, use_optimized_prompts: bool, llm) -> str:
+    """Version asynchrone de resumer_email_avec_options"""
+    if use_optimized_prompts:
+        return await resume_email_optimized_async(texte_email, llm, use_optimized_prompts=True)
+    return await resume_email_async(texte_email, llm)
+
+
 def traiter_emails_mode_classique(
     use_batch_processing=True,
     use_cache=True,
-    use_optimized_prompts=True
+    use_optimized_prompts=True,
+    use_async_processing=True,
+    max_concurrency=None,
+    extraction_mode=EXTRACTION_CLASSIQUE
     ):
     """
     🔧 MODE CLASSIQUE: Traitement sans rate limiting (code existant intact).
     Exactement le même comportement qu'avant.
+    
+    ⚡ use_async_processing : tous les emails des batches sont lancés en même
+    temps (batches urgents d'abord) et les appels IA s'exécutent en parallèle,
+    bornés par max_concurrency. Les résultats sont ensuite pris en compte dans
+    l'ordre des batches, comme en mode séquentiel.
+    
+    📦 extraction_mode="groupee" : les batches sont dimensionnés par budget de
+    tokens et chaque batch part en un seul appel IA (repli email par email).
     """
     print("⚡ Traitement mode classique...")
+    pre_classification_depart = _compteurs_pre_classification()
     
     # Charger emails.json
     with open(EMAIL_FILE, "r", encoding="utf-8") as f:
@@ -168,12 +290,14 @@ def traiter_emails_mode_classique(
         tasks_data = json.load(f)
 
     # Initialiser le processeur de batch
-    batch_processor = BatchProcessor(batch_size_normal=5, batch_size_urgent=2)
+    batch_processor = BatchProcessor(batch_size_normal=5, batch_size_urgent=2,
+                                     max_emails_par_lot=EXTRACTION_GROUPEE_MAX_EMAILS)
     
     # Compteurs pour statistiques
     taches_totales = 0
     emails_doublons_detectes = 0
     emails_traites_batch = 0
+    emails_reportes = 0
     batches_traites = 0
 
     # 1. 🔍 PHASE CACHE: Traiter d'abord les doublons (comme avant)
@@ -214,7 +338,8 @@ def traiter_emails_mode_classique(
         emails_apres_cache.append(email)
 
     # 2. 🎯 PHASE BATCH: Créer batches intelligents pour emails restants
-    batches = batch_processor.creer_batches_intelligents(emails_apres_cache)
+    budget_tokens = EXTRACTION_GROUPEE_BUDGET_TOKENS if extraction_mode == EXTRACTION_GROUPEE else None
+    batches = batch_processor.creer_batches_intelligents(emails_apres_cache, budget_tokens=budget_tokens)
     
     if not batches:
         print("ℹ️ Aucun email nouveau à traiter par batch")
@@ -225,14 +350,33 @@ def traiter_emails_mode_classique(
         print(f"   📋 Normaux: {stats_batch['batches_normaux']} batches")
 
     # 3. 🤖 PHASE TRAITEMENT: Traiter chaque batch
+    resultats_concurrents = {}
+    resultats_precalcules = use_async_processing or extraction_mode == EXTRACTION_GROUPEE
+    if use_async_processing and batches:
+        # ⚡ Tous les emails en vol, appels IA bornés par le sémaphore
+        resultats_concurrents = executer_coroutine(
+            traiter_batches_concurrents(batches, use_optimized_prompts, max_concurrency, extraction_mode)
+        )
+    elif extraction_mode == EXTRACTION_GROUPEE:
+        # 📦 Un appel IA par batch, séquentiellement
+        for batch in batches:
+            resultats_concurrents.update(traiter_lot_groupe(batch["emails"], use_optimized_prompts))
+    
     for batch in batches:
         print(f"\n🔄 Traitement batch {batch['id']} ({batch['type']}) - {batch['taille']} emails")
         
         # Traiter emails du batch individuellement (garde logique existante)
         for email in batch["emails"]:
             try:
-                # 🚀 Traitement avec options d'optimisation
-                resultat = traiter_email_individuel_avec_cache(email, tasks_data, use_optimized_prompts)
+                if resultats_precalcules:
+                    # Résultat déjà calculé (en parallèle ou par lot), ou exception levée pendant le calcul
+                    resultat = resultats_concurrents[id(email)]
+                    if isinstance(resultat, Exception):
+                        raise resultat
+                    tasks_data.extend(resultat.get("taches", []))
+                else:
+                    # 🚀 Traitement avec options d'optimisation
+                    resultat = traiter_email_individuel_avec_cache(email, tasks_data, use_optimized_prompts, extraction_mode)
                 
                 if resultat["statut"] == "succès":
                     taches_totales += resultat["nb_taches"]
@@ -252,6 +396,10 @@ def traiter_emails_mode_classique(
                     print(f"   ❌ Erreur email: {resultat.get('erreur', 'Inconnue')}")
                     
             except Exception as e:
+                if fournisseur_indisponible(e):
+                    _reporter_email(email, e, batch_id=batch["id"])
+                    emails_reportes += 1
+                    continue
                 print(f"   ❌ Erreur traitement email: {str(e)}")
                 # Log d'erreur
                 log_entree = {
@@ -272,7 +420,7 @@ def traiter_emails_mode_classique(
         json.dump(tasks_data, f, indent=4, ensure_ascii=False)
 
     # 🔄 NOUVEAU: Sauvegarder aussi dans le système unifié si disponible
-    if UNIFIED_SYSTEM_AVAILABLE and os.path.exists(UNIFIED_TASKS_FILE):
+    if unified_store_available():
         try:
             unified_manager = get_unified_task_manager()
             # Ajouter nouvelles tâches au système unifié
@@ -314,9 +462,13 @@ def traiter_emails_mode_classique(
     resume = {
         "emails_traitees": len(emails),  # Compatibilité avec l'ancien format
         "emails_traites_batch": emails_traites_batch,
+        "emails_reportes": emails_reportes,
+        "disjoncteur_llm": get_disjoncteur().get_stats()["etat"],
         "taches_ajoutees": taches_totales,
         "doublons_detectes": emails_doublons_detectes,
         "batches_traites": batches_traites,
+        "extraction_mode": extraction_mode,
+        "pre_classification": _bilan_pre_classification(pre_classification_depart),
         "economies_ia": f"{emails_doublons_detectes} appels OpenRouter évités par cache",
         "efficacite_batch": f"{batches_traites} batches vs {emails_traites_batch} emails individuels",
         "cache_stats": {
@@ -329,6 +481,8 @@ def traiter_emails_mode_classique(
     print(f"\n📊 Résumé du traitement intelligent:")
     print(f"   📧 Emails total: {len(emails)}")
     print(f"   🚀 Emails traités: {emails_traites_batch}")
+    if emails_reportes:
+        print(f"   ⏸️ Emails remis en attente (fournisseur indisponible): {emails_reportes}")
     print(f"   ✅ Nouvelles tâches: {taches_totales}")
     print(f"   🟡 Doublons évités: {emails_doublons_detectes}")
     print(f"   📦 Batches utilisés: {batches_traites}")
@@ -337,57 +491,330 @@ def traiter_emails_mode_classique(
     
     return resume
 
-def traiter_email_individuel_avec_cache(email, tasks_data, use_optimized_prompts=True):
+def _reporter_email(email, erreur, **contexte):
+    """
+    Fournisseur indisponible : l'email reste "non_traité" pour le prochain
+    passage (pipeline ou watcher) au lieu d'être marqué en échec.
+    """
+    print(f"   ⏸️ Email remis en attente (fournisseur indisponible): {email.get('objet', 'unknown')}")
+    enregistrer_log({
+        "horodatage": datetime.now().isoformat(timespec='seconds'),
+        "email_objet": email.get("objet", "unknown"),
+        "statut": "reporté",
+        "erreur": str(erreur),
+        **contexte
+    })
+
+
+def _cle_email_en_vol(email_hash, use_optimized_prompts, extraction_mode):
+    """Même email + mêmes prompts = même extraction"""
+    return (email_hash, bool(use_optimized_prompts), extraction_mode)
+
+
+def _resultat_partage(email, resultat):
+    """
+    Résultat calculé par un autre appelant pour le même email : mettre à jour
+    cet email-ci et lui attribuer une copie des tâches (ids et origine propres).
+    """
+    email["statut_traitement"] = "traité"
+    email["type_email"] = resultat.get("type_detecte", "inconnu")
+    email["nb_taches_extraites"] = resultat.get("nb_taches", 0)
+    email["hash_email"] = resultat.get("hash_email", email.get("hash_email"))
+    partage = dict(resultat, partage=True)
+    if "taches" in resultat:
+        taches = copy.deepcopy(resultat["taches"])
+        for index, tache in enumerate(taches):
+            tache["id"] = f"{email['id']}_{index + 1}"
+            origine = tache.get("origine_email")
+            if isinstance(origine, dict):
+                for champ in ("expediteur", "destinataire", "objet", "date_reception"):
+                    origine[champ] = email.get(champ)
+        partage["taches"] = taches
+    return partage
+
+
+def traiter_email_individuel_avec_cache(email, tasks_data, use_optimized_prompts=True,
+                                        extraction_mode=EXTRACTION_CLASSIQUE):
     """
     Traite un email individuel avec la logique complète du pipeline original.
     Utilisé par le système de batch pour garder la compatibilité.
+    Si le même email est déjà en cours de traitement (autre thread ou handler),
+    attend son résultat au lieu de rappeler l'IA.
     
     Args:
         email: Email à traiter
         tasks_data: Données des tâches existantes
         use_optimized_prompts: Utiliser les prompts IA optimisés
+        extraction_mode: "fusionnee" = un seul appel IA (repli sur le mode classique si invalide)
     """
-    
-    texte = email["texte"]
+    resultat = _traiter_email_en_vol(email, use_optimized_prompts, extraction_mode)
+    tasks_data.extend(resultat.get("taches", []))
+    return resultat
+
+
+def _traiter_email_en_vol(email, use_optimized_prompts, extraction_mode):
+    """Extraction d'un email, partagée avec un traitement concurrent du même email"""
     email_hash = calculer_hash_email(email["texte"], email["objet"])
+    resultat, partage = emails_en_vol.do(
+        _cle_email_en_vol(email_hash, use_optimized_prompts, extraction_mode),
+        lambda: _traiter_email_individuel(email, email_hash, use_optimized_prompts, extraction_mode)
+    )
+    return _resultat_partage(email, resultat) if partage else resultat
+
+
+def _traiter_email_individuel(email, email_hash, use_optimized_prompts, extraction_mode):
+    """Extraction d'un email (tâches retournées dans resultat["taches"])"""
+    texte = email["texte"]
+
+    if extraction_mode in (EXTRACTION_FUSIONNEE, EXTRACTION_GROUPEE):
+        # Email seul en mode groupé : extraction fusionnée
+        try:
+            extraction = extraction_fusionnee(texte)
+        except Exception as e:
+            if fournisseur_indisponible(e):
+                raise
+            print(f"⚠️ Extraction fusionnée invalide, repli sur le mode classique: {e}")
+        else:
+            return _finaliser_extraction_fusionnee(email, email_hash, extraction)
 
     # Filtrer email (logique originale)
-    type_detecte = filtrer_email(texte)
+    type_detecte = filtrer_email(texte, email.get("objet", ""))
 
     # 🚀 NOUVEAU: Extraction avec prompts optimisés selon paramètre
     result_text = extraire_taches_avec_options(texte, type_detecte, use_optimized_prompts)
 
     try:
-        taches = json.loads(result_text)
-        if not isinstance(taches, list):
-            raise ValueError("Résultat IA n'est pas une liste")
+        taches = _parser_taches(result_text)
     except Exception as e:
-        # Log d'erreur (logique originale)
-        log_entree = {
-            "horodatage": datetime.now().isoformat(timespec='seconds'),
-            "email_objet": email["objet"],
-            "statut": "échec",
-            "type_detecte": type_detecte,
-            "erreur": str(e),
-            "resultat_ia": result_text
-        }
-        enregistrer_log(log_entree)
-        
-        email["statut_traitement"] = "traité"
-        email["type_email"] = type_detecte
-        email["nb_taches_extraites"] = 0
-        email["hash_email"] = email_hash
-        
-        return {"statut": "échec", "erreur": str(e), "nb_taches": 0}
+        return _echec_extraction(email, email_hash, type_detecte, result_text, e)
 
     # 🚀 NOUVEAU: Résumé avec prompts optimisés selon paramètre
     resume = resumer_email_avec_options(texte, use_optimized_prompts)
     if email.get("departement"):
         departement_info = {"nom": email["departement"], "origine": "Utilisateur"}
     else:
-        nom_dept = identifier_departement(texte)
+        nom_dept = identifier_departement(texte, email.get("expediteur"), email.get("destinataire"),
+                                          email.get("objet", ""))
         departement_info = {"nom": nom_dept, "origine": "AI"}
 
+    completer_priorites(taches, email)
+
+    return _finaliser_email(email, email_hash, type_detecte, taches, resume, departement_info)
+
+
+async def traiter_email_individuel_async(email, llm, use_optimized_prompts=True,
+                                         extraction_mode=EXTRACTION_CLASSIQUE):
+    """
+    ⚡ Version asynchrone de traiter_email_individuel_avec_cache.
+    Le résumé et le département (indépendants du type) partent en même temps
+    que filtrage → extraction ; les priorités manquantes viennent du moteur local.
+    Les tâches sont retournées dans resultat["taches"] (pas d'écriture partagée).
+    Un email déjà en vol ailleurs n'est pas retraité : son résultat est partagé.
+    """
+    email_hash = calculer_hash_email(email["texte"], email["objet"])
+    resultat, partage = await emails_en_vol.do_async(
+        _cle_email_en_vol(email_hash, use_optimized_prompts, extraction_mode),
+        lambda: _traiter_email_individuel_async(email, email_hash, llm, use_optimized_prompts, extraction_mode)
+    )
+    return _resultat_partage(email, resultat) if partage else resultat
+
+
+async def _traiter_email_individuel_async(email, email_hash, llm, use_optimized_prompts, extraction_mode):
+    texte = email["texte"]
+
+    if extraction_mode in (EXTRACTION_FUSIONNEE, EXTRACTION_GROUPEE):
+        try:
+            extraction = await extraction_fusionnee_async(texte, llm)
+        except Exception as e:
+            if fournisseur_indisponible(e):
+                raise
+            print(f"⚠️ Extraction fusionnée invalide, repli sur le mode classique: {e}")
+        else:
+            return _finaliser_extraction_fusionnee(email, email_hash, extraction)
+
+    async def filtrer_puis_extraire():
+        type_email = await filtrer_email_async(texte, llm, email.get("objet", ""))
+        return type_email, await extraire_taches_avec_options_async(texte, type_email, use_optimized_prompts, llm)
+
+    async def departement():
+        if email.get("departement"):
+            return {"nom": email["departement"], "origine": "Utilisateur"}
+        nom_dept = await identifier_departement_async(texte, llm, email.get("expediteur"),
+                                                      email.get("destinataire"), email.get("objet", ""))
+        return {"nom": nom_dept, "origine": "AI"}
+
+    (type_detecte, result_text), resume, departement_info = await asyncio.gather(
+        filtrer_puis_extraire(),
+        resumer_email_avec_options_async(texte, use_optimized_prompts, llm),
+        departement()
+    )
+
+    try:
+        taches = _parser_taches(result_text)
+    except Exception as e:
+        return _echec_extraction(email, email_hash, type_detecte, result_text, e)
+
+    await completer_priorites_async(taches, llm, email)
+
+    return _finaliser_email(email, email_hash, type_detecte, taches, resume, departement_info)
+
+
+async def traiter_batches_concurrents(batches, use_optimized_prompts=True, max_concurrency=None,
+                                      extraction_mode=EXTRACTION_CLASSIQUE):
+    """
+    Lancer tous les emails des batches en parallèle (ordre de soumission :
+    batches urgents d'abord). Retourne {id(email): résultat ou exception}.
+    """
+    # Sans limite explicite : fenêtre adaptative partagée (adaptive_concurrency.py)
+    llm = ClientLLMAsync(max_concurrency)
+    emails = [email for batch in batches for email in batch["emails"]]
+    try:
+        if extraction_mode == EXTRACTION_GROUPEE:
+            # 📦 Un appel par batch, tous les batches en parallèle
+            lots = await asyncio.gather(
+                *(traiter_lot_groupe_async(batch["emails"], llm, use_optimized_prompts) for batch in batches)
+            )
+            resultats_par_email = {cle: resultat for lot in lots for cle, resultat in lot.items()}
+        else:
+            resultats = await asyncio.gather(
+                *(traiter_email_individuel_async(email, llm, use_optimized_prompts, extraction_mode) for email in emails),
+                return_exceptions=True
+            )
+            resultats_par_email = {id(email): resultat for email, resultat in zip(emails, resultats)}
+    finally:
+        await llm.close()
+    stats = llm.get_stats()
+    print(f"⚡ {len(emails)} emails traités en parallèle: {stats['calls']} appels IA, "
+          f"{stats['max_in_flight']} simultanés max (limite {stats['max_concurrency']})")
+    return resultats_par_email
+
+
+def _lot_avec_identifiants(emails):
+    """Identifiants courts et uniques (E1, E2...) pour délimiter les emails d'un prompt groupé"""
+    return {f"E{i + 1}": email for i, email in enumerate(emails)}
+
+
+def _finaliser_lot_groupe(lot, extractions, erreurs, erreur_lot=None):
+    """
+    Résultats des emails bien extraits par l'appel groupé ; retourne aussi
+    les emails à retraiter seuls (absents, invalides, ou lot entier illisible).
+    """
+    resultats, a_retraiter = {}, []
+    for cle, email in lot.items():
+        if cle in extractions:
+            email_hash = calculer_hash_email(email["texte"], email["objet"])
+            resultats[id(email)] = _finaliser_extraction_fusionnee(
+                email, email_hash, extractions[cle], EXTRACTION_GROUPEE
+            )
+        else:
+            a_retraiter.append(email)
+    if a_retraiter:
+        raison = erreur_lot or "; ".join(f"{cle}: {erreurs[cle]}" for cle in lot if cle in erreurs)
+        print(f"⚠️ Extraction groupée: {len(a_retraiter)}/{len(lot)} emails retraités seuls ({raison})")
+    return resultats, a_retraiter
+
+
+def traiter_lot_groupe(emails, use_optimized_prompts=True):
+    """
+    📦 Extraction groupée d'un lot d'emails en un seul appel IA.
+    Les emails absents ou invalides dans la réponse sont retraités seuls
+    (extraction fusionnée, puis mode classique). Retourne {id(email): résultat ou exception}.
+    """
+    lot = _lot_avec_identifiants(emails)
+    if len(lot) > 1:
+        try:
+            extractions, erreurs = extraction_groupee([(cle, email["texte"]) for cle, email in lot.items()])
+            resultats, a_retraiter = _finaliser_lot_groupe(lot, extractions, erreurs)
+        except Exception as e:
+            if fournisseur_indisponible(e):
+                # Pas de repli email par email pendant une panne : tout le lot est reporté
+                return {id(email): e for email in emails}
+            resultats, a_retraiter = _finaliser_lot_groupe(lot, {}, {}, str(e))
+    else:
+        resultats, a_retraiter = {}, list(emails)
+
+    for email in a_retraiter:
+        try:
+            resultats[id(email)] = _traiter_email_en_vol(email, use_optimized_prompts, EXTRACTION_GROUPEE)
+        except Exception as e:
+            resultats[id(email)] = e
+    return resultats
+
+
+async def traiter_lot_groupe_async(emails, llm, use_optimized_prompts=True):
+    """Version asynchrone de traiter_lot_groupe (replis individuels en parallèle)"""
+    lot = _lot_avec_identifiants(emails)
+    if len(lot) > 1:
+        try:
+            extractions, erreurs = await extraction_groupee_async(
+                [(cle, email["texte"]) for cle, email in lot.items()], llm
+            )
+            resultats, a_retraiter = _finaliser_lot_groupe(lot, extractions, erreurs)
+        except Exception as e:
+            if fournisseur_indisponible(e):
+                return {id(email): e for email in emails}
+            resultats, a_retraiter = _finaliser_lot_groupe(lot, {}, {}, str(e))
+    else:
+        resultats, a_retraiter = {}, list(emails)
+
+    replis = await asyncio.gather(
+        *(traiter_email_individuel_async(email, llm, use_optimized_prompts, EXTRACTION_GROUPEE) for email in a_retraiter),
+        return_exceptions=True
+    )
+    for email, resultat in zip(a_retraiter, replis):
+        resultats[id(email)] = resultat
+    return resultats
+
+
+def _parser_taches(result_text):
+    """Liste des tâches renvoyée par l'IA (balises, texte autour et troncature tolérés)"""
+    return parser_taches(result_text)
+
+
+def _echec_extraction(email, email_hash, type_detecte, result_text, erreur):
+    """Réponse IA illisible : journaliser et marquer l'email (logique originale)"""
+    log_entree = {
+        "horodatage": datetime.now().isoformat(timespec='seconds'),
+        "email_objet": email["objet"],
+        "statut": "échec",
+        "type_detecte": type_detecte,
+        "erreur": str(erreur),
+        "resultat_ia": result_text
+    }
+    enregistrer_log(log_entree)
+    
+    email["statut_traitement"] = "traité"
+    email["type_email"] = type_detecte
+    email["nb_taches_extraites"] = 0
+    email["hash_email"] = email_hash
+    
+    return {"statut": "échec", "erreur": str(erreur), "nb_taches": 0}
+
+
+def _memoriser_departement(email, nom):
+    """Département fourni ou extrait par l'IA → mémo des départements"""
+    classifier = get_department_classifier()
+    if classifier is not None:
+        classifier.enregistrer(email.get("expediteur"), email.get("destinataire"), nom)
+
+
+def _finaliser_extraction_fusionnee(email, email_hash, extraction, extraction_mode=EXTRACTION_FUSIONNEE):
+    """Tâches d'une extraction fusionnée (priorités déjà fournies par le modèle)"""
+    if email.get("departement"):
+        departement_info = {"nom": email["departement"], "origine": "Utilisateur"}
+    else:
+        departement_info = {"nom": extraction["departement"] or "inconnu", "origine": "AI"}
+        _memoriser_departement(email, extraction["departement"])
+    return _finaliser_email(email, email_hash, extraction["type"], extraction["taches"],
+                            extraction["resume"], departement_info, extraction_mode)
+
+
+def _finaliser_email(email, email_hash, type_detecte, taches, resume, departement_info,
+                     extraction_mode=EXTRACTION_CLASSIQUE):
+    """Enrichir les tâches extraites, mettre à jour l'email et journaliser le succès"""
+    if departement_info.get("origine") == "Utilisateur":
+        _memoriser_departement(email, departement_info["nom"])
+
     origine_email = {
         "expediteur": email["expediteur"],
         "destinataire": email["destinataire"],
@@ -403,8 +830,6 @@ def traiter_email_individuel_avec_cache(email, tasks_data, use_optimized_prompts
         tache["id"] = f"{email['id']}_{len(nouvelles_taches)+1}"
         if not tache.get("responsable"):
             tache["responsable"] = "inconnu"
-        if not tache.get("priorite"):
-            tache["priorite"] = deduire_priorite(tache["description"])
         if type_detecte == "explicite":
             tache["confiance_ia"] = 1.0
         elif not tache.get("confiance_ia"):
@@ -416,7 +841,6 @@ def traiter_email_individuel_avec_cache(email, tasks_data, use_optimized_prompts
         tache["statut"] = "à faire"
         tache["origine_email"] = origine_email
 
-        tasks_data.append(tache)
         nouvelles_taches.append(tache)
 
     # Mise à jour email (logique originale)
@@ -434,7 +858,9 @@ def traiter_email_individuel_avec_cache(email, tasks_data, use_optimized_prompts
         "nb_taches": len(nouvelles_taches),
         "hash_email": email_hash,
         "cache_status": "nouveau_email_ajoute_au_cache",
-        "traitement_mode": "batch"
+        "traitement_mode": "batch",
+        "extraction_mode": extraction_mode,
+        "tokens_entree": mesurer_reduction(email["texte"])
     }
     enregistrer_log(log_entree)
 
@@ -442,10 +868,12 @@ def traiter_email_individuel_avec_cache(email, tasks_data, use_optimized_prompts
         "statut": "succès",
         "type_detecte": type_detecte,
         "nb_taches": len(nouvelles_taches),
-        "hash_email": email_hash
+        "hash_email": email_hash,
+        "taches": nouvelles_taches
     }
 
-# Fonction utilitaire pour écrire dans logs.json
+# Fonction utilitaire pour écrire dans logs.json (fichier quel que soit STORAGE_BACKEND,
+# comme ecrire_log de main.py : une seule source pour les lecteurs de l'historique)
 def enregistrer_log(entree):
     if not os.path.exists(LOG_FILE):
         with open(LOG_FILE, "w", encoding="utf-8") as f:
@@ -463,13 +891,15 @@ def enregistrer_log(entree):
 def traiter_emails_avec_rate_limiting(
     use_batch_processing=True,
     use_cache=True,
-    use_optimized_prompts=True
+    use_optimized_prompts=True,
+    extraction_mode=EXTRACTION_CLASSIQUE
     ):
     """
     🚦 NOUVEAU MODE: Traitement avec Rate Limiting + Queue.
     Respecte les limites d'appels IA et utilise une file d'attente intelligente.
     """
     print("🚦 Démarrage traitement avec rate limiting...")
+    pre_classification_depart = _compteurs_pre_classification()
     
     # Initialiser le rate limiter et la queue
     rate_limiter = RateLimiter(
@@ -493,6 +923,8 @@ def traiter_emails_avec_rate_limiting(
     emails_traites = 0
     appels_ia_effectues = 0
     temps_attente_total = 0.0
+    reports_par_email = {}
+    emails_en_erreur = set()
     
     print(f"📧 {len(emails)} emails à analyser...")
     
@@ -556,6 +988,11 @@ def traiter_emails_avec_rate_limiting(
         if not email:
             break
         
+        # 🔌 Circuit ouvert : inutile de vider la file en échecs immédiats
+        if get_disjoncteur().est_ouvert():
+            print(f"🔌 Fournisseur IA indisponible: {email_queue.get_total_queue_size() + 1} emails laissés en attente")
+            break
+        
         # Vérifier rate limiting
         if not rate_limiter.can_make_call():
             wait_time = rate_limiter.wait_if_needed()
@@ -564,7 +1001,7 @@ def traiter_emails_avec_rate_limiting(
         # 🚀 Traiter l'email avec toutes les optimisations
         try:
             resultat = traiter_email_individuel_avec_cache_et_rate_limiting(
-                email, tasks_data, rate_limiter, use_optimized_prompts
+                email, tasks_data, rate_limiter, use_optimized_prompts, extraction_mode
             )
             
             if resultat["statut"] == "succès":
@@ -586,7 +1023,19 @@ def traiter_emails_avec_rate_limiting(
                 print(f"   ❌ Erreur: {resultat.get('erreur', 'Inconnue')}")
                 
         except Exception as e:
-            print(f"   ❌ Erreur traitement: {str(e)}")
+            if not fournisseur_indisponible(e):
+                print(f"   ❌ Erreur traitement: {str(e)}")
+                emails_en_erreur.add(id(email))
+                continue
+            # ⏸️ Remis en file (au plus MAX_REPORTS_PAR_EMAIL fois), sinon au prochain passage
+            _reporter_email(email, e, mode_traitement="rate_limited")
+            reports_par_email[id(email)] = reports_par_email.get(id(email), 0) + 1
+            if reports_par_email[id(email)] <= MAX_REPORTS_PAR_EMAIL and not isinstance(e, CircuitOuvertError):
+                email_queue.add_email(email, detecter_priorite_email_pour_queue(email))
+    
+    # Emails restés "non_traité" sans erreur propre : repris au prochain passage
+    emails_reportes = sum(1 for e in emails_a_traiter
+                          if e["statut_traitement"] == "non_traité" and id(e) not in emails_en_erreur)
     
     # 4. 💾 SAUVEGARDE: Identique aux autres modes
     with open(DATA_FILE, "w", encoding="utf-8") as f:
@@ -606,7 +1055,10 @@ def traiter_emails_avec_rate_limiting(
         "taches_ajoutees": taches_totales,
         "doublons_detectes": emails_doublons_detectes,
         "appels_ia_effectues": appels_ia_effectues,
+        "emails_reportes": emails_reportes,
+        "disjoncteur_llm": get_disjoncteur().get_stats()["etat"],
         "temps_attente_total": round(temps_attente_total, 2),
+        "pre_classification": _bilan_pre_classification(pre_classification_depart),
         "economies_ia": f"{emails_doublons_detectes} appels évités par cache",
         "rate_limiting_stats": {
             "calls_remaining_minute": rate_limiter_stats["remaining"]["minute"],
@@ -631,6 +1083,8 @@ def traiter_emails_avec_rate_limiting(
     print(f"   ✅ Nouvelles tâches: {taches_totales}")
     print(f"   🟡 Doublons évités: {emails_doublons_detectes}")
     print(f"   🤖 Appels IA effectués: {appels_ia_effectues}")
+    if emails_reportes:
+        print(f"   ⏸️ Emails remis en attente (fournisseur indisponible): {emails_reportes}")
     print(f"   ⏱️ Temps attente total: {temps_attente_total:.1f}s")
     print(f"   🚦 Appels restants/heure: {rate_limiter_stats['remaining']['hour']}")
     print(f"   📋 Santé queue: {queue_stats_final['queue_health']['status']}")
@@ -638,7 +1092,8 @@ def traiter_emails_avec_rate_limiting(
     return resume
 
 
-def traiter_email_individuel_avec_cache_et_rate_limiting(email, tasks_data, rate_limiter, use_optimized_prompts=True):
+def traiter_email_individuel_avec_cache_et_rate_limiting(email, tasks_data, rate_limiter, use_optimized_prompts=True,
+                                                         extraction_mode=EXTRACTION_CLASSIQUE):
     """
     Traite un email individuel avec rate limiting.
     Identique à traiter_email_individuel_avec_cache mais enregistre l'appel IA.
@@ -648,9 +1103,11 @@ def traiter_email_individuel_avec_cache_et_rate_limiting(email, tasks_data, rate
         tasks_data: Données des tâches existantes  
         rate_limiter: Instance du rate limiter
         use_optimized_prompts: Utiliser les prompts IA optimisés
+        extraction_mode: "classique", "fusionnee" ou "groupee" (traité ici comme "fusionnee" :
+            la file d'attente délivre les emails un par un)
     """
     # 🚀 Même logique que traiter_email_individuel_avec_cache avec optimisations
-    resultat = traiter_email_individuel_avec_cache(email, tasks_data, use_optimized_prompts)
+    resultat = traiter_email_individuel_avec_cache(email, tasks_data, use_optimized_prompts, extraction_mode)
     
     # Enregistrer l'appel IA dans le rate limiter
     if resultat["statut"] == "succès":
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+🧪 MOCK LLM SERVER - Fournisseur OpenAI-compatible local
+=======================================================
+
+Remplace OpenRouter pour mesurer le pipeline sans réseau ni coût :
+répond à POST .../chat/completions au format OpenAI, avec
+
+- une latence tirée d'une loi configurable :
+  "fixe:0.2", "uniforme:0.1,0.5", "normale:0.8,0.2" (moyenne, écart-type),
+  "lognormale:0.8,0.5" (médiane, sigma), "exponentielle:0.5" (moyenne)
+- des erreurs injectées : 429 (avec en-tête Retry-After) et 503
+- des réponses prêtes à l'emploi selon le prompt reçu : extraction groupée
+  (un objet par <<<EMAIL id>>>), extraction fusionnée, filtrage, département,
+  priorité, résumé, sinon liste JSON de tâches (modèles remplaçables par
+  un fichier JSON : --taches)
+
+Les réponses et la latence dépendent de la graine (--graine) et du prompt :
+deux passages identiques produisent les mêmes tâches.
+
+Utilisation :
+    python src/services/mock_llm_server.py --port 8089 --latence lognormale:0.8,0.5 --taux-429 0.05
+    OPENROUTER_BASE_URL=http://127.0.0.1:8089/v1 python main.py
+
+GET /stats : appels par type, erreurs injectées, latences p50/p95/p99 ;
+POST /stats/reset : remise à zéro ; GET /health.
+
+Aucune dépendance : http.server de la bibliothèque standard.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+TACHES_PAR_DEFAUT = [
+    {"description": "Préparer le rapport mensuel", "responsable": "Karim", "deadline": "vendredi",
+     "priorite": "moyenne", "confiance_ia": 0.9},
+    {"description": "Corriger le bug critique de connexion", "responsable": "équipe IT", "deadline": "demain",
+     "priorite": "élevée", "confiance_ia": 0.95},
+    {"description": "Organiser la réunion de validation", "responsable": "Sophie", "deadline": "lundi prochain",
+     "priorite": "moyenne", "confiance_ia": 0.8},
+    {"description": "Mettre à jour la documentation", "responsable": "inconnu", "deadline": "inconnue",
+     "priorite": "faible", "confiance_ia": 0.6},
+    {"description": "Valider le budget 2025", "responsable": "direction", "deadline": "fin du mois",
+     "priorite": "élevée", "confiance_ia": 0.85},
+]
+DEPARTEMENTS = ["IT", "Finance", "RH", "Marketing", "Commercial"]
+
+_GROUPEE = re.compile(r"<<<EMAIL (\w+)>>>")
+
+
+def percentile(valeurs: List[float], p: float) -> float:
+    """Percentile par rang (p entre 0 et 100), 0.0 sans valeur"""
+    if not valeurs:
+        return 0.0
+    ordonnees = sorted(valeurs)
+    return ordonnees[max(0, math.ceil(p / 100 * len(ordonnees)) - 1)]
+
+
+def resume_latences(valeurs: List[float]) -> Dict:
+    return {
+        "nb": len(valeurs),
+        "moyenne": round(sum(valeurs) / len(valeurs), 4) if valeurs else 0.0,
+        "p50": round(percentile(valeurs, 50), 4),
+        "p95": round(percentile(valeurs, 95), 4),
+        "p99": round(percentile(valeurs, 99), 4),
+        "max": round(max(valeurs), 4) if valeurs else 0.0
+    }
+
+
+class LoiLatence:
+    """Loi de latence décrite par "nom:param1,param2" (secondes)"""
+
+    LOIS = ("fixe", "uniforme", "normale", "lognormale", "exponentielle")
+
+    def __init__(self, spec: str = "fixe:0"):
+        nom, _, params = spec.partition(":")
+        self.nom = nom.strip().lower()
+        if self.nom not in self.LOIS:
+            raise ValueError(f"Loi de latence inconnue: {nom} (attendu: {', '.join(self.LOIS)})")
+        self.params = [float(p) for p in params.split(",") if p.strip()] or [0.0]
+        attendus = {"fixe": 1, "uniforme": 2, "normale": 2, "lognormale": 2, "exponentielle": 1}[self.nom]
+        if len(self.params) != attendus:
+            raise ValueError(f"Loi {self.nom}: {attendus} paramètre(s) attendu(s), reçu {spec!r}")
+        self.spec = spec
+
+    def tirer(self, rng: random.Random) -> float:
+        a = self.params[0]
+        if self.nom == "fixe":
+            valeur = a
+        elif self.nom == "uniforme":
+            valeur = rng.uniform(a, self.params[1])
+        elif self.nom == "normale":
+            valeur = rng.gauss(a, self.params[1])
+        elif self.nom == "lognormale":
+            valeur = rng.lognormvariate(math.log(a), self.params[1]) if a > 0 else 0.0
+        else:
+            valeur = rng.expovariate(1 / a) if a > 0 else 0.0
+        return max(0.0, valeur)
+
+
+def type_prompt(prompt: str) -> str:
+    """Type d'appel reconnu d'après les consignes des prompts de agent_task.py"""
+    if _GROUPEE.search(prompt):
+        return "groupee"
+    if '"type":"explicite|implicite"' in prompt:
+        return "fusionnee"
+    if "donne sa priorité" in prompt:
+        return "priorite"
+    if 'Retourne seulement "explicite" ou "implicite"' in prompt:
+        return "filtrage"
+    if "déduis le département" in prompt:
+        return "departement"
+    if prompt.lstrip().startswith("Résume") or "court résumé" in prompt:
+        return "resume"
+    return "taches"
+
+
+class ReponsesSimulees:
+    """Contenu de réponse déterministe pour un prompt donné"""
+
+    def __init__(self, taches: Optional[List[Dict]] = None, max_taches: int = 3):
+        self.taches = taches or TACHES_PAR_DEFAUT
+        self.max_taches = max(1, max_taches)
+
+    @staticmethod
+    def _graine(texte: str) -> int:
+        return int(hashlib.md5(texte.encode("utf-8")).hexdigest()[:8], 16)
+
+    def _taches_pour(self, texte: str) -> List[Dict]:
+        graine = self._graine(texte)
+        nb = 1 + graine % self.max_taches
+        return [dict(self.taches[(graine + i) % len(self.taches)]) for i in range(nb)]
+
+    def _extraction(self, texte: str) -> Dict:
+        graine = self._graine(texte)
+        return {
+            "type": "explicite" if graine % 4 else "implicite",
+            "taches": self._taches_pour(texte),
+            "resume": "Demande de suivi des actions évoquées dans le message.",
+            "departement": DEPARTEMENTS[graine % len(DEPARTEMENTS)]
+        }
+
+    def contenu(self, prompt: str) -> str:
+        genre = type_prompt(prompt)
+        if genre == "groupee":
+            blocs = re.findall(r"<<<EMAIL (\w+)>>>\n(.*?)\n<<<FIN \1>>>", prompt, re.DOTALL)
+            return json.dumps({email_id: self._extraction(texte) for email_id, texte in blocs}, ensure_ascii=False)
+        if genre == "fusionnee":
+            return json.dumps(self._extraction(prompt), ensure_ascii=False)
+        if genre == "priorite":
+            return ["élevée", "moyenne", "faible"][self._graine(prompt) % 3]
+        if genre == "filtrage":
+            return "explicite" if self._graine(prompt) % 4 else "implicite"
+        if genre == "departement":
+            return DEPARTEMENTS[self._graine(prompt) % len(DEPARTEMENTS)]
+        if genre == "resume":
+            return "Demande de suivi des actions évoquées dans le message."
+        return json.dumps(self._taches_pour(prompt), ensure_ascii=False)
+
+
+class ServeurLLMSimule:
+    """Serveur HTTP OpenAI-compatible (thread dédié), statistiques par type d'appel"""
+
+    def __init__(self, latence: str = "fixe:0", taux_429: float = 0.0, taux_erreur: float = 0.0,
+                 retry_after: float = 1.0, graine: int = 42, reponses: Optional[ReponsesSimulees] = None):
+        self.loi = LoiLatence(latence)
+        self.taux_429 = taux_429
+        self.taux_erreur = taux_erreur
+        self.retry_after = retry_after
+        self.rng = random.Random(graine)
+        self.reponses = reponses or ReponsesSimulees()
+        self.lock = threading.Lock()
+        self.serveur = None
+        self.thread = None
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        with self.lock:
+            self.stats = {"requetes": 0, "reponses": 0, "erreurs_429": 0, "erreurs_503": 0, "par_type": {}}
+            self.latences: List[float] = []
+
+    # =====================================
+    # Décision pour une requête
+    # =====================================
+
+    def _tirage(self):
+        """(latence, erreur injectée ou None), tirés sous verrou pour rester reproductibles"""
+        with self.lock:
+            latence = self.loi.tirer(self.rng)
+            tirage = self.rng.random()
+        if tirage < self.taux_429:
+            return latence, 429
+        if tirage < self.taux_429 + self.taux_erreur:
+            return latence, 503
+        return latence, None
+
+    def traiter(self, corps: Dict):
+        """(code HTTP, en-têtes, corps JSON) pour une requête chat.completions"""
+        debut = time.perf_counter()
+        messages = corps.get("messages") or [{}]
+        prompt = str(messages[-1].get("content", ""))
+        genre = type_prompt(prompt)
+        latence, erreur = self._tirage()
+        time.sleep(latence)
+
+        with self.lock:
+            self.stats["requetes"] += 1
+            self.stats["par_type"][genre] = self.stats["par_type"].get(genre, 0) + 1
+            if erreur is not None:
+                self.stats[f"erreurs_{erreur}"] += 1
+        if erreur == 429:
+            return 429, {"Retry-After": str(self.retry_after)}, {
+                "error": {"message": "Rate limit exceeded (simulé)", "type": "rate_limit_error", "code": 429}}
+        if erreur == 503:
+            return 503, {}, {"error": {"message": "Service unavailable (simulé)", "type": "server_error", "code": 503}}
+
+        contenu = self.reponses.contenu(prompt)
+        tokens_prompt = max(1, len(prompt) // 4)
+        tokens_reponse = max(1, len(contenu) // 4)
+        with self.lock:
+            self.stats["reponses"] += 1
+            numero = self.stats["reponses"]
+            self.latences.append(time.perf_counter() - debut)
+        return 200, {}, {
+            "id": f"chatcmpl-mock-{numero}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": corps.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": contenu}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": tokens_prompt, "completion_tokens": tokens_reponse,
+                      "total_tokens": tokens_prompt + tokens_reponse}
+        }
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {
+                **self.stats,
+                "par_type": dict(self.stats["par_type"]),
+                "latence_s": resume_latences(self.latences),
+                "configuration": {"latence": self.loi.spec, "taux_429": self.taux_429,
+                                  "taux_erreur": self.taux_erreur, "retry_after": self.retry_after}
+            }
+
+    # =====================================
+    # Serveur HTTP
+    # =====================================
+
+    def demarrer(self, hote: str = "127.0.0.1", port: int = 0) -> str:
+        """Démarrer en arrière-plan ; retourne la base_url à donner au client OpenAI"""
+        simulateur = self
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _repondre(self, code: int, corps: Dict, entetes: Optional[Dict] = None):
+                donnees = json.dumps(corps, ensure_ascii=False).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(donnees)))
+                for cle, valeur in (entetes or {}).items():
+                    self.send_header(cle, valeur)
+                self.end_headers()
+                self.wfile.write(donnees)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/stats"):
+                    self._repondre(200, simulateur.get_stats())
+                elif self.path.rstrip("/").endswith("/health"):
+                    self._repondre(200, {"status": "ok"})
+                else:
+                    self._repondre(404, {"error": {"message": f"Chemin inconnu: {self.path}"}})
+
+            def do_POST(self):
+                longueur = int(self.headers.get("Content-Length") or 0)
+                brut = self.rfile.read(longueur) if longueur else b""
+                if self.path.rstrip("/").endswith("/stats/reset"):
+                    simulateur.reinitialiser()
+                    self._repondre(200, {"status": "reset"})
+                    return
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._repondre(404, {"error": {"message": f"Chemin inconnu: {self.path}"}})
+                    return
+                try:
+                    corps = json.loads(brut or b"{}")
+                except ValueError:
+                    self._repondre(400, {"error": {"message": "JSON invalide", "type": "invalid_request_error"}})
+                    return
+                code, entetes, reponse = simulateur.traiter(corps)
+                self._repondre(code, reponse, entetes)
+
+            def log_message(self, format, *args):
+                # Pas de ligne par requête : les statistiques suffisent
+                pass
+
+        self.serveur = ThreadingHTTPServer((hote, port), Gestionnaire)
+        self.serveur.daemon_threads = True
+        self.thread = threading.Thread(target=self.serveur.serve_forever, daemon=True)
+        self.thread.start()
+        return f"http://{hote}:{self.serveur.server_address[1]}/v1"
+
+    def arreter(self):
+        if self.serveur is not None:
+            self.serveur.shutdown()
+            self.serveur.server_close()
+            self.serveur = None
+
+
+def charger_taches(chemin: Optional[str]) -> Optional[List[Dict]]:
+    if not chemin:
+        return None
+    with open(chemin, "r", encoding="utf-8") as f:
+        taches = json.load(f)
+    if not isinstance(taches, list) or not taches:
+        raise ValueError(f"{chemin}: liste JSON de tâches attendue")
+    return taches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fournisseur LLM OpenAI-compatible simulé")
+    parser.add_argument("--hote", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latence", default="lognormale:0.8,0.4", help="ex: fixe:0.2, uniforme:0.1,0.5")
+    parser.add_argument("--taux-429", type=float, default=0.0, help="part des requêtes refusées en 429")
+    parser.add_argument("--taux-erreur", type=float, default=0.0, help="part des requêtes en erreur 503")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After des 429 (secondes)")
+    parser.add_argument("--taches", help="fichier JSON : liste de tâches modèles")
+    parser.add_argument("--graine", type=int, default=42)
+    args = parser.parse_args()
+
+    simulateur = ServeurLLMSimule(args.latence, args.taux_429, args.taux_erreur, args.retry_after, args.graine,
+                                  ReponsesSimulees(charger_taches(args.taches)))
+    base_url = simulateur.demarrer(args.hote, args.port)
+    print(f"🧪 Mock LLM prêt: OPENROUTER_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"\n📊 {json.dumps(simulateur.get_stats(), ensure_ascii=False)}")
+        simulateur.arreter()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+📈 CONCURRENCE ADAPTATIVE (AIMD)
+===============================
+
+Le RateLimiter applique des plafonds fixes (appels par minute / heure /
+jour) devinés à l'avance, et ClientLLMAsync un nombre d'appels en vol
+constant (LLM_MAX_CONCURRENCY). Aucun des deux ne réagit à ce que fait
+réellement le fournisseur.
+
+Ce contrôleur ajuste la fenêtre d'appels simultanés comme TCP :
+- augmentation additive : +1 par fenêtre d'appels réussis tant que la
+  latence reste sous la cible (LLM_LATENCY_TARGET_S)
+- diminution multiplicative (×0.5) sur un 429, un timeout, ou quand le
+  p95 des latences récentes dépasse la cible de plus de 50 %
+- une seule diminution par période de refroidissement, pour ne pas
+  réagir plusieurs fois à la même salve d'erreurs
+
+Il est partagé par tous les clients (threads et boucles asyncio) :
+les appels en vol sont comptés globalement.
+
+Configuration : LLM_ADAPTIVE_CONCURRENCY (1), LLM_MAX_CONCURRENCY (fenêtre
+initiale, 8), LLM_MIN_CONCURRENCY (1), LLM_MAX_CONCURRENCY_LIMIT (64),
+LLM_LATENCY_TARGET_S (8), LLM_AIMD_COOLDOWN_S (5).
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+LLM_ADAPTIVE_CONCURRENCY = os.getenv("LLM_ADAPTIVE_CONCURRENCY", "1") not in ("0", "false", "False")
+
+FACTEUR_DIMINUTION = 0.5
+# p95 toléré au-dessus de la cible avant de réduire la fenêtre
+TOLERANCE_P95 = 1.5
+# Latences récentes prises en compte pour le p95 (et minimum pour s'y fier)
+TAILLE_ECHANTILLON = 50
+MIN_ECHANTILLON_P95 = 10
+TAILLE_HISTORIQUE = 20
+
+
+def _percentile(valeurs, p: float) -> float:
+    if not valeurs:
+        return 0.0
+    ordonnees = sorted(valeurs)
+    return ordonnees[max(0, math.ceil(p / 100 * len(ordonnees)) - 1)]
+
+
+def cause_surcharge(erreur: BaseException) -> Optional[str]:
+    """"429", "timeout" ou None si l'erreur ne traduit pas une saturation du fournisseur"""
+    if getattr(erreur, "status_code", None) == 429 or "RateLimit" in type(erreur).__name__:
+        return "429"
+    if isinstance(erreur, TimeoutError) or "Timeout" in type(erreur).__name__:
+        return "timeout"
+    return None
+
+
+class ControleurAIMD:
+    """Fenêtre d'appels simultanés ajustée par les latences et les erreurs observées"""
+
+    def __init__(self, initiale: int = 8, minimum: int = 1, maximum: int = 64,
+                 latence_cible: float = 8.0, refroidissement: float = 5.0):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.latence_cible = latence_cible
+        self.refroidissement = refroidissement
+        self.fenetre = float(min(self.maximum, max(self.minimum, initiale)))
+        self.en_vol = 0
+        self.lock = threading.Lock()
+        self.latences = deque(maxlen=TAILLE_ECHANTILLON)
+        self._derniere_diminution = 0.0
+        self.historique = deque(maxlen=TAILLE_HISTORIQUE)
+        self.stats = {"succes": 0, "echecs": 0, "augmentations": 0, "refus": 0,
+                      "diminutions": {"429": 0, "timeout": 0, "p95": 0}}
+
+    @property
+    def limite(self) -> int:
+        return int(self.fenetre)
+
+    # =====================================
+    # Places en vol
+    # =====================================
+
+    def acquerir(self) -> bool:
+        """Réserver une place si la fenêtre le permet"""
+        with self.lock:
+            if self.en_vol >= self.limite:
+                self.stats["refus"] += 1
+                return False
+            self.en_vol += 1
+            return True
+
+    def liberer(self):
+        with self.lock:
+            self.en_vol = max(0, self.en_vol - 1)
+
+    # =====================================
+    # Signaux du fournisseur
+    # =====================================
+
+    def signaler_succes(self, latence: float):
+        with self.lock:
+            self.stats["succes"] += 1
+            self.latences.append(latence)
+            if len(self.latences) >= MIN_ECHANTILLON_P95 and \
+                    _percentile(self.latences, 95) > self.latence_cible * TOLERANCE_P95:
+                self._diminuer("p95")
+            elif latence <= self.latence_cible and self.fenetre < self.maximum:
+                # +1/fenêtre par succès : +1 quand toute la fenêtre a réussi
+                avant = self.limite
+                self.fenetre = min(self.maximum, self.fenetre + 1.0 / self.fenetre)
+                if self.limite > avant:
+                    self.stats["augmentations"] += 1
+                    self._noter("augmentation")
+
+    def signaler_echec(self, erreur: BaseException):
+        cause = cause_surcharge(erreur)
+        with self.lock:
+            self.stats["echecs"] += 1
+            if cause is not None:
+                self._diminuer(cause)
+
+    def _diminuer(self, cause: str):
+        maintenant = time.monotonic()
+        if maintenant - self._derniere_diminution < self.refroidissement:
+            return
+        self._derniere_diminution = maintenant
+        self.fenetre = max(float(self.minimum), self.fenetre * FACTEUR_DIMINUTION)
+        self.stats["diminutions"][cause] += 1
+        # Les latences d'avant la réduction ne doivent pas déclencher une seconde coupe
+        self.latences.clear()
+        self._noter(cause)
+
+    def _noter(self, evenement: str):
+        self.historique.append({
+            "horodatage": datetime.now().isoformat(timespec="seconds"),
+            "evenement": evenement,
+            "fenetre": self.limite
+        })
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {
+                "fenetre": self.limite,
+                "en_vol": self.en_vol,
+                "minimum": self.minimum,
+                "maximum": self.maximum,
+                "latence_cible": self.latence_cible,
+                "latence_p50": round(_percentile(self.latences, 50), 3),
+                "latence_p95": round(_percentile(self.latences, 95), 3),
+                **{cle: valeur for cle, valeur in self.stats.items() if cle != "diminutions"},
+                "diminutions": dict(self.stats["diminutions"]),
+                "historique": list(self.historique)
+            }
+
+
+_controleur = None
+_controleur_lock = threading.Lock()
+
+
+def get_controleur_concurrence() -> Optional[ControleurAIMD]:
+    """Contrôleur partagé (None si LLM_ADAPTIVE_CONCURRENCY=0)"""
+    global _controleur
+    if not LLM_ADAPTIVE_CONCURRENCY:
+        return None
+    with _controleur_lock:
+        if _controleur is None:
+            _controleur = ControleurAIMD(
+                initiale=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+                minimum=int(os.getenv("LLM_MIN_CONCURRENCY", "1")),
+                maximum=int(os.getenv("LLM_MAX_CONCURRENCY_LIMIT", "64")),
+                latence_cible=float(os.getenv("LLM_LATENCY_TARGET_S", "8")),
+                refroidissement=float(os.getenv("LLM_AIMD_COOLDOWN_S", "5"))
+            )
+        return _controleur
+
+
+def statistiques_concurrence() -> Dict:
+    controleur = get_controleur_concurrence()
+    return controleur.get_stats() if controleur is not None else {"enabled": False}
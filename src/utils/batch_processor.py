@@ -6,23 +6,29 @@ import json
 from datetime import datetime
 from typing import List, Dict, Any
 from cache_emails import calculer_hash_email, est_email_deja_traite
+from token_budget import estimer_tokens, estimer_tokens_entree
 
 class BatchProcessor:
     """
     Processeur de batch intelligent pour emails d'entreprise.
     Groupe les emails par priorité et taille optimale sans classification IA complexe.
     """
+
+    # Mots-clés pour détection urgence (simple et efficace), partagés avec priority_engine.py
+    MOTS_URGENTS = [
+        "urgent", "asap", "immédiat", "critique", "emergency",
+        "panne", "bug", "erreur", "problème", "incident",
+        "down", "crash", "bloquer", "bloqué", "help"
+    ]
+    # Expéditeurs prioritaires (préfixes d'adresse)
+    EXPEDITEURS_VIP = ['ceo@', 'direction@', 'pdg@']
     
-    def __init__(self, batch_size_normal=5, batch_size_urgent=2):
+    def __init__(self, batch_size_normal=5, batch_size_urgent=2, max_emails_par_lot=12):
         self.batch_size_normal = batch_size_normal  # Taille batch emails normaux
         self.batch_size_urgent = batch_size_urgent  # Taille batch emails urgents
+        self.max_emails_par_lot = max_emails_par_lot  # Plafond des lots dimensionnés par budget de tokens
         
-        # Mots-clés pour détection urgence (simple et efficace)
-        self.mots_urgents = [
-            "urgent", "asap", "immédiat", "critique", "emergency",
-            "panne", "bug", "erreur", "problème", "incident",
-            "down", "crash", "bloquer", "bloqué", "help"
-        ]
+        self.mots_urgents = list(self.MOTS_URGENTS)
     
     def detecter_urgence(self, email):
         """
@@ -44,7 +50,7 @@ class BatchProcessor:
         
         # Vérifier expéditeur prioritaire (optionnel)
         expediteur = email.get('expediteur', '').lower()
-        if any(vip in expediteur for vip in ['ceo@', 'direction@', 'pdg@']):
+        if any(vip in expediteur for vip in self.EXPEDITEURS_VIP):
             return True
             
         return False
@@ -78,13 +84,42 @@ class BatchProcessor:
         
         return emails_a_traiter
     
-    def creer_batches_intelligents(self, emails):
+    def decouper_par_budget(self, emails, budget_tokens):
+        """
+        Découpe une liste d'emails en lots dont le texte cumulé tient dans
+        budget_tokens (au plus max_emails_par_lot emails par lot).
+        Un email dépassant seul le budget forme son propre lot.
+        
+        Args:
+            emails (list): Emails dans l'ordre de traitement
+            budget_tokens (int): Tokens d'emails maximum par lot
+            
+        Returns:
+            list: Liste de (emails du lot, tokens estimés)
+        """
+        lots = []
+        lot, tokens_lot = [], 0
+        for email in emails:
+            # Tokens réellement envoyés : texte nettoyé et plafonné (token_budget.py)
+            tokens = estimer_tokens_entree(email.get("texte", ""), "groupee") + estimer_tokens(email.get("objet", ""))
+            if lot and (tokens_lot + tokens > budget_tokens or len(lot) >= self.max_emails_par_lot):
+                lots.append((lot, tokens_lot))
+                lot, tokens_lot = [], 0
+            lot.append(email)
+            tokens_lot += tokens
+        if lot:
+            lots.append((lot, tokens_lot))
+        return lots
+    
+    def creer_batches_intelligents(self, emails, budget_tokens=None):
         """
         Crée des batches optimisés pour traitement par l'IA.
         Sépare urgent/normal et groupe par taille optimale.
         
         Args:
             emails (list): Liste des emails à traiter
+            budget_tokens (int): Si fourni, taille des batches adaptée à ce budget
+                de tokens (extraction groupée) au lieu d'un nombre fixe d'emails
             
         Returns:
             list: Liste de batches avec métadonnées
@@ -108,6 +143,21 @@ class BatchProcessor:
         # 3. Créer batches
         batches = []
         
+        if budget_tokens:
+            # Lots dimensionnés par tokens : beaucoup d'emails courts, peu d'emails longs
+            for type_batch, priorite, groupe in (("urgent", 1, emails_urgents), ("normal", 2, emails_normaux)):
+                for batch_emails, tokens in self.decouper_par_budget(groupe, budget_tokens):
+                    batches.append({
+                        "id": f"{type_batch}_{len(batches)+1}",
+                        "type": type_batch,
+                        "priorite": priorite,
+                        "emails": batch_emails,
+                        "taille": len(batch_emails),
+                        "tokens_estimes": tokens,
+                        "created_at": datetime.now().isoformat()
+                    })
+            return batches
+        
         # Batches urgents (petits, traités en premier)
         for i in range(0, len(emails_urgents), self.batch_size_urgent):
             batch_emails = emails_urgents[i:i+self.batch_size_urgent]
@@ -191,13 +241,13 @@ class BatchProcessor:
         """
         from agent_task import (
             filtrer_email, extract_tasks_from_email, suggere_taches_implicites,
-            resume_email, identifier_departement, deduire_priorite
+            resume_email, identifier_departement, completer_priorites
         )
         
         texte = email["texte"]
         
         # 1. Filtrer email (logique existante)
-        type_detecte = filtrer_email(texte)
+        type_detecte = filtrer_email(texte, email.get("objet", ""))
         
         # 2. Extraction tâches selon type
         if type_detecte == "explicite":
@@ -224,17 +274,17 @@ class BatchProcessor:
         if email.get("departement"):
             departement_info = {"nom": email["departement"], "origine": "Utilisateur"}
         else:
-            nom_dept = identifier_departement(texte)
+            nom_dept = identifier_departement(texte, email.get("expediteur"), email.get("destinataire"),
+                                              email.get("objet", ""))
             departement_info = {"nom": nom_dept, "origine": "AI"}
         
-        # 5. Préparer tâches enrichies
+        # 5. Préparer tâches enrichies (priorités manquantes : moteur local, toutes les tâches d'un coup)
+        completer_priorites(taches, email)
         taches_enrichies = []
         for i, tache in enumerate(taches):
             tache["id"] = f"{email['id']}_{i+1}"
             if not tache.get("responsable"):
                 tache["responsable"] = "inconnu"
-            if not tache.get("priorite"):
-                tache["priorite"] = deduire_priorite(tache["description"])
                 
             if type_detecte == "explicite":
                 tache["confiance_ia"] = 1.0
@@ -13,6 +13,13 @@ from datetime import datetime
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 CACHE_FILE = os.path.join(BASE_DIR, "data", "emails_cache.json")
 
+# Backend SQLite optionnel (STORAGE_BACKEND=sqlite) : une ligne par hash
+try:
+    from sqlite_storage import get_storage
+except ImportError:
+    def get_storage():
+        return None
+
 def calculer_hash_email(texte_email, objet_email=""):
     """
     Calcule un hash unique pour un email basé sur son contenu et objet.
@@ -51,6 +58,10 @@ def est_email_deja_traite(hash_email):
     Returns:
         bool: True si l'email a déjà été traité, False sinon
     """
+    storage = get_storage()
+    if storage is not None:
+        return storage.cache_contains(hash_email)
+
     # Si le fichier cache n'existe pas, aucun email n'a été traité
     if not os.path.exists(CACHE_FILE):
         return False
@@ -74,6 +85,25 @@ def marquer_email_traite(hash_email, email_info):
         hash_email (str): Le hash unique de l'email
         email_info (dict): Informations sur l'email (objet, expéditeur, etc.)
     """
+    # Métadonnées de l'email
+    info = {
+        "processed_at": datetime.now().isoformat(timespec='seconds'),
+        "email_objet": email_info.get("objet", ""),
+        "email_expediteur": email_info.get("expediteur", ""),
+        "email_destinataire": email_info.get("destinataire", ""),
+        "nb_taches_extraites": email_info.get("nb_taches", 0),
+        "type_email": email_info.get("type_email", ""),
+        "hash": hash_email
+    }
+
+    storage = get_storage()
+    if storage is not None:
+        try:
+            storage.cache_put(hash_email, info)
+        except Exception as e:
+            print(f"⚠️ Erreur sauvegarde cache: {e}")
+        return
+
     # Charger le cache existant ou créer un nouveau
     if not os.path.exists(CACHE_FILE):
         cache = {"emails_hashes": {}}
@@ -86,15 +116,7 @@ def marquer_email_traite(hash_email, email_info):
             cache = {"emails_hashes": {}}
     
     # Ajouter l'email au cache avec ses métadonnées
-    cache["emails_hashes"][hash_email] = {
-        "processed_at": datetime.now().isoformat(timespec='seconds'),
-        "email_objet": email_info.get("objet", ""),
-        "email_expediteur": email_info.get("expediteur", ""),
-        "email_destinataire": email_info.get("destinataire", ""),
-        "nb_taches_extraites": email_info.get("nb_taches", 0),
-        "type_email": email_info.get("type_email", ""),
-        "hash": hash_email
-    }
+    cache["emails_hashes"][hash_email] = info
     
     # Sauvegarder le cache mis à jour
     try:
@@ -113,6 +135,10 @@ def obtenir_info_cache(hash_email):
     Returns:
         dict: Informations de l'email ou None si non trouvé
     """
+    storage = get_storage()
+    if storage is not None:
+        return storage.cache_get(hash_email)
+
     if not os.path.exists(CACHE_FILE):
         return None
     
@@ -125,6 +151,29 @@ def obtenir_info_cache(hash_email):
     except (json.JSONDecodeError, FileNotFoundError):
         return None
 
+def obtenir_tout_le_cache():
+    """
+    Récupère toutes les entrées du cache (hash -> informations) en une lecture.
+    
+    Returns:
+        dict: Informations des emails traités, indexées par hash
+    """
+    storage = get_storage()
+    if storage is not None:
+        return storage.cache_all()
+
+    if not os.path.exists(CACHE_FILE):
+        return {}
+    
+    try:
+        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        
+        return cache.get("emails_hashes", {})
+    
+    except (json.JSONDecodeError, FileNotFoundError):
+        return {}
+
 def nettoyer_cache_ancien(jours_retention=30):
     """
     Nettoie les entrées du cache plus anciennes que X jours.
@@ -132,6 +181,15 @@ def nettoyer_cache_ancien(jours_retention=30):
     Args:
         jours_retention (int): Nombre de jours à conserver dans le cache
     """
+    storage = get_storage()
+    if storage is not None:
+        try:
+            conserves = storage.cache_purge_older_than(jours_retention)
+            print(f"🧹 Cache nettoyé: {conserves} entrées conservées")
+        except Exception as e:
+            print(f"⚠️ Erreur nettoyage cache: {e}")
+        return
+
     if not os.path.exists(CACHE_FILE):
         return
     
@@ -170,6 +228,10 @@ def obtenir_statistiques_cache():
     Returns:
         dict: Statistiques du cache
     """
+    storage = get_storage()
+    if storage is not None:
+        return storage.cache_stats()
+
     if not os.path.exists(CACHE_FILE):
         return {
             "total_emails_caches": 0,
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+🔄 JOURNAL DES CHANGEMENTS - Synchronisation différentielle
+==========================================================
+
+Garde les derniers changements du TaskStore (insertion, mise à jour,
+suppression) avec la version du store qui les a produits. Un client qui
+connaît la version de sa dernière synchronisation ne récupère que les
+tâches modifiées depuis (GET /tasks/changes?since=<version>).
+
+- upsert (add_task / update_task) : une entrée par écriture
+- reset (rechargement disque, save_all_tasks) : différence avec l'état
+  précédent → insertions, mises à jour et suppressions
+- rétention bornée : un client trop en retard doit se resynchroniser
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# Nombre de changements conservés
+CHANGE_LOG_MAX_ENTRIES = 5000
+
+
+class ChangeLog:
+    """Journal borné des changements du store, indexé par version"""
+
+    def __init__(self, store, max_entries: int = CHANGE_LOG_MAX_ENTRIES):
+        self.store = store
+        self.max_entries = max_entries
+        # (version, horodatage, op, id) par ordre de version croissante
+        self._entries: deque = deque()
+        # État connu : id → tâche résidente (références, pas de copie)
+        self._known: Optional[Dict[str, Dict]] = None
+        # Plus petite version depuis laquelle le journal est complet
+        self._floor = 0
+        self._floor_time = time.time()
+        self._lock = threading.Lock()
+        self.stats = {"recorded": 0, "evicted": 0, "resets_diffed": 0, "resync_required": 0}
+        store.add_listener(self._on_store_event)
+
+    # =====================================
+    # Enregistrement (appelé sous le verrou du store)
+    # =====================================
+
+    def _on_store_event(self, event: str, task: Optional[Dict]):
+        version = self.store.version
+        with self._lock:
+            if event == "upsert":
+                if self._known is None:
+                    return
+                op = "updated" if task["id"] in self._known else "inserted"
+                self._known[task["id"]] = task
+                self._append(version, op, task["id"])
+            elif event == "reset":
+                current = self.store.snapshot()
+                if self._known is None:
+                    # Premier chargement : point de départ du journal
+                    self._known = current
+                    self._floor = version
+                    return
+                self.stats["resets_diffed"] += 1
+                for task_id, task in current.items():
+                    previous = self._known.get(task_id)
+                    if previous is None:
+                        self._append(version, "inserted", task_id)
+                    elif previous is not task and previous != task:
+                        self._append(version, "updated", task_id)
+                for task_id in self._known.keys() - current.keys():
+                    self._append(version, "deleted", task_id)
+                self._known = current
+
+    def _append(self, version: int, op: str, task_id: str):
+        self._entries.append((version, time.time(), op, task_id))
+        self.stats["recorded"] += 1
+        while len(self._entries) > self.max_entries:
+            evicted = self._entries.popleft()
+            # Les changements de cette version ne sont plus tous connus
+            self._floor = evicted[0]
+            self._floor_time = evicted[1]
+            self.stats["evicted"] += 1
+
+    # =====================================
+    # Lecture
+    # =====================================
+
+    @staticmethod
+    def parse_since(since: str, instance_id: str) -> Optional[int]:
+        """
+        Version demandée : "12" ou jeton "<instance>:12" (voir TaskStore.etag_token).
+        None si le jeton vient d'une autre instance ou est illisible.
+        """
+        instance, _, version = str(since).strip().rpartition(":")
+        if instance and instance != instance_id:
+            return None
+        try:
+            return int(version)
+        except ValueError:
+            return None
+
+    def _collect(self, selector) -> Tuple[List[str], List[str], List[str]]:
+        """Dernier état de chaque tâche changée parmi les entrées sélectionnées"""
+        first_op: Dict[str, str] = {}
+        for entry in self._entries:
+            if selector(entry):
+                first_op.setdefault(entry[3], entry[2])
+        current = self._known or {}
+        inserted, updated, deleted = [], [], []
+        for task_id, op in first_op.items():
+            if task_id not in current:
+                # Insérée puis supprimée dans la fenêtre : le client ne l'a jamais vue
+                if op != "inserted":
+                    deleted.append(task_id)
+            elif op == "inserted":
+                inserted.append(task_id)
+            else:
+                updated.append(task_id)
+        return inserted, updated, deleted
+
+    def changes_since(self, since_version: Optional[int] = None,
+                      since_timestamp: Optional[float] = None) -> Dict:
+        """
+        Changements postérieurs à une version (ou à un horodatage epoch).
+        resync_required=True si la fenêtre de rétention est dépassée.
+        """
+        with self.store.lock:
+            self.store.ensure_fresh()
+            version = self.store.version
+            with self._lock:
+                if since_version is not None:
+                    too_old = since_version < self._floor or since_version > version
+                    selector = lambda entry: entry[0] > since_version
+                else:
+                    too_old = since_timestamp is None or since_timestamp < self._floor_time
+                    selector = lambda entry: entry[1] > since_timestamp
+                if too_old or self._known is None:
+                    self.stats["resync_required"] += 1
+                    return {"version": version, "resync_required": True,
+                            "inserted": [], "updated": [], "deleted": []}
+                inserted, updated, deleted = self._collect(selector)
+                return {
+                    "version": version,
+                    "resync_required": False,
+                    "inserted": [self._known[task_id] for task_id in inserted],
+                    "updated": [self._known[task_id] for task_id in updated],
+                    "deleted": deleted
+                }
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "oldest_version": self._floor
+            }
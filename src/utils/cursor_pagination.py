@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+📜 PAGINATION PAR CURSEUR (KEYSET)
+=================================
+
+Curseurs opaques pour /all-tasks et /tasks/tags/{tag_name}/tasks :
+le jeton encode la dernière clé de tri vue (clé, position, id), le tri
+utilisé et une empreinte des filtres. La page suivante reprend par
+bisect dans l'index de tri (sort_index.py) au lieu de recalculer un offset :
+les insertions concurrentes (watchers) ne décalent pas les pages.
+"""
+
+import base64
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from sort_index import key_type
+
+CURSOR_VERSION = 1
+
+
+def empreinte_requete(**params) -> str:
+    """Empreinte courte des paramètres de filtre/tri (un curseur n'est valable que pour eux)"""
+    normalized = {key: value for key, value in params.items() if value not in (None, "", [])}
+    raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def encoder_curseur(sort_by: str, order: str, after: tuple, scope: str) -> str:
+    payload = {"v": CURSOR_VERSION, "s": sort_by, "o": order, "a": list(after), "f": scope}
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decoder_curseur(token: str, sort_by: str, order: str, scope: str) -> tuple:
+    """
+    Décoder un curseur et vérifier qu'il correspond à la requête courante.
+    Lève ValueError si le jeton est invalide ou émis pour d'autres paramètres.
+    La clé et la position sont typées selon le champ trié : une clé forgée
+    d'un autre type ferait échouer la comparaison dans bisect.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload: Dict[str, Any] = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        after = payload["a"]
+        if payload.get("v") != CURSOR_VERSION or not isinstance(after, list) or len(after) != 3:
+            raise ValueError
+    except Exception:
+        raise ValueError("Curseur invalide")
+    if payload.get("s") != sort_by or payload.get("o") != order or payload.get("f") != scope:
+        raise ValueError("Curseur émis pour d'autres filtres ou un autre tri")
+    key, position, task_id = after
+    if not (_est_du_type(key, key_type(sort_by)) and _est_du_type(position, int) and isinstance(task_id, str)):
+        raise ValueError("Curseur invalide")
+    return tuple(after)
+
+
+def _est_du_type(value: Any, expected: type) -> bool:
+    # bool est une sous-classe d'int mais n'est jamais une clé de tri
+    return isinstance(value, expected) and not isinstance(value, bool)
+
+
+def pagination_curseur(page_tasks, has_next: bool, total: int, page_size: int,
+                       next_cursor: Optional[str]) -> Dict:
+    """Métadonnées de pagination en mode curseur"""
+    return {
+        "mode": "cursor",
+        "total_tasks": total,
+        "page_size": page_size,
+        "returned": len(page_tasks),
+        "has_next": has_next,
+        "next_cursor": next_cursor if has_next else None
+    }
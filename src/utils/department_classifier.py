@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+🏢 INFÉRENCE LOCALE DU DÉPARTEMENT
+=================================
+
+identifier_departement() appelle l'IA pour chaque email sans département,
+alors que la réponse se déduit presque toujours de l'expéditeur, des
+destinataires et de l'objet. Ordre de résolution :
+
+1. mémo expéditeur / destinataire / domaine → département, appris des
+   résultats passés (tâches du TaskStore unifié) puis mis à jour à
+   chaque nouvelle réponse ; une clé ne répond que si un département y
+   est largement majoritaire (les domaines internes, multi-départements,
+   ne répondent donc jamais)
+2. classifieur textuel léger (mots-clés par département, adresses comprises)
+3. seulement ensuite : l'IA (dont la réponse enrichit le mémo)
+
+Le mémo est persisté dans data/department_memo.json.
+Configuration : DEPARTMENT_CLASSIFIER_ENABLED (1).
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MEMO_FILE = os.path.join(BASE_DIR, "data", "department_memo.json")
+
+DEPARTMENT_CLASSIFIER_ENABLED = os.getenv("DEPARTMENT_CLASSIFIER_ENABLED", "1") not in ("0", "false", "False")
+
+# Une clé du mémo répond si elle a assez d'exemples et un département dominant
+SUPPORT_MINIMUM = 2
+PART_MINIMUM = 0.75
+# Score minimal du classifieur textuel (somme des poids des mots-clés trouvés)
+SCORE_TEXTE_MINIMUM = 2.0
+
+# Variantes rencontrées → nom canonique
+SYNONYMES_DEPARTEMENT = {
+    "rh": "RH", "ressources humaines": "RH", "ressources humaines (rh)": "RH", "hr": "RH",
+    "human resources": "RH",
+    "finance": "Finance", "finances": "Finance", "comptabilité": "Finance", "comptabilite": "Finance",
+    "it": "IT", "informatique": "IT", "dsi": "IT", "tech": "IT", "technique": "IT",
+    "marketing": "Marketing", "communication": "Marketing",
+    "commercial": "Commercial", "ventes": "Commercial", "sales": "Commercial",
+    "juridique": "Juridique", "legal": "Juridique",
+    "achats": "Achats", "logistique": "Logistique", "direction": "Direction",
+}
+# Réponses sans valeur (valeurs par défaut de formulaires, échecs)
+VALEURS_IGNOREES = {"", "string", "inconnu", "non identifié", "non identifie", "none", "null"}
+
+# Mots-clés (texte, objet et adresses) → département, avec poids
+MOTS_CLES_DEPARTEMENT = {
+    "IT": {"bug": 2, "serveur": 2, "déploiement": 2, "deployer": 1, "déployer": 2, "vpn": 2, "api": 2,
+           "authentification": 2, "logiciel": 1.5, "code": 1.5, "dev": 1.5, "développement": 1.5,
+           "infrastructure": 2, "base de données": 2, "crm": 1, "système": 1, "admin": 1, "test": 0.5},
+    "Finance": {"budget": 2, "budgétaire": 2, "facture": 2, "comptab": 2, "fiscal": 2, "trésorerie": 2,
+                "paiement": 1.5, "coûts": 1, "chiffres": 1, "investisseurs": 1.5, "frais": 1.5},
+    "RH": {"congés": 2, "recrutement": 2, "télétravail": 2, "salaire": 2, "embauche": 2, "formation": 1,
+           "politique rh": 2, "onboarding": 2, "employés": 1, "rh": 1.5},
+    "Marketing": {"campagne": 2, "marketing": 2, "brief": 1.5, "marque": 1.5, "réseaux sociaux": 2,
+                  "présentation": 0.5, "communication": 1.5, "salon": 1.5},
+    "Commercial": {"devis": 2, "vente": 1.5, "commercial": 2, "prospect": 2, "contrat client": 2},
+    "Logistique": {"livraison": 2, "stock": 2, "commande": 1.5, "expédition": 2, "entrepôt": 2},
+    "Achats": {"fournisseur": 2, "achats": 2, "approvisionnement": 2},
+    "Juridique": {"juridique": 2, "contrat": 1, "conformité": 2, "rgpd": 2, "litige": 2},
+}
+
+
+def normaliser_departement(nom) -> Optional[str]:
+    """Nom canonique d'un département (None si la valeur est inexploitable)"""
+    if isinstance(nom, dict):
+        nom = nom.get("nom")
+    if not isinstance(nom, str):
+        return None
+    nettoye = nom.strip().strip(".\"'").strip()
+    if nettoye.lower() in VALEURS_IGNOREES or len(nettoye) > 60:
+        return None
+    return SYNONYMES_DEPARTEMENT.get(nettoye.lower(), nettoye)
+
+
+def _adresses(valeur) -> List[str]:
+    """Adresses email en minuscules (chaîne unique, liste ou 'a@x, b@y')"""
+    if not valeur:
+        return []
+    if isinstance(valeur, (list, tuple)):
+        valeur = ",".join(str(v) for v in valeur)
+    return [adresse.lower() for adresse in re.findall(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+", str(valeur))]
+
+
+def cles_memo(expediteur, destinataire) -> List[str]:
+    """Clés consultées, de la plus précise à la plus générale"""
+    expediteurs, destinataires = _adresses(expediteur), _adresses(destinataire)
+    cles = [f"paire:{e}>{d}" for e in expediteurs for d in destinataires]
+    cles += [f"expediteur:{e}" for e in expediteurs]
+    cles += [f"destinataire:{d}" for d in destinataires]
+    cles += [f"domaine:{e.split('@', 1)[1]}" for e in expediteurs]
+    return cles
+
+
+def score_texte(texte: str, objet: str = "", adresses: Iterable[str] = ()) -> Tuple[Optional[str], float]:
+    """Département le plus probable d'après les mots-clés, et son score"""
+    contenu = " ".join([objet or "", texte or "", " ".join(adresses)]).lower()
+    scores = Counter()
+    for departement, mots in MOTS_CLES_DEPARTEMENT.items():
+        for mot, poids in mots.items():
+            if re.search(r"(?<!\w)" + re.escape(mot), contenu):
+                scores[departement] += poids
+    if not scores:
+        return None, 0.0
+    (meilleur, score), *suivants = scores.most_common(2)
+    # Égalité ou quasi-égalité : pas de décision locale
+    if suivants and suivants[0][1] >= score - 1.0:
+        return None, score
+    return meilleur, score
+
+
+class DepartmentClassifier:
+    """Mémo appris + classifieur textuel, thread-safe, persisté en JSON"""
+
+    def __init__(self, memo_file: str = MEMO_FILE):
+        self.memo_file = memo_file
+        self.lock = threading.Lock()
+        self.memo: Dict[str, Counter] = {}
+        self.stats = {"requetes": 0, "memo": 0, "texte": 0, "llm": 0, "apprentissages": 0}
+
+    # =====================================
+    # Persistance
+    # =====================================
+
+    def charger(self) -> bool:
+        """Charger le mémo persisté (False si absent ou illisible)"""
+        try:
+            with open(self.memo_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        with self.lock:
+            self.memo = {cle: Counter(comptes) for cle, comptes in data.get("memo", {}).items()}
+        return True
+
+    def sauvegarder(self):
+        """Écriture atomique du mémo"""
+        with self.lock:
+            data = {"memo": {cle: dict(comptes) for cle, comptes in self.memo.items()}}
+        directory = os.path.dirname(self.memo_file) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.memo_file)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def amorcer_depuis_historique(self, taches: Iterable[Dict] = None) -> int:
+        """
+        Apprendre des tâches existantes (un exemple par email d'origine).
+        Par défaut, les tâches du TaskStore unifié : à jour quel que soit le
+        mode de persistance (journal, SQLite), et les tâches héritées y sont
+        synchronisées avec leur email d'origine.
+        """
+        if taches is None:
+            from unified_task_manager import get_unified_task_manager
+            taches = get_unified_task_manager().load_all_tasks()
+        vus = set()
+        appris = 0
+        for tache in taches:
+            if not isinstance(tache, dict):
+                continue
+            email = (tache.get("source_metadata") or {}).get("original_email") or tache.get("origine_email")
+            if not isinstance(email, dict):
+                continue
+            signature = (email.get("expediteur"), email.get("destinataire"), email.get("objet"),
+                         email.get("date_reception"))
+            if signature in vus:
+                continue
+            vus.add(signature)
+            if self.apprendre(email.get("expediteur"), email.get("destinataire"), email.get("departement")):
+                appris += 1
+        return appris
+
+    # =====================================
+    # Apprentissage et inférence
+    # =====================================
+
+    def apprendre(self, expediteur, destinataire, departement) -> bool:
+        """Enregistrer un département observé pour ces adresses"""
+        nom = normaliser_departement(departement)
+        cles = cles_memo(expediteur, destinataire)
+        if nom is None or not cles:
+            return False
+        with self.lock:
+            for cle in cles:
+                self.memo.setdefault(cle, Counter())[nom] += 1
+            self.stats["apprentissages"] += 1
+        return True
+
+    def enregistrer(self, expediteur, destinataire, departement) -> bool:
+        """apprendre() puis persister le mémo (réponses IA, départements fournis)"""
+        if not self.apprendre(expediteur, destinataire, departement):
+            return False
+        try:
+            self.sauvegarder()
+        except Exception as e:
+            print(f"⚠️ Mémo des départements non sauvegardé: {e}")
+        return True
+
+    def _consulter_memo(self, expediteur, destinataire) -> Tuple[Optional[str], Optional[str]]:
+        with self.lock:
+            for cle in cles_memo(expediteur, destinataire):
+                comptes = self.memo.get(cle)
+                if not comptes:
+                    continue
+                total = sum(comptes.values())
+                nom, nombre = comptes.most_common(1)[0]
+                if total >= SUPPORT_MINIMUM and nombre / total >= PART_MINIMUM:
+                    return nom, cle
+        return None, None
+
+    def identifier(self, texte: str, expediteur=None, destinataire=None, objet: str = "") -> Tuple[Optional[str], str]:
+        """
+        (département, source) avec source = "memo", "texte" ;
+        (None, "llm") si la décision revient à l'IA.
+        """
+        with self.lock:
+            self.stats["requetes"] += 1
+        nom, _ = self._consulter_memo(expediteur, destinataire)
+        source = "memo"
+        if nom is None:
+            nom, score = score_texte(texte, objet, _adresses(expediteur) + _adresses(destinataire))
+            source = "texte" if nom is not None and score >= SCORE_TEXTE_MINIMUM else "llm"
+            if source == "llm":
+                nom = None
+        with self.lock:
+            self.stats[source] += 1
+        return nom, source
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            requetes = self.stats["requetes"]
+            locales = self.stats["memo"] + self.stats["texte"]
+            return {
+                **self.stats,
+                "hit_rate": round(locales / requetes * 100, 1) if requetes else 0.0,
+                "memo_hit_rate": round(self.stats["memo"] / requetes * 100, 1) if requetes else 0.0,
+                "cles_memo": len(self.memo),
+                "memo_file": self.memo_file
+            }
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_department_classifier() -> Optional[DepartmentClassifier]:
+    """Instance partagée : mémo persisté, ou amorcé depuis l'historique des tâches"""
+    global _classifier
+    if not DEPARTMENT_CLASSIFIER_ENABLED:
+        return None
+    with _classifier_lock:
+        if _classifier is None:
+            classifier = DepartmentClassifier()
+            if not classifier.charger():
+                try:
+                    appris = classifier.amorcer_depuis_historique()
+                    classifier.sauvegarder()
+                    print(f"🏢 Mémo des départements amorcé: {appris} emails")
+                except Exception as e:
+                    print(f"⚠️ Mémo des départements non amorcé: {e}")
+            _classifier = classifier
+        return _classifier
+
+
+def statistiques_departements() -> Dict:
+    classifier = get_department_classifier()
+    return classifier.get_stats() if classifier is not None else {"enabled": False}
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+🏷️ PRÉ-CLASSIFICATION LOCALE DES EMAILS (explicite / implicite)
+==============================================================
+
+filtrer_email() consacre un appel IA complet à une étiquette binaire.
+La plupart des emails se classent sans modèle : verbes à l'impératif,
+"merci de…", "doit … avant vendredi" d'un côté ; confirmations, tickets
+résolus, "pour info" de l'autre.
+
+Étage local placé devant l'appel IA :
+1. score de règles (mots-clés / expressions régulières pondérés)
+2. si les règles hésitent : modèle optionnel tf-idf + régression logistique
+   (pur Python), entraîné sur l'historique étiqueté (type_email des emails,
+   complété par le cache des emails traités, JSON ou SQLite selon STORAGE_BACKEND)
+3. l'IA n'est appelée que si la confiance reste sous le seuil
+
+Le modèle est entraîné dans un thread au démarrage, jamais dans le chemin
+d'une requête : en attendant, seules les règles s'appliquent.
+
+Configuration : EMAIL_CLASSIFIER_ENABLED (1), EMAIL_CLASSIFIER_THRESHOLD (0.8),
+EMAIL_CLASSIFIER_MODEL (1 = entraîner le modèle si l'historique suffit),
+EMAIL_CLASSIFIER_MAX_EXAMPLES (400 plus récents), EMAIL_CLASSIFIER_ITERATIONS (150).
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from cache_emails import calculer_hash_email, obtenir_tout_le_cache
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+EMAILS_FILE = os.path.join(BASE_DIR, "data", "emails.json")
+
+EMAIL_CLASSIFIER_ENABLED = os.getenv("EMAIL_CLASSIFIER_ENABLED", "1") not in ("0", "false", "False")
+EMAIL_CLASSIFIER_THRESHOLD = float(os.getenv("EMAIL_CLASSIFIER_THRESHOLD", "0.8"))
+EMAIL_CLASSIFIER_MODEL = os.getenv("EMAIL_CLASSIFIER_MODEL", "1") not in ("0", "false", "False")
+EMAIL_CLASSIFIER_MAX_EXAMPLES = int(os.getenv("EMAIL_CLASSIFIER_MAX_EXAMPLES", "400"))
+EMAIL_CLASSIFIER_ITERATIONS = int(os.getenv("EMAIL_CLASSIFIER_ITERATIONS", "150"))
+
+EXPLICITE = "explicite"
+IMPLICITE = "implicite"
+
+# Exemples étiquetés minimum (avec les deux classes) pour entraîner le modèle
+MIN_EXEMPLES_MODELE = 10
+
+_JOURS = r"(lundi|mardi|mercredi|jeudi|vendredi|samedi|dimanche|demain|ce soir|aujourd'hui|\d{1,2}\s?h|\d{1,2}/\d{1,2})"
+
+# (expression, poids) : positif = demande d'action explicite, négatif = information / implicite
+REGLES: List[Tuple[re.Pattern, float]] = [
+    (re.compile(r"\bmerci de\b(?! nous contacter)"), 2.0),
+    (re.compile(r"\b(veuillez|pourriez-vous|pouvez-vous|peux-tu|pourrais-tu|please|could you)\b(?! prendre connaissance)"), 1.5),
+    (re.compile(r"\b(doit|doivent|devra|devront|il faut|must|need to)\b"), 1.5),
+    (re.compile(r"(^|[.!:\n]\s*)(\d+\.\s*)?\**(préparez|envoyez|organisez|contactez|réduisez|formez|vérifiez|"
+                r"validez|transmettez|fournissez|planifiez|mettez|faites|corrigez|soumettez|send|prepare|schedule)\b"), 2.0),
+    (re.compile(r"\b(avant|d'ici|au plus tard|deadline|échéance|by)\b[^.]{0,30}?\b" + _JOURS), 1.5),
+    (re.compile(r"\b(urgent|asap|immédiatement)\b"), 1.0),
+    (re.compile(r"(^|\n)\s*\d+\.\s"), 0.5),
+    (re.compile(r"\b(pour info|pour information|fyi|à titre informatif|prendre connaissance)\b"), -2.0),
+    (re.compile(r"\b(a|ont) été (résolue?s?|enregistrée?s?|livrée?s?|traitée?s?|validée?s?|clôturée?s?)\b"), -2.0),
+    (re.compile(r"\b(nous vous prions|excuser|votre commande|votre ticket|confirmation)\b"), -1.5),
+    (re.compile(r"\b(je souhaiterais|qu'en pensez-vous|il serait|on pourrait|peut-être)\b"), -1.5),
+    (re.compile(r"\?\s*$"), -0.5),
+]
+BIAIS_REGLES = -0.5
+
+
+def _sigmoide(x: float) -> float:
+    if x < -30:
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-x))
+
+
+def score_regles(texte: str, objet: str = "") -> float:
+    """Probabilité (0-1) que l'email soit explicite d'après les règles"""
+    contenu = f"{objet}\n{texte}".lower()
+    score = BIAIS_REGLES + sum(poids for regle, poids in REGLES if regle.search(contenu))
+    return _sigmoide(score)
+
+
+# =====================================
+# Modèle tf-idf + régression logistique
+# =====================================
+
+_MOTS = re.compile(r"[^\W\d_]{2,}")
+
+
+def _tokens(texte: str) -> List[str]:
+    return _MOTS.findall(texte.lower())
+
+
+class ModeleTfidfLR:
+    """Petit classifieur linéaire sans dépendance (quelques centaines d'emails)"""
+
+    def __init__(self):
+        self.idf: Dict[str, float] = {}
+        self.poids: Dict[str, float] = {}
+        self.biais = 0.0
+        self.nb_exemples = 0
+
+    def _vecteur(self, texte: str) -> Dict[str, float]:
+        compte = Counter(mot for mot in _tokens(texte) if mot in self.idf)
+        vecteur = {mot: n * self.idf[mot] for mot, n in compte.items()}
+        norme = math.sqrt(sum(v * v for v in vecteur.values())) or 1.0
+        return {mot: v / norme for mot, v in vecteur.items()}
+
+    def entrainer(self, textes: List[str], labels: List[int], iterations: int = EMAIL_CLASSIFIER_ITERATIONS,
+                  pas: float = 1.0, l2: float = 1e-3):
+        """Descente de gradient sur la log-vraisemblance (labels : 1 = explicite)"""
+        documents = [set(_tokens(texte)) for texte in textes]
+        frequence = Counter(mot for doc in documents for mot in doc)
+        n = len(textes)
+        self.idf = {mot: math.log((1 + n) / (1 + df)) + 1.0 for mot, df in frequence.items()}
+        vecteurs = [self._vecteur(texte) for texte in textes]
+        self.poids = {mot: 0.0 for mot in self.idf}
+        self.biais = 0.0
+        for _ in range(iterations):
+            gradient: Dict[str, float] = Counter()
+            gradient_biais = 0.0
+            for vecteur, label in zip(vecteurs, labels):
+                erreur = self._proba_vecteur(vecteur) - label
+                gradient_biais += erreur
+                for mot, valeur in vecteur.items():
+                    gradient[mot] += erreur * valeur
+            for mot in self.poids:
+                self.poids[mot] -= pas * (gradient.get(mot, 0.0) / n + l2 * self.poids[mot])
+            self.biais -= pas * gradient_biais / n
+        self.nb_exemples = n
+
+    def _proba_vecteur(self, vecteur: Dict[str, float]) -> float:
+        return _sigmoide(self.biais + sum(self.poids.get(mot, 0.0) * v for mot, v in vecteur.items()))
+
+    def proba(self, texte: str) -> float:
+        """Probabilité que l'email soit explicite"""
+        return self._proba_vecteur(self._vecteur(texte))
+
+
+def charger_historique(emails_file: str = None, infos_cache: Dict[str, Dict] = None) -> List[Tuple[str, str]]:
+    """
+    (texte, étiquette) des emails déjà classés : type_email de emails.json,
+    complété par le type_email du cache des emails traités (jointure sur le hash).
+    """
+    try:
+        with open(emails_file or EMAILS_FILE, "r", encoding="utf-8") as f:
+            emails = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if infos_cache is None:
+        infos_cache = obtenir_tout_le_cache()
+
+    exemples = []
+    for email in emails if isinstance(emails, list) else []:
+        if not isinstance(email, dict) or not email.get("texte"):
+            continue
+        label = email.get("type_email")
+        if label not in (EXPLICITE, IMPLICITE):
+            hash_email = email.get("hash_email") or calculer_hash_email(email["texte"], email.get("objet", ""))
+            label = (infos_cache.get(hash_email) or {}).get("type_email")
+        if label in (EXPLICITE, IMPLICITE):
+            exemples.append((f"{email.get('objet', '')}\n{email['texte']}", label))
+    return exemples
+
+
+# =====================================
+# Pré-classifieur
+# =====================================
+
+class PreClassifieur:
+    """Règles puis modèle (si disponible) ; None quand la décision revient à l'IA"""
+
+    def __init__(self, seuil: float = EMAIL_CLASSIFIER_THRESHOLD, modele: Optional[ModeleTfidfLR] = None):
+        self.seuil = seuil
+        self.modele = modele
+        self.lock = threading.Lock()
+        self.stats = {"decisions_locales": 0, "appels_llm": 0, "par_regles": 0, "par_modele": 0,
+                      EXPLICITE: 0, IMPLICITE: 0}
+
+    def classer(self, texte: str, objet: str = "") -> Tuple[Optional[str], float]:
+        """(étiquette ou None si confiance insuffisante, meilleure confiance obtenue)"""
+        etapes = [("par_regles", lambda: score_regles(texte, objet))]
+        if self.modele is not None:
+            etapes.append(("par_modele", lambda: self.modele.proba(f"{objet}\n{texte}")))
+
+        meilleure = 0.0
+        for source, probabilite in etapes:
+            p = probabilite()
+            confiance = max(p, 1 - p)
+            meilleure = max(meilleure, confiance)
+            if confiance >= self.seuil:
+                label = EXPLICITE if p >= 0.5 else IMPLICITE
+                with self.lock:
+                    self.stats["decisions_locales"] += 1
+                    self.stats[source] += 1
+                    self.stats[label] += 1
+                return label, confiance
+        with self.lock:
+            self.stats["appels_llm"] += 1
+        return None, meilleure
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            total = self.stats["decisions_locales"] + self.stats["appels_llm"]
+            return {
+                **self.stats,
+                "taux_local": round(self.stats["decisions_locales"] / total * 100, 1) if total else 0.0,
+                "seuil": self.seuil,
+                "modele": {"exemples": self.modele.nb_exemples} if self.modele is not None else None
+            }
+
+
+def entrainer_depuis_historique(emails_file: str = None, infos_cache: Dict[str, Dict] = None,
+                                max_exemples: int = EMAIL_CLASSIFIER_MAX_EXAMPLES) -> Optional[ModeleTfidfLR]:
+    """Modèle entraîné sur les exemples les plus récents, None si trop peu d'exemples ou une seule classe"""
+    exemples = charger_historique(emails_file, infos_cache)[-max_exemples:]
+    labels = [1 if label == EXPLICITE else 0 for _, label in exemples]
+    if len(exemples) < MIN_EXEMPLES_MODELE or len(set(labels)) < 2:
+        return None
+    modele = ModeleTfidfLR()
+    modele.entrainer([texte for texte, _ in exemples], labels)
+    return modele
+
+
+_pre_classifieur = None
+_pre_classifieur_lock = threading.Lock()
+
+
+def _entrainer_en_arriere_plan(pre_classifieur: PreClassifieur):
+    """Entraîner puis brancher le modèle ; les règles seules servent en attendant"""
+    try:
+        modele = entrainer_depuis_historique()
+    except Exception as e:
+        print(f"⚠️ Modèle de pré-classification non entraîné: {e}")
+        return
+    if modele is not None:
+        pre_classifieur.modele = modele
+        print(f"🏷️ Modèle de pré-classification prêt ({modele.nb_exemples} exemples)")
+
+
+def get_pre_classifieur() -> Optional[PreClassifieur]:
+    """
+    Instance partagée (None si EMAIL_CLASSIFIER_ENABLED=0). Ne bloque jamais :
+    le premier appel lance l'entraînement du modèle dans un thread.
+    """
+    global _pre_classifieur
+    if not EMAIL_CLASSIFIER_ENABLED:
+        return None
+    with _pre_classifieur_lock:
+        if _pre_classifieur is None:
+            _pre_classifieur = PreClassifieur()
+            if EMAIL_CLASSIFIER_MODEL:
+                threading.Thread(target=_entrainer_en_arriere_plan, args=(_pre_classifieur,),
+                                 name="email-classifier-training", daemon=True).start()
+        return _pre_classifieur
+
+
+def statistiques_pre_classification() -> Dict:
+    pre_classifieur = get_pre_classifieur()
+    return pre_classifieur.get_stats() if pre_classifieur is not None else {"enabled": False}
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+🏷️ ETAGS - Réponses conditionnelles (If-None-Match / 304)
+=========================================================
+
+Les ETags sont dérivés de la version des données (version du TaskStore,
+signature des fichiers de réunions), jamais du corps de la réponse :
+la comparaison se fait avant tout filtrage ou sérialisation.
+"""
+
+import hashlib
+from typing import Optional
+
+
+def calculer_etag(*parts) -> str:
+    """ETag fort (entre guillemets) à partir des composants de version"""
+    raw = "|".join(str(part) for part in parts)
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def etag_correspond(if_none_match: Optional[str], etag: str) -> bool:
+    """L'en-tête If-None-Match du client désigne-t-il cet ETag ?"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # Comparaison faible autorisée pour If-None-Match (RFC 9110)
+    return any((candidate[2:] if candidate.startswith("W/") else candidate) == etag
+               for candidate in candidates)
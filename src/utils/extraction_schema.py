@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+🧩 SCHÉMA DE L'EXTRACTION FUSIONNÉE
+==================================
+
+Le mode d'extraction "fusionnee" demande au modèle, en un seul appel,
+un objet JSON contenant le type de l'email, les tâches (avec priorité),
+le résumé et le département. Ce module décrit le schéma attendu et
+valide / normalise la réponse avant qu'elle n'entre dans le pipeline.
+
+Le mode "groupee" envoie plusieurs emails courts dans un même prompt :
+la réponse associe l'identifiant de chaque email à une extraction
+fusionnée, validée email par email.
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+EXTRACTION_CLASSIQUE = "classique"
+EXTRACTION_FUSIONNEE = "fusionnee"
+EXTRACTION_GROUPEE = "groupee"
+MODES_EXTRACTION = (EXTRACTION_CLASSIQUE, EXTRACTION_FUSIONNEE, EXTRACTION_GROUPEE)
+
+TYPES_EMAIL = ("explicite", "implicite")
+PRIORITES = ("élevée", "moyenne", "faible")
+
+# Variantes rencontrées dans les réponses → valeur canonique
+SYNONYMES_PRIORITE = {
+    "elevee": "élevée", "élevée": "élevée", "haute": "élevée", "high": "élevée",
+    "urgent": "élevée", "urgente": "élevée", "critique": "élevée",
+    "moyenne": "moyenne", "normale": "moyenne", "medium": "moyenne",
+    "faible": "faible", "basse": "faible", "low": "faible",
+}
+
+# Schéma (format JSON Schema, repris dans le prompt et la documentation)
+SCHEMA_EXTRACTION_FUSIONNEE = {
+    "type": "object",
+    "required": ["type", "taches", "resume", "departement"],
+    "properties": {
+        "type": {"enum": list(TYPES_EMAIL)},
+        "taches": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["description", "priorite"],
+                "properties": {
+                    "description": {"type": "string"},
+                    "responsable": {"type": "string"},
+                    "deadline": {"type": ["string", "null"]},
+                    "priorite": {"enum": list(PRIORITES)},
+                    "confiance_ia": {"type": "number", "minimum": 0.0, "maximum": 1.0}
+                }
+            }
+        },
+        "resume": {"type": "string"},
+        "departement": {"type": "string"}
+    }
+}
+
+
+def normaliser_priorite(valeur: Any) -> str:
+    """Priorité canonique (élevée / moyenne / faible), moyenne par défaut"""
+    return SYNONYMES_PRIORITE.get(str(valeur or "").strip().lower(), "moyenne")
+
+
+def _valider_tache(tache: Any, index: int) -> Dict:
+    if not isinstance(tache, dict):
+        raise ValueError(f"taches[{index}] n'est pas un objet")
+    description = tache.get("description")
+    if not isinstance(description, str) or not description.strip():
+        raise ValueError(f"taches[{index}].description manquante")
+
+    validee = dict(tache)
+    validee["description"] = description.strip()
+    validee["priorite"] = normaliser_priorite(tache.get("priorite"))
+    if "confiance_ia" in tache:
+        try:
+            validee["confiance_ia"] = min(1.0, max(0.0, float(tache["confiance_ia"])))
+        except (TypeError, ValueError):
+            del validee["confiance_ia"]
+    return validee
+
+
+def valider_extraction_fusionnee(data: Any) -> Dict:
+    """
+    Valider une réponse d'extraction fusionnée et la normaliser.
+    Lève ValueError si un champ obligatoire manque ou a un type invalide.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("La réponse n'est pas un objet JSON")
+    manquants = [champ for champ in SCHEMA_EXTRACTION_FUSIONNEE["required"] if champ not in data]
+    if manquants:
+        raise ValueError(f"Champs manquants: {', '.join(manquants)}")
+
+    type_email = str(data["type"]).strip().lower()
+    if type_email not in TYPES_EMAIL:
+        raise ValueError(f"Type d'email invalide: {data['type']}")
+    if not isinstance(data["taches"], list):
+        raise ValueError("taches n'est pas une liste")
+    taches: List[Dict] = [_valider_tache(tache, i) for i, tache in enumerate(data["taches"])]
+
+    return {
+        "type": type_email,
+        "taches": taches,
+        "resume": str(data["resume"] or "").strip(),
+        "departement": str(data["departement"] or "").strip()
+    }
+
+
+def valider_extraction_groupee(data: Any, ids: Iterable[str]) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+    """
+    Valider une réponse d'extraction groupée {id_email: extraction fusionnée}.
+    Retourne (extractions valides par id, erreur par id invalide ou absent) :
+    un email mal extrait n'invalide pas les autres emails du lot.
+    """
+    if isinstance(data, dict) and isinstance(data.get("emails"), dict):
+        data = data["emails"]
+    if not isinstance(data, dict):
+        raise ValueError("La réponse groupée n'est pas un objet JSON")
+
+    valides: Dict[str, Dict] = {}
+    erreurs: Dict[str, str] = {}
+    for email_id in ids:
+        if email_id not in data:
+            erreurs[email_id] = "absent de la réponse"
+            continue
+        try:
+            valides[email_id] = valider_extraction_fusionnee(data[email_id])
+        except ValueError as e:
+            erreurs[email_id] = str(e)
+    return valides, erreurs
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+🧠 CACHE DES RÉPONSES LLM - Adressé par empreinte du prompt
+==========================================================
+
+Le cache d'emails (cache_emails.py) retient seulement qu'un email a été
+traité. Ce cache retient ce que le modèle a répondu : un même prompt
+(même modèle, température et max_tokens) n'est jamais payé deux fois,
+y compris avec use_cache=False, au retraitement d'une réunion ou au
+renvoi d'un document.
+
+- seuls les appels déterministes (température explicite ≤ 0.1) sont mis en
+  cache : à la température par défaut du fournisseur (~1.0), mémoriser une
+  réponse figerait un tirage au hasard
+- une réponse qui échoue à la validation de l'appelant (parsing, schéma)
+  n'est pas mémorisée, et est supprimée (supprimer) si elle l'avait été
+- clé : sha256(modèle, température, max_tokens, prompt)
+- stockage disque : base SQLite dédiée (data/llm_cache.db)
+- éviction LRU par taille totale (LLM_CACHE_MAX_MB) et expiration (LLM_CACHE_TTL_DAYS)
+- métriques : hits, misses, octets économisés (exposées dans /cache/stats)
+
+Désactivation : LLM_CACHE_ENABLED=0
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") not in ("0", "false", "False")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(BASE_DIR, "data", "llm_cache.db"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "50"))
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+# Au-delà, la réponse varie d'un appel à l'autre : pas de mise en cache
+TEMPERATURE_MAX_CACHE = 0.1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    prompt_size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_llm_responses_last_access ON llm_responses(last_access);
+"""
+
+
+def cle_reponse(model: str, prompt: str, temperature: Optional[float], max_tokens: Optional[int]) -> str:
+    """Empreinte d'un appel : tous les paramètres qui influencent la réponse"""
+    raw = json.dumps([model, temperature, max_tokens, prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def reponse_deterministe(temperature: Optional[float]) -> bool:
+    """Température explicite assez basse pour que la réponse soit réutilisable"""
+    return temperature is not None and temperature <= TEMPERATURE_MAX_CACHE
+
+
+class LLMResponseCache:
+    """Cache disque LRU + TTL des réponses du modèle"""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = None, ttl_seconds: float = None):
+        self.path = path
+        self.max_bytes = int(max_bytes if max_bytes is not None else LLM_CACHE_MAX_MB * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else LLM_CACHE_TTL_DAYS * 86400
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._total_bytes = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "stores": 0,
+                      "invalidations": 0, "bytes_saved": 0, "prompt_bytes_saved": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        """Réponse en cache (None si absente ou expirée)"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response, size, prompt_size, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            response, size, prompt_size, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self.conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self.conn.commit()
+                self._total_bytes -= size
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self.conn.execute(
+                "UPDATE llm_responses SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += size
+            self.stats["prompt_bytes_saved"] += prompt_size
+            return response
+
+    def put(self, key: str, response: str, model: str = "", prompt_size: int = 0):
+        """Mémoriser une réponse puis évincer les moins récemment utilisées si besoin"""
+        if response is None:
+            return
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self.lock:
+            previous = self.conn.execute("SELECT size FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_responses "
+                "(key, model, response, size, prompt_size, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, model, response, size, prompt_size, now, now))
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self.stats["stores"] += 1
+            self._evict()
+            self.conn.commit()
+
+    def supprimer(self, key: str) -> bool:
+        """Oublier une réponse (inexploitable) ; True si elle était en cache"""
+        with self.lock:
+            row = self.conn.execute("SELECT size FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False
+            self.conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            self.conn.commit()
+            self._total_bytes -= row[0]
+            self.stats["invalidations"] += 1
+            return True
+
+    def _evict(self):
+        """LRU : supprimer les entrées les plus anciennement lues jusqu'à repasser sous la limite"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        rows = self.conn.execute("SELECT key, size FROM llm_responses ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            self._total_bytes -= size
+            self.stats["evictions"] += 1
+
+    def purge_expired(self) -> int:
+        """Supprimer toutes les entrées expirées"""
+        if not self.ttl_seconds:
+            return 0
+        with self.lock:
+            cutoff = time.time() - self.ttl_seconds
+            removed = self.conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?", (cutoff,)).rowcount
+            self.conn.commit()
+            self._total_bytes = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+            self.stats["expired"] += removed
+            return removed
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM llm_responses")
+            self.conn.commit()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups * 100, 1) if lookups else 0.0,
+                "entries": entries,
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_days": round(self.ttl_seconds / 86400, 2) if self.ttl_seconds else None,
+                "path": self.path
+            }
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Instance partagée du cache (None si désactivé ou inutilisable)"""
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            try:
+                _llm_cache = LLMResponseCache()
+            except Exception as e:
+                print(f"⚠️ Cache des réponses LLM indisponible: {e}")
+                return None
+        return _llm_cache
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+🩹 LECTURE TOLÉRANTE DU JSON RENVOYÉ PAR LE MODÈLE
+=================================================
+
+json.loads(result_text) échoue dès que le modèle entoure sa réponse de
+balises markdown, ajoute une phrase avant ou après, ou est coupé par
+max_tokens : l'email est alors marqué "traité" sans tâches et l'appel est
+perdu. Ce module récupère le JSON utile en une seule passe caractère par
+caractère :
+- balises ```json ... ``` retirées, texte avant/après ignoré
+- premier tableau / objet équilibré extrait
+- réparations : virgules finales, chaînes entre apostrophes, True/False/None
+- réponse tronquée : coupée après le dernier élément complet puis refermée
+- parser_taches() valide ensuite la liste contre le schéma des tâches
+"""
+
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from extraction_schema import normaliser_priorite
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_MOT = re.compile(r"[^\W\d_]+")
+_LITTERAUX_PYTHON = {"True": "true", "False": "false", "None": "null"}
+_OUVRANTS = {"[": "]", "{": "}"}
+
+# Nombre maximal de débuts de JSON essayés dans une réponse bavarde
+MAX_CANDIDATS = 5
+
+_stats_lock = threading.Lock()
+_stats = {"direct": 0, "repares": 0, "tronques": 0, "echecs": 0}
+
+
+def _compter(cle: str):
+    with _stats_lock:
+        _stats[cle] += 1
+
+
+def statistiques_parsing() -> Dict[str, int]:
+    """Réponses lues directement, réparées, tronquées refermées, illisibles"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _retirer_virgule_finale(sortie: List[str]):
+    """Supprimer ', ' avant un crochet / une accolade fermante"""
+    while sortie and sortie[-1] in " \t\r\n":
+        sortie.pop()
+    if sortie and sortie[-1] == ",":
+        sortie.pop()
+
+
+def _normaliser(texte: str, debut: int) -> Tuple[str, bool]:
+    """
+    Réécrire la valeur JSON commençant à texte[debut] en JSON strict.
+    Retourne (json, tronqué). Lève ValueError si rien n'est récupérable.
+    """
+    sortie: List[str] = []
+    pile: List[str] = []
+    # Dernier point sûr d'une réponse tronquée : (longueur de sortie, pile) après un élément complet
+    point_sur: Optional[Tuple[int, List[str]]] = None
+    guillemet = None  # '"' ou "'" si dans une chaîne
+    i = debut
+    n = len(texte)
+
+    while i < n:
+        c = texte[i]
+        if guillemet:
+            if c == "\\" and i + 1 < n:
+                suivant = texte[i + 1]
+                # \' n'est pas un échappement JSON valide
+                sortie.append("'" if suivant == "'" else c + suivant)
+                i += 2
+                continue
+            if c == guillemet:
+                sortie.append('"')
+                guillemet = None
+            elif c == '"':
+                sortie.append('\\"')  # guillemet dans une chaîne entre apostrophes
+            elif c == "\n":
+                sortie.append("\\n")
+            else:
+                sortie.append(c)
+            i += 1
+            continue
+
+        if c in "\"'":
+            guillemet = c
+            sortie.append('"')
+        elif c in _OUVRANTS:
+            pile.append(_OUVRANTS[c])
+            sortie.append(c)
+        elif c in "]}":
+            if not pile or pile[-1] != c:
+                raise ValueError(f"'{c}' inattendu à la position {i}")
+            _retirer_virgule_finale(sortie)
+            pile.pop()
+            sortie.append(c)
+            if not pile:
+                return "".join(sortie), False
+            point_sur = (len(sortie), list(pile))
+        elif c.isalpha():
+            mot = _MOT.match(texte, i).group(0)
+            sortie.append(_LITTERAUX_PYTHON.get(mot, mot))
+            i += len(mot)
+            continue
+        else:
+            sortie.append(c)
+        i += 1
+
+    # Fin du texte avant la fermeture : réponse tronquée (max_tokens)
+    if point_sur is None:
+        raise ValueError("JSON tronqué sans aucun élément complet")
+    longueur, pile_sure = point_sur
+    sortie = sortie[:longueur]
+    for fermant in reversed(pile_sure):
+        _retirer_virgule_finale(sortie)
+        sortie.append(fermant)
+    return "".join(sortie), True
+
+
+def _candidats(texte: str) -> List[str]:
+    """Textes à examiner : contenu des balises markdown d'abord, puis la réponse entière"""
+    blocs = [bloc for bloc in _FENCE.findall(texte) if bloc.strip()]
+    return blocs + [texte]
+
+
+def extraire_json(texte: Any, attendu: Optional[type] = None) -> Any:
+    """
+    Première valeur JSON (tableau ou objet) lisible dans une réponse du modèle.
+
+    Args:
+        texte: réponse brute du modèle
+        attendu: list ou dict pour ignorer les valeurs d'un autre type
+
+    Raises:
+        ValueError: aucun JSON récupérable
+    """
+    if not isinstance(texte, str) or not texte.strip():
+        _compter("echecs")
+        raise ValueError("Réponse IA vide")
+
+    try:
+        valeur = json.loads(texte.strip())
+        if attendu is None or isinstance(valeur, attendu):
+            _compter("direct")
+            return valeur
+    except ValueError:
+        pass
+
+    ouvrants = "[" if attendu is list else "{" if attendu is dict else "[{"
+    derniere_erreur = "aucun tableau ni objet JSON"
+    for candidat in _candidats(texte):
+        debuts = [i for i, c in enumerate(candidat) if c in ouvrants][:MAX_CANDIDATS]
+        for debut in debuts:
+            try:
+                repare, tronque = _normaliser(candidat, debut)
+                valeur = json.loads(repare)
+            except ValueError as e:
+                derniere_erreur = str(e)
+                continue
+            if attendu is not None and not isinstance(valeur, attendu):
+                continue
+            _compter("tronques" if tronque else "repares")
+            return valeur
+
+    _compter("echecs")
+    raise ValueError(f"Réponse IA non JSON: {derniere_erreur}")
+
+
+def valider_taches(data: Any) -> List[Dict]:
+    """
+    Liste de tâches conforme au schéma : objets avec une description non vide.
+    Accepte aussi {"taches": [...]} / {"tasks": [...]} ou une tâche seule ;
+    les éléments invalides sont écartés.
+    """
+    if isinstance(data, dict):
+        for cle in ("taches", "tâches", "tasks"):
+            if isinstance(data.get(cle), list):
+                data = data[cle]
+                break
+        else:
+            data = [data]
+    if not isinstance(data, list):
+        raise ValueError("Résultat IA n'est pas une liste")
+
+    taches = []
+    for tache in data:
+        if not isinstance(tache, dict):
+            continue
+        description = tache.get("description")
+        if not isinstance(description, str) or not description.strip():
+            continue
+        tache = dict(tache)
+        tache["description"] = description.strip()
+        if isinstance(tache.get("priorite"), str) and tache["priorite"].strip():
+            tache["priorite"] = normaliser_priorite(tache["priorite"])
+        taches.append(tache)
+
+    if data and not taches:
+        raise ValueError("Aucune tâche valide dans la réponse IA")
+    return taches
+
+
+def parser_taches(texte: Any) -> List[Dict]:
+    """Liste de tâches extraite d'une réponse du modèle (tolérante, validée)"""
+    if isinstance(texte, (list, dict)):
+        return valider_taches(texte)
+    return valider_taches(extraire_json(texte))
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+🛡️ RÉSILIENCE DES APPELS LLM
+===========================
+
+Les fonctions *_optimized de agent_task.py rattrapaient toute exception en
+renvoyant aussitôt la même requête avec le prompt standard : pendant une
+panne du fournisseur la charge doublait et chaque email échouait lentement.
+
+Les appels passent désormais par une seule couche :
+- erreurs classées : réessayables (429, 408, 5xx, timeouts, connexion) ou
+  fatales (400, 401, 403, 404, réponse inexploitable) — une erreur fatale
+  n'est jamais rejouée
+- nouvel essai après un backoff exponentiel avec jitter complet
+  (aléa entre 0 et base × 2^n, plafonné), ou après le délai Retry-After
+  annoncé par le fournisseur s'il est présent
+- disjoncteur : après LLM_BREAKER_THRESHOLD échecs réessayables consécutifs
+  il s'ouvre et les appels échouent immédiatement (CircuitOuvertError) ;
+  au bout de LLM_BREAKER_COOLDOWN_S un seul appel d'essai est autorisé
+  (semi-ouvert), dont le résultat referme ou rouvre le circuit
+
+Le pipeline reconnaît ces échecs (fournisseur_indisponible) et remet les
+emails en attente au lieu de les marquer en échec.
+
+Configuration : LLM_RETRY_ATTEMPTS (3), LLM_RETRY_BASE_S (0.5),
+LLM_RETRY_MAX_S (20), LLM_RETRY_AFTER_MAX_S (60), LLM_BREAKER_THRESHOLD (5),
+LLM_BREAKER_COOLDOWN_S (30).
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+REESSAYABLE = "reessayable"
+FATALE = "fatale"
+
+FERME = "ferme"
+OUVERT = "ouvert"
+SEMI_OUVERT = "semi_ouvert"
+
+CODES_REESSAYABLES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "3"))
+LLM_RETRY_BASE_S = float(os.getenv("LLM_RETRY_BASE_S", "0.5"))
+LLM_RETRY_MAX_S = float(os.getenv("LLM_RETRY_MAX_S", "20"))
+LLM_RETRY_AFTER_MAX_S = float(os.getenv("LLM_RETRY_AFTER_MAX_S", "60"))
+
+
+class CircuitOuvertError(Exception):
+    """Fournisseur considéré indisponible : appel refusé sans toucher au réseau"""
+
+    def __init__(self, reessayer_dans: float):
+        self.reessayer_dans = reessayer_dans
+        super().__init__(f"Circuit LLM ouvert, nouvel essai dans {reessayer_dans:.1f}s")
+
+
+def _code_http(erreur: BaseException) -> Optional[int]:
+    code = getattr(erreur, "status_code", None)
+    if code is None:
+        code = getattr(getattr(erreur, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def classer_erreur(erreur: BaseException) -> str:
+    """REESSAYABLE si un nouvel essai peut réussir, FATALE sinon"""
+    if isinstance(erreur, CircuitOuvertError):
+        return REESSAYABLE
+    code = _code_http(erreur)
+    if code is not None:
+        return REESSAYABLE if code in CODES_REESSAYABLES else FATALE
+    nom = type(erreur).__name__
+    if isinstance(erreur, (TimeoutError, ConnectionError)) or "Timeout" in nom or "Connection" in nom:
+        return REESSAYABLE
+    return FATALE
+
+
+def fournisseur_indisponible(erreur: BaseException) -> bool:
+    """Échec dû au fournisseur (circuit ouvert ou essais épuisés) : l'email est à reporter, pas en échec"""
+    return classer_erreur(erreur) == REESSAYABLE
+
+
+def delai_retry_after(erreur: BaseException, maintenant: Optional[datetime] = None) -> Optional[float]:
+    """Délai annoncé par l'en-tête Retry-After (secondes ou date HTTP), plafonné ; None si absent"""
+    entetes = getattr(getattr(erreur, "response", None), "headers", None) or {}
+    try:
+        millisecondes = entetes.get("retry-after-ms")
+        if millisecondes is not None:
+            return min(LLM_RETRY_AFTER_MAX_S, max(0.0, float(millisecondes) / 1000))
+        valeur = entetes.get("retry-after")
+        if valeur is None:
+            return None
+        try:
+            delai = float(valeur)
+        except ValueError:
+            date = parsedate_to_datetime(valeur)
+            delai = (date - (maintenant or datetime.now(date.tzinfo))).total_seconds()
+    except (TypeError, ValueError, AttributeError):
+        return None
+    return min(LLM_RETRY_AFTER_MAX_S, max(0.0, delai))
+
+
+def delai_backoff(tentative: int, base: float = LLM_RETRY_BASE_S, plafond: float = LLM_RETRY_MAX_S,
+                  alea: Callable[[], float] = random.random) -> float:
+    """Jitter complet : uniforme entre 0 et min(plafond, base × 2^tentative)"""
+    return alea() * min(plafond, base * (2 ** tentative))
+
+
+class Disjoncteur:
+    """Disjoncteur fermé / ouvert / semi-ouvert, partagé par tous les appels LLM"""
+
+    def __init__(self, seuil_echecs: int = 5, delai_ouverture: float = 30.0,
+                 horloge: Callable[[], float] = time.monotonic):
+        self.seuil_echecs = max(1, seuil_echecs)
+        self.delai_ouverture = delai_ouverture
+        self.horloge = horloge
+        self.etat = FERME
+        self.echecs_consecutifs = 0
+        self._ouvert_depuis = 0.0
+        self._essai_en_cours = False
+        self._essai_depuis = 0.0
+        self.lock = threading.Lock()
+        self.stats = {"ouvertures": 0, "refus": 0, "essais": 0, "derniere_erreur": None, "ouvert_le": None}
+
+    def _reessayer_dans(self) -> float:
+        return max(0.0, self._ouvert_depuis + self.delai_ouverture - self.horloge())
+
+    def autoriser(self):
+        """Lever CircuitOuvertError si l'appel ne doit pas partir"""
+        with self.lock:
+            if self.etat == OUVERT:
+                if self._reessayer_dans() > 0:
+                    self.stats["refus"] += 1
+                    raise CircuitOuvertError(self._reessayer_dans())
+                self.etat = SEMI_OUVERT
+            if self.etat == SEMI_OUVERT:
+                # Un seul appel d'essai à la fois (un essai annulé sans réponse expire)
+                if self._essai_en_cours and self.horloge() - self._essai_depuis < self.delai_ouverture:
+                    self.stats["refus"] += 1
+                    raise CircuitOuvertError(0.0)
+                self._essai_en_cours = True
+                self._essai_depuis = self.horloge()
+                self.stats["essais"] += 1
+
+    def est_ouvert(self) -> bool:
+        """Circuit ouvert et délai d'ouverture non écoulé (les appels seraient refusés)"""
+        with self.lock:
+            return self.etat == OUVERT and self._reessayer_dans() > 0
+
+    def signaler_succes(self):
+        with self.lock:
+            self.etat = FERME
+            self.echecs_consecutifs = 0
+            self._essai_en_cours = False
+
+    def signaler_echec(self, erreur: BaseException):
+        with self.lock:
+            self._essai_en_cours = False
+            if classer_erreur(erreur) == FATALE:
+                # Le fournisseur a répondu : il n'est pas en panne
+                self.etat = FERME
+                self.echecs_consecutifs = 0
+                return
+            self.echecs_consecutifs += 1
+            self.stats["derniere_erreur"] = f"{type(erreur).__name__}: {erreur}"[:200]
+            if self.etat == SEMI_OUVERT or self.echecs_consecutifs >= self.seuil_echecs:
+                if self.etat != OUVERT:
+                    self.stats["ouvertures"] += 1
+                    self.stats["ouvert_le"] = datetime.now().isoformat(timespec="seconds")
+                    print(f"🔌 Circuit LLM ouvert ({self.echecs_consecutifs} échecs consécutifs)")
+                self.etat = OUVERT
+                self._ouvert_depuis = self.horloge()
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            etat = self.etat
+            if etat == OUVERT and self._reessayer_dans() <= 0:
+                etat = SEMI_OUVERT
+            return {
+                "etat": etat,
+                "echecs_consecutifs": self.echecs_consecutifs,
+                "seuil_echecs": self.seuil_echecs,
+                "reessayer_dans": round(self._reessayer_dans(), 1) if self.etat == OUVERT else 0.0,
+                **self.stats
+            }
+
+
+_stats_lock = threading.Lock()
+_stats = {"appels": 0, "nouveaux_essais": 0, "abandons": 0, "erreurs_fatales": 0,
+          "retry_after_respectes": 0, "attente_totale_s": 0.0}
+
+
+def _compter(cle: str, valeur=1):
+    with _stats_lock:
+        _stats[cle] += valeur
+
+
+def _attente_avant_essai(erreur: BaseException, tentative: int, tentatives: int) -> Optional[float]:
+    """Délai avant l'essai suivant, None si l'erreur doit remonter"""
+    if isinstance(erreur, CircuitOuvertError):
+        return None
+    if classer_erreur(erreur) == FATALE:
+        _compter("erreurs_fatales")
+        return None
+    if tentative + 1 >= tentatives:
+        _compter("abandons")
+        return None
+    delai = delai_retry_after(erreur)
+    if delai is not None:
+        _compter("retry_after_respectes")
+    else:
+        delai = delai_backoff(tentative)
+    _compter("nouveaux_essais")
+    _compter("attente_totale_s", delai)
+    return delai
+
+
+def executer_avec_resilience(appel: Callable, disjoncteur: Optional[Disjoncteur] = None,
+                             tentatives: int = LLM_RETRY_ATTEMPTS, attendre: Callable[[float], None] = time.sleep):
+    """Exécuter appel() avec nouveaux essais et disjoncteur (appels bloquants)"""
+    disjoncteur = disjoncteur or get_disjoncteur()
+    _compter("appels")
+    for tentative in range(max(1, tentatives)):
+        disjoncteur.autoriser()
+        try:
+            resultat = appel()
+        except Exception as e:
+            disjoncteur.signaler_echec(e)
+            delai = _attente_avant_essai(e, tentative, tentatives)
+            if delai is None:
+                raise
+            attendre(delai)
+        else:
+            disjoncteur.signaler_succes()
+            return resultat
+
+
+async def executer_avec_resilience_async(appel: Callable, disjoncteur: Optional[Disjoncteur] = None,
+                                         tentatives: int = LLM_RETRY_ATTEMPTS, place: Optional[Callable] = None):
+    """
+    Version asynchrone : appel() retourne une coroutine, l'attente ne bloque pas la boucle.
+    place() (contexte asynchrone) réserve une place en vol : le disjoncteur est consulté
+    une fois la place obtenue, et l'attente entre deux essais se fait place rendue.
+    """
+    disjoncteur = disjoncteur or get_disjoncteur()
+    _compter("appels")
+    for tentative in range(max(1, tentatives)):
+        erreur = None
+        async with (place() if place is not None else _sans_place()):
+            disjoncteur.autoriser()
+            try:
+                resultat = await appel()
+            except Exception as e:
+                erreur = e
+        if erreur is None:
+            disjoncteur.signaler_succes()
+            return resultat
+        disjoncteur.signaler_echec(erreur)
+        delai = _attente_avant_essai(erreur, tentative, tentatives)
+        if delai is None:
+            raise erreur
+        await asyncio.sleep(delai)
+
+
+@asynccontextmanager
+async def _sans_place():
+    yield
+
+
+_disjoncteur = None
+_disjoncteur_lock = threading.Lock()
+
+
+def get_disjoncteur() -> Disjoncteur:
+    global _disjoncteur
+    with _disjoncteur_lock:
+        if _disjoncteur is None:
+            _disjoncteur = Disjoncteur(
+                seuil_echecs=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+                delai_ouverture=float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+            )
+        return _disjoncteur
+
+
+def statistiques_resilience() -> Dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["attente_totale_s"] = round(stats["attente_totale_s"], 2)
+    return {"disjoncteur": get_disjoncteur().get_stats(), "nouveaux_essais": stats}
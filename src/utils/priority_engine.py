@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+🚩 PRIORITÉ LOCALE DES TÂCHES
+============================
+
+deduire_priorite() consacrait un appel IA à chaque tâche sans priorité :
+un email de 8 tâches pouvait coûter 8 appels supplémentaires. La priorité
+se déduit pourtant de trois signaux disponibles localement :
+
+- urgence : mots-clés de BatchProcessor.MOTS_URGENTS dans la tâche ou
+  l'objet de l'email (et formulations "pas urgent", "si possible"…)
+- proximité de l'échéance : deadline de la tâche (ou expression de date
+  dans sa description) rapportée à la date de réception de l'email
+- rang de l'expéditeur : direction > management > autres
+
+Les signaux propres à l'email (objet, expéditeur, date de référence) sont
+calculés une fois par lot de tâches ; chaque tâche ne coûte ensuite que
+quelques expressions régulières précompilées.
+
+L'IA n'est qu'un repli optionnel (PRIORITY_LLM_FALLBACK=1) pour les tâches
+sans aucun signal ; par défaut elles reçoivent "moyenne".
+"""
+
+import os
+import re
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from batch_processor import BatchProcessor
+
+PRIORITY_LLM_FALLBACK = os.getenv("PRIORITY_LLM_FALLBACK", "0") in ("1", "true", "True")
+
+ELEVEE = "élevée"
+MOYENNE = "moyenne"
+FAIBLE = "faible"
+
+SEUIL_ELEVEE = 2.0
+SEUIL_FAIBLE = -1.0
+
+_MOTS_URGENTS = re.compile(r"(?<!\w)(" + "|".join(re.escape(mot) for mot in BatchProcessor.MOTS_URGENTS) + ")")
+_MOTS_FAIBLES = re.compile(
+    r"(?<!\w)(pas urgent|non urgent|pas pressé|sans urgence|si possible|quand (?:vous|tu) (?:pourr|aur)\w*|"
+    r"à terme|optionnel|facultatif|idéalement|pour info|lorsque possible|à l'occasion)"
+)
+_RECURRENT = re.compile(r"(?<!\w)(chaque|tous les|toutes les|hebdomadaire|mensuel|quotidien)")
+
+JOURS_SEMAINE = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
+MOIS = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet",
+        "août", "septembre", "octobre", "novembre", "décembre"]
+
+# Expressions relatives → jours avant l'échéance (la première trouvée l'emporte)
+_RELATIFS: List[Tuple[re.Pattern, int]] = [
+    (re.compile(r"(?<!\w)(aujourd'hui|ce soir|ce matin|cet après-midi|immédiatement|dès que possible)"), 0),
+    (re.compile(r"(?<!\w)après-demain"), 2),
+    (re.compile(r"(?<!\w)demain"), 1),
+    (re.compile(r"(?<!\w)(semaine prochaine)"), 7),
+    (re.compile(r"(?<!\w)(cette semaine|fin de semaine|fin de la semaine)"), 3),
+    (re.compile(r"(?<!\w)(mois prochain)"), 30),
+    (re.compile(r"(?<!\w)(ce mois|fin du mois|fin de mois)"), 14),
+]
+_DATE_ISO = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+_DATE_NUMERIQUE = re.compile(r"(?<!\d)(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?")
+_JOUR_MOIS = re.compile(r"(?<!\w)(\d{1,2})(?:er)?\s+(" + "|".join(MOIS) + ")")
+_MOIS_SEUL = re.compile(r"(?<!\w)(" + "|".join(MOIS) + ")")
+_JOUR_SEMAINE = re.compile(r"(?<!\w)(" + "|".join(JOURS_SEMAINE) + ")")
+_HEURE_SEULE = re.compile(r"(?<!\w)\d{1,2}\s?h(\d{2})?(?!\w)")
+
+RANGS_EXPEDITEUR = {
+    2: {"ceo", "pdg", "dg", "direction", "directeur", "directrice", "president", "président"},
+    1: {"manager", "chef", "responsable", "lead", "superviseur"},
+}
+
+
+def date_reference(email: Optional[Dict]) -> date:
+    """Date de réception de l'email (aujourd'hui si absente ou illisible)"""
+    valeur = str((email or {}).get("date_reception") or "")
+    try:
+        return datetime.fromisoformat(valeur[:19]).date()
+    except ValueError:
+        return date.today()
+
+
+def _date_future(reference: date, jour: int, mois: int, annee: Optional[int] = None) -> Optional[date]:
+    try:
+        cible = date(annee or reference.year, mois, jour)
+    except ValueError:
+        return None
+    if annee is None and cible < reference:
+        cible = date(reference.year + 1, mois, jour)
+    return cible
+
+
+def jours_avant_echeance(texte: str, reference: date) -> Optional[int]:
+    """Jours entre la date de référence et la première échéance exprimée dans le texte"""
+    texte = (texte or "").lower()
+    if not texte or texte in ("inconnue", "inconnu", "none", "null", "non précisé"):
+        return None
+    for regle, jours in _RELATIFS:
+        if regle.search(texte):
+            return jours
+
+    cible = None
+    if (m := _DATE_ISO.search(texte)):
+        try:
+            cible = date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        except ValueError:
+            cible = None
+    elif (m := _JOUR_MOIS.search(texte)):
+        cible = _date_future(reference, int(m.group(1)), MOIS.index(m.group(2)) + 1)
+    elif (m := _DATE_NUMERIQUE.search(texte)):
+        annee = int(m.group(3)) if m.group(3) else None
+        if annee is not None and annee < 100:
+            annee += 2000
+        cible = _date_future(reference, int(m.group(1)), int(m.group(2)), annee)
+    elif (m := _JOUR_SEMAINE.search(texte)):
+        # Le même jour de semaine que la réception désigne la semaine suivante
+        ecart = (JOURS_SEMAINE.index(m.group(1)) - reference.weekday()) % 7
+        return ecart or 7
+    elif (m := _MOIS_SEUL.search(texte)):
+        cible = _date_future(reference, 1, MOIS.index(m.group(1)) + 1)
+    elif _HEURE_SEULE.search(texte):
+        return 0
+    if cible is None:
+        return None
+    return (cible - reference).days
+
+
+def rang_expediteur(expediteur: str) -> int:
+    """2 = direction, 1 = management, 0 = autres"""
+    adresse = (expediteur or "").lower()
+    if any(vip in adresse for vip in BatchProcessor.EXPEDITEURS_VIP):
+        return 2
+    parties = set(re.split(r"[.\-_+]", adresse.split("@", 1)[0]))
+    for rang in (2, 1):
+        if parties & RANGS_EXPEDITEUR[rang]:
+            return rang
+    return 0
+
+
+def _score_urgence(texte: str) -> Tuple[float, int]:
+    """(score, signaux) des mots-clés d'urgence / de faible priorité"""
+    score, signaux = 0.0, 0
+    if _MOTS_FAIBLES.search(texte):
+        score -= 1.5
+        signaux += 1
+        # "pas urgent" ne doit pas compter comme "urgent"
+        texte = _MOTS_FAIBLES.sub(" ", texte)
+    urgences = {m.group(1) for m in _MOTS_URGENTS.finditer(texte)}
+    if urgences:
+        score += 2.0 + 0.5 * (len(urgences) - 1)
+        signaux += 1
+    return score, signaux
+
+
+def _score_echeance(jours: Optional[int]) -> float:
+    if jours is None:
+        return 0.0
+    if jours <= 1:
+        return 2.0
+    if jours <= 3:
+        return 1.0
+    if jours >= 14:
+        return -1.0
+    return 0.0
+
+
+class ContexteEmail:
+    """Signaux communs à toutes les tâches d'un email, calculés une seule fois"""
+
+    def __init__(self, email: Optional[Dict] = None):
+        email = email or {}
+        self.reference = date_reference(email)
+        self.rang = rang_expediteur(email.get("expediteur", ""))
+        score_objet, signaux_objet = _score_urgence(str(email.get("objet") or "").lower())
+        # L'objet colore toutes les tâches de l'email, avec un poids réduit
+        self.score = score_objet / 2 + {2: 1.0, 1: 0.5, 0: 0.0}[self.rang]
+        self.signaux = signaux_objet + (1 if self.rang else 0)
+
+
+def score_priorite(description: str, deadline: Optional[str] = None,
+                   contexte: Optional[ContexteEmail] = None) -> Tuple[float, int]:
+    """(score, nombre de signaux) d'une tâche ; score >= 2 → élevée, <= -1 → faible"""
+    contexte = contexte or ContexteEmail()
+    texte = (description or "").lower()
+    score, signaux = _score_urgence(texte)
+    score += contexte.score
+    signaux += contexte.signaux
+
+    # Tâche récurrente ("chaque lundi") : pas d'échéance ponctuelle
+    if _RECURRENT.search(texte) or _RECURRENT.search(str(deadline or "").lower()):
+        return score - 0.5, signaux + 1
+    jours = jours_avant_echeance(str(deadline or ""), contexte.reference)
+    if jours is None:
+        jours = jours_avant_echeance(texte, contexte.reference)
+    if jours is not None:
+        score += _score_echeance(jours)
+        signaux += 1
+    return score, signaux
+
+
+def priorite_depuis_score(score: float) -> str:
+    if score >= SEUIL_ELEVEE:
+        return ELEVEE
+    if score <= SEUIL_FAIBLE:
+        return FAIBLE
+    return MOYENNE
+
+
+class MoteurPriorite:
+    """Priorités locales d'un lot de tâches ; None = à confier à l'IA (repli optionnel)"""
+
+    def __init__(self, repli_llm: bool = PRIORITY_LLM_FALLBACK):
+        self.repli_llm = repli_llm
+        self.lock = threading.Lock()
+        self.stats = {"decisions_locales": 0, "renvois_llm": 0, "sans_signal": 0,
+                      ELEVEE: 0, MOYENNE: 0, FAIBLE: 0}
+
+    def deduire_priorites(self, taches: List[Dict], email: Optional[Dict] = None) -> List[Optional[str]]:
+        """Une priorité par tâche ({"description", "deadline"}), en un seul passage"""
+        contexte = ContexteEmail(email)
+        resultats: List[Optional[str]] = []
+        compteurs = {"decisions_locales": 0, "renvois_llm": 0, "sans_signal": 0, ELEVEE: 0, MOYENNE: 0, FAIBLE: 0}
+        for tache in taches:
+            score, signaux = score_priorite(tache.get("description", ""), tache.get("deadline"), contexte)
+            if signaux == 0:
+                compteurs["sans_signal"] += 1
+                if self.repli_llm:
+                    compteurs["renvois_llm"] += 1
+                    resultats.append(None)
+                    continue
+            priorite = priorite_depuis_score(score)
+            compteurs["decisions_locales"] += 1
+            compteurs[priorite] += 1
+            resultats.append(priorite)
+        with self.lock:
+            for cle, valeur in compteurs.items():
+                self.stats[cle] += valeur
+        return resultats
+
+    def deduire(self, description: str, deadline: Optional[str] = None, email: Optional[Dict] = None) -> Optional[str]:
+        return self.deduire_priorites([{"description": description, "deadline": deadline}], email)[0]
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            total = self.stats["decisions_locales"] + self.stats["renvois_llm"]
+            return {
+                **self.stats,
+                "taux_local": round(self.stats["decisions_locales"] / total * 100, 1) if total else 0.0,
+                "repli_llm": self.repli_llm
+            }
+
+
+_moteur = None
+_moteur_lock = threading.Lock()
+
+
+def get_moteur_priorite() -> MoteurPriorite:
+    global _moteur
+    with _moteur_lock:
+        if _moteur is None:
+            _moteur = MoteurPriorite()
+        return _moteur
+
+
+def statistiques_priorites() -> Dict:
+    return get_moteur_priorite().get_stats()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+⚡ CACHE DES RÉSULTATS DE REQUÊTES
+=================================
+
+Le tableau de bord interroge /all-tasks, /tasks/stats et /tasks/tags avec
+les mêmes paramètres toutes les quelques secondes. Les réponses sont mises
+en cache par (endpoint, paramètres normalisés, version du store) :
+- toute écriture incrémente la version du TaskStore → anciennes entrées invalides
+- éviction LRU bornée en nombre d'entrées et en poids (nombre de tâches retenues)
+
+Les réponses en cache sont partagées : ne pas les modifier.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Limites par défaut
+QUERY_CACHE_MAX_ENTRIES = 256
+QUERY_CACHE_MAX_WEIGHT = 50000
+
+
+def _response_weight(response: Any) -> int:
+    """Poids d'une réponse : nombre de tâches qu'elle référence (au moins 1)"""
+    if isinstance(response, dict) and isinstance(response.get("tasks"), list):
+        return max(1, len(response["tasks"]))
+    return 1
+
+
+class QueryCache:
+    """Cache LRU de réponses, invalidé par la version du store"""
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES,
+                 max_weight: int = QUERY_CACHE_MAX_WEIGHT):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._weight = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "uncacheable": 0}
+
+    @staticmethod
+    def make_key(namespace: str, params: Dict) -> tuple:
+        """Clé normalisée : l'ordre des paramètres et les valeurs vides n'importent pas"""
+        normalized = {key: value for key, value in params.items() if value not in (None, "", [])}
+        return (namespace, json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str))
+
+    def _check_version(self, version) -> bool:
+        """Purger les entrées d'une version antérieure ; False si `version` est dépassée"""
+        if self._version is not None and version < self._version:
+            # Calcul commencé avant une écriture plus récente : ne pas mémoriser
+            return False
+        if version != self._version:
+            if self._entries:
+                self.stats["invalidations"] += 1
+            self._entries.clear()
+            self._weight = 0
+            self._version = version
+        return True
+
+    def get(self, namespace: str, params: Dict, version) -> Optional[Any]:
+        key = self.make_key(namespace, params)
+        with self._lock:
+            entry = self._entries.get(key) if self._check_version(version) else None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def put(self, namespace: str, params: Dict, version, response: Any):
+        weight = _response_weight(response)
+        if weight > self.max_weight:
+            self.stats["uncacheable"] += 1
+            return
+        key = self.make_key(namespace, params)
+        with self._lock:
+            if not self._check_version(version):
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._weight -= previous[1]
+            self._entries[key] = (response, weight)
+            self._weight += weight
+            while len(self._entries) > self.max_entries or self._weight > self.max_weight:
+                _, (_, evicted_weight) = self._entries.popitem(last=False)
+                self._weight -= evicted_weight
+                self.stats["evictions"] += 1
+
+    def get_or_compute(self, namespace: str, params: Dict, version, compute: Callable[[], Any]) -> Any:
+        """Réponse en cache pour cette version, sinon calculée puis mémorisée"""
+        cached = self.get(namespace, params, version)
+        if cached is not None:
+            return cached
+        response = compute()
+        self.put(namespace, params, version, response)
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups * 100, 1) if lookups else 0.0,
+                "entries": len(self._entries),
+                "weight": self._weight,
+                "max_entries": self.max_entries,
+                "max_weight": self.max_weight,
+                "store_version": self._version
+            }
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+🎯 CLASSEMENT PAR PERTINENCE (BM25F)
+===================================
+
+Remplace sort_by_relevance (poids fixes 5/3/2/1 recalculés dans la clé de tri) :
+- score BM25F sur l'index inversé (search_index.py), champs pondérés
+- requêtes multi-mots : chaque mot contribue (préfixe de token accepté)
+- top-k par tas : seule la page demandée est ordonnée, pas tout le corpus
+"""
+
+import heapq
+import math
+from typing import Dict, Iterable, List
+
+from search_index import normaliser_texte
+
+# Poids par champ (description > responsable > objet email > résumé email)
+FIELD_WEIGHTS = {
+    "description": 3.0,
+    "responsable": 2.0,
+    "email_objet": 1.5,
+    "email_resume": 1.0,
+}
+
+# Paramètres BM25 classiques
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class BM25FRanker:
+    """Score BM25F et extraction des k tâches les plus pertinentes"""
+
+    def __init__(self, search_index, field_weights: Dict[str, float] = None,
+                 k1: float = BM25_K1, b: float = BM25_B):
+        self.index = search_index
+        self.field_weights = field_weights or FIELD_WEIGHTS
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, candidate_ids: Iterable[str] = None) -> Dict[str, float]:
+        """Scores BM25F des tâches (restreints à candidate_ids si fourni)"""
+        terms = list(dict.fromkeys(normaliser_texte(query).split()))
+        if not terms:
+            return {}
+        candidates = set(candidate_ids) if candidate_ids is not None else None
+        index = self.index
+        scores: Dict[str, float] = {}
+
+        with index.store.lock:
+            index.ensure_built()
+            total_docs = index.document_count()
+            avg_lengths = {field: index.average_length(field) for field in self.field_weights}
+
+            for term in terms:
+                # Fréquences pondérées et normalisées par longueur, cumulées sur les champs
+                weighted_tf: Dict[str, float] = {}
+                docs_with_term = set()
+                for field, weight in self.field_weights.items():
+                    avg_length = avg_lengths[field] or 1.0
+                    for bucket in index.postings_with_prefix(field, term):
+                        docs_with_term.update(bucket)
+                        for task_id, tf in bucket.items():
+                            if candidates is not None and task_id not in candidates:
+                                continue
+                            length = index.field_length(task_id, field)
+                            norm = 1 - self.b + self.b * length / avg_length
+                            weighted_tf[task_id] = weighted_tf.get(task_id, 0.0) + weight * tf / norm
+
+                df = len(docs_with_term)
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                for task_id, tf in weighted_tf.items():
+                    scores[task_id] = scores.get(task_id, 0.0) + idf * tf / (self.k1 + tf)
+        return scores
+
+    def top_k(self, query: str, tasks: List[Dict], k: int) -> List[Dict]:
+        """
+        Réordonner `tasks` : les k plus pertinentes d'abord (score décroissant,
+        ordre d'origine en cas d'égalité), puis le reste dans l'ordre d'origine.
+        Coût O(n + m log k) au lieu d'un tri complet.
+        """
+        if not tasks or k <= 0:
+            return tasks
+        scores = self.score(query, (task.get("id") for task in tasks))
+        scored = ((score, -position, position)
+                  for position, task in enumerate(tasks)
+                  if (score := scores.get(task.get("id"), 0.0)) > 0)
+        top_positions = [position for _, _, position in heapq.nlargest(k, scored)]
+
+        if len(top_positions) < k:
+            # Compléter avec les tâches sans score, dans l'ordre d'origine
+            taken = set(top_positions)
+            for position in range(len(tasks)):
+                if len(top_positions) >= k:
+                    break
+                if position not in taken:
+                    top_positions.append(position)
+
+        taken = set(top_positions)
+        head = [tasks[position] for position in top_positions]
+        return head + [task for position, task in enumerate(tasks) if position not in taken]
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+🔍 INDEX INVERSÉ PLEIN TEXTE DES TÂCHES UNIFIÉES
+===============================================
+
+Remplace le parcours complet de filter_by_search :
+- normalisation (casse, accents, ponctuation) faite une seule fois à l'indexation
+- listes de postings par champ : token → {id tâche: fréquence}
+- mise à jour incrémentale via les événements du TaskStore
+
+Sémantique identique à search_in_text : la requête normalisée doit
+apparaître comme sous-chaîne du champ normalisé. Les postings réduisent
+les candidats, la sous-chaîne est vérifiée sur ces seuls candidats.
+
+Les morceaux de requête partiels (préfixe, suffixe, sous-chaîne d'un
+token) ne parcourent pas le vocabulaire : termes triés et termes
+inversés triés (bisect) pour préfixes et suffixes, index de n-grammes
+(1 à 3 caractères) pour les sous-chaînes.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set
+
+# Champs interrogeables (mêmes noms que search_in_task_fields)
+SEARCHABLE_FIELDS = (
+    "description", "responsable", "statut", "priorite", "type", "deadline",
+    "email_objet", "email_expediteur", "email_destinataire", "email_resume"
+)
+
+EMAIL_FIELDS = {
+    "email_objet": "objet",
+    "email_expediteur": "expediteur",
+    "email_destinataire": "destinataire",
+    "email_resume": "resume_contenu",
+}
+
+
+def normaliser_texte(text) -> str:
+    """Minuscules, sans accents ni ponctuation, espaces normalisés"""
+    if not text:
+        return ""
+    text = str(text).lower()
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def champs_recherchables(task: Dict) -> Dict[str, str]:
+    """Valeurs brutes des champs interrogeables d'une tâche"""
+    fields = {
+        "description": task.get("description", ""),
+        "responsable": task.get("responsable", ""),
+        "statut": task.get("statut", ""),
+        "priorite": task.get("priorite", ""),
+        "type": task.get("type", ""),
+        "deadline": str(task.get("deadline", "")),
+    }
+    metadata = task.get("source_metadata") or {}
+    email_data = metadata.get("original_email")
+    if isinstance(email_data, dict):
+        for field, key in EMAIL_FIELDS.items():
+            fields[field] = email_data.get(key, "")
+    return fields
+
+
+def resoudre_champs(search_in: Iterable[str]) -> List[str]:
+    """["all"] → tous les champs, sinon les champs connus demandés"""
+    search_in = list(search_in or ["description"])
+    if "all" in search_in:
+        return list(SEARCHABLE_FIELDS)
+    return [field for field in SEARCHABLE_FIELDS if field in search_in]
+
+
+# Longueur maximale des n-grammes du vocabulaire (sous-chaînes)
+TAILLE_NGRAMME = 3
+
+
+def _ngrammes(terme: str) -> Set[str]:
+    """Sous-chaînes de 1 à TAILLE_NGRAMME caractères d'un terme"""
+    return {terme[i:i + n] for n in range(1, TAILLE_NGRAMME + 1) for i in range(len(terme) - n + 1)}
+
+
+class Vocabulaire:
+    """Termes d'un champ : listes triées (préfixes, suffixes) et n-grammes (sous-chaînes)"""
+
+    def __init__(self, termes: Iterable[str] = ()):
+        self.termes = sorted(termes)
+        self.inverses = sorted(terme[::-1] for terme in self.termes)
+        self.ngrammes: Dict[str, Set[str]] = {}
+        for terme in self.termes:
+            for ngramme in _ngrammes(terme):
+                self.ngrammes.setdefault(ngramme, set()).add(terme)
+
+    def ajouter(self, terme: str):
+        insort(self.termes, terme)
+        insort(self.inverses, terme[::-1])
+        for ngramme in _ngrammes(terme):
+            self.ngrammes.setdefault(ngramme, set()).add(terme)
+
+    def retirer(self, terme: str):
+        for liste, valeur in ((self.termes, terme), (self.inverses, terme[::-1])):
+            i = bisect_left(liste, valeur)
+            if i < len(liste) and liste[i] == valeur:
+                del liste[i]
+        for ngramme in _ngrammes(terme):
+            termes = self.ngrammes.get(ngramme)
+            if termes is not None:
+                termes.discard(terme)
+                if not termes:
+                    del self.ngrammes[ngramme]
+
+    @staticmethod
+    def _avec_prefixe(liste: List[str], prefixe: str):
+        i = bisect_left(liste, prefixe)
+        while i < len(liste) and liste[i].startswith(prefixe):
+            yield liste[i]
+            i += 1
+
+    def avec_prefixe(self, prefixe: str):
+        return self._avec_prefixe(self.termes, prefixe)
+
+    def avec_suffixe(self, suffixe: str):
+        return (inverse[::-1] for inverse in self._avec_prefixe(self.inverses, suffixe[::-1]))
+
+    def contenant(self, morceau: str) -> Set[str]:
+        """Termes contenant morceau : n-gramme direct, ou intersection des trigrammes puis vérification"""
+        if len(morceau) <= TAILLE_NGRAMME:
+            return set(self.ngrammes.get(morceau, ()))
+        ensembles = []
+        for i in range(len(morceau) - TAILLE_NGRAMME + 1):
+            termes = self.ngrammes.get(morceau[i:i + TAILLE_NGRAMME])
+            if not termes:
+                return set()
+            ensembles.append(termes)
+        ensembles.sort(key=len)
+        candidats = set(ensembles[0]).intersection(*ensembles[1:])
+        return {terme for terme in candidats if morceau in terme}
+
+
+class SearchIndex:
+    """Index inversé par champ, tenu à jour par les événements du TaskStore"""
+
+    def __init__(self, store):
+        self.store = store
+        # texte normalisé par tâche et par champ (vérification + longueurs)
+        self._texts: Dict[str, Dict[str, str]] = {}
+        # champ → token → {id tâche: fréquence du token dans le champ}
+        self._postings: Dict[str, Dict[str, Dict[str, int]]] = {field: {} for field in SEARCHABLE_FIELDS}
+        # champ → termes indexés pour les morceaux partiels de requête
+        self._vocabulaires: Dict[str, Vocabulaire] = {field: Vocabulaire() for field in SEARCHABLE_FIELDS}
+        # Somme des longueurs (en tokens) par champ, pour la longueur moyenne (BM25)
+        self._length_totals: Dict[str, int] = {field: 0 for field in SEARCHABLE_FIELDS}
+        self._dirty = True
+        self.stats = {"rebuilds": 0, "incremental_updates": 0, "queries": 0, "candidates_checked": 0}
+        store.add_listener(self._on_store_event)
+
+    # =====================================
+    # Maintenance
+    # =====================================
+
+    def _on_store_event(self, event: str, task: Optional[Dict]):
+        if event == "reset":
+            # Reconstruction paresseuse à la prochaine requête
+            self._dirty = True
+        elif event == "upsert" and not self._dirty:
+            self._unindex(task["id"])
+            self._index(task)
+            self.stats["incremental_updates"] += 1
+
+    def _index(self, task: Dict, vocabulaire: bool = True):
+        """vocabulaire=False : reconstruction complète, vocabulaires construits ensuite en une fois"""
+        task_id = task["id"]
+        texts = {}
+        for field, value in champs_recherchables(task).items():
+            normalized = normaliser_texte(value)
+            if not normalized:
+                continue
+            texts[field] = normalized
+            postings = self._postings[field]
+            tokens = normalized.split(" ")
+            self._length_totals[field] += len(tokens)
+            for token in tokens:
+                bucket = postings.get(token)
+                if bucket is None:
+                    bucket = postings[token] = {}
+                    if vocabulaire:
+                        self._vocabulaires[field].ajouter(token)
+                bucket[task_id] = bucket.get(task_id, 0) + 1
+        self._texts[task_id] = texts
+
+    def _unindex(self, task_id: str):
+        texts = self._texts.pop(task_id, None)
+        if not texts:
+            return
+        for field, normalized in texts.items():
+            postings = self._postings[field]
+            tokens = normalized.split(" ")
+            self._length_totals[field] -= len(tokens)
+            for token in set(tokens):
+                bucket = postings.get(token)
+                if bucket is not None:
+                    bucket.pop(task_id, None)
+                    if not bucket:
+                        del postings[token]
+                        self._vocabulaires[field].retirer(token)
+
+    def ensure_built(self):
+        """Reconstruire l'index si le store a été rechargé"""
+        with self.store.lock:
+            self.store.ensure_fresh()
+            if not self._dirty:
+                return
+            self._texts = {}
+            self._postings = {field: {} for field in SEARCHABLE_FIELDS}
+            self._length_totals = {field: 0 for field in SEARCHABLE_FIELDS}
+            for task in self.store.all():
+                self._index(task, vocabulaire=False)
+            self._vocabulaires = {field: Vocabulaire(postings) for field, postings in self._postings.items()}
+            self._dirty = False
+            self.stats["rebuilds"] += 1
+
+    # =====================================
+    # Accès pour le classement (relevance_ranking.py)
+    # =====================================
+
+    def document_count(self) -> int:
+        return len(self._texts)
+
+    def average_length(self, field: str) -> float:
+        """Longueur moyenne du champ (en tokens) sur les tâches indexées"""
+        return self._length_totals[field] / len(self._texts) if self._texts else 0.0
+
+    def field_length(self, task_id: str, field: str) -> int:
+        text = self._texts.get(task_id, {}).get(field)
+        return len(text.split(" ")) if text else 0
+
+    def postings_with_prefix(self, field: str, prefix: str):
+        """Postings des tokens du champ commençant par `prefix` (bisect sur les termes triés)"""
+        postings = self._postings[field]
+        for vocab in self._vocabulaires[field].avec_prefixe(prefix):
+            yield postings[vocab]
+
+    # =====================================
+    # Recherche
+    # =====================================
+
+    def _ids_for_token(self, field: str, token: str, position: str) -> Set[str]:
+        """
+        Ids dont un token du champ peut contenir ce morceau de requête :
+        - "seul"   : sous-chaîne d'un token
+        - "debut"  : suffixe d'un token (premier mot d'une requête multi-mots)
+        - "fin"    : préfixe d'un token (dernier mot)
+        - "milieu" : token exact
+        """
+        postings = self._postings[field]
+        if position == "milieu":
+            return set(postings.get(token, ()))
+        vocabulaire = self._vocabulaires[field]
+        if position == "debut":
+            termes = vocabulaire.avec_suffixe(token)
+        elif position == "fin":
+            termes = vocabulaire.avec_prefixe(token)
+        else:
+            termes = vocabulaire.contenant(token)
+        ids: Set[str] = set()
+        for vocab in termes:
+            ids.update(postings[vocab])
+        return ids
+
+    def _search_field(self, field: str, query: str) -> Set[str]:
+        tokens = query.split(" ")
+        candidates: Optional[Set[str]] = None
+        for i, token in enumerate(tokens):
+            if len(tokens) == 1:
+                position = "seul"
+            elif i == 0:
+                position = "debut"
+            elif i == len(tokens) - 1:
+                position = "fin"
+            else:
+                position = "milieu"
+            ids = self._ids_for_token(field, token, position)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+        self.stats["candidates_checked"] += len(candidates)
+        return {task_id for task_id in candidates if query in self._texts[task_id].get(field, "")}
+
+    def search(self, query: str, search_in: Iterable[str] = ("description",)) -> Set[str]:
+        """Ids des tâches dont au moins un champ contient la requête"""
+        if not query:
+            return set()
+        fields = resoudre_champs(search_in)
+        with self.store.lock:
+            self.ensure_built()
+            self.stats["queries"] += 1
+            normalized = normaliser_texte(query)
+            if not normalized:
+                # Requête réduite à de la ponctuation : tout champ non vide correspond
+                return {task_id for task_id, texts in self._texts.items()
+                        if any(field in texts for field in fields)}
+            ids: Set[str] = set()
+            for field in fields:
+                ids |= self._search_field(field, normalized)
+            return ids
+
+    def get_stats(self) -> Dict:
+        with self.store.lock:
+            return {
+                **self.stats,
+                "indexed_tasks": len(self._texts),
+                "vocabulary": {field: len(postings) for field, postings in self._postings.items()}
+            }
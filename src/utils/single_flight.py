@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+🛫 SINGLE-FLIGHT - Regroupement des appels identiques en vol
+===========================================================
+
+Quand le surveillant de fichiers, le monitoring périodique et un appel
+manuel à /traiter-emails se chevauchent, le même email (ou le même prompt)
+peut partir plusieurs fois vers le modèle : le cache n'est marqué qu'après
+le traitement. Avec SingleFlight, le premier appelant d'une clé exécute le
+travail ; les appelants concurrents sur la même clé attendent son résultat
+(ou son exception) au lieu de refaire l'appel.
+
+Le registre est partagé entre threads (watchers) et boucles asyncio
+(handlers FastAPI) : chaque clé en vol est un concurrent.futures.Future,
+attendu par future.result() côté synchrone et asyncio.wrap_future() côté
+asynchrone.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Registre clé → exécution en cours"""
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.stats = {"executions": 0, "coalesced": 0, "errors": 0}
+
+    def _rejoindre(self, key: Hashable) -> Tuple[Future, bool]:
+        """(future partagée, True si l'appelant doit exécuter le travail)"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, False
+            future = Future()
+            # En cours : un appelant annulé ne peut plus annuler le résultat partagé
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            self.stats["executions"] += 1
+            return future, True
+
+    def _terminer(self, key: Hashable, future: Future, result: Any = None, error: BaseException = None):
+        with self._lock:
+            self._calls.pop(key, None)
+            if error is not None:
+                self.stats["errors"] += 1
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Exécuter fn() une seule fois par clé en vol (appelants synchrones).
+        Retourne (résultat, partagé) ; partagé=True si un autre appelant l'a calculé.
+        """
+        future, leader = self._rejoindre(key)
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            self._terminer(key, future, error=e)
+            raise
+        self._terminer(key, future, result)
+        return result, False
+
+    async def do_async(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Version asynchrone de do() : factory() crée la coroutine du premier appelant"""
+        future, leader = self._rejoindre(key)
+        if not leader:
+            return await asyncio.shield(asyncio.wrap_future(future)), True
+        try:
+            result = await factory()
+        except BaseException as e:
+            self._terminer(key, future, error=e)
+            raise
+        self._terminer(key, future, result)
+        return result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "in_flight": len(self._calls)}
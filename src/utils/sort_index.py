@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+📈 INDEX DE TRI DES TÂCHES UNIFIÉES
+==================================
+
+Tableaux de clés pré-triés par champ triable (priority, status, deadline,
+created_at, responsable, description, source), tenus à jour par les
+événements du TaskStore :
+- page sur toutes les tâches : parcours direct du tableau trié, O(k)
+- page sur un sous-ensemble filtré : heapq.nsmallest/nlargest sur les clés
+  précalculées, ou parcours filtré du tableau si le sous-ensemble est grand
+
+Égalités départagées par l'ordre du fichier (comme un tri stable).
+page_after reprend un parcours après une entrée (pagination par curseur).
+Les dates sont lues dans les vrais champs deadline / created_at.
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from task_query import normalize_filter_value, parse_date_string
+
+PRIORITY_RANK = {"critical": 4, "high": 3, "medium": 2, "low": 1}
+STATUS_RANK = {"pending": 4, "in_progress": 3, "completed": 2, "cancelled": 1}
+
+# Tâche sans date : en fin de tri croissant (comme l'ancien tri)
+MISSING_DATE = "9999-12-31"
+
+# Pseudo-champ : ordre du fichier (pagination par curseur sans tri)
+FILE_ORDER = "file"
+
+# En dessous de ce ratio sous-ensemble / total, le tas est moins coûteux que le parcours
+SUBSET_HEAP_RATIO = 0.25
+
+
+def _date_key(value) -> str:
+    parsed = parse_date_string(value)
+    return parsed.isoformat() if parsed else MISSING_DATE
+
+
+SORT_KEYS = {
+    "priority": lambda t: PRIORITY_RANK.get(normalize_filter_value("priority", t.get("priorite")), 0),
+    "status": lambda t: STATUS_RANK.get(normalize_filter_value("status", t.get("statut")), 0),
+    "deadline": lambda t: _date_key(t.get("deadline")),
+    "created_at": lambda t: _date_key(t.get("created_at")),
+    "responsable": lambda t: str(t.get("responsable") or "").lower(),
+    "description": lambda t: str(t.get("description") or "").lower(),
+    "source": lambda t: str(t.get("source") or ""),
+}
+
+# Champs dont la clé est un rang entier (les autres sont des chaînes)
+INT_KEYS = {FILE_ORDER, "priority", "status"}
+
+
+def key_type(field: str) -> type:
+    """Type de la clé de tri d'un champ (pour valider un curseur décodé)"""
+    return int if field in INT_KEYS else str
+
+
+def _is_after(entry: tuple, after: tuple, descending: bool) -> bool:
+    """L'entrée vient-elle après `after` dans l'ordre de parcours ?"""
+    if not descending:
+        return entry > after
+    return entry[0] < after[0] or (entry[0] == after[0] and entry[1] > after[1])
+
+
+class SortIndex:
+    """Clés de tri pré-triées par champ, maintenues incrémentalement"""
+
+    def __init__(self, store):
+        self.store = store
+        # champ → liste triée de (clé, position, id)
+        self._sorted: Dict[str, List[Tuple[Any, int, str]]] = {}
+        # champ → id → entrée courante (pour la retrouver par bisect)
+        self._entries: Dict[str, Dict[str, Tuple[Any, int, str]]] = {}
+        self._dirty = True
+        self.stats = {"rebuilds": 0, "incremental_updates": 0, "direct_walks": 0, "heap_selections": 0}
+        store.add_listener(self._on_store_event)
+
+    # =====================================
+    # Maintenance
+    # =====================================
+
+    @staticmethod
+    def _fields():
+        return (FILE_ORDER,) + tuple(SORT_KEYS)
+
+    @staticmethod
+    def _key(field: str, task: Dict, position: int) -> Any:
+        return position if field == FILE_ORDER else SORT_KEYS[field](task)
+
+    def _on_store_event(self, event: str, task: Optional[Dict]):
+        if event == "reset":
+            self._dirty = True
+        elif event == "upsert" and not self._dirty:
+            position = self.store.position(task["id"])
+            for field in self._fields():
+                entry = (self._key(field, task, position), position, task["id"])
+                previous = self._entries[field].get(task["id"])
+                if previous == entry:
+                    continue
+                if previous is not None:
+                    array = self._sorted[field]
+                    del array[bisect_left(array, previous)]
+                insort(self._sorted[field], entry)
+                self._entries[field][task["id"]] = entry
+            self.stats["incremental_updates"] += 1
+
+    def ensure_built(self):
+        with self.store.lock:
+            self.store.ensure_fresh()
+            if not self._dirty:
+                return
+            tasks = self.store.all()
+            positions = {task["id"]: self.store.position(task["id"]) for task in tasks}
+            for field in self._fields():
+                entries = {
+                    task["id"]: (self._key(field, task, positions[task["id"]]), positions[task["id"]], task["id"])
+                    for task in tasks
+                }
+                self._entries[field] = entries
+                self._sorted[field] = sorted(entries.values())
+            self._dirty = False
+            self.stats["rebuilds"] += 1
+
+    # =====================================
+    # Parcours ordonné
+    # =====================================
+
+    def iter_ids(self, sort_by: str, descending: bool = False, after: tuple = None) -> Iterator[str]:
+        """
+        Ids de toutes les tâches dans l'ordre de tri (égalités : ordre du fichier),
+        en reprenant après l'entrée `after` (clé, position, id) si fournie : O(log n).
+        """
+        array = self._sorted[sort_by]
+        if not descending:
+            start = bisect_right(array, after) if after else 0
+            for i in range(start, len(array)):
+                yield array[i][2]
+            return
+        # Décroissant : clés de la plus grande à la plus petite, chaque groupe
+        # d'égalité restant dans l'ordre du fichier
+        end = len(array)
+        if after:
+            # Fin du groupe de la clé du curseur, puis groupes de clés inférieures
+            group_end = bisect_left(array, (after[0], float("inf")))
+            for i in range(bisect_right(array, after), group_end):
+                yield array[i][2]
+            end = bisect_left(array, (after[0], -1, ""))
+        while end > 0:
+            key = array[end - 1][0]
+            start = bisect_left(array, (key, -1, ""))
+            for i in range(start, end):
+                yield array[i][2]
+            end = start
+
+    def sort_page(self, tasks: List[Dict], sort_by: str, order: str = "asc", k: int = None) -> List[Dict]:
+        """
+        Réordonner `tasks` : les k premières triées, le reste dans l'ordre d'origine
+        (paginate_tasks ne lit que la tranche de la page). k=None : tri complet.
+        """
+        if sort_by not in SORT_KEYS or not tasks:
+            return tasks
+        descending = (order or "asc").lower() == "desc"
+        with self.store.lock:
+            self.ensure_built()
+            k = len(tasks) if k is None else min(k, len(tasks))
+            by_id = {task.get("id"): task for task in tasks}
+            entries = self._entries[sort_by]
+
+            if len(by_id) < len(tasks) or any(task_id not in entries for task_id in by_id):
+                # Tâches hors store, sans id ou dupliquées : tri classique sur les clés
+                return sorted(tasks, key=SORT_KEYS[sort_by], reverse=descending)
+
+            if len(tasks) >= SUBSET_HEAP_RATIO * len(entries):
+                # Grand sous-ensemble : parcours du tableau pré-trié jusqu'à k éléments
+                self.stats["direct_walks"] += 1
+                head_ids = list(islice((task_id for task_id in self.iter_ids(sort_by, descending)
+                                        if task_id in by_id), k))
+            else:
+                self.stats["heap_selections"] += 1
+                if descending:
+                    selected = heapq.nlargest(k, (entries[task_id] for task_id in by_id),
+                                              key=lambda e: (e[0], -e[1]))
+                else:
+                    selected = heapq.nsmallest(k, (entries[task_id] for task_id in by_id))
+                head_ids = [task_id for _, _, task_id in selected]
+
+        head = set(head_ids)
+        return [by_id[task_id] for task_id in head_ids] + [t for t in tasks if t["id"] not in head]
+
+    def entry(self, sort_by: str, task_id: str) -> Optional[tuple]:
+        """Entrée (clé, position, id) d'une tâche : base d'un curseur"""
+        with self.store.lock:
+            self.ensure_built()
+            return self._entries[sort_by].get(task_id)
+
+    def page_after(self, tasks: List[Dict], sort_by: str, order: str, after: Optional[tuple],
+                   limit: int) -> Tuple[List[Dict], bool]:
+        """
+        Page de `limit` tâches de `tasks` situées après `after` dans l'ordre de tri.
+        Retourne (tâches de la page, has_next).
+        """
+        descending = (order or "asc").lower() == "desc"
+        with self.store.lock:
+            self.ensure_built()
+            entries = self._entries[sort_by]
+            by_id = {task["id"]: task for task in tasks if task.get("id") in entries}
+            if len(by_id) >= SUBSET_HEAP_RATIO * len(entries):
+                self.stats["direct_walks"] += 1
+                ids = list(islice((task_id for task_id in self.iter_ids(sort_by, descending, after)
+                                   if task_id in by_id), limit + 1))
+            else:
+                self.stats["heap_selections"] += 1
+                candidates = (entries[task_id] for task_id in by_id
+                              if not after or _is_after(entries[task_id], after, descending))
+                if descending:
+                    selected = heapq.nlargest(limit + 1, candidates, key=lambda e: (e[0], -e[1]))
+                else:
+                    selected = heapq.nsmallest(limit + 1, candidates)
+                ids = [task_id for _, _, task_id in selected]
+        return [by_id[task_id] for task_id in ids[:limit]], len(ids) > limit
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "fields": list(SORT_KEYS)}
@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+"""
+🗄️ STOCKAGE SQLITE - Backend alternatif aux fichiers JSON
+=========================================================
+
+Une base SQLite (mode WAL) remplace les fichiers de data/ :
+- unified_tasks  : tâches unifiées (colonnes normalisées + document JSON)
+- meetings, meeting_tasks, meeting_logs
+- email_cache    : hash des emails déjà traités
+
+emails.json, tasks.json (format legacy) et logs.json restent des fichiers
+quel que soit le backend : emails.json est la boîte d'entrée surveillée
+par email_watcher.py, et ces trois fichiers sont lus tels quels par l'API
+et le pré-classifieur. Les garder en un seul endroit évite deux sources
+de vérité.
+
+Activation : STORAGE_BACKEND=sqlite (défaut : json)
+Migration   : python src/utils/sqlite_storage.py migrate [--db data/ai_task.db]
+
+Les filtres de /all-tasks sont traduits en SQL sur des colonnes
+normalisées (statut, priorité, responsable, département, dates ISO).
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from task_persistence import appliquer_enregistrement
+from task_query import extract_department_from_task, normalize_filter_value, parse_date_string
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+# Backend de stockage : "json" (fichiers historiques) ou "sqlite"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", os.path.join(DATA_DIR, "ai_task.db"))
+
+# Collections stockées comme listes ordonnées de documents JSON
+# (table → colonne id éventuelle dans le document)
+DOCUMENT_COLLECTIONS = {
+    "meetings": "id",
+    "meeting_tasks": "meeting_id",
+    "meeting_logs": "meeting_id",
+}
+
+# Fichiers JSON migrés vers chaque collection
+JSON_FILES = {
+    "unified_tasks": "unified_tasks.json",
+    "meetings": "meetings.json",
+    "meeting_tasks": "meeting_tasks.json",
+    "meeting_logs": "meeting_logs.json",
+    "email_cache": "emails_cache.json",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS unified_tasks (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    statut_norm TEXT,
+    priorite_norm TEXT,
+    source_lower TEXT,
+    validated INTEGER NOT NULL DEFAULT 0,
+    responsable_lower TEXT,
+    department_lower TEXT,
+    deadline_ts TEXT,
+    created_ts TEXT,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_unified_position ON unified_tasks(position);
+CREATE INDEX IF NOT EXISTS idx_unified_statut ON unified_tasks(statut_norm);
+CREATE INDEX IF NOT EXISTS idx_unified_priorite ON unified_tasks(priorite_norm);
+CREATE INDEX IF NOT EXISTS idx_unified_source ON unified_tasks(source_lower);
+CREATE INDEX IF NOT EXISTS idx_unified_department ON unified_tasks(department_lower);
+CREATE INDEX IF NOT EXISTS idx_unified_deadline ON unified_tasks(deadline_ts);
+CREATE INDEX IF NOT EXISTS idx_unified_created ON unified_tasks(created_ts);
+
+CREATE TABLE IF NOT EXISTS email_cache (
+    hash TEXT PRIMARY KEY,
+    processed_at TEXT,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_email_cache_processed ON email_cache(processed_at);
+"""
+
+DOCUMENT_TABLE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    position INTEGER PRIMARY KEY,
+    doc_id TEXT,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_{table}_doc_id ON {table}(doc_id);
+"""
+
+
+def _iso_or_none(value) -> Optional[str]:
+    parsed = parse_date_string(value)
+    return parsed.isoformat() if parsed else None
+
+
+def colonnes_tache(task: Dict) -> Dict:
+    """Colonnes normalisées d'une tâche unifiée (mêmes règles que les filtres API)"""
+    department = extract_department_from_task(task)
+    return {
+        "id": task["id"],
+        "statut_norm": normalize_filter_value("status", task.get("statut")) or None,
+        "priorite_norm": normalize_filter_value("priority", task.get("priorite")) or None,
+        "source_lower": str(task.get("source") or "").lower(),
+        "validated": 1 if task.get("validated", False) is True else 0,
+        "responsable_lower": str(task.get("responsable") or "").lower(),
+        "department_lower": department.lower() if department else None,
+        "deadline_ts": _iso_or_none(task.get("deadline")),
+        "created_ts": _iso_or_none(task.get("created_at")),
+        "body": json.dumps(task, ensure_ascii=False),
+    }
+
+
+class SQLiteStorage:
+    """Accès thread-safe à la base SQLite (une connexion partagée, mode WAL)"""
+
+    def __init__(self, db_path: str = SQLITE_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            for table in DOCUMENT_COLLECTIONS:
+                self.conn.executescript(DOCUMENT_TABLE_SCHEMA.format(table=table))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def data_version(self) -> int:
+        """Change dès qu'une AUTRE connexion a validé une écriture"""
+        with self.lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def change_token(self) -> tuple:
+        """Change à chaque écriture, de ce processus (total_changes) ou d'un autre (data_version)"""
+        with self.lock:
+            return (self.data_version(), self.conn.total_changes)
+
+    # =====================================
+    # Tâches unifiées
+    # =====================================
+
+    def _upsert_task(self, task: Dict, position: int):
+        cols = colonnes_tache(task)
+        cols["position"] = position
+        names = ", ".join(cols)
+        placeholders = ", ".join(f":{name}" for name in cols)
+        self.conn.execute(f"INSERT OR REPLACE INTO unified_tasks ({names}) VALUES ({placeholders})", cols)
+
+    def load_unified_tasks(self) -> List[Dict]:
+        with self.lock:
+            rows = self.conn.execute("SELECT body FROM unified_tasks ORDER BY position").fetchall()
+        return [json.loads(body) for (body,) in rows]
+
+    def save_unified_tasks(self, tasks: List[Dict]):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM unified_tasks")
+            for position, task in enumerate(t for t in tasks if t.get("id")):
+                self._upsert_task(task, position)
+
+    def add_unified_task(self, task: Dict):
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT position FROM unified_tasks WHERE id = ?", (task["id"],)).fetchone()
+            if row:
+                position = row[0]
+            else:
+                position = self.conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM unified_tasks").fetchone()[0]
+            self._upsert_task(task, position)
+
+    def apply_task_record(self, record: Dict):
+        """Appliquer une mutation (format du journal) sur une seule ligne"""
+        if record.get("op") == "add":
+            self.add_unified_task(record["task"])
+            return
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT position, body FROM unified_tasks WHERE id = ?", (record.get("id"),)
+            ).fetchone()
+            if row is None:
+                return
+            position, body = row
+            tasks_by_id = {record["id"]: json.loads(body)}
+            appliquer_enregistrement(tasks_by_id, record)
+            self._upsert_task(tasks_by_id[record["id"]], position)
+
+    def query_task_ids(self,
+                       status: str = None,
+                       priority: str = None,
+                       assignee: str = None,
+                       validated: bool = None,
+                       source: str = None,
+                       department: str = None,
+                       deadline_before: str = None,
+                       deadline_after: str = None,
+                       created_after: str = None,
+                       created_before: str = None) -> List[str]:
+        """Ids des tâches satisfaisant les filtres phase 1/2, dans l'ordre d'insertion"""
+        clauses, params = [], []
+        if status:
+            clauses.append("statut_norm = ?")
+            params.append(normalize_filter_value("status", status))
+        if priority:
+            clauses.append("priorite_norm = ?")
+            params.append(normalize_filter_value("priority", priority))
+        if assignee:
+            clauses.append("instr(responsable_lower, ?) > 0")
+            params.append(assignee.lower())
+        if validated is not None:
+            clauses.append("validated = ?")
+            params.append(1 if validated else 0)
+        if source:
+            clauses.append("source_lower = ?")
+            params.append(source.lower().strip())
+        if department:
+            clauses.append("instr(department_lower, ?) > 0")
+            params.append(department.lower().strip())
+
+        # Tâche sans deadline : incluse pour deadline_before, exclue pour deadline_after
+        date_filters = (
+            (deadline_before, "(deadline_ts IS NULL OR deadline_ts < ?)"),
+            (deadline_after, "deadline_ts > ?"),
+            (created_after, "(created_ts IS NULL OR created_ts > ?)"),
+            (created_before, "(created_ts IS NULL OR created_ts < ?)"),
+        )
+        for value, clause in date_filters:
+            iso = _iso_or_none(value)
+            if iso:
+                clauses.append(clause)
+                params.append(iso)
+
+        sql = "SELECT id FROM unified_tasks"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY position"
+        with self.lock:
+            return [row[0] for row in self.conn.execute(sql, params)]
+
+    # =====================================
+    # Collections documentaires (réunions)
+    # =====================================
+
+    def _check_collection(self, table: str):
+        if table not in DOCUMENT_COLLECTIONS:
+            raise ValueError(f"Collection inconnue: {table}")
+
+    def load_documents(self, table: str) -> List[Dict]:
+        self._check_collection(table)
+        with self.lock:
+            rows = self.conn.execute(f"SELECT body FROM {table} ORDER BY position").fetchall()
+        return [json.loads(body) for (body,) in rows]
+
+    def save_documents(self, table: str, documents: List[Dict]):
+        self._check_collection(table)
+        id_field = DOCUMENT_COLLECTIONS[table]
+        with self.lock, self.conn:
+            self.conn.execute(f"DELETE FROM {table}")
+            self.conn.executemany(
+                f"INSERT INTO {table} (position, doc_id, body) VALUES (?, ?, ?)",
+                [
+                    (position, doc.get(id_field) if id_field else None, json.dumps(doc, ensure_ascii=False))
+                    for position, doc in enumerate(documents)
+                ]
+            )
+
+    def append_document(self, table: str, document: Dict):
+        """Ajout en fin de collection sans réécrire les autres lignes (meeting_logs)"""
+        self._check_collection(table)
+        id_field = DOCUMENT_COLLECTIONS[table]
+        with self.lock, self.conn:
+            self.conn.execute(
+                f"INSERT INTO {table} (position, doc_id, body) "
+                f"VALUES ((SELECT COALESCE(MAX(position) + 1, 0) FROM {table}), ?, ?)",
+                (document.get(id_field) if id_field else None, json.dumps(document, ensure_ascii=False))
+            )
+
+    def find_documents(self, table: str, doc_id: str) -> List[Dict]:
+        """Documents d'une collection par id (index doc_id)"""
+        self._check_collection(table)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT body FROM {table} WHERE doc_id = ? ORDER BY position", (doc_id,)
+            ).fetchall()
+        return [json.loads(body) for (body,) in rows]
+
+    # =====================================
+    # Cache des emails traités
+    # =====================================
+
+    def cache_contains(self, hash_email: str) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM email_cache WHERE hash = ?", (hash_email,)).fetchone() is not None
+
+    def cache_get(self, hash_email: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute("SELECT body FROM email_cache WHERE hash = ?", (hash_email,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def cache_put(self, hash_email: str, info: Dict):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO email_cache (hash, processed_at, body) VALUES (?, ?, ?)",
+                (hash_email, info.get("processed_at"), json.dumps(info, ensure_ascii=False))
+            )
+
+    def cache_all(self) -> Dict[str, Dict]:
+        with self.lock:
+            rows = self.conn.execute("SELECT hash, body FROM email_cache").fetchall()
+        return {hash_email: json.loads(body) for hash_email, body in rows}
+
+    def cache_purge_older_than(self, jours_retention: int) -> int:
+        """Supprimer les entrées plus anciennes que la rétention, retourne le nombre conservé"""
+        date_limite = (datetime.now() - timedelta(days=jours_retention)).isoformat(timespec='seconds')
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM email_cache WHERE processed_at IS NOT NULL AND processed_at < ?", (date_limite,)
+            )
+            return self.conn.execute("SELECT COUNT(*) FROM email_cache").fetchone()[0]
+
+    def cache_stats(self) -> Dict:
+        with self.lock:
+            total, last = self.conn.execute("SELECT COUNT(*), MAX(processed_at) FROM email_cache").fetchone()
+        return {"total_emails_caches": total, "cache_existe": True, "derniere_entree": last}
+
+    # =====================================
+    # Migration depuis les fichiers JSON
+    # =====================================
+
+    def migrate_from_json(self, data_dir: str = DATA_DIR) -> Dict[str, int]:
+        """Importer tous les fichiers JSON de data/ (remplace le contenu des tables)"""
+        counts = {}
+        for table, filename in JSON_FILES.items():
+            path = os.path.join(data_dir, filename)
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if table == "unified_tasks":
+                if os.path.exists(os.path.splitext(path)[0] + ".journal.jsonl"):
+                    # Inclure les mutations encore dans le journal
+                    from task_persistence import JournalPersistence
+                    data = JournalPersistence(path).load()
+                self.save_unified_tasks(data)
+            elif table == "email_cache":
+                hashes = (data or {}).get("emails_hashes", {})
+                with self.lock, self.conn:
+                    self.conn.execute("DELETE FROM email_cache")
+                for hash_email, info in hashes.items():
+                    self.cache_put(hash_email, info)
+                data = hashes
+            else:
+                self.save_documents(table, data if isinstance(data, list) else [])
+            counts[table] = len(data)
+        return counts
+
+
+class SQLitePersistence:
+    """Persistance du TaskStore dans la table unified_tasks"""
+
+    mode = "sqlite"
+
+    def __init__(self, storage: SQLiteStorage):
+        self.storage = storage
+        self.stats = {"rows_written": 0}
+
+    def signature(self):
+        # data_version ne change pas pour nos propres écritures : seules
+        # les écritures d'autres processus provoquent un rechargement
+        return (self.storage.db_path, self.storage.data_version())
+
+    def load(self) -> List[Dict]:
+        return self.storage.load_unified_tasks()
+
+    def save_all(self, tasks: List[Dict]):
+        self.storage.save_unified_tasks(tasks)
+        self.stats["rows_written"] += len(tasks)
+
+    def record(self, record: Dict, get_tasks: Callable[[], List[Dict]]):
+        """Une mutation = une ligne mise à jour"""
+        self.storage.apply_task_record(record)
+        self.stats["rows_written"] += 1
+
+    def needs_compaction(self) -> bool:
+        return False
+
+    def get_stats(self) -> Dict:
+        return {"mode": self.mode, "db_path": self.storage.db_path, **self.stats}
+
+
+_storage_instance = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Optional[SQLiteStorage]:
+    """Instance SQLite partagée si STORAGE_BACKEND=sqlite, sinon None (fichiers JSON)"""
+    global _storage_instance
+    if STORAGE_BACKEND != "sqlite":
+        return None
+    with _storage_lock:
+        if _storage_instance is None:
+            _storage_instance = SQLiteStorage(SQLITE_DB_PATH)
+        return _storage_instance
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migration des fichiers JSON vers SQLite")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--db", default=SQLITE_DB_PATH, help="Chemin de la base SQLite")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Répertoire des fichiers JSON")
+    args = parser.parse_args()
+
+    storage = SQLiteStorage(args.db)
+    counts = storage.migrate_from_json(args.data_dir)
+    storage.close()
+    print(f"✅ Migration terminée vers {args.db}")
+    for table, count in counts.items():
+        print(f"   - {table}: {count} enregistrement(s)")
+    print("👉 Activer le backend avec STORAGE_BACKEND=sqlite")
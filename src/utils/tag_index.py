@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+🏷️ INDEX DES TAGS
+================
+
+Index tag → ensemble d'ids tenu à jour par les événements du TaskStore
+(add_tags_to_task, remove_tag_from_task, create_task_with_tags passent tous
+par put()) :
+- tâches d'un tag : lecture directe de l'ensemble
+- filtres tag/tags de /all-tasks : intersection des ensembles (ET logique)
+- tags populaires : tas de comptes avec invalidation paresseuse,
+  top-k en O(k log T) sans trier tous les tags
+
+Égalités de popularité départagées par ordre alphabétique.
+"""
+
+import heapq
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+def _task_tags(task: Dict) -> frozenset:
+    """Tags (chaînes) d'une tâche"""
+    tags = task.get("tags") or []
+    if not isinstance(tags, list):
+        return frozenset()
+    return frozenset(tag for tag in tags if isinstance(tag, str))
+
+
+class TagIndex:
+    """Ensembles d'ids par tag et tas de popularité"""
+
+    def __init__(self, store):
+        self.store = store
+        self._postings: Dict[str, Set[str]] = {}
+        self._task_tags: Dict[str, frozenset] = {}
+        # Entrées (-compte, tag) ; une entrée est périmée si le compte a changé
+        self._heap: List[Tuple[int, str]] = []
+        self._dirty = True
+        self.stats = {"rebuilds": 0, "incremental_updates": 0, "heap_compactions": 0}
+        store.add_listener(self._on_store_event)
+
+    # =====================================
+    # Maintenance
+    # =====================================
+
+    def _count(self, tag: str) -> int:
+        return len(self._postings.get(tag, ()))
+
+    def _on_store_event(self, event: str, task: Optional[Dict]):
+        if event == "reset":
+            self._dirty = True
+        elif event == "upsert" and not self._dirty:
+            task_id = task["id"]
+            previous = self._task_tags.get(task_id, frozenset())
+            current = _task_tags(task)
+            if previous == current:
+                return
+            for tag in previous - current:
+                bucket = self._postings[tag]
+                bucket.discard(task_id)
+                if not bucket:
+                    del self._postings[tag]
+            for tag in current - previous:
+                self._postings.setdefault(tag, set()).add(task_id)
+            for tag in previous ^ current:
+                if self._count(tag):
+                    heapq.heappush(self._heap, (-self._count(tag), tag))
+            if current:
+                self._task_tags[task_id] = current
+            else:
+                self._task_tags.pop(task_id, None)
+            self.stats["incremental_updates"] += 1
+            if len(self._heap) > 2 * len(self._postings) + 64:
+                self._rebuild_heap()
+                self.stats["heap_compactions"] += 1
+
+    def _rebuild_heap(self):
+        self._heap = [(-len(ids), tag) for tag, ids in self._postings.items()]
+        heapq.heapify(self._heap)
+
+    def _rebuild(self):
+        self._postings = {}
+        self._task_tags = {}
+        for task in self.store.all():
+            tags = _task_tags(task)
+            if not tags:
+                continue
+            self._task_tags[task["id"]] = tags
+            for tag in tags:
+                self._postings.setdefault(tag, set()).add(task["id"])
+        self._rebuild_heap()
+        self._dirty = False
+        self.stats["rebuilds"] += 1
+
+    def _ensure_built(self):
+        self.store.ensure_fresh()
+        if self._dirty:
+            self._rebuild()
+
+    # =====================================
+    # Lecture
+    # =====================================
+
+    def ids_with_tag(self, tag: str) -> Set[str]:
+        with self.store.lock:
+            self._ensure_built()
+            return set(self._postings.get(tag, ()))
+
+    def ids_with_all(self, tags: Iterable[str]) -> Set[str]:
+        """Ids des tâches portant tous les tags (intersection, plus petit ensemble d'abord)"""
+        with self.store.lock:
+            self._ensure_built()
+            buckets = sorted((self._postings.get(tag, set()) for tag in set(tags)), key=len)
+            if not buckets:
+                return set()
+            result = set(buckets[0])
+            for bucket in buckets[1:]:
+                if not result:
+                    break
+                result &= bucket
+            return result
+
+    def counts(self) -> Dict[str, int]:
+        """Nombre de tâches par tag"""
+        with self.store.lock:
+            self._ensure_built()
+            return {tag: len(ids) for tag, ids in self._postings.items()}
+
+    def tasks_with_tags(self) -> int:
+        with self.store.lock:
+            self._ensure_built()
+            return len(self._task_tags)
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        """Les k tags les plus utilisés (tag, compte), sans trier tous les tags"""
+        with self.store.lock:
+            self._ensure_built()
+            result, valid = [], []
+            seen = set()
+            while self._heap and len(result) < k:
+                negative_count, tag = heapq.heappop(self._heap)
+                if tag in seen or -negative_count != self._count(tag):
+                    continue  # Entrée périmée ou doublon : abandonnée
+                seen.add(tag)
+                valid.append((negative_count, tag))
+                result.append((tag, -negative_count))
+            for entry in valid:
+                heapq.heappush(self._heap, entry)
+            return result
+
+    def by_popularity(self) -> List[Tuple[str, int]]:
+        """Tous les tags par popularité décroissante"""
+        with self.store.lock:
+            self._ensure_built()
+            return sorted(((tag, len(ids)) for tag, ids in self._postings.items()),
+                          key=lambda item: (-item[1], item[0]))
+
+    def get_stats(self) -> Dict:
+        with self.store.lock:
+            return {**self.stats, "tags": len(self._postings), "heap_size": len(self._heap)}
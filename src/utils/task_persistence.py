@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+💾 PERSISTANCE DES TÂCHES UNIFIÉES
+=================================
+
+Deux modes de persistance pour le TaskStore :
+- "snapshot" : réécriture complète de unified_tasks.json à chaque mutation
+  (comportement historique)
+- "journal"  : chaque mutation est ajoutée en une ligne JSONL dans un journal
+  (write-ahead log). Une compaction en arrière-plan fusionne le journal dans
+  le snapshot lorsque sa taille dépasse un seuil.
+
+Reprise après crash : snapshot + journal en cours de compaction + journal.
+"""
+
+import json
+import os
+import tempfile
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seuil de taille du journal déclenchant une compaction (1 Mo)
+JOURNAL_COMPACTION_THRESHOLD_BYTES = 1024 * 1024
+
+
+def appliquer_enregistrement(tasks_by_id: Dict[str, Dict], record: Dict):
+    """
+    Rejouer un enregistrement du journal sur un dict id → tâche.
+
+    Types d'enregistrements :
+    - {"op": "add", "task": {...}}
+    - {"op": "update", "id": "...", "set": {...}, "history": {...}}
+    """
+    op = record.get("op")
+    if op == "add":
+        task = record.get("task") or {}
+        if task.get("id"):
+            tasks_by_id[task["id"]] = task
+    elif op == "update":
+        task = tasks_by_id.get(record.get("id"))
+        if task is None:
+            return
+        task.update(record.get("set", {}))
+        entry = record.get("history")
+        if entry:
+            history = task.setdefault("history", [])
+            # Idempotent : un crash pendant la compaction peut rejouer l'entrée
+            if not history or history[-1] != entry:
+                history.append(entry)
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+class SnapshotPersistence:
+    """Persistance historique : un seul fichier JSON réécrit en entier"""
+
+    mode = "snapshot"
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def signature(self):
+        return _file_signature(self.file_path)
+
+    def _read_snapshot(self) -> List[Dict]:
+        try:
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, list) else []
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            print(f"❌ Erreur chargement tâches: {e}")
+            return []
+
+    def _write_temp(self, tasks: List[Dict]) -> str:
+        """Écrire dans un fichier temporaire unique du même répertoire (écrivains concurrents)"""
+        directory = os.path.dirname(self.file_path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(self.file_path)}.",
+                                        suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(tasks, f, ensure_ascii=False, indent=2)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        return tmp_path
+
+    def _write_snapshot(self, tasks: List[Dict]):
+        """Écriture atomique (fichier temporaire + os.replace)"""
+        os.replace(self._write_temp(tasks), self.file_path)
+
+    def load(self) -> List[Dict]:
+        return self._read_snapshot()
+
+    def save_all(self, tasks: List[Dict]):
+        self._write_snapshot(tasks)
+
+    def record(self, record: Dict, get_tasks: Callable[[], List[Dict]]):
+        """Sans journal, toute mutation réécrit le snapshot complet"""
+        self._write_snapshot(get_tasks())
+
+    def needs_compaction(self) -> bool:
+        return False
+
+    def get_stats(self) -> Dict:
+        return {"mode": self.mode, "snapshot_size": (self.signature() or (0, 0))[1]}
+
+
+class JournalPersistence(SnapshotPersistence):
+    """Snapshot JSON + journal append-only des mutations (JSONL)"""
+
+    mode = "journal"
+
+    def __init__(self, file_path: str,
+                 compaction_threshold: int = JOURNAL_COMPACTION_THRESHOLD_BYTES,
+                 fsync: bool = False):
+        super().__init__(file_path)
+        base, _ = os.path.splitext(file_path)
+        self.journal_path = f"{base}.journal.jsonl"
+        self.compacting_path = f"{base}.journal.compacting.jsonl"
+        self.compaction_threshold = compaction_threshold
+        self.fsync = fsync
+        self.stats = {
+            "records_appended": 0,
+            "bytes_appended": 0,
+            "records_replayed": 0,
+            "compactions": 0,
+            "compactions_discarded": 0
+        }
+
+    def signature(self):
+        return (_file_signature(self.file_path), _file_signature(self.journal_path))
+
+    def _replay(self, path: str, tasks_by_id: Dict[str, Dict]):
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Dernière ligne tronquée par un crash : on l'ignore
+                    print(f"⚠️ Enregistrement journal illisible ignoré ({path})")
+                    continue
+                appliquer_enregistrement(tasks_by_id, record)
+                self.stats["records_replayed"] += 1
+
+    def load(self) -> List[Dict]:
+        """Snapshot + rejeu du journal (reprise après crash)"""
+        tasks_by_id = {}
+        for task in self._read_snapshot():
+            if task.get("id"):
+                tasks_by_id[task["id"]] = task
+        self._replay(self.compacting_path, tasks_by_id)
+        self._replay(self.journal_path, tasks_by_id)
+        return list(tasks_by_id.values())
+
+    def record(self, record: Dict, get_tasks: Callable[[], List[Dict]]):
+        """Ajouter une mutation au journal : coût proportionnel à la taille du changement"""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(line)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self.stats["records_appended"] += 1
+        self.stats["bytes_appended"] += len(line)
+
+    def save_all(self, tasks: List[Dict]):
+        """Réécriture complète : le journal devient inutile"""
+        self._write_snapshot(tasks)
+        for path in (self.journal_path, self.compacting_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def needs_compaction(self) -> bool:
+        sig = _file_signature(self.journal_path)
+        return sig is not None and sig[1] >= self.compaction_threshold
+
+    def rotate_journal(self):
+        """Geler le journal courant avant compaction (appelé sous verrou)"""
+        if not os.path.exists(self.journal_path):
+            return
+        if os.path.exists(self.compacting_path):
+            # Compaction précédente interrompue : concaténer pour ne rien perdre
+            with open(self.journal_path, "r", encoding="utf-8") as src, \
+                    open(self.compacting_path, "a", encoding="utf-8") as dst:
+                dst.write(src.read())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.compacting_path)
+
+    def prepare_compacted_snapshot(self, tasks: List[Dict]) -> str:
+        """Écrire le snapshot fusionné dans un fichier temporaire (hors verrou)"""
+        return self._write_temp(tasks)
+
+    def commit_compacted_snapshot(self, tmp_path: str):
+        """Publier le snapshot fusionné puis supprimer le journal gelé (sous verrou)"""
+        os.replace(tmp_path, self.file_path)
+        if os.path.exists(self.compacting_path):
+            os.remove(self.compacting_path)
+        self.stats["compactions"] += 1
+
+    def discard_compacted_snapshot(self, tmp_path: str):
+        """Abandonner un snapshot fusionné périmé (réécriture complète entre-temps)"""
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        self.stats["compactions_discarded"] += 1
+
+    def get_stats(self) -> Dict:
+        journal_sig = _file_signature(self.journal_path)
+        return {
+            **super().get_stats(),
+            **self.stats,
+            "journal_size": journal_sig[1] if journal_sig else 0,
+            "compaction_threshold": self.compaction_threshold
+        }
+
+
+def creer_persistance(file_path: str, mode: str = "journal") -> SnapshotPersistence:
+    """Créer la persistance selon le mode configuré ("snapshot" ou "journal")"""
+    if mode == "snapshot":
+        return SnapshotPersistence(file_path)
+    if mode == "journal":
+        return JournalPersistence(file_path)
+    raise ValueError(f"Mode de persistance inconnu: {mode}")
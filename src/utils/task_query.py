@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+🔎 REQUÊTES SUR LES TÂCHES UNIFIÉES
+==================================
+
+Filtres de /all-tasks (phases 1 et 2) évalués sur le TaskStore :
+- statut / priorité / source / validated via les index secondaires
+- responsable, département et plages de dates sur les seuls candidats restants
+
+Mêmes règles que les fonctions de filtrage de main.py (variantes FR/EN,
+tâches sans deadline incluses pour deadline_before, exclues pour deadline_after).
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+STATUS_MAPPING = {
+    "à faire": "pending",
+    "a faire": "pending",
+    "en cours": "in_progress",
+    "en_cours": "in_progress",
+    "terminé": "completed",
+    "termine": "completed",
+    "fini": "completed",
+    "annulé": "cancelled",
+    "annule": "cancelled"
+}
+
+PRIORITY_MAPPING = {
+    "haute": "high",
+    "elevé": "high",
+    "élevé": "high",
+    "urgent": "high",
+    "moyenne": "medium",
+    "normale": "medium",
+    "normal": "medium",
+    "moyen": "medium",
+    "critique": "critical",
+    "prioritaire": "critical",
+    "basse": "low",
+    "faible": "low",
+    "bas": "low"
+}
+
+
+def normalize_filter_value(field, value):
+    """Normaliser une valeur de statut/priorité (variantes acceptées)"""
+    if not value:
+        return ""
+    value_lower = str(value).lower().strip()
+    if field == "status":
+        return STATUS_MAPPING.get(value_lower, value_lower)
+    elif field == "priority":
+        return PRIORITY_MAPPING.get(value_lower, value_lower)
+    return value_lower
+
+
+def parse_date_string(date_str):
+    """Parser YYYY-MM-DD ou ISO, None si non interprétable"""
+    if not date_str or date_str == "null" or not isinstance(date_str, str):
+        return None
+    try:
+        if len(date_str) == 10 and date_str.count('-') == 2:
+            return datetime.strptime(date_str, "%Y-%m-%d")
+        if 'T' in date_str:
+            if '.' in date_str:
+                date_str = date_str.split('.')[0]
+            return datetime.fromisoformat(date_str.replace('Z', ''))
+        return None
+    except Exception:
+        return None
+
+
+def extract_department_from_task(task: Dict) -> Optional[str]:
+    """Département d'une tâche depuis ses métadonnées email/meeting"""
+    metadata = task.get('source_metadata', {}) or {}
+    if 'original_email' in metadata:
+        dept = (metadata['original_email'] or {}).get('departement')
+        if isinstance(dept, dict) and 'nom' in dept:
+            return dept['nom']
+        elif isinstance(dept, str):
+            return dept
+    if 'meeting' in metadata or task.get('origine_meeting'):
+        dept = (task.get('origine_meeting') or {}).get('departement')
+        if dept:
+            return dept
+    return None
+
+
+def _ids_matching_index(store, field: str, predicate) -> Set[str]:
+    """Union des ids dont la valeur indexée satisfait le prédicat (O(valeurs distinctes))"""
+    ids: Set[str] = set()
+    for value in store.index_values(field):
+        if predicate(value):
+            ids |= store.ids_where(field, value)
+    return ids
+
+
+def _date_filters_match(task: Dict, deadline_before, deadline_after, created_after, created_before) -> bool:
+    if deadline_before or deadline_after:
+        task_deadline = parse_date_string(task.get('deadline'))
+        if deadline_before and task_deadline and task_deadline >= deadline_before:
+            return False
+        if deadline_after and (not task_deadline or task_deadline <= deadline_after):
+            return False
+    if created_after or created_before:
+        task_created = parse_date_string(task.get('created_at'))
+        if task_created:
+            if created_after and task_created <= created_after:
+                return False
+            if created_before and task_created >= created_before:
+                return False
+    return True
+
+
+def query_tasks(store,
+                status: str = None,
+                priority: str = None,
+                assignee: str = None,
+                validated: bool = None,
+                source: str = None,
+                department: str = None,
+                deadline_before: str = None,
+                deadline_after: str = None,
+                created_after: str = None,
+                created_before: str = None,
+                candidate_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """
+    Filtrer les tâches du store (ordre du fichier conservé).
+
+    Les filtres indexés (et candidate_ids, ex. résultat de recherche) réduisent
+    d'abord l'ensemble candidat ; les autres ne sont évalués que sur ces candidats.
+    """
+    candidate_sets = [] if candidate_ids is None else [set(candidate_ids)]
+    if status:
+        wanted = normalize_filter_value("status", status)
+        candidate_sets.append(_ids_matching_index(
+            store, "statut", lambda v: bool(v) and normalize_filter_value("status", v) == wanted))
+    if priority:
+        wanted = normalize_filter_value("priority", priority)
+        candidate_sets.append(_ids_matching_index(
+            store, "priorite", lambda v: bool(v) and normalize_filter_value("priority", v) == wanted))
+    if source:
+        wanted = source.lower().strip()
+        candidate_sets.append(_ids_matching_index(
+            store, "source", lambda v: str(v or "").lower() == wanted))
+    if validated is not None:
+        # Tâche sans champ validated = non validée
+        candidate_sets.append(_ids_matching_index(
+            store, "validated", lambda v: (False if v is None else v) == validated))
+
+    with store.lock:
+        if candidate_sets:
+            candidate_ids = set.intersection(*candidate_sets)
+            tasks = [store.get(task_id) for task_id in store.order_ids(candidate_ids)]
+        else:
+            tasks = store.all()
+
+    assignee_lower = assignee.lower() if assignee else None
+    department_lower = department.lower().strip() if department else None
+    deadline_before_date = parse_date_string(deadline_before)
+    deadline_after_date = parse_date_string(deadline_after)
+    created_after_date = parse_date_string(created_after)
+    created_before_date = parse_date_string(created_before)
+    has_date_filters = any((deadline_before_date, deadline_after_date, created_after_date, created_before_date))
+
+    if not (assignee_lower or department_lower or has_date_filters):
+        return tasks
+
+    results = []
+    for task in tasks:
+        if assignee_lower and assignee_lower not in (task.get('responsable') or '').lower():
+            continue
+        if department_lower:
+            task_dept = extract_department_from_task(task)
+            if not task_dept or department_lower not in task_dept.lower():
+                continue
+        if has_date_filters and not _date_filters_match(
+                task, deadline_before_date, deadline_after_date, created_after_date, created_before_date):
+            continue
+        results.append(task)
+    return results
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+📊 STATISTIQUES INCRÉMENTALES DES TÂCHES
+=======================================
+
+Compteurs agrégés tenus à jour par les événements du TaskStore, sans
+parcourir les tâches à chaque appel de /tasks/stats :
+- statut, priorité, source, département, validation, tags
+- croisements statut × priorité et département × statut
+  (taux de complétion par département)
+
+Chaque tâche mémorise sa contribution : une mise à jour retire l'ancienne
+et ajoute la nouvelle (O(nombre de tags)). Un rechargement complet marque
+les compteurs à reconstruire au prochain accès ; rebuild() force le recalcul.
+"""
+
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from task_query import extract_department_from_task
+
+# Dimensions simples : nom → extraction de la valeur
+DIMENSIONS = {
+    "status": lambda t: t.get("statut"),
+    "priority": lambda t: t.get("priorite"),
+    "source": lambda t: t.get("source"),
+    "department": extract_department_from_task,
+    "validated": lambda t: bool(t.get("validated")),
+}
+
+
+def _hashable(value):
+    """Valeur utilisable comme clé de compteur"""
+    if isinstance(value, (list, dict)):
+        return str(value)
+    return value
+
+
+class TaskStatistics:
+    """Compteurs agrégés maintenus incrémentalement"""
+
+    def __init__(self, store):
+        self.store = store
+        # id → contribution ((valeurs des dimensions), tags)
+        self._contributions: Dict[str, Tuple[tuple, tuple]] = {}
+        self._counters: Dict[str, Counter] = {name: Counter() for name in DIMENSIONS}
+        self._tags = Counter()
+        self._tasks_with_tags = 0
+        self._status_priority = Counter()
+        self._department_status = Counter()
+        self._dirty = True
+        self.stats = {"rebuilds": 0, "incremental_updates": 0}
+        store.add_listener(self._on_store_event)
+
+    # =====================================
+    # Maintenance
+    # =====================================
+
+    @staticmethod
+    def _contribution(task: Dict) -> Tuple[tuple, tuple]:
+        values = tuple(_hashable(extract(task)) for extract in DIMENSIONS.values())
+        tags = task.get("tags") or []
+        tags = tuple(_hashable(tag) for tag in tags) if isinstance(tags, list) else ()
+        return values, tags
+
+    def _apply(self, contribution: Tuple[tuple, tuple], sign: int):
+        values, tags = contribution
+        for name, value in zip(DIMENSIONS, values):
+            self._counters[name][value] += sign
+        status, priority, _, department, _ = values
+        self._status_priority[(status, priority)] += sign
+        if department:
+            self._department_status[(department, status)] += sign
+        for tag in tags:
+            self._tags[tag] += sign
+        if tags:
+            self._tasks_with_tags += sign
+
+    def _on_store_event(self, event: str, task: Optional[Dict]):
+        if event == "reset":
+            self._dirty = True
+        elif event == "upsert" and not self._dirty:
+            previous = self._contributions.get(task["id"])
+            current = self._contribution(task)
+            if previous == current:
+                return
+            if previous is not None:
+                self._apply(previous, -1)
+            self._apply(current, +1)
+            self._contributions[task["id"]] = current
+            self.stats["incremental_updates"] += 1
+
+    def rebuild(self):
+        """Recalculer tous les compteurs depuis les tâches du store"""
+        with self.store.lock:
+            self._contributions = {}
+            self._counters = {name: Counter() for name in DIMENSIONS}
+            self._tags = Counter()
+            self._tasks_with_tags = 0
+            self._status_priority = Counter()
+            self._department_status = Counter()
+            for task in self.store.all():
+                contribution = self._contribution(task)
+                self._contributions[task["id"]] = contribution
+                self._apply(contribution, +1)
+            self._dirty = False
+            self.stats["rebuilds"] += 1
+
+    def _ensure_built(self):
+        self.store.ensure_fresh()
+        if self._dirty:
+            self.rebuild()
+
+    # =====================================
+    # Lecture
+    # =====================================
+
+    @staticmethod
+    def _positive(counter: Counter) -> Dict:
+        return {key: count for key, count in counter.items() if count > 0}
+
+    def counts(self, dimension: str) -> Dict:
+        """Nombre de tâches par valeur d'une dimension (status, priority, ...)"""
+        with self.store.lock:
+            self._ensure_built()
+            return self._positive(self._counters[dimension])
+
+    def summary(self) -> Dict:
+        """Tous les compteurs et croisements (coût proportionnel aux valeurs distinctes)"""
+        with self.store.lock:
+            self._ensure_built()
+            total = len(self._contributions)
+            by_status = self._positive(self._counters["status"])
+
+            status_priority: Dict = {}
+            for (status, priority), count in self._status_priority.items():
+                if count > 0:
+                    status_priority.setdefault(str(status), {})[str(priority)] = count
+
+            by_department = self._positive(self._counters["department"])
+            by_department.pop(None, None)
+            department_completion = {}
+            for department, department_total in by_department.items():
+                completed = self._department_status.get((department, "completed"), 0)
+                department_completion[department] = {
+                    "total": department_total,
+                    "completed": completed,
+                    "completion_rate": round(completed / department_total * 100, 1)
+                }
+
+            validated = self._counters["validated"]
+            return {
+                "total": total,
+                "by_status": by_status,
+                "by_priority": self._positive(self._counters["priority"]),
+                "by_source": self._positive(self._counters["source"]),
+                "by_department": by_department,
+                "validated": {"validated": validated[True], "not_validated": validated[False]},
+                "tags": self._positive(self._tags),
+                "tasks_with_tags": self._tasks_with_tags,
+                "status_by_priority": status_priority,
+                "department_completion": department_completion,
+                "completion_rate": round(by_status.get("completed", 0) / total * 100, 1) if total else 0.0
+            }
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "dirty": self._dirty}
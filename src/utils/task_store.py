@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+🗂️ TASK STORE - Stockage résident et indexé des tâches unifiées
+===============================================================
+
+Charge data/unified_tasks.json une seule fois et garde en mémoire :
+- un index principal id → tâche (accès O(1))
+- des index secondaires sur statut, source, priorite et validated
+
+Le fichier n'est relu que si sa signature disque (mtime + taille) change,
+par exemple lorsqu'un autre processus l'a réécrit. L'écriture est déléguée
+à une persistance (snapshot complet ou journal append-only, voir
+task_persistence.py).
+"""
+
+import json
+import threading
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from task_persistence import SnapshotPersistence
+
+# Champs indexés pour les filtres fréquents de /all-tasks
+INDEXED_FIELDS = ("statut", "source", "priorite", "validated")
+
+
+class TaskStore:
+    """Stockage en mémoire des tâches unifiées avec index par id et index secondaires"""
+
+    def __init__(self, file_path: str, indexed_fields: Iterable[str] = INDEXED_FIELDS,
+                 persistence: Optional[SnapshotPersistence] = None):
+        self.file_path = file_path
+        self.persistence = persistence or SnapshotPersistence(file_path)
+        self.indexed_fields = tuple(indexed_fields)
+        # Verrou réentrant partagé avec le gestionnaire (watchers + API en parallèle)
+        self.lock = threading.RLock()
+        self._tasks: Dict[str, Dict] = {}
+        self._indexes: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in self.indexed_fields}
+        # Position de chaque tâche dans le fichier (ordre stable pour les résultats)
+        self._positions: Dict[str, int] = {}
+        self._signature = None
+        self._compacting = False
+        # Incrémentée à chaque réécriture complète : invalide la compaction en cours
+        self._generation = 0
+        # Version monotone : incrémentée à chaque changement (écriture ou rechargement)
+        self.version = 0
+        # Identifiant d'instance : une version n'a de sens que pour un même processus
+        self.instance_id = uuid.uuid4().hex[:8]
+        # Abonnés notifiés des changements : callback(event, task)
+        # event = "reset" (rechargement complet, task=None) ou "upsert"
+        self._listeners: List[Callable[[str, Optional[Dict]], None]] = []
+        self.stats = {
+            "loads": 0,
+            "reloads_detected": 0,
+            "writes": 0,
+            "full_rewrites": 0
+        }
+
+    # =====================================
+    # Chargement et détection des changements disque
+    # =====================================
+
+    def ensure_fresh(self):
+        """Recharger depuis le disque uniquement si le fichier a changé"""
+        with self.lock:
+            if self._compacting:
+                # Les fichiers changent pendant la compaction : état mémoire de référence
+                return
+            signature = self.persistence.signature()
+            if self._signature is not None and signature == self._signature:
+                return
+            if self._signature is not None:
+                self.stats["reloads_detected"] += 1
+            self._rebuild(self.persistence.load())
+            self._signature = signature
+            self.stats["loads"] += 1
+
+    def _rebuild(self, tasks: List[Dict]):
+        """Reconstruire l'index principal et les index secondaires"""
+        self._tasks = {}
+        self._indexes = {field: {} for field in self.indexed_fields}
+        self._positions = {}
+        for task in tasks:
+            task_id = task.get("id")
+            if not task_id:
+                continue
+            if task_id in self._tasks:
+                self._unindex_task(self._tasks[task_id])
+            else:
+                self._positions[task_id] = len(self._positions)
+            self._tasks[task_id] = task
+            self._index_task(task)
+        self.version += 1
+        self._notify("reset", None)
+
+    # =====================================
+    # Abonnés (index dérivés : recherche, tri, statistiques...)
+    # =====================================
+
+    def add_listener(self, callback: Callable[[str, Optional[Dict]], None]):
+        """Abonner un index dérivé aux changements (appelé sous le verrou du store)"""
+        with self.lock:
+            self._listeners.append(callback)
+
+    def _notify(self, event: str, task: Optional[Dict]):
+        for callback in self._listeners:
+            try:
+                callback(event, task)
+            except Exception as e:
+                print(f"⚠️ Erreur mise à jour index dérivé: {e}")
+
+    # =====================================
+    # Maintenance des index secondaires
+    # =====================================
+
+    @staticmethod
+    def _index_key(value: Any) -> Any:
+        """Clé d'index hashable (les listes/dicts sont indexés par leur repr JSON)"""
+        if isinstance(value, (list, dict)):
+            return json.dumps(value, sort_keys=True, ensure_ascii=False)
+        return value
+
+    def _index_task(self, task: Dict):
+        task_id = task["id"]
+        for field in self.indexed_fields:
+            key = self._index_key(task.get(field))
+            self._indexes[field].setdefault(key, set()).add(task_id)
+
+    def _unindex_task(self, task: Dict):
+        task_id = task["id"]
+        for field in self.indexed_fields:
+            key = self._index_key(task.get(field))
+            bucket = self._indexes[field].get(key)
+            if bucket is not None:
+                bucket.discard(task_id)
+                if not bucket:
+                    del self._indexes[field][key]
+
+    # =====================================
+    # Lecture
+    # =====================================
+
+    def all(self) -> List[Dict]:
+        """Toutes les tâches, dans l'ordre du fichier"""
+        with self.lock:
+            self.ensure_fresh()
+            return list(self._tasks.values())
+
+    def current_version(self) -> int:
+        """Version des données après vérification du disque (clé de cache)"""
+        with self.lock:
+            self.ensure_fresh()
+            return self.version
+
+    def etag_token(self) -> str:
+        """Jeton de version unique entre redémarrages (base des ETags)"""
+        return f"{self.instance_id}:{self.current_version()}"
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Copie de l'index id → tâche, sans vérifier le disque (sûr depuis un abonné)"""
+        with self.lock:
+            return dict(self._tasks)
+
+    def count(self) -> int:
+        with self.lock:
+            self.ensure_fresh()
+            return len(self._tasks)
+
+    def get(self, task_id: str) -> Optional[Dict]:
+        """Accès O(1) par id (retourne l'objet résident, ne pas le modifier)"""
+        with self.lock:
+            self.ensure_fresh()
+            return self._tasks.get(task_id)
+
+    def ids_where(self, field: str, value: Any) -> Set[str]:
+        """Ids des tâches dont le champ indexé vaut exactement `value`"""
+        with self.lock:
+            self.ensure_fresh()
+            if field not in self._indexes:
+                raise KeyError(f"Champ non indexé: {field}")
+            return set(self._indexes[field].get(self._index_key(value), ()))
+
+    def where(self, field: str, value: Any) -> List[Dict]:
+        """Tâches dont le champ indexé vaut `value`, dans l'ordre du fichier"""
+        with self.lock:
+            ids = self.ids_where(field, value)
+            return [self._tasks[task_id] for task_id in self.order_ids(ids)]
+
+    def position(self, task_id: str) -> Optional[int]:
+        """Position de la tâche dans l'ordre du fichier"""
+        with self.lock:
+            return self._positions.get(task_id)
+
+    def order_ids(self, ids: Iterable[str]) -> List[str]:
+        """Trier des ids selon l'ordre du fichier (ids inconnus ignorés)"""
+        with self.lock:
+            return sorted((task_id for task_id in ids if task_id in self._positions),
+                          key=self._positions.__getitem__)
+
+    def index_values(self, field: str) -> Dict[Any, int]:
+        """Valeurs distinctes d'un champ indexé avec leur nombre de tâches"""
+        with self.lock:
+            self.ensure_fresh()
+            return {key: len(ids) for key, ids in self._indexes[field].items()}
+
+    # =====================================
+    # Écriture
+    # =====================================
+
+    def put(self, task: Dict):
+        """Ajouter ou remplacer une tâche en maintenant les index"""
+        with self.lock:
+            self.ensure_fresh()
+            task_id = task["id"]
+            previous = self._tasks.get(task_id)
+            if previous is not None:
+                self._unindex_task(previous)
+            else:
+                self._positions[task_id] = len(self._positions)
+            self._tasks[task_id] = task
+            self._index_task(task)
+            self.version += 1
+            self._notify("upsert", task)
+
+    def replace_all(self, tasks: List[Dict]):
+        """Remplacer l'ensemble des tâches (utilisé par save_all_tasks)"""
+        with self.lock:
+            self._rebuild(tasks)
+
+    def persist(self):
+        """Réécrire toutes les tâches et mémoriser la nouvelle signature"""
+        with self.lock:
+            self._generation += 1
+            try:
+                self.persistence.save_all(list(self._tasks.values()))
+                self.stats["writes"] += 1
+                self.stats["full_rewrites"] += 1
+            except Exception as e:
+                print(f"❌ Erreur sauvegarde tâches: {e}")
+            self._signature = self.persistence.signature()
+
+    def persist_record(self, record: Dict):
+        """
+        Persister une seule mutation (voir appliquer_enregistrement).
+        En mode journal, seule la ligne du changement est écrite.
+        """
+        with self.lock:
+            try:
+                self.persistence.record(record, lambda: list(self._tasks.values()))
+                self.stats["writes"] += 1
+            except Exception as e:
+                print(f"❌ Erreur sauvegarde tâches: {e}")
+            self._signature = self.persistence.signature()
+            if self.persistence.needs_compaction():
+                self._start_compaction()
+
+    # =====================================
+    # Compaction du journal en arrière-plan
+    # =====================================
+
+    def _start_compaction(self):
+        """Geler le journal et fusionner dans le snapshot dans un thread dédié"""
+        if self._compacting:
+            return
+        self._compacting = True
+        # Les tâches résidentes sont remplacées (jamais modifiées en place) :
+        # une copie de la liste suffit pour un instantané cohérent
+        tasks = list(self._tasks.values())
+        try:
+            self.persistence.rotate_journal()
+        except Exception as e:
+            print(f"⚠️ Erreur rotation journal: {e}")
+            self._compacting = False
+            return
+        threading.Thread(target=self._run_compaction, args=(tasks, self._generation), daemon=True).start()
+
+    def _run_compaction(self, tasks: List[Dict], generation: int):
+        tmp_path = None
+        try:
+            tmp_path = self.persistence.prepare_compacted_snapshot(tasks)
+        except Exception as e:
+            print(f"⚠️ Erreur compaction journal: {e}")
+        with self.lock:
+            try:
+                if tmp_path is not None and generation == self._generation:
+                    self.persistence.commit_compacted_snapshot(tmp_path)
+                elif tmp_path is not None:
+                    # persist() a réécrit le snapshot entre-temps : il contient déjà tout
+                    self.persistence.discard_compacted_snapshot(tmp_path)
+            except Exception as e:
+                print(f"⚠️ Erreur compaction journal: {e}")
+            finally:
+                # Le disque n'a pas été surveillé pendant la compaction (écritures d'un
+                # autre processus possibles) : relire à la prochaine lecture
+                self._signature = None
+                self._compacting = False
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {
+                **self.stats,
+                "tasks_in_memory": len(self._tasks),
+                "indexed_fields": list(self.indexed_fields),
+                "persistence": self.persistence.get_stats()
+            }
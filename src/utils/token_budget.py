@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+🔢 BUDGET DE TOKENS
+==================
+
+Estimation locale (sans tokenizer ni appel réseau) du nombre de tokens
+d'un texte, utilisée pour dimensionner les lots de l'extraction groupée.
+Heuristique : ~4 caractères par token pour du français/anglais courant,
+les textes très courts étant arrondis vers le haut.
+
+✂️ Préparation des entrées : les prompts embarquaient l'email ou la
+transcription complète. Avant chaque appel, le texte est :
+1. nettoyé : historique cité (">", "Le … a écrit :" daté ou suivi de ">",
+   "-----Original Message-----"), signature ("-- ", "Cordialement," suivi
+   seulement de lignes de signature) et mentions légales retirés
+2. ramené au budget du type d'appel (LLM_INPUT_BUDGET_<TYPE>) : début et fin
+   conservés pour un appel unique, découpage en morceaux pour l'extraction de tâches
+"""
+
+import math
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, List
+
+CARACTERES_PAR_TOKEN = 4.0
+
+# Budget d'entrée (tokens du texte de l'email) par type d'appel
+BUDGETS_ENTREE = {
+    "filtrage": 500,
+    "departement": 400,
+    "resume": 1500,
+    "explicite": 1500,
+    "implicite": 1500,
+    "fusionnee": 2500,
+    "groupee": 800,
+}
+BUDGET_ENTREE_DEFAUT = 1500
+
+# Part du budget gardée au début du texte lors d'une troncature (le reste : la fin)
+PART_DEBUT = 0.75
+MARQUEUR_TRONCATURE = "\n[…]\n"
+
+# "Le … a écrit :" n'est un en-tête de réponse que s'il porte une date, une heure ou une adresse
+# (voir _entete_credible) : "Le client a écrit :" dans le corps du message n'est pas coupé
+_ENTETE_A_ECRIT = re.compile(r"^\s*(le|on)\b.{0,200}\b(a écrit|wrote)\s*:\s*$", re.IGNORECASE | re.MULTILINE)
+_DATE_OU_ADRESSE = re.compile(r"\d{1,2}[:h]\d{2}|\d{1,2}[/.-]\d{1,2}|\b\d{4}\b|@", re.IGNORECASE)
+_ENTETES_REPONSE = [
+    _ENTETE_A_ECRIT,
+    re.compile(r"^\s*-{2,}\s*(message d'origine|original message|message transféré|forwarded message)\s*-{2,}",
+               re.IGNORECASE | re.MULTILINE),
+    re.compile(r"^\s*(de|from)\s*:.*\n\s*(envoyé|sent|date)\s*:", re.IGNORECASE | re.MULTILINE),
+]
+_LIGNES_ENTETE = re.compile(
+    r"^\s*(-{2,}.*-{2,}|(de|from|à|to|cc|date|envoyé|sent|objet|subject)\s*:.*)$", re.IGNORECASE | re.MULTILINE
+)
+_SEPARATEUR_SIGNATURE = re.compile(r"^-- ?$", re.MULTILINE)
+_FORMULES_POLITESSE = re.compile(
+    r"^\s*(cordialement|bien cordialement|bien à vous|salutations|sincères salutations|"
+    r"best regards|kind regards|regards|merci|merci d'avance|bonne journée)\s*[,.!]?\s*$",
+    re.IGNORECASE
+)
+_MENTIONS = [
+    re.compile(r"(ce (message|courriel|mail)|this (e-?mail|message)).{0,120}\b(confidenti|intended)", re.IGNORECASE | re.DOTALL),
+    re.compile(r"(pensez à l'environnement|please consider the environment)", re.IGNORECASE),
+    re.compile(r"^(envoyé (de|depuis) mon|sent from my)\b", re.IGNORECASE),
+]
+# Lignes de fin examinées pour trouver une formule de politesse
+LIGNES_SIGNATURE = 8
+# Ligne de signature : courte (nom, fonction, téléphone), sans ponctuation de phrase finale
+LONGUEUR_MAX_LIGNE_SIGNATURE = 60
+MOTS_MAX_LIGNE_SIGNATURE = 6
+# En dessous, le début du texte n'est pas un vrai message (ex : transfert sans commentaire)
+MIN_CARACTERES_UTILES = 20
+
+_stats_lock = threading.Lock()
+_stats = {"appels": 0, "tokens_avant": 0, "tokens_apres": 0, "troncatures": 0, "decoupages": 0, "morceaux": 0}
+
+
+def estimer_tokens(texte: str) -> int:
+    """Nombre de tokens approximatif d'un texte"""
+    if not texte:
+        return 0
+    return max(1, math.ceil(len(texte) / CARACTERES_PAR_TOKEN))
+
+
+def budget_entree(type_appel: str) -> int:
+    """Budget de tokens du texte pour un type d'appel (surcharge : LLM_INPUT_BUDGET_<TYPE>)"""
+    valeur = os.getenv(f"LLM_INPUT_BUDGET_{type_appel.upper()}")
+    if valeur:
+        return int(valeur)
+    return BUDGETS_ENTREE.get(type_appel, BUDGET_ENTREE_DEFAUT)
+
+
+# =====================================
+# Nettoyage
+# =====================================
+
+def _contenu_utile(texte: str) -> int:
+    """Caractères hors lignes d'en-tête (De :, Objet :, ----- Message transféré -----)"""
+    return len(_LIGNES_ENTETE.sub("", texte).strip())
+
+
+def _entete_credible(texte: str, m: re.Match) -> bool:
+    """En-tête "Le … a écrit :" avec date, heure ou adresse, ou suivi de lignes citées ">" """
+    if _DATE_OU_ADRESSE.search(m.group(0)):
+        return True
+    suite = [ligne for ligne in texte[m.end():].split("\n") if ligne.strip()]
+    return bool(suite) and suite[0].lstrip().startswith(">")
+
+
+def _couper_historique(texte: str) -> str:
+    # Premier en-tête de réponse précédé d'un vrai message ; un transfert sans commentaire est gardé
+    debuts = sorted(m.start() for entete in _ENTETES_REPONSE for m in entete.finditer(texte)
+                    if entete is not _ENTETE_A_ECRIT or _entete_credible(texte, m))
+    for debut in debuts:
+        if _contenu_utile(texte[:debut]) >= MIN_CARACTERES_UTILES:
+            texte = texte[:debut]
+            break
+    return "\n".join(ligne for ligne in texte.split("\n") if not ligne.lstrip().startswith(">"))
+
+
+def _couper_signature(texte: str) -> str:
+    m = _SEPARATEUR_SIGNATURE.search(texte)
+    if m and len(texte[:m.start()].strip()) >= MIN_CARACTERES_UTILES:
+        texte = texte[:m.start()]
+    # Depuis la fin : seule une formule suivie uniquement de lignes de signature est coupée
+    # ("Merci !" au milieu du message, suivi de demandes, est gardé)
+    lignes = texte.rstrip().split("\n")
+    examinees = 0
+    for i in range(len(lignes) - 1, 0, -1):
+        ligne = lignes[i].strip()
+        if not ligne:
+            continue
+        if _FORMULES_POLITESSE.match(ligne):
+            # Formules consécutives ("Merci,\nCordialement,") retirées ensemble
+            while i > 1 and _FORMULES_POLITESSE.match(lignes[i - 1]):
+                i -= 1
+            if len("\n".join(lignes[:i]).strip()) >= MIN_CARACTERES_UTILES:
+                return "\n".join(lignes[:i])
+            return texte
+        examinees += 1
+        if examinees > LIGNES_SIGNATURE or not _ligne_signature(ligne):
+            break
+    return texte
+
+
+def _ligne_signature(ligne: str) -> bool:
+    return (len(ligne) <= LONGUEUR_MAX_LIGNE_SIGNATURE and len(ligne.split()) <= MOTS_MAX_LIGNE_SIGNATURE
+            and not ligne.endswith((".", "?", "!", ":", ";")))
+
+
+def _retirer_mentions(texte: str) -> str:
+    paragraphes = re.split(r"\n\s*\n", texte)
+    return "\n\n".join(p for p in paragraphes if not any(mention.search(p.strip()) for mention in _MENTIONS))
+
+
+@lru_cache(maxsize=512)
+def nettoyer_texte(texte: str) -> str:
+    """Texte sans historique cité, signature ni mentions légales (original si rien d'utile ne reste)"""
+    if not texte:
+        return ""
+    nettoye = texte.replace("\r\n", "\n").replace("\r", "\n")
+    nettoye = _couper_historique(nettoye)
+    nettoye = _retirer_mentions(nettoye)
+    nettoye = _couper_signature(nettoye)
+    nettoye = "\n".join(ligne.rstrip() for ligne in nettoye.split("\n"))
+    nettoye = re.sub(r"\n{3,}", "\n\n", nettoye).strip()
+    return nettoye if len(nettoye) >= MIN_CARACTERES_UTILES else texte.strip()
+
+
+def mesurer_reduction(texte: str) -> Dict[str, int]:
+    """Tokens du texte brut et du texte nettoyé (journalisation)"""
+    return {"avant": estimer_tokens(texte), "apres": estimer_tokens(nettoyer_texte(texte or ""))}
+
+
+# =====================================
+# Mise au budget
+# =====================================
+
+def _couper_proprement(texte: str, longueur: int, depuis_la_fin: bool = False) -> str:
+    """Couper à une limite de mot plutôt qu'au milieu"""
+    if len(texte) <= longueur:
+        return texte
+    if depuis_la_fin:
+        morceau = texte[len(texte) - longueur:]
+        espace = morceau.find(" ")
+        return morceau[espace + 1:] if 0 <= espace < 40 else morceau
+    morceau = texte[:longueur]
+    espace = morceau.rfind(" ")
+    return morceau[:espace] if espace > longueur - 40 else morceau
+
+
+def tronquer_au_budget(texte: str, budget: int) -> str:
+    """Garder le début (consignes) et la fin (dernières demandes) d'un texte trop long"""
+    if estimer_tokens(texte) <= budget:
+        return texte
+    caracteres = int(budget * CARACTERES_PAR_TOKEN) - len(MARQUEUR_TRONCATURE)
+    debut = _couper_proprement(texte, int(caracteres * PART_DEBUT))
+    fin = _couper_proprement(texte, caracteres - len(debut), depuis_la_fin=True)
+    return debut.rstrip() + MARQUEUR_TRONCATURE + fin.lstrip()
+
+
+def decouper_au_budget(texte: str, budget: int) -> List[str]:
+    """Morceaux consécutifs (par paragraphes, puis lignes) tenant chacun dans le budget"""
+    if estimer_tokens(texte) <= budget:
+        return [texte]
+    limite = int(budget * CARACTERES_PAR_TOKEN)
+    unites: List[str] = []
+    for paragraphe in re.split(r"\n\s*\n", texte):
+        if len(paragraphe) <= limite:
+            unites.append(paragraphe)
+            continue
+        for ligne in paragraphe.split("\n"):
+            while len(ligne) > limite:
+                coupe = _couper_proprement(ligne, limite)
+                unites.append(coupe)
+                ligne = ligne[len(coupe):].lstrip()
+            unites.append(ligne)
+
+    morceaux: List[str] = []
+    courant = ""
+    for unite in unites:
+        if courant and len(courant) + 2 + len(unite) > limite:
+            morceaux.append(courant)
+            courant = unite
+        else:
+            courant = f"{courant}\n\n{unite}" if courant else unite
+    if courant.strip():
+        morceaux.append(courant)
+    return [morceau for morceau in morceaux if morceau.strip()]
+
+
+def _compter(avant: str, apres: List[str], tronque: bool):
+    with _stats_lock:
+        _stats["appels"] += len(apres)
+        _stats["tokens_avant"] += estimer_tokens(avant)
+        _stats["tokens_apres"] += sum(estimer_tokens(morceau) for morceau in apres)
+        if tronque:
+            _stats["troncatures"] += 1
+        if len(apres) > 1:
+            _stats["decoupages"] += 1
+            _stats["morceaux"] += len(apres)
+
+
+def preparer_entree(texte: str, type_appel: str) -> str:
+    """Texte nettoyé puis tronqué au budget du type d'appel (un seul appel IA)"""
+    texte = texte or ""
+    nettoye = nettoyer_texte(texte)
+    pret = tronquer_au_budget(nettoye, budget_entree(type_appel))
+    _compter(texte, [pret], pret is not nettoye)
+    return pret
+
+
+def preparer_morceaux(texte: str, type_appel: str) -> List[str]:
+    """Texte nettoyé puis découpé au budget du type d'appel (un appel IA par morceau)"""
+    texte = texte or ""
+    morceaux = decouper_au_budget(nettoyer_texte(texte), budget_entree(type_appel))
+    _compter(texte, morceaux, False)
+    return morceaux
+
+
+def estimer_tokens_entree(texte: str, type_appel: str) -> int:
+    """Tokens effectivement envoyés pour ce texte (après nettoyage et budget), sans compter dans les stats"""
+    return min(estimer_tokens(nettoyer_texte(texte or "")), budget_entree(type_appel))
+
+
+def statistiques_tokens() -> Dict:
+    """Tokens d'entrée avant / après préparation, cumulés sur tous les appels"""
+    with _stats_lock:
+        stats = dict(_stats)
+    avant = stats["tokens_avant"]
+    stats["reduction_pct"] = round((avant - stats["tokens_apres"]) / avant * 100, 1) if avant else 0.0
+    return stats
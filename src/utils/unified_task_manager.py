@@ -7,18 +7,59 @@ Gestionnaire pour le nouveau système de tâches unifié
 Compatible avec l'ancien système + nouvelles fonctionnalités
 """
 
+import copy
 import json
 import os
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import uuid
 
+from task_store import TaskStore
+from task_persistence import creer_persistance
+from task_query import query_tasks
+from search_index import SearchIndex
+from relevance_ranking import BM25FRanker
+from sort_index import FILE_ORDER, SORT_KEYS, SortIndex
+from cursor_pagination import decoder_curseur, encoder_curseur, pagination_curseur
+from sqlite_storage import SQLitePersistence, get_storage
+from change_log import ChangeLog
+from task_statistics import TaskStatistics
+from tag_index import TagIndex
+
+# Mode de persistance : "journal" (append-only + compaction) ou "snapshot" (réécriture complète)
+# Ignoré si STORAGE_BACKEND=sqlite (voir sqlite_storage.py)
+PERSISTENCE_MODE = os.getenv("UNIFIED_TASKS_PERSISTENCE", "journal")
+
 class UnifiedTaskManager:
     """Gestionnaire pour les tâches unifiées"""
     
-    def __init__(self):
+    def __init__(self, persistence_mode: str = None):
         self.unified_file = "data/unified_tasks.json"
-        self.ensure_file_exists()
+        # Backend SQLite si configuré, sinon fichiers JSON
+        self.sqlite_storage = get_storage()
+        if self.sqlite_storage is not None:
+            self.persistence_mode = "sqlite"
+            persistence = SQLitePersistence(self.sqlite_storage)
+        else:
+            self.ensure_file_exists()
+            self.persistence_mode = persistence_mode or PERSISTENCE_MODE
+            persistence = creer_persistance(self.unified_file, self.persistence_mode)
+        # Stockage résident : les données ne sont relues que si elles changent sur disque
+        self.store = TaskStore(self.unified_file, persistence=persistence)
+        # Index plein texte tenu à jour par les événements du store
+        self.search_index = SearchIndex(self.store)
+        self.ranker = BM25FRanker(self.search_index)
+        self.sort_index = SortIndex(self.store)
+        # Journal borné des changements (synchronisation différentielle)
+        self.change_log = ChangeLog(self.store)
+        # Compteurs agrégés (statut, priorité, source, département, tags...)
+        self.statistics = TaskStatistics(self.store)
+        # Index tag → ids et popularité des tags
+        self.tag_index = TagIndex(self.store)
+    
+    def is_available(self) -> bool:
+        """Store utilisable : backend SQLite (aucun fichier JSON requis) ou fichier unifié présent"""
+        return self.sqlite_storage is not None or os.path.exists(self.unified_file)
     
     def ensure_file_exists(self):
         """S'assurer que le fichier unifié existe"""
@@ -27,26 +68,17 @@ class UnifiedTaskManager:
                 json.dump([], f, ensure_ascii=False, indent=2)
     
     def load_all_tasks(self) -> List[Dict]:
-        """Charger toutes les tâches unifiées"""
-        try:
-            with open(self.unified_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"❌ Erreur chargement tâches: {e}")
-            return []
+        """Charger toutes les tâches unifiées (objets résidents, lecture seule)"""
+        return self.store.all()
     
     def save_all_tasks(self, tasks: List[Dict]):
         """Sauvegarder toutes les tâches"""
-        try:
-            with open(self.unified_file, "w", encoding="utf-8") as f:
-                json.dump(tasks, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"❌ Erreur sauvegarde tâches: {e}")
+        with self.store.lock:
+            self.store.replace_all(tasks)
+            self.store.persist()
     
     def add_task(self, task_data: Dict) -> str:
         """Ajouter une nouvelle tâche au système unifié"""
-        tasks = self.load_all_tasks()
-        
         # Générer ID unique
         task_id = f"task_{task_data.get('source', 'manual')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{str(uuid.uuid4())[:8]}"
         
@@ -75,57 +107,151 @@ class UnifiedTaskManager:
             "comments": []
         }
         
-        tasks.append(new_task)
-        self.save_all_tasks(tasks)
+        with self.store.lock:
+            self.store.put(new_task)
+            self.store.persist_record({"op": "add", "task": new_task})
         return task_id
     
     def get_task_by_id(self, task_id: str) -> Optional[Dict]:
-        """Récupérer une tâche par son ID"""
-        tasks = self.load_all_tasks()
-        for task in tasks:
-            if task.get("id") == task_id:
-                return task
-        return None
+        """Récupérer une tâche par son ID (copie modifiable)"""
+        task = self.store.get(task_id)
+        return copy.deepcopy(task) if task is not None else None
     
     def update_task(self, task_id: str, updates: Dict, history_entry: Dict = None) -> Optional[Dict]:
         """Mettre à jour une tâche avec historique avancé"""
-        tasks = self.load_all_tasks()
-        
-        for i, task in enumerate(tasks):
-            if task.get("id") == task_id:
-                # Mettre à jour les champs
-                for key, value in updates.items():
-                    if key not in ["id", "created_at"]:  # Champs protégés (history retiré)
-                        task[key] = value
-                
-                # Mettre à jour timestamp automatiquement
-                if "updated_at" not in updates:
-                    task["updated_at"] = datetime.now().isoformat()
-                
-                # Ajouter à l'historique (entry personnalisée ou auto)
-                if "history" not in task:
-                    task["history"] = []
-                
-                if history_entry:
-                    task["history"].append(history_entry)
-                else:
-                    task["history"].append({
-                        "action": "updated",
-                        "timestamp": datetime.now().isoformat(),
-                        "user": "system",
-                        "details": f"Champs modifiés: {', '.join(updates.keys())}"
-                    })
-                
-                tasks[i] = task
-                self.save_all_tasks(tasks)
-                return task  # Retourner la tâche mise à jour
-        
-        return None  # Tâche non trouvée
+        with self.store.lock:
+            current = self.store.get(task_id)
+            if current is None:
+                return None  # Tâche non trouvée
+            
+            # Travailler sur une copie : les index sont mis à jour par put()
+            task = copy.deepcopy(current)
+            
+            # Mettre à jour les champs
+            changed_fields = {}
+            for key, value in updates.items():
+                if key not in ["id", "created_at"]:  # Champs protégés (history retiré)
+                    task[key] = value
+                    changed_fields[key] = value
+            
+            # Mettre à jour timestamp automatiquement
+            if "updated_at" not in updates:
+                task["updated_at"] = datetime.now().isoformat()
+                changed_fields["updated_at"] = task["updated_at"]
+            
+            # Ajouter à l'historique (entry personnalisée ou auto)
+            if "history" not in task:
+                task["history"] = []
+            
+            if not history_entry:
+                history_entry = {
+                    "action": "updated",
+                    "timestamp": datetime.now().isoformat(),
+                    "user": "system",
+                    "details": f"Champs modifiés: {', '.join(updates.keys())}"
+                }
+            task["history"].append(history_entry)
+            
+            self.store.put(task)
+            # Seul le delta est journalisé (champs modifiés + entrée d'historique)
+            self.store.persist_record({
+                "op": "update",
+                "id": task_id,
+                "set": changed_fields,
+                "history": history_entry
+            })
+            return copy.deepcopy(task)  # Retourner la tâche mise à jour
+    
+    def query_tasks(self, candidate_ids: set = None, **filters) -> List[Dict]:
+        """
+        Filtres phase 1/2 de /all-tasks (status, priority, assignee, validated,
+        source, department, deadline_before/after, created_after/before).
+        En SQLite les filtres sont évalués en SQL, sinon sur les index mémoire.
+        candidate_ids restreint le résultat (ex. ids issus de search_task_ids).
+        """
+        if self.sqlite_storage is None:
+            return query_tasks(self.store, candidate_ids=candidate_ids, **filters)
+        with self.store.lock:
+            self.store.ensure_fresh()
+            task_ids = self.sqlite_storage.query_task_ids(**filters)
+            if candidate_ids is not None:
+                task_ids = [task_id for task_id in task_ids if task_id in candidate_ids]
+            return [task for task in map(self.store.get, task_ids) if task is not None]
+    
+    def search_task_ids(self, query: str, search_in: List[str] = None) -> set:
+        """Ids des tâches correspondant à la recherche (index inversé)"""
+        return self.search_index.search(query, search_in or ["description"])
+    
+    def rank_tasks(self, query: str, tasks: List[Dict], k: int) -> List[Dict]:
+        """Classer par pertinence BM25F : les k premières ordonnées, le reste inchangé"""
+        return self.ranker.top_k(query, tasks, k)
+    
+    def sort_tasks(self, tasks: List[Dict], sort_by: str, order: str = "asc", k: int = None) -> List[Dict]:
+        """Trier via les clés pré-triées : les k premières ordonnées, le reste inchangé"""
+        return self.sort_index.sort_page(tasks, sort_by, order, k)
+    
+    @staticmethod
+    def _cursor_sort(sort_by: str, order: str):
+        """Champ et ordre effectifs d'une pagination par curseur (None si incompatible)"""
+        if not sort_by:
+            return FILE_ORDER, "asc"
+        if sort_by not in SORT_KEYS:
+            return None, None
+        return sort_by, "desc" if (order or "").lower() == "desc" else "asc"
+    
+    def next_cursor(self, page_tasks: List[Dict], sort_by: str, order: str, scope: str) -> Optional[str]:
+        """Curseur désignant la fin de `page_tasks` (None si le tri ne le permet pas)"""
+        sort_field, sort_order = self._cursor_sort(sort_by, order)
+        if not page_tasks or sort_field is None:
+            return None
+        entry = self.sort_index.entry(sort_field, page_tasks[-1].get("id"))
+        return encoder_curseur(sort_field, sort_order, entry, scope) if entry else None
+    
+    def cursor_page(self, tasks: List[Dict], sort_by: str, order: str, limit: int,
+                    cursor: str = None, scope: str = "") -> Dict:
+        """
+        Page suivant `cursor` parmi `tasks` (reprise en O(log n) dans l'index de tri).
+        Lève ValueError si le curseur est invalide ou incompatible avec la requête.
+        """
+        sort_field, sort_order = self._cursor_sort(sort_by, order)
+        if sort_field is None:
+            raise ValueError(f"Tri '{sort_by}' non compatible avec la pagination par curseur")
+        after = decoder_curseur(cursor, sort_field, sort_order, scope) if cursor else None
+        page_tasks, has_next = self.sort_index.page_after(tasks, sort_field, sort_order, after, limit)
+        next_cursor = self.next_cursor(page_tasks, sort_by, order, scope) if has_next else None
+        return {
+            "tasks": page_tasks,
+            "pagination": pagination_curseur(page_tasks, has_next, len(tasks), limit, next_cursor)
+        }
+    
+    def get_changes_since(self, since: str = None, since_timestamp: float = None) -> Dict:
+        """
+        Tâches insérées / modifiées / supprimées depuis une version du store
+        (ou un horodatage epoch). resync_required si le client est trop en retard.
+        """
+        since_version = None
+        if since is not None:
+            since_version = self.change_log.parse_since(since, self.store.instance_id)
+            if since_version is None:
+                # Jeton d'une autre instance (redémarrage) ou illisible
+                since_version = -1
+        changes = self.change_log.changes_since(since_version, since_timestamp)
+        changes["version_token"] = f"{self.store.instance_id}:{changes['version']}"
+        return changes
+    
+    def task_ids_with_tags(self, tags: List[str]) -> set:
+        """Ids des tâches portant tous les tags (intersection d'ensembles)"""
+        return self.tag_index.ids_with_all(tags)
+    
+    def get_tasks_with_tags(self, tags: List[str]) -> List[Dict]:
+        """Tâches portant tous les tags, dans l'ordre du fichier"""
+        with self.store.lock:
+            task_ids = self.store.order_ids(self.tag_index.ids_with_all(tags))
+            return [self.store.get(task_id) for task_id in task_ids]
     
     def get_tasks_by_source(self, source: str) -> List[Dict]:
         """Récupérer tâches par source (email/meeting)"""
-        tasks = self.load_all_tasks()
-        return [task for task in tasks if task.get("source") == source]
+        return self.store.where("source", source)
     
     def calculate_task_age(self, created_at: str) -> int:
         """Calculer l'âge de la tâche en jours"""
@@ -140,8 +266,7 @@ class UnifiedTaskManager:
     
     def get_tasks_by_status(self, status: str) -> List[Dict]:
         """Récupérer tâches par statut"""
-        tasks = self.load_all_tasks()
-        return [task for task in tasks if task.get("statut") == status]
+        return self.store.where("statut", status)
     
     def get_legacy_format_email_tasks(self) -> List[Dict]:
         """
@@ -203,30 +328,23 @@ class UnifiedTaskManager:
         return legacy_tasks
     
     def get_statistics(self) -> Dict:
-        """Statistiques sur les tâches"""
-        tasks = self.load_all_tasks()
-        
-        stats = {
-            "total_tasks": len(tasks),
-            "by_source": {},
-            "by_status": {},
-            "by_priority": {}
+        """Statistiques sur les tâches (compteurs incrémentaux, sans parcours)"""
+        summary = self.statistics.summary()
+        return {
+            "total_tasks": summary["total"],
+            "by_source": summary["by_source"],
+            "by_status": summary["by_status"],
+            "by_priority": summary["by_priority"]
         }
-        
-        for task in tasks:
-            # Par source
-            source = task.get("source", "unknown")
-            stats["by_source"][source] = stats["by_source"].get(source, 0) + 1
-            
-            # Par statut
-            status = task.get("statut", "unknown")
-            stats["by_status"][status] = stats["by_status"].get(status, 0) + 1
-            
-            # Par priorité
-            priority = task.get("priorite", "unknown")
-            stats["by_priority"][priority] = stats["by_priority"].get(priority, 0) + 1
-        
-        return stats
+    
+    def get_statistics_summary(self) -> Dict:
+        """Tous les compteurs agrégés et croisements (voir task_statistics.py)"""
+        return self.statistics.summary()
+    
+    def rebuild_statistics(self) -> Dict:
+        """Reconstruire les compteurs depuis zéro (contrôle / réparation)"""
+        self.statistics.rebuild()
+        return self.statistics.summary()
 
 # Instance globale
 unified_task_manager = UnifiedTaskManager()
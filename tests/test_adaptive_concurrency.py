@@ -0,0 +1,75 @@
+"""
+Tests du contrôleur de concurrence adaptatif (AIMD)
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from adaptive_concurrency import ControleurAIMD, cause_surcharge
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+class TestFenetre:
+    """Augmentation additive, diminution multiplicative"""
+
+    def test_additive_increase_while_latency_is_on_target(self):
+        controleur = ControleurAIMD(initiale=4, maximum=6, latence_cible=1.0)
+        for _ in range(4):
+            controleur.signaler_succes(0.2)
+        assert controleur.limite == 4
+        controleur.signaler_succes(0.2)
+        assert controleur.limite == 5
+        for _ in range(50):
+            controleur.signaler_succes(0.2)
+        assert controleur.limite == 6
+
+    def test_slow_calls_do_not_increase(self):
+        controleur = ControleurAIMD(initiale=4, latence_cible=1.0)
+        for _ in range(5):
+            controleur.signaler_succes(1.2)
+        assert controleur.limite == 4
+
+    def test_multiplicative_decrease_on_429_with_cooldown(self):
+        controleur = ControleurAIMD(initiale=16, latence_cible=1.0, refroidissement=60)
+        controleur.signaler_echec(RateLimitError())
+        controleur.signaler_echec(RateLimitError())
+        assert controleur.limite == 8
+        stats = controleur.get_stats()
+        assert stats["diminutions"]["429"] == 1 and stats["echecs"] == 2
+        assert stats["historique"][-1]["evenement"] == "429"
+
+    def test_timeouts_and_rising_p95_cut_the_window(self):
+        controleur = ControleurAIMD(initiale=8, latence_cible=1.0, refroidissement=0)
+        controleur.signaler_echec(APITimeoutError())
+        assert controleur.limite == 4
+        for _ in range(10):
+            controleur.signaler_succes(2.0)
+        assert controleur.limite == 2
+        assert controleur.get_stats()["diminutions"] == {"429": 0, "timeout": 1, "p95": 1}
+
+    def test_other_errors_and_minimum(self):
+        controleur = ControleurAIMD(initiale=2, minimum=2, refroidissement=0)
+        controleur.signaler_echec(ValueError("JSON"))
+        controleur.signaler_echec(RateLimitError())
+        assert controleur.limite == 2
+        assert cause_surcharge(ValueError()) is None and cause_surcharge(TimeoutError()) == "timeout"
+
+
+class TestPlaces:
+    """Les appels en vol ne dépassent jamais la fenêtre"""
+
+    def test_acquire_and_release(self):
+        controleur = ControleurAIMD(initiale=2)
+        assert controleur.acquerir() and controleur.acquerir()
+        assert not controleur.acquerir()
+        controleur.liberer()
+        assert controleur.acquerir()
+        assert controleur.get_stats()["en_vol"] == 2 and controleur.get_stats()["refus"] == 1
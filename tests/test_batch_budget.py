@@ -0,0 +1,47 @@
+"""
+Tests du découpage des batches par budget de tokens (extraction groupée)
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from batch_processor import BatchProcessor
+from token_budget import budget_entree, estimer_tokens
+
+
+def _email(i, longueur):
+    return {"id": f"e{i}", "objet": "", "texte": "x" * longueur, "expediteur": "a@b.c"}
+
+
+class TestBatchBudget:
+    """Beaucoup d'emails courts par lot, les emails longs seuls"""
+
+    def test_token_estimate(self):
+        assert estimer_tokens("") == 0
+        assert estimer_tokens("abc") == 1
+        assert estimer_tokens("x" * 400) == 100
+
+    def test_short_emails_are_packed_up_to_the_budget(self):
+        processor = BatchProcessor(max_emails_par_lot=50)
+        lots = processor.decouper_par_budget([_email(i, 400) for i in range(10)], budget_tokens=300)
+        assert [len(lot) for lot, _ in lots] == [3, 3, 3, 1]
+        assert all(tokens <= 300 for _, tokens in lots)
+
+    def test_count_cap_and_oversized_email(self):
+        processor = BatchProcessor(max_emails_par_lot=4)
+        emails = [_email(i, 40) for i in range(6)] + [_email(99, 8000)]
+        lots = processor.decouper_par_budget(emails, budget_tokens=500)
+        assert [len(lot) for lot, _ in lots] == [4, 2, 1]
+        assert lots[-1][0][0]["id"] == "e99"
+        # Un email long est compté au plafond de son extraction (texte tronqué avant l'appel)
+        assert lots[-1][1] == budget_entree("groupee")
+
+    def test_budget_batches_keep_urgent_first(self, monkeypatch):
+        processor = BatchProcessor()
+        monkeypatch.setattr(processor, "filtrer_emails_a_traiter", lambda emails: emails)
+        emails = [_email(i, 40) for i in range(3)]
+        emails[2]["objet"] = "URGENT panne"
+        batches = processor.creer_batches_intelligents(emails, budget_tokens=1000)
+        assert [b["type"] for b in batches] == ["urgent", "normal"]
+        assert batches[1]["taille"] == 2 and batches[1]["tokens_estimes"] == 20
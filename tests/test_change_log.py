@@ -0,0 +1,63 @@
+"""
+Tests du journal des changements (synchronisation différentielle)
+"""
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from change_log import ChangeLog
+from task_persistence import SnapshotPersistence
+from task_store import TaskStore
+
+
+def _setup(tmp_path, max_entries=100):
+    path = tmp_path / "unified_tasks.json"
+    path.write_text(json.dumps([{"id": "a"}, {"id": "b"}]), encoding="utf-8")
+    store = TaskStore(str(path))
+    log = ChangeLog(store, max_entries=max_entries)
+    store.ensure_fresh()
+    return store, log, path
+
+
+def _ids(tasks):
+    return [task["id"] for task in tasks]
+
+
+class TestChangeLog:
+    """Upserts, différences au rechargement, rétention bornée"""
+
+    def test_upserts_since_version(self, tmp_path):
+        store, log, _ = _setup(tmp_path)
+        start = store.current_version()
+        store.put({"id": "c"})
+        middle = store.current_version()
+        store.put({"id": "a", "statut": "completed"})
+
+        changes = log.changes_since(start)
+        assert _ids(changes["inserted"]) == ["c"] and _ids(changes["updated"]) == ["a"]
+        assert _ids(log.changes_since(middle)["inserted"]) == []
+        assert log.changes_since(store.current_version())["updated"] == []
+
+    def test_reload_from_disk_reports_deletions(self, tmp_path):
+        store, log, path = _setup(tmp_path)
+        start = store.current_version()
+        # Réécriture par un autre processus
+        SnapshotPersistence(str(path)).save_all([{"id": "a", "statut": "done"}, {"id": "d"}])
+
+        changes = log.changes_since(start)
+        assert _ids(changes["updated"]) == ["a"]
+        assert _ids(changes["inserted"]) == ["d"]
+        assert changes["deleted"] == ["b"]
+
+    def test_resync_required_when_too_far_behind(self, tmp_path):
+        store, log, _ = _setup(tmp_path, max_entries=3)
+        start = store.current_version()
+        for i in range(5):
+            store.put({"id": f"n{i}"})
+
+        assert log.changes_since(start)["resync_required"] is True
+        assert log.changes_since(store.current_version() - 2)["resync_required"] is False
+        assert ChangeLog.parse_since("autre:3", store.instance_id) is None
+        assert ChangeLog.parse_since(f"{store.instance_id}:3", store.instance_id) == 3
@@ -0,0 +1,93 @@
+"""
+Tests de la pagination par curseur (keyset)
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from cursor_pagination import decoder_curseur, empreinte_requete, encoder_curseur
+from sort_index import FILE_ORDER, SortIndex
+from task_store import TaskStore
+
+
+def _setup(tmp_path, n=25):
+    tasks = [{"id": f"t{i:02d}", "priorite": ["high", "medium", "low"][i % 3]} for i in range(n)]
+    path = tmp_path / "unified_tasks.json"
+    path.write_text(json.dumps(tasks), encoding="utf-8")
+    store = TaskStore(str(path))
+    return store, SortIndex(store)
+
+
+def _walk(store, index, sort_by, order, limit, scope, on_page=None, subset=None):
+    seen, after = [], None
+    while True:
+        cursor = encoder_curseur(sort_by, order, after, scope) if after else None
+        if cursor:
+            after = decoder_curseur(cursor, sort_by, order, scope)
+        page, has_next = index.page_after(subset or store.all(), sort_by, order, after, limit)
+        seen.extend(t["id"] for t in page)
+        if on_page:
+            on_page()
+        if not has_next:
+            return seen
+        after = index.entry(sort_by, page[-1]["id"])
+
+
+class TestCursorPagination:
+    """Parcours complet, égalités et insertions concurrentes"""
+
+    def test_walk_matches_full_sort_with_ties(self, tmp_path):
+        store, index = _setup(tmp_path)
+        expected_desc = [t["id"] for t in index.sort_page(store.all(), "priority", "desc")]
+
+        assert _walk(store, index, "priority", "desc", 4, "s") == expected_desc
+        assert _walk(store, index, FILE_ORDER, "asc", 7, "s") == [f"t{i:02d}" for i in range(25)]
+
+        # Petit sous-ensemble filtré : sélection par tas
+        subset = store.all()[:5]
+        expected_subset = [t["id"] for t in index.sort_page(subset, "priority", "desc")]
+        assert _walk(store, index, "priority", "desc", 2, "s", subset=subset) == expected_subset
+        assert index.stats["heap_selections"] > 0
+
+    def test_concurrent_inserts_do_not_shift_pages(self, tmp_path):
+        store, index = _setup(tmp_path)
+        inserted = []
+
+        def insert():
+            task_id = f"new{len(inserted)}"
+            inserted.append(task_id)
+            store.put({"id": task_id, "priorite": "high"})
+
+        seen = _walk(store, index, FILE_ORDER, "asc", 5, "s", on_page=insert)
+        # Aucun doublon ni tâche existante sautée ; les ajouts en fin sont vus
+        assert len(seen) == len(set(seen))
+        assert seen[:25] == [f"t{i:02d}" for i in range(25)]
+
+    def test_cursor_is_bound_to_query(self):
+        scope = empreinte_requete(status="pending", tags=[])
+        assert scope == empreinte_requete(status="pending")
+        token = encoder_curseur("priority", "asc", (3, 0, "t00"), scope)
+
+        assert decoder_curseur(token, "priority", "asc", scope) == (3, 0, "t00")
+        with pytest.raises(ValueError):
+            decoder_curseur(token, "priority", "desc", scope)
+        with pytest.raises(ValueError):
+            decoder_curseur(token, "priority", "asc", empreinte_requete(status="completed"))
+        with pytest.raises(ValueError):
+            decoder_curseur("pas-un-curseur", "priority", "asc", scope)
+
+    def test_forged_key_type_is_rejected(self, tmp_path):
+        store, index = _setup(tmp_path)
+        for sort_by, after in [("priority", ("high", 0, "t00")), ("deadline", (3, 0, "t00")),
+                               (FILE_ORDER, (1, "0", "t00")), ("priority", (3, 0, 7)),
+                               ("priority", (True, 0, "t00"))]:
+            token = encoder_curseur(sort_by, "asc", after, "s")
+            with pytest.raises(ValueError, match="Curseur invalide"):
+                decoder_curseur(token, sort_by, "asc", "s")
+        after = decoder_curseur(encoder_curseur("deadline", "asc", ("2024-01-01", 0, "t00"), "s"),
+                                "deadline", "asc", "s")
+        assert index.page_after(store.all(), "deadline", "asc", after, 5)[0]
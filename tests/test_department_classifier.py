@@ -0,0 +1,107 @@
+"""
+Tests de l'inférence locale du département (mémo + mots-clés)
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from department_classifier import (
+    DepartmentClassifier,
+    cles_memo,
+    normaliser_departement,
+    score_texte,
+)
+
+
+class TestNormalisation:
+    """Variantes ramenées à un nom canonique, valeurs parasites écartées"""
+
+    def test_synonyms(self):
+        assert normaliser_departement("Ressources Humaines (RH)") == "RH"
+        assert normaliser_departement({"nom": "finance", "origine": "AI"}) == "Finance"
+        assert normaliser_departement("Logistique") == "Logistique"
+
+    def test_junk_values(self):
+        assert normaliser_departement("string") is None
+        assert normaliser_departement("") is None
+        assert normaliser_departement(None) is None
+
+    def test_memo_keys_from_most_to_least_specific(self):
+        cles = cles_memo("Paul@Client.com", "a@entreprise.com, b@entreprise.com")
+        assert cles[0] == "paire:paul@client.com>a@entreprise.com"
+        assert cles[-1] == "domaine:client.com"
+        assert cles_memo("API_direct", "") == []
+
+
+class TestMemo:
+    """Le mémo ne répond que pour des clés fiables"""
+
+    def test_learned_sender_answers_without_llm(self, tmp_path):
+        classifier = DepartmentClassifier(str(tmp_path / "memo.json"))
+        for _ in range(2):
+            classifier.apprendre("compta@client.com", "moi@entreprise.com", "Finance")
+        assert classifier.identifier("Bonjour", "compta@client.com", "autre@entreprise.com") == ("Finance", "memo")
+
+    def test_mixed_domain_does_not_answer(self, tmp_path):
+        classifier = DepartmentClassifier(str(tmp_path / "memo.json"))
+        classifier.apprendre("a@entreprise.com", "x@entreprise.com", "IT")
+        classifier.apprendre("b@entreprise.com", "y@entreprise.com", "RH")
+        classifier.apprendre("c@entreprise.com", "z@entreprise.com", "Finance")
+        assert classifier.identifier("Bonjour", "d@entreprise.com", "w@entreprise.com") == (None, "llm")
+        assert classifier.get_stats()["llm"] == 1
+
+    def test_single_observation_is_not_enough(self, tmp_path):
+        classifier = DepartmentClassifier(str(tmp_path / "memo.json"))
+        classifier.apprendre("a@client.com", "b@entreprise.com", "IT")
+        assert classifier.identifier("Bonjour", "a@client.com", "b@entreprise.com")[1] == "llm"
+
+    def test_persistence_round_trip(self, tmp_path):
+        path = str(tmp_path / "memo.json")
+        classifier = DepartmentClassifier(path)
+        classifier.enregistrer("rh@client.com", "moi@entreprise.com", "RH")
+        classifier.enregistrer("rh@client.com", "moi@entreprise.com", "Ressources Humaines")
+        recharge = DepartmentClassifier(path)
+        assert recharge.charger()
+        assert recharge.identifier("", "rh@client.com", "moi@entreprise.com") == ("RH", "memo")
+
+    def test_bootstrap_from_task_history(self, tmp_path):
+        email = {"expediteur": "it@client.com", "destinataire": "dev@entreprise.com",
+                 "objet": "Bug", "date_reception": "2025-01-01", "departement": {"nom": "IT"}}
+        autre = dict(email, objet="Bug 2")
+        # Deux tâches du même email ne comptent qu'une fois ; format unifié et hérité
+        taches = [{"source_metadata": {"original_email": email}}, {"origine_email": email},
+                  {"source_metadata": {"original_email": autre}}, {"source_metadata": {}},
+                  {"origine_email": dict(email, objet="Bug 3")}]
+        classifier = DepartmentClassifier(str(tmp_path / "memo.json"))
+        assert classifier.amorcer_depuis_historique(taches) == 3
+        assert classifier.identifier("", "it@client.com", "qui@entreprise.com") == ("IT", "memo")
+
+    def test_bootstrap_reads_the_task_store_by_default(self, tmp_path, monkeypatch):
+        email = {"expediteur": "rh@client.com", "objet": "Congés", "departement": "RH"}
+        taches = [{"source_metadata": {"original_email": dict(email, objet=f"Congés {i}")}} for i in range(2)]
+        gestionnaire = SimpleNamespace(load_all_tasks=lambda: taches)
+        monkeypatch.setitem(sys.modules, "unified_task_manager",
+                            SimpleNamespace(get_unified_task_manager=lambda: gestionnaire))
+        classifier = DepartmentClassifier(str(tmp_path / "memo.json"))
+        assert classifier.amorcer_depuis_historique() == 2
+        assert classifier.identifier("", "rh@client.com") == ("RH", "memo")
+
+
+class TestTexte:
+    """Repli sur les mots-clés quand le mémo ne sait pas"""
+
+    def test_keywords(self):
+        assert score_texte("Merci de valider la facture et le budget")[0] == "Finance"
+        assert score_texte("Le serveur VPN est en panne", adresses=["support.it@entreprise.com"])[0] == "IT"
+
+    def test_tie_is_left_to_the_llm(self):
+        assert score_texte("Budget de la campagne")[0] is None
+        assert score_texte("Bonjour à tous")[0] is None
+
+    def test_text_fallback_counts(self, tmp_path):
+        classifier = DepartmentClassifier(str(tmp_path / "memo.json"))
+        assert classifier.identifier("Nouvelle politique de télétravail et congés", objet="RH") == ("RH", "texte")
+        stats = classifier.get_stats()
+        assert stats["texte"] == 1 and stats["hit_rate"] == 100.0
@@ -0,0 +1,87 @@
+"""
+Tests du pré-classifieur local explicite / implicite
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+import email_classifier
+from cache_emails import calculer_hash_email
+from email_classifier import (
+    ModeleTfidfLR,
+    PreClassifieur,
+    charger_historique,
+    entrainer_depuis_historique,
+    score_regles,
+)
+
+
+class TestReglesEtSeuil:
+    """Les cas évidents sont tranchés localement, les autres laissés à l'IA"""
+
+    def test_obvious_emails_are_classified_locally(self):
+        classifieur = PreClassifieur(seuil=0.8)
+        assert classifieur.classer("Merci de préparer le rapport avant vendredi 17h.")[0] == "explicite"
+        assert classifieur.classer("Votre commande a été enregistrée. Livraison mercredi.")[0] == "implicite"
+        assert classifieur.classer("Pour info, le serveur redémarre ce week-end.")[0] == "implicite"
+
+    def test_ambiguous_email_goes_to_the_llm(self):
+        classifieur = PreClassifieur(seuil=0.8)
+        label, confiance = classifieur.classer("Ahmed doit envoyer le rapport final cette semaine.")
+        assert label is None and confiance < 0.8
+        stats = classifieur.get_stats()
+        assert stats["appels_llm"] == 1 and stats["decisions_locales"] == 0
+
+    def test_rule_score_direction(self):
+        assert score_regles("Veuillez envoyer les justificatifs d'ici lundi.") > 0.9
+        assert score_regles("Le ticket a été résolu, nous vous prions de nous excuser.") < 0.1
+
+
+class TestModele:
+    """tf-idf + régression logistique entraînés sur l'historique"""
+
+    def test_model_learns_separable_vocabulary(self):
+        textes = ["envoyer rapport client"] * 5 + ["livraison confirmée merci"] * 5
+        labels = [1] * 5 + [0] * 5
+        modele = ModeleTfidfLR()
+        modele.entrainer(textes, labels)
+        assert modele.proba("envoyer le rapport") > 0.7
+        assert modele.proba("livraison confirmée") < 0.3
+
+    def test_history_joins_email_cache_on_hash(self, tmp_path):
+        emails = [{"objet": f"o{i}", "texte": f"Préparez le budget {i}" if i % 2 else f"Commande {i} livrée",
+                   "type_email": "explicite" if i % 2 else None} for i in range(12)]
+        infos_cache = {calculer_hash_email(e["texte"], e["objet"]): {"type_email": "implicite"}
+                       for e in emails[::2]}
+        (tmp_path / "emails.json").write_text(json.dumps(emails), encoding="utf-8")
+
+        exemples = charger_historique(str(tmp_path / "emails.json"), infos_cache)
+        assert len(exemples) == 12
+        modele = entrainer_depuis_historique(str(tmp_path / "emails.json"), infos_cache)
+        assert modele is not None and modele.nb_exemples == 12
+        assert entrainer_depuis_historique(str(tmp_path / "emails.json"), infos_cache, max_exemples=4) is None
+        assert entrainer_depuis_historique(str(tmp_path / "absent.json"), infos_cache) is None
+
+    def test_model_is_trained_off_the_request_path(self, monkeypatch):
+        def entrainement_lent():
+            time.sleep(0.3)
+            modele = ModeleTfidfLR()
+            modele.entrainer(["envoyer rapport", "livraison confirmée"], [1, 0], iterations=5)
+            return modele
+
+        monkeypatch.setattr(email_classifier, "EMAIL_CLASSIFIER_ENABLED", True)
+        monkeypatch.setattr(email_classifier, "EMAIL_CLASSIFIER_MODEL", True)
+        monkeypatch.setattr(email_classifier, "_pre_classifieur", None)
+        monkeypatch.setattr(email_classifier, "entrainer_depuis_historique", entrainement_lent)
+
+        debut = time.perf_counter()
+        pre_classifieur = email_classifier.get_pre_classifieur()
+        assert time.perf_counter() - debut < 0.1 and pre_classifieur.modele is None
+        for _ in range(50):
+            if pre_classifieur.modele is not None:
+                break
+            time.sleep(0.05)
+        assert pre_classifieur.modele is not None
@@ -0,0 +1,34 @@
+"""
+Tests des ETags (réponses conditionnelles)
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from etag import calculer_etag, etag_correspond
+from task_store import TaskStore
+
+
+class TestEtag:
+    """Dérivation depuis la version et comparaison If-None-Match"""
+
+    def test_etag_changes_with_store_version(self, tmp_path):
+        path = tmp_path / "unified_tasks.json"
+        path.write_text('[{"id": "a"}]', encoding="utf-8")
+        store = TaskStore(str(path))
+        before = calculer_etag("all-tasks", store.etag_token())
+
+        assert before == calculer_etag("all-tasks", store.etag_token())
+        assert before != calculer_etag("tasks-stats", store.etag_token())
+        store.put({"id": "b"})
+        assert before != calculer_etag("all-tasks", store.etag_token())
+
+    def test_if_none_match_parsing(self):
+        etag = calculer_etag("x", 1)
+        assert etag.startswith('"') and etag.endswith('"')
+        assert etag_correspond(etag, etag)
+        assert etag_correspond(f'"autre", W/{etag}', etag)
+        assert etag_correspond("*", etag)
+        assert not etag_correspond(None, etag)
+        assert not etag_correspond('"autre"', etag)
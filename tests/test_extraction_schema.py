@@ -0,0 +1,72 @@
+"""
+Tests du schéma des extractions fusionnée et groupée
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from extraction_schema import normaliser_priorite, valider_extraction_fusionnee, valider_extraction_groupee
+
+
+class TestExtractionSchema:
+    """Validation et normalisation de la réponse fusionnée"""
+
+    def test_valid_response_is_normalized(self):
+        data = valider_extraction_fusionnee({
+            "type": "Explicite",
+            "taches": [
+                {"description": " Envoyer le rapport ", "priorite": "haute", "responsable": "Marie"},
+                {"description": "Relancer le client", "priorite": "??", "confiance_ia": 3}
+            ],
+            "resume": " Demande de rapport. ",
+            "departement": "Finance"
+        })
+
+        assert data["type"] == "explicite"
+        assert data["taches"][0]["description"] == "Envoyer le rapport"
+        assert data["taches"][0]["priorite"] == "élevée"
+        assert data["taches"][1]["priorite"] == "moyenne"
+        assert data["taches"][1]["confiance_ia"] == 1.0
+        assert data["resume"] == "Demande de rapport."
+
+    @pytest.mark.parametrize("data", [
+        [],
+        {"type": "explicite", "taches": []},
+        {"type": "autre", "taches": [], "resume": "", "departement": ""},
+        {"type": "implicite", "taches": "x", "resume": "", "departement": ""},
+        {"type": "implicite", "taches": [{"priorite": "faible"}], "resume": "", "departement": ""},
+    ])
+    def test_invalid_responses_raise(self, data):
+        with pytest.raises(ValueError):
+            valider_extraction_fusionnee(data)
+
+    def test_priority_synonyms(self):
+        assert normaliser_priorite("LOW") == "faible"
+        assert normaliser_priorite(None) == "moyenne"
+
+
+class TestExtractionGroupee:
+    """Réponse groupée : chaque email est validé séparément"""
+
+    VALIDE = {"type": "explicite", "taches": [{"description": "A", "priorite": "low"}],
+              "resume": "R", "departement": "IT"}
+
+    def test_invalid_or_missing_emails_are_reported_individually(self):
+        valides, erreurs = valider_extraction_groupee(
+            {"E1": self.VALIDE, "E2": {"type": "explicite"}, "E9": self.VALIDE},
+            ["E1", "E2", "E3"]
+        )
+        assert list(valides) == ["E1"]
+        assert valides["E1"]["taches"][0]["priorite"] == "faible"
+        assert set(erreurs) == {"E2", "E3"}
+
+    def test_wrapped_map_is_accepted(self):
+        valides, erreurs = valider_extraction_groupee({"emails": {"E1": self.VALIDE}}, ["E1"])
+        assert list(valides) == ["E1"] and not erreurs
+
+    def test_non_object_response_raises(self):
+        with pytest.raises(ValueError):
+            valider_extraction_groupee([self.VALIDE], ["E1"])
@@ -0,0 +1,73 @@
+"""
+Tests du cache disque des réponses LLM (clé, TTL, éviction LRU, métriques)
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from llm_cache import LLMResponseCache, cle_reponse, reponse_deterministe
+
+
+class TestLLMResponseCache:
+    """Un prompt déjà payé est relu depuis le disque"""
+
+    def test_key_depends_on_every_parameter(self):
+        base = cle_reponse("m", "prompt", 0.1, 800)
+        assert base == cle_reponse("m", "prompt", 0.1, 800)
+        assert base != cle_reponse("m2", "prompt", 0.1, 800)
+        assert base != cle_reponse("m", "prompt!", 0.1, 800)
+        assert base != cle_reponse("m", "prompt", 0.0, 800)
+        assert base != cle_reponse("m", "prompt", 0.1, None)
+
+    def test_only_deterministic_calls_are_cacheable(self):
+        assert reponse_deterministe(0.0) and reponse_deterministe(0.1)
+        assert not reponse_deterministe(None)
+        assert not reponse_deterministe(0.2)
+
+    def test_invalid_response_can_be_removed(self, tmp_path):
+        cache = LLMResponseCache(str(tmp_path / "llm.db"), max_bytes=10_000, ttl_seconds=3600)
+        cache.put("a", "pas du JSON")
+        assert cache.supprimer("a") is True
+        assert cache.get("a") is None and cache.supprimer("a") is False
+        stats = cache.get_stats()
+        assert stats["invalidations"] == 1 and stats["entries"] == 0 and stats["total_bytes"] == 0
+
+    def test_hit_miss_and_bytes_saved_survive_reopen(self, tmp_path):
+        path = str(tmp_path / "llm.db")
+        cache = LLMResponseCache(path, max_bytes=10_000, ttl_seconds=3600)
+        key = cle_reponse("m", "prompt", 0.0, 100)
+        assert cache.get(key) is None
+        cache.put(key, "réponse", model="m", prompt_size=6)
+
+        reopened = LLMResponseCache(path, max_bytes=10_000, ttl_seconds=3600)
+        assert reopened.get(key) == "réponse"
+        stats = reopened.get_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 0
+        assert stats["bytes_saved"] == len("réponse".encode("utf-8"))
+        assert stats["entries"] == 1 and stats["total_bytes"] == stats["bytes_saved"]
+        assert cache.get_stats()["misses"] == 1
+
+    def test_expired_entries_are_dropped(self, tmp_path):
+        cache = LLMResponseCache(str(tmp_path / "llm.db"), max_bytes=10_000, ttl_seconds=0.05)
+        cache.put("a", "x")
+        time.sleep(0.1)
+        assert cache.get("a") is None
+        stats = cache.get_stats()
+        assert stats["expired"] == 1 and stats["entries"] == 0 and stats["total_bytes"] == 0
+
+    def test_lru_eviction_keeps_recently_read_entries(self, tmp_path):
+        cache = LLMResponseCache(str(tmp_path / "llm.db"), max_bytes=30, ttl_seconds=3600)
+        cache.put("a", "a" * 10)
+        time.sleep(0.01)
+        cache.put("b", "b" * 10)
+        time.sleep(0.01)
+        cache.get("a")  # "a" devient la plus récemment utilisée
+        time.sleep(0.01)
+        cache.put("c", "c" * 15)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "a" * 10 and cache.get("c") == "c" * 15
+        stats = cache.get_stats()
+        assert stats["evictions"] == 1 and stats["total_bytes"] <= 30
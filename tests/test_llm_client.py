@@ -0,0 +1,79 @@
+"""
+Tests du client LLM asynchrone (parallélisme borné)
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("dotenv")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "core"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+import llm_client
+from llm_client import ClientLLMAsync, executer_coroutine
+
+
+@pytest.fixture(autouse=True)
+def sans_cache_reponses(monkeypatch):
+    """Chaque appel doit atteindre le faux client (pas de cache disque partagé)"""
+    monkeypatch.setattr(llm_client, "get_llm_cache", lambda: None)
+
+
+class FauxCompletions:
+    """Imite chat.completions.create : latence fixe, suivi des appels simultanés"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **params):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.latency)
+        self.in_flight -= 1
+        content = params["messages"][0]["content"].upper()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _faux_client(latency):
+    completions = FauxCompletions(latency)
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions)), completions
+
+
+class TestClientLLMAsync:
+    """Le sémaphore borne les appels en vol ; la durée dépend de la limite"""
+
+    def test_bounded_concurrency_and_wall_time(self):
+        fake, completions = _faux_client(0.05)
+
+        async def run():
+            llm = ClientLLMAsync(max_concurrency=10, async_client=fake)
+            start = time.perf_counter()
+            results = await asyncio.gather(*(llm.completer(f"email {i}") for i in range(50)))
+            return results, time.perf_counter() - start, llm.get_stats()
+
+        results, elapsed, stats = executer_coroutine(run())
+
+        assert results[3] == "EMAIL 3"
+        assert completions.max_in_flight == 10 and stats["max_in_flight"] == 10
+        assert stats["calls"] == 50
+        # 50 appels de 50 ms, 10 en parallèle : ~0.25 s au lieu de 2.5 s
+        assert elapsed < 1.0
+
+    def test_runs_from_inside_a_running_loop(self):
+        fake, _ = _faux_client(0)
+
+        async def inner():
+            return await ClientLLMAsync(max_concurrency=1, async_client=fake).completer("ok")
+
+        async def outer():
+            return executer_coroutine(inner())
+
+        assert asyncio.run(outer()) == "OK"
@@ -0,0 +1,62 @@
+"""
+Tests de la lecture tolérante du JSON renvoyé par le modèle
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from llm_json import extraire_json, parser_taches
+
+
+class TestExtraireJson:
+    """Balises, texte autour, défauts courants et troncature"""
+
+    def test_plain_json_is_untouched(self):
+        assert extraire_json('[{"description": "A"}]') == [{"description": "A"}]
+
+    def test_markdown_fence_and_prose(self):
+        texte = 'Voici les tâches :\n```json\n[{"description": "Envoyer [v2] du rapport"}]\n```\nBonne journée !'
+        assert extraire_json(texte) == [{"description": "Envoyer [v2] du rapport"}]
+
+    def test_trailing_commas_single_quotes_and_python_literals(self):
+        texte = "[{'description': 'Appeler l\\'équipe', 'urgent': True, 'deadline': None,},]"
+        assert extraire_json(texte) == [{"description": "Appeler l'équipe", "urgent": True, "deadline": None}]
+
+    def test_apostrophe_inside_double_quoted_string(self):
+        assert extraire_json('Résultat: {"resume": "L\'équipe valide", "n": 2,}') == {"resume": "L'équipe valide", "n": 2}
+
+    def test_truncated_array_keeps_complete_elements(self):
+        texte = '[{"description": "A", "priorite": "haute"}, {"description": "B"}, {"description": "C", "respo'
+        assert extraire_json(texte) == [{"description": "A", "priorite": "haute"}, {"description": "B"}]
+
+    def test_truncated_nested_object_is_closed(self):
+        texte = '{"type": "explicite", "taches": [{"description": "A"}, {"descr'
+        assert extraire_json(texte, attendu=dict) == {"type": "explicite", "taches": [{"description": "A"}]}
+
+    def test_expected_type_skips_other_values(self):
+        assert extraire_json('Note {"x": 1} puis [1, 2]', attendu=list) == [1, 2]
+
+    @pytest.mark.parametrize("texte", ["", None, "Aucune tâche.", '[{"description": "tronq'])
+    def test_unrecoverable_responses_raise(self, texte):
+        with pytest.raises(ValueError):
+            extraire_json(texte)
+
+
+class TestParserTaches:
+    """Validation contre le schéma des tâches"""
+
+    def test_invalid_items_are_dropped_and_priorities_normalised(self):
+        taches = parser_taches('```\n[{"description": " A ", "priorite": "HIGH"}, {"responsable": "x"}, "texte", {"description": "B", "priorite": ""}]\n```')
+        assert taches == [{"description": "A", "priorite": "élevée"}, {"description": "B", "priorite": ""}]
+
+    def test_wrapped_list_and_single_task(self):
+        assert parser_taches('{"taches": [{"description": "A"}]}') == [{"description": "A"}]
+        assert parser_taches('{"description": "Seule"}') == [{"description": "Seule"}]
+        assert parser_taches("[]") == []
+
+    def test_no_valid_task_raises(self):
+        with pytest.raises(ValueError):
+            parser_taches('[{"responsable": "x"}]')
@@ -0,0 +1,162 @@
+"""
+Tests de la résilience des appels LLM (nouveaux essais, Retry-After, disjoncteur)
+"""
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from llm_resilience import (
+    FATALE, FERME, OUVERT, REESSAYABLE, SEMI_OUVERT, CircuitOuvertError, Disjoncteur,
+    classer_erreur, delai_backoff, delai_retry_after, executer_avec_resilience,
+    executer_avec_resilience_async, fournisseur_indisponible
+)
+
+
+class ErreurHTTP(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+class Horloge:
+    def __init__(self):
+        self.maintenant = 0.0
+
+    def __call__(self):
+        return self.maintenant
+
+
+def _appel_qui_echoue(erreurs, resultat="ok"):
+    """Lève les erreurs dans l'ordre puis retourne resultat"""
+    appels = []
+
+    def appel():
+        appels.append(1)
+        if erreurs:
+            raise erreurs.pop(0)
+        return resultat
+    return appel, appels
+
+
+class TestClassification:
+    """Réessayable : saturation ou panne ; fatale : requête refusée"""
+
+    def test_status_codes(self):
+        assert classer_erreur(ErreurHTTP(429)) == REESSAYABLE
+        assert classer_erreur(ErreurHTTP(503)) == REESSAYABLE
+        assert classer_erreur(ErreurHTTP(400)) == FATALE
+        assert classer_erreur(ErreurHTTP(401)) == FATALE
+
+    def test_network_and_local_errors(self):
+        assert classer_erreur(APIConnectionError()) == REESSAYABLE
+        assert classer_erreur(TimeoutError()) == REESSAYABLE
+        assert classer_erreur(ValueError("JSON")) == FATALE
+        assert fournisseur_indisponible(CircuitOuvertError(3.0))
+
+
+class TestDelais:
+    """Retry-After prioritaire, sinon backoff exponentiel avec jitter complet"""
+
+    def test_retry_after_seconds_milliseconds_and_date(self):
+        assert delai_retry_after(ErreurHTTP(429, {"retry-after": "2"})) == 2.0
+        assert delai_retry_after(ErreurHTTP(429, {"retry-after-ms": "1500"})) == 1.5
+        assert delai_retry_after(ErreurHTTP(429, {"retry-after": "3600"})) == 60.0
+        from datetime import datetime, timezone
+        maintenant = datetime(2025, 1, 6, 12, 0, 0, tzinfo=timezone.utc)
+        erreur = ErreurHTTP(503, {"retry-after": "Mon, 06 Jan 2025 12:00:05 GMT"})
+        assert delai_retry_after(erreur, maintenant) == 5.0
+
+    def test_retry_after_absent_or_invalid(self):
+        assert delai_retry_after(ErreurHTTP(503)) is None
+        assert delai_retry_after(ValueError()) is None
+        assert delai_retry_after(ErreurHTTP(503, {"retry-after": "bientôt"})) is None
+
+    def test_backoff_bounds(self):
+        assert delai_backoff(0, base=0.5, plafond=20, alea=lambda: 1.0) == 0.5
+        assert delai_backoff(3, base=0.5, plafond=20, alea=lambda: 1.0) == 4.0
+        assert delai_backoff(10, base=0.5, plafond=20, alea=lambda: 1.0) == 20
+        assert delai_backoff(3, base=0.5, plafond=20, alea=lambda: 0.0) == 0.0
+
+
+class TestNouveauxEssais:
+    """Erreurs réessayables rejouées, erreurs fatales remontées aussitôt"""
+
+    def test_retries_then_succeeds_honouring_retry_after(self):
+        attentes = []
+        appel, appels = _appel_qui_echoue([ErreurHTTP(429, {"retry-after": "2"}), APIConnectionError()])
+        resultat = executer_avec_resilience(appel, Disjoncteur(), tentatives=3, attendre=attentes.append)
+        assert resultat == "ok" and len(appels) == 3
+        assert attentes[0] == 2.0 and 0 <= attentes[1] <= 1.0
+
+    def test_fatal_error_is_not_retried(self):
+        appel, appels = _appel_qui_echoue([ErreurHTTP(400)])
+        with pytest.raises(ErreurHTTP):
+            executer_avec_resilience(appel, Disjoncteur(), tentatives=3, attendre=lambda _: None)
+        assert len(appels) == 1
+
+    def test_gives_up_after_attempts(self):
+        appel, appels = _appel_qui_echoue([ErreurHTTP(503)] * 5)
+        with pytest.raises(ErreurHTTP):
+            executer_avec_resilience(appel, Disjoncteur(), tentatives=3, attendre=lambda _: None)
+        assert len(appels) == 3
+
+    def test_async_version(self):
+        appel_sync, appels = _appel_qui_echoue([TimeoutError()])
+
+        async def appel():
+            return appel_sync()
+
+        resultat = asyncio.run(executer_avec_resilience_async(appel, Disjoncteur(), tentatives=2))
+        assert resultat == "ok" and len(appels) == 2
+
+
+class TestDisjoncteur:
+    """Fermé → ouvert après le seuil → semi-ouvert après le délai → fermé ou rouvert"""
+
+    def test_opens_and_fails_fast(self):
+        disjoncteur = Disjoncteur(seuil_echecs=3, delai_ouverture=30, horloge=Horloge())
+        appel, appels = _appel_qui_echoue([ErreurHTTP(503)] * 10)
+        # Le circuit s'ouvre au 3e échec : le 4e essai est refusé sans appel
+        with pytest.raises(CircuitOuvertError):
+            executer_avec_resilience(appel, disjoncteur, tentatives=5, attendre=lambda _: None)
+        assert len(appels) == 3 and disjoncteur.est_ouvert()
+        with pytest.raises(CircuitOuvertError):
+            executer_avec_resilience(appel, disjoncteur, tentatives=5, attendre=lambda _: None)
+        assert len(appels) == 3
+        assert disjoncteur.get_stats()["ouvertures"] == 1
+
+    def test_half_open_probe_closes_or_reopens(self):
+        horloge = Horloge()
+        disjoncteur = Disjoncteur(seuil_echecs=1, delai_ouverture=30, horloge=horloge)
+        disjoncteur.signaler_echec(ErreurHTTP(503))
+        assert disjoncteur.etat == OUVERT
+        horloge.maintenant = 31
+        assert disjoncteur.get_stats()["etat"] == SEMI_OUVERT
+        disjoncteur.autoriser()
+        # Un seul essai à la fois pendant la période semi-ouverte
+        with pytest.raises(CircuitOuvertError):
+            disjoncteur.autoriser()
+        disjoncteur.signaler_echec(APIConnectionError())
+        assert disjoncteur.est_ouvert()
+
+        horloge.maintenant = 62
+        disjoncteur.autoriser()
+        disjoncteur.signaler_succes()
+        assert disjoncteur.etat == FERME and disjoncteur.echecs_consecutifs == 0
+
+    def test_fatal_errors_do_not_count(self):
+        disjoncteur = Disjoncteur(seuil_echecs=2, horloge=Horloge())
+        disjoncteur.signaler_echec(ErreurHTTP(503))
+        disjoncteur.signaler_echec(ErreurHTTP(400))
+        disjoncteur.signaler_echec(ErreurHTTP(503))
+        assert disjoncteur.etat == FERME
@@ -0,0 +1,124 @@
+"""
+Tests du fournisseur LLM simulé (latences, réponses prêtes à l'emploi, erreurs injectées)
+"""
+import json
+import random
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "services"))
+
+from extraction_schema import valider_extraction_fusionnee, valider_extraction_groupee
+from llm_json import parser_taches
+from mock_llm_server import LoiLatence, ReponsesSimulees, ServeurLLMSimule, percentile, type_prompt
+
+PROMPT_GROUPE = (
+    "Pour chaque email ci-dessous, retourne un objet JSON indexé par identifiant.\n"
+    "<<<EMAIL e1>>>\nKarim doit finaliser le budget avant vendredi.\n<<<FIN e1>>>\n"
+    "<<<EMAIL e2>>>\nMerci de corriger le bug de connexion.\n<<<FIN e2>>>"
+)
+PROMPT_FUSIONNE = 'Analyse cet email et retourne {"type":"explicite|implicite", "taches": [...]} :\nBonjour...'
+
+
+@pytest.fixture
+def serveur():
+    simulateur = ServeurLLMSimule(latence="fixe:0", graine=1)
+    base_url = simulateur.demarrer()
+    yield simulateur, base_url
+    simulateur.arreter()
+
+
+def _poster(url, corps):
+    requete = urllib.request.Request(url, data=json.dumps(corps).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(requete, timeout=10) as reponse:
+            return reponse.status, dict(reponse.headers), json.loads(reponse.read())
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), json.loads(e.read())
+
+
+class TestLatences:
+    """Lois de latence configurables et percentiles"""
+
+    def test_laws_and_bounds(self):
+        rng = random.Random(0)
+        assert LoiLatence("fixe:0.2").tirer(rng) == 0.2
+        assert all(0.1 <= LoiLatence("uniforme:0.1,0.3").tirer(rng) <= 0.3 for _ in range(50))
+        assert all(LoiLatence("normale:0.01,1").tirer(rng) >= 0 for _ in range(50))
+        assert LoiLatence("lognormale:0.8,0.5").tirer(rng) > 0
+        assert LoiLatence("exponentielle:0.5").tirer(rng) >= 0
+
+    def test_invalid_specs(self):
+        with pytest.raises(ValueError):
+            LoiLatence("gamma:1")
+        with pytest.raises(ValueError):
+            LoiLatence("uniforme:0.1")
+
+    def test_percentile(self):
+        valeurs = [float(i) for i in range(1, 101)]
+        assert percentile(valeurs, 50) == 50.0
+        assert percentile(valeurs, 99) == 99.0
+        assert percentile([], 95) == 0.0
+
+
+class TestReponses:
+    """Réponses au format attendu par chaque appel du pipeline"""
+
+    def test_prompt_types(self):
+        assert type_prompt(PROMPT_GROUPE) == "groupee"
+        assert type_prompt(PROMPT_FUSIONNE) == "fusionnee"
+        assert type_prompt('Retourne seulement "explicite" ou "implicite".') == "filtrage"
+        assert type_prompt("Extrait les tâches de cet email : ...") == "taches"
+
+    def test_grouped_and_fused_outputs_validate(self):
+        reponses = ReponsesSimulees()
+        valides, erreurs = valider_extraction_groupee(json.loads(reponses.contenu(PROMPT_GROUPE)), ["e1", "e2"])
+        assert set(valides) == {"e1", "e2"} and not erreurs
+        extraction = valider_extraction_fusionnee(json.loads(reponses.contenu(PROMPT_FUSIONNE)))
+        assert extraction["taches"]
+
+    def test_tasks_are_deterministic_and_parseable(self):
+        reponses = ReponsesSimulees(taches=[{"description": "Tâche modèle", "responsable": "Lisa"}], max_taches=2)
+        contenu = reponses.contenu("Extrait les tâches : appeler le client")
+        assert contenu == reponses.contenu("Extrait les tâches : appeler le client")
+        taches = parser_taches(contenu)
+        assert 1 <= len(taches) <= 2 and taches[0]["description"] == "Tâche modèle"
+
+
+class TestServeur:
+    """Serveur HTTP OpenAI-compatible, erreurs injectées et statistiques"""
+
+    def test_chat_completion_shape(self, serveur):
+        simulateur, base_url = serveur
+        code, _, reponse = _poster(f"{base_url}/chat/completions",
+                                   {"model": "test", "messages": [{"role": "user", "content": PROMPT_FUSIONNE}]})
+        assert code == 200
+        assert reponse["object"] == "chat.completion"
+        assert json.loads(reponse["choices"][0]["message"]["content"])["taches"]
+        assert reponse["usage"]["total_tokens"] > 0
+
+    def test_injected_429_with_retry_after(self, serveur):
+        simulateur, base_url = serveur
+        simulateur.taux_429 = 1.0
+        simulateur.retry_after = 2
+        code, entetes, reponse = _poster(f"{base_url}/chat/completions",
+                                         {"messages": [{"role": "user", "content": "x"}]})
+        assert code == 429 and entetes["Retry-After"] == "2"
+        assert reponse["error"]["type"] == "rate_limit_error"
+
+    def test_stats_and_reset(self, serveur):
+        simulateur, base_url = serveur
+        for _ in range(3):
+            _poster(f"{base_url}/chat/completions", {"messages": [{"role": "user", "content": PROMPT_GROUPE}]})
+        with urllib.request.urlopen(f"{base_url}/stats", timeout=10) as reponse:
+            stats = json.loads(reponse.read())
+        assert stats["requetes"] == 3 and stats["par_type"] == {"groupee": 3}
+        assert stats["latence_s"]["nb"] == 3
+        _poster(f"{base_url}/stats/reset", {})
+        assert simulateur.get_stats()["requetes"] == 0
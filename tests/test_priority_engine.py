@@ -0,0 +1,94 @@
+"""
+Tests du moteur local de priorité des tâches
+"""
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from priority_engine import (
+    ContexteEmail,
+    MoteurPriorite,
+    jours_avant_echeance,
+    rang_expediteur,
+    score_priorite,
+)
+
+# Mercredi
+REFERENCE = date(2025, 8, 6)
+
+
+class TestEcheance:
+    """Expressions d'échéance rapportées à la date de réception"""
+
+    def test_relative_expressions(self):
+        assert jours_avant_echeance("ce soir", REFERENCE) == 0
+        assert jours_avant_echeance("demain 16h", REFERENCE) == 1
+        assert jours_avant_echeance("après-demain", REFERENCE) == 2
+        assert jours_avant_echeance("fin de semaine", REFERENCE) == 3
+
+    def test_weekdays_and_dates(self):
+        assert jours_avant_echeance("vendredi matin", REFERENCE) == 2
+        assert jours_avant_echeance("mercredi", REFERENCE) == 7
+        assert jours_avant_echeance("15 août", REFERENCE) == 9
+        assert jours_avant_echeance("2025-08-07", REFERENCE) == 1
+        assert jours_avant_echeance("10/09", REFERENCE) == 35
+        assert jours_avant_echeance("d'ici octobre", REFERENCE) == 56
+
+    def test_unknown_deadline(self):
+        assert jours_avant_echeance("inconnue", REFERENCE) is None
+        assert jours_avant_echeance("", REFERENCE) is None
+        assert jours_avant_echeance("Rédiger le rapport", REFERENCE) is None
+
+
+class TestSignaux:
+    """Urgence, échéance et rang de l'expéditeur"""
+
+    def test_sender_rank(self):
+        assert rang_expediteur("ceo@entreprise.com") == 2
+        assert rang_expediteur("directeur@entreprise.com") == 2
+        assert rang_expediteur("chef.projet@entreprise.com") == 1
+        assert rang_expediteur("ahmed@entreprise.com") == 0
+
+    def test_not_urgent_is_not_urgent(self):
+        score, _ = score_priorite("Mettre à jour le wiki, pas urgent")
+        assert score < 0
+
+    def test_recurring_task_ignores_weekday(self):
+        contexte = ContexteEmail({"date_reception": "2025-08-06"})
+        score, signaux = score_priorite("Envoyer un rapport hebdomadaire", "chaque lundi", contexte)
+        assert score < 0 and signaux == 1
+
+
+class TestMoteur:
+    """Décisions locales par lot, repli IA optionnel"""
+
+    EMAIL = {"expediteur": "chef.projet@entreprise.com", "objet": "Sprint", "date_reception": "2025-08-06"}
+
+    def test_batch_priorities(self):
+        moteur = MoteurPriorite(repli_llm=False)
+        taches = [
+            {"description": "Corriger le bug critique d'authentification", "deadline": "demain 16h"},
+            {"description": "Documenter les nouvelles fonctionnalités", "deadline": "mardi matin"},
+            {"description": "Revoir la charte graphique si possible", "deadline": "octobre"},
+        ]
+        assert moteur.deduire_priorites(taches, self.EMAIL) == ["élevée", "moyenne", "faible"]
+        assert moteur.get_stats()["decisions_locales"] == 3
+
+    def test_no_signal_defaults_to_medium(self):
+        moteur = MoteurPriorite(repli_llm=False)
+        assert moteur.deduire("Organiser la réunion") == "moyenne"
+        assert moteur.get_stats()["sans_signal"] == 1
+
+    def test_opt_in_llm_fallback_only_without_signal(self):
+        moteur = MoteurPriorite(repli_llm=True)
+        resultats = moteur.deduire_priorites([{"description": "Organiser la réunion"},
+                                              {"description": "Urgent : redémarrer le serveur"}])
+        assert resultats == [None, "élevée"]
+        assert moteur.get_stats()["renvois_llm"] == 1
+
+    def test_urgent_subject_and_director_raise_priority(self):
+        moteur = MoteurPriorite(repli_llm=False)
+        email = {"expediteur": "directeur@entreprise.com", "objet": "URGENT: budget", "date_reception": "2025-08-06"}
+        assert moteur.deduire("Organiser des réunions avec les équipes", "Cette semaine", email) == "élevée"
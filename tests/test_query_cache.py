@@ -0,0 +1,62 @@
+"""
+Tests du cache de résultats de requêtes
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from query_cache import QueryCache
+from task_store import TaskStore
+
+
+class TestQueryCache:
+    """Clés normalisées, invalidation par version, éviction LRU"""
+
+    def test_hit_after_miss_with_normalized_params(self):
+        cache = QueryCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"tasks": [1, 2]}
+
+        first = cache.get_or_compute("all-tasks", {"status": "pending", "tags": [], "page": 1}, 1, compute)
+        second = cache.get_or_compute("all-tasks", {"page": 1, "status": "pending", "tag": None}, 1, compute)
+
+        assert first is second and len(calls) == 1
+        assert cache.get_stats()["hits"] == 1 and cache.get_stats()["misses"] == 1
+
+    def test_version_bump_invalidates_and_stale_results_are_not_stored(self):
+        cache = QueryCache()
+        cache.put("stats", {}, 1, {"total": 1})
+        assert cache.get("stats", {}, 2) is None
+        assert cache.get_stats()["invalidations"] == 1
+
+        # Résultat calculé sur une version dépassée : ignoré
+        cache.put("stats", {}, 1, {"total": 1})
+        assert cache.get("stats", {}, 2) is None
+
+    def test_lru_eviction_by_entries_and_weight(self):
+        cache = QueryCache(max_entries=2, max_weight=5)
+        cache.put("q", {"page": 1}, 1, {"tasks": [1]})
+        cache.put("q", {"page": 2}, 1, {"tasks": [1]})
+        cache.get("q", {"page": 1}, 1)
+        cache.put("q", {"page": 3}, 1, {"tasks": [1]})
+
+        assert cache.get("q", {"page": 2}, 1) is None
+        assert cache.get("q", {"page": 1}, 1) is not None
+
+        cache.put("q", {"page": 4}, 1, {"tasks": [1, 2, 3, 4, 5]})
+        assert cache.get_stats()["weight"] <= 5
+        cache.put("q", {"page": 5}, 1, {"tasks": list(range(6))})
+        assert cache.get_stats()["uncacheable"] == 1
+
+    def test_store_version_changes_on_write(self, tmp_path):
+        path = tmp_path / "unified_tasks.json"
+        path.write_text('[{"id": "a"}]', encoding="utf-8")
+        store = TaskStore(str(path))
+        version = store.current_version()
+
+        store.put({"id": "b"})
+        assert store.current_version() == version + 1
@@ -0,0 +1,56 @@
+"""
+Tests du classement BM25F par pertinence
+"""
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from relevance_ranking import BM25FRanker
+from search_index import SearchIndex
+from task_store import TaskStore
+
+
+def _ranker(tmp_path, tasks):
+    path = tmp_path / "unified_tasks.json"
+    path.write_text(json.dumps(tasks), encoding="utf-8")
+    store = TaskStore(str(path))
+    return store, BM25FRanker(SearchIndex(store))
+
+
+TASKS = [
+    {"id": "a", "description": "Préparer la réunion mensuelle", "responsable": "Samia"},
+    {"id": "b", "description": "Budget", "responsable": "Karim"},
+    {"id": "c", "description": "Relire le budget et valider le budget du projet marketing",
+     "responsable": "Paul"},
+    {"id": "d", "description": "Envoyer le rapport", "responsable": "Karim Budget"},
+    {"id": "e", "description": "Archiver", "responsable": "Nadia",
+     "source_metadata": {"original_email": {"objet": "Budget 2025"}}},
+]
+
+
+class TestBM25FRanker:
+    """Pondération des champs, requêtes multi-mots et top-k"""
+
+    def test_field_weights_and_length_normalisation(self, tmp_path):
+        store, ranker = _ranker(tmp_path, TASKS)
+        scores = ranker.score("budget")
+
+        assert "a" not in scores
+        # Description courte > description longue > responsable > objet email
+        assert scores["b"] > scores["c"] > scores["d"] > scores["e"] > 0
+
+    def test_multi_word_query_rewards_all_terms(self, tmp_path):
+        store, ranker = _ranker(tmp_path, TASKS)
+        scores = ranker.score("budget karim")
+
+        assert scores["b"] > scores["c"]
+        assert scores["d"] > scores["e"]
+
+    def test_top_k_orders_head_and_keeps_rest(self, tmp_path):
+        store, ranker = _ranker(tmp_path, TASKS)
+        ranked = ranker.top_k("budget", store.all(), k=2)
+
+        assert [t["id"] for t in ranked] == ["b", "c", "a", "d", "e"]
+        assert [t["id"] for t in ranker.top_k("budget", store.all(), k=5)] == ["b", "c", "d", "e", "a"]
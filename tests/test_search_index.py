@@ -0,0 +1,77 @@
+"""
+Tests de l'index inversé plein texte
+"""
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from search_index import SearchIndex, Vocabulaire, normaliser_texte
+from task_store import TaskStore
+
+
+def _store(tmp_path, tasks):
+    path = tmp_path / "unified_tasks.json"
+    path.write_text(json.dumps(tasks), encoding="utf-8")
+    return TaskStore(str(path))
+
+
+class TestSearchIndex:
+    """Recherche par sous-chaîne normalisée, mise à jour incrémentale"""
+
+    def test_normalisation(self):
+        assert normaliser_texte("Préparer  la Présentation!") == "preparer la presentation"
+
+    def test_substring_semantics_per_field(self, tmp_path):
+        store = _store(tmp_path, [
+            {"id": "a", "description": "Finaliser le budget 2025", "responsable": "Karim"},
+            {"id": "b", "description": "Préparer la présentation", "responsable": "Samia",
+             "source_metadata": {"original_email": {"objet": "Budget trimestriel"}}},
+            {"id": "c", "description": "Budgétiser la présentation client", "responsable": "Karim"},
+        ])
+        index = SearchIndex(store)
+
+        assert index.search("budget") == {"a", "c"}
+        assert index.search("get 20") == {"a"}
+        assert index.search("presentation", ["description"]) == {"b", "c"}
+        assert index.search("la pres") == {"b", "c"}
+        assert index.search("karim", ["responsable"]) == {"a", "c"}
+        assert index.search("budget", ["all"]) == {"a", "b", "c"}
+        assert index.search("trimestriel", ["description"]) == set()
+
+    def test_incremental_updates_from_store(self, tmp_path):
+        store = _store(tmp_path, [{"id": "a", "description": "Relancer le fournisseur"}])
+        index = SearchIndex(store)
+        assert index.search("fournisseur") == {"a"}
+
+        store.put({"id": "a", "description": "Appeler le client"})
+        store.put({"id": "b", "description": "Relancer le fournisseur"})
+
+        assert index.search("fournisseur") == {"b"}
+        assert index.search("client") == {"a"}
+        assert index.stats["rebuilds"] == 1
+        assert index.stats["incremental_updates"] == 2
+
+    def test_vocabulary_lookups_match_full_scan(self):
+        termes = ["budget", "budgetiser", "rebudget", "presentation", "pre", "client", "b"]
+        vocabulaire = Vocabulaire(termes[:4])
+        for terme in termes[4:]:
+            vocabulaire.ajouter(terme)
+        vocabulaire.retirer("rebudget")
+        restants = [t for t in termes if t != "rebudget"]
+        for morceau in ["b", "bu", "bud", "budg", "get", "dgetis", "pre", "ent", "z", "budgetiserx"]:
+            assert set(vocabulaire.avec_prefixe(morceau)) == {t for t in restants if t.startswith(morceau)}
+            assert set(vocabulaire.avec_suffixe(morceau)) == {t for t in restants if t.endswith(morceau)}
+            assert vocabulaire.contenant(morceau) == {t for t in restants if morceau in t}
+
+    def test_vocabulary_follows_incremental_updates(self, tmp_path):
+        store = _store(tmp_path, [{"id": "a", "description": "Relancer le fournisseur"}])
+        index = SearchIndex(store)
+        assert index.search("fourn") == {"a"}
+
+        store.put({"id": "a", "description": "Appeler le client"})
+        assert index.search("fourn") == set()
+        assert index.search("lien") == {"a"}
+        assert index.search("ler le cli") == {"a"}
+        assert sorted(index._vocabulaires["description"].termes) == sorted(index._postings["description"])
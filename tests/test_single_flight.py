@@ -0,0 +1,86 @@
+"""
+Tests du regroupement des appels identiques en vol (threads et asyncio)
+"""
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Un seul appel par clé en vol, résultat partagé avec les appelants concurrents"""
+
+    def test_threads_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+
+        def work():
+            calls.append(1)
+            time.sleep(0.1)
+            return "résultat"
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(lambda _: flight.do("email", work), range(5)))
+
+        assert len(calls) == 1
+        assert [value for value, _ in results] == ["résultat"] * 5
+        assert sum(shared for _, shared in results) == 4
+        assert flight.get_stats() == {"executions": 1, "coalesced": 4, "errors": 0, "in_flight": 0}
+
+    def test_async_callers_and_sync_thread_share_the_same_key(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return 42
+
+        async def run():
+            leader = asyncio.ensure_future(flight.do_async("k", work))
+            await asyncio.sleep(0.01)
+            # Un watcher (thread) demande la même clé pendant que la coroutine est en vol
+            thread_result = {}
+            thread = threading.Thread(target=lambda: thread_result.update(r=flight.do("k", lambda: -1)))
+            thread.start()
+            followers = await asyncio.gather(*(flight.do_async("k", work) for _ in range(3)))
+            await asyncio.get_running_loop().run_in_executor(None, thread.join)
+            return await leader, followers, thread_result["r"]
+
+        leader, followers, from_thread = asyncio.run(run())
+        assert len(calls) == 1
+        assert leader == (42, False)
+        assert followers == [(42, True)] * 3
+        assert from_thread == (42, True)
+
+    def test_errors_are_shared_then_key_is_released(self):
+        flight = SingleFlight()
+        started = threading.Event()
+
+        def fail():
+            started.set()
+            time.sleep(0.05)
+            raise ValueError("boom")
+
+        def follower():
+            started.wait()
+            return flight.do("k", lambda: "jamais")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(flight.do, "k", fail)
+            other = executor.submit(follower)
+            with pytest.raises(ValueError):
+                leader.result()
+            with pytest.raises(ValueError):
+                other.result()
+
+        assert flight.do("k", lambda: "ok") == ("ok", False)
+        assert flight.get_stats()["errors"] == 1
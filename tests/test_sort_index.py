@@ -0,0 +1,67 @@
+"""
+Tests de l'index de tri pré-trié
+"""
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from sort_index import SORT_KEYS, SortIndex
+from task_store import TaskStore
+
+
+def _random_tasks(n, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"t{i:03d}",
+            "priorite": rng.choice(["haute", "Moyenne", "low", "critical", None]),
+            "statut": rng.choice(["pending", "en cours", "completed"]),
+            "deadline": rng.choice([None, "demain", "2025-08-01", "2025-09-15", "2025-07-30"]),
+            "created_at": f"2025-08-{rng.randint(1, 28):02d}T10:00:00",
+            "responsable": rng.choice(["Karim", "samia", "Paul", ""]),
+            "description": f"Tâche {rng.randint(0, 50)}",
+            "source": rng.choice(["email", "meeting"]),
+        }
+        for i in range(n)
+    ]
+
+
+def _setup(tmp_path, tasks):
+    path = tmp_path / "unified_tasks.json"
+    path.write_text(json.dumps(tasks), encoding="utf-8")
+    store = TaskStore(str(path))
+    return store, SortIndex(store)
+
+
+class TestSortIndex:
+    """La tête de page doit correspondre à un tri stable complet"""
+
+    def test_pages_match_full_stable_sort(self, tmp_path):
+        store, index = _setup(tmp_path, _random_tasks(120))
+        tasks = store.all()
+        subset = [t for t in tasks if t["source"] == "email"][:20]
+
+        for sort_by, key_func in SORT_KEYS.items():
+            for order in ("asc", "desc"):
+                for sample in (tasks, subset):
+                    expected = sorted(sample, key=key_func, reverse=(order == "desc"))
+                    result = index.sort_page(sample, sort_by, order, k=15)
+                    assert [t["id"] for t in result[:15]] == [t["id"] for t in expected[:15]], (sort_by, order)
+                    assert len(result) == len(sample)
+
+        assert index.stats["direct_walks"] > 0 and index.stats["heap_selections"] > 0
+
+    def test_real_deadline_field_and_incremental_update(self, tmp_path):
+        store, index = _setup(tmp_path, [
+            {"id": "a", "deadline": "2025-09-01"},
+            {"id": "b", "deadline": "demain"},
+            {"id": "c", "deadline": "2025-08-01"},
+        ])
+        assert [t["id"] for t in index.sort_page(store.all(), "deadline")] == ["c", "a", "b"]
+
+        store.put({"id": "a", "deadline": "2025-07-01"})
+        assert [t["id"] for t in index.sort_page(store.all(), "deadline", "desc")] == ["b", "c", "a"]
+        assert index.stats["rebuilds"] == 1
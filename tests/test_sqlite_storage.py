@@ -0,0 +1,124 @@
+"""
+Tests du backend SQLite et de la délégation des filtres /all-tasks
+"""
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+import sqlite_storage
+from sqlite_storage import SQLitePersistence, SQLiteStorage
+from task_query import query_tasks
+from task_store import TaskStore
+from unified_task_manager import UnifiedTaskManager
+
+TASKS = [
+    {"id": "t1", "statut": "pending", "priorite": "Haute", "source": "email", "responsable": "Karim",
+     "deadline": "2025-08-10", "created_at": "2025-08-01T10:00:00", "validated": True,
+     "source_metadata": {"original_email": {"departement": {"nom": "Finance"}}}},
+    {"id": "t2", "statut": "en cours", "priorite": "medium", "source": "meeting", "responsable": "Samia",
+     "deadline": "demain", "created_at": "2025-08-05T09:30:00.123456",
+     "origine_meeting": {"departement": "IT"}, "source_metadata": {"meeting": True}},
+    {"id": "t3", "statut": "completed", "priorite": "urgent", "source": "Email", "responsable": "karim B.",
+     "deadline": "2025-09-01", "created_at": "2025-08-10T08:00:00"},
+]
+
+FILTER_CASES = [
+    {},
+    {"status": "à faire"},
+    {"status": "in_progress"},
+    {"priority": "high"},
+    {"assignee": "KARIM"},
+    {"validated": True},
+    {"validated": False},
+    {"source": "email"},
+    {"department": "fin"},
+    {"deadline_before": "2025-08-20"},
+    {"deadline_after": "2025-08-20"},
+    {"created_after": "2025-08-02", "created_before": "2025-08-09"},
+    {"priority": "haute", "assignee": "karim", "deadline_after": "2025-08-01"},
+]
+
+
+def _storage(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "ai_task.db"))
+    storage.save_unified_tasks(TASKS)
+    return storage
+
+
+class TestSQLiteStorage:
+    """Le SQL doit donner les mêmes résultats que les filtres en mémoire"""
+
+    def test_sql_filters_match_in_memory_filters(self, tmp_path):
+        storage = _storage(tmp_path)
+        store = TaskStore(str(tmp_path / "unused.json"), persistence=SQLitePersistence(storage))
+
+        for filters in FILTER_CASES:
+            expected = [t["id"] for t in query_tasks(store, **filters)]
+            assert storage.query_task_ids(**filters) == expected, filters
+
+    def test_update_record_rewrites_single_row(self, tmp_path):
+        storage = _storage(tmp_path)
+        storage.apply_task_record({"op": "update", "id": "t2", "set": {"statut": "completed"},
+                                   "history": {"action": "updated"}})
+        storage.apply_task_record({"op": "add", "task": {"id": "t4", "statut": "pending"}})
+
+        assert storage.query_task_ids(status="completed") == ["t2", "t3"]
+        tasks = storage.load_unified_tasks()
+        assert [t["id"] for t in tasks] == ["t1", "t2", "t3", "t4"]
+        assert tasks[1]["history"] == [{"action": "updated"}]
+
+    def test_store_reloads_after_external_write(self, tmp_path):
+        storage = _storage(tmp_path)
+        store = TaskStore(str(tmp_path / "unused.json"), persistence=SQLitePersistence(storage))
+        assert store.count() == 3
+
+        # Écriture par un autre processus (autre connexion)
+        other = sqlite3.connect(storage.db_path)
+        with other:
+            other.execute("DELETE FROM unified_tasks WHERE id = 't1'")
+        other.close()
+
+        assert store.get("t1") is None
+        assert store.stats["reloads_detected"] == 1
+
+    def test_unified_manager_available_without_json_file(self, tmp_path, monkeypatch):
+        # Installation SQLite neuve : data/unified_tasks.json n'est jamais créé
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "data").mkdir()
+        monkeypatch.setattr(sqlite_storage, "STORAGE_BACKEND", "sqlite")
+        monkeypatch.setattr(sqlite_storage, "_storage_instance", SQLiteStorage(str(tmp_path / "ai_task.db")))
+
+        manager = UnifiedTaskManager()
+        assert manager.persistence_mode == "sqlite" and manager.is_available()
+        task_id = manager.add_task({"description": "Relancer le client", "source": "email"})
+        assert not (tmp_path / "data" / "unified_tasks.json").exists()
+        assert [t["id"] for t in manager.query_tasks(source="email")] == [task_id]
+
+    def test_documents_cache_and_migration(self, tmp_path):
+        data_dir = tmp_path / "data"
+        data_dir.mkdir()
+        (data_dir / "unified_tasks.json").write_text(json.dumps(TASKS), encoding="utf-8")
+        (data_dir / "meetings.json").write_text(json.dumps([{"id": "m1"}, {"id": "m2"}]), encoding="utf-8")
+        # Fichiers restés en JSON quel que soit le backend : jamais migrés
+        (data_dir / "emails.json").write_text(json.dumps([{"id": "e1"}]), encoding="utf-8")
+        (data_dir / "emails_cache.json").write_text(json.dumps(
+            {"emails_hashes": {"abc": {"processed_at": "2020-01-01T00:00:00", "hash": "abc"}}}
+        ), encoding="utf-8")
+
+        storage = SQLiteStorage(str(tmp_path / "ai_task.db"))
+        counts = storage.migrate_from_json(str(data_dir))
+
+        assert counts == {"unified_tasks": 3, "meetings": 2, "email_cache": 1}
+        assert storage.find_documents("meetings", "m2") == [{"id": "m2"}]
+        storage.append_document("meeting_logs", {"meeting_id": "m1", "statut": "succès"})
+        assert storage.load_documents("meeting_logs") == [{"meeting_id": "m1", "statut": "succès"}]
+        with pytest.raises(ValueError):
+            storage.load_documents("emails")
+        assert storage.cache_contains("abc")
+        assert set(storage.cache_all()) == {"abc"}
+        assert storage.cache_purge_older_than(30) == 0
@@ -0,0 +1,57 @@
+"""
+Tests de l'index des tags
+"""
+import json
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from tag_index import TagIndex
+from task_store import TaskStore
+
+TAGS = ["api", "urgent", "backend", "frontend", "test"]
+
+
+def _setup(tmp_path, tasks):
+    path = tmp_path / "unified_tasks.json"
+    path.write_text(json.dumps(tasks), encoding="utf-8")
+    store = TaskStore(str(path))
+    return store, TagIndex(store)
+
+
+def _expected_counts(store):
+    return Counter(tag for task in store.all() for tag in task.get("tags", []))
+
+
+class TestTagIndex:
+    """Intersections, popularité et mises à jour incrémentales"""
+
+    def test_intersection_and_counts(self, tmp_path):
+        store, index = _setup(tmp_path, [
+            {"id": "a", "tags": ["api", "urgent"]},
+            {"id": "b", "tags": ["api"]},
+            {"id": "c"},
+        ])
+        assert index.ids_with_all(["api"]) == {"a", "b"}
+        assert index.ids_with_all(["api", "urgent"]) == {"a"}
+        assert index.ids_with_all(["api", "absent"]) == set()
+        assert index.top(1) == [("api", 2)]
+        assert index.tasks_with_tags() == 2
+
+    def test_incremental_updates_keep_heap_consistent(self, tmp_path):
+        rng = random.Random(3)
+        store, index = _setup(tmp_path, [{"id": f"t{i}", "tags": rng.sample(TAGS, 2)} for i in range(20)])
+        index.counts()
+
+        for _ in range(200):
+            store.put({"id": f"t{rng.randrange(25)}", "tags": rng.sample(TAGS, rng.randint(0, 3))})
+            expected = _expected_counts(store)
+            assert index.counts() == dict(expected)
+            top = index.top(3)
+            assert [count for _, count in top] == sorted(expected.values(), reverse=True)[:3]
+
+        assert index.stats["rebuilds"] == 1
+        assert index.by_popularity()[0][1] == max(_expected_counts(store).values())
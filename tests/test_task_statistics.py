@@ -0,0 +1,61 @@
+"""
+Tests des statistiques incrémentales
+"""
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from task_statistics import TaskStatistics
+from task_store import TaskStore
+
+
+def _task(i, rng):
+    return {
+        "id": f"t{i}",
+        "statut": rng.choice(["pending", "completed", "in_progress"]),
+        "priorite": rng.choice(["high", "medium", "low"]),
+        "source": rng.choice(["email", "meeting"]),
+        "validated": rng.choice([True, None]),
+        "tags": rng.sample(["api", "urgent", "backend"], rng.randint(0, 2)),
+        "origine_meeting": {"departement": rng.choice(["IT", "RH"])}
+    }
+
+
+class TestTaskStatistics:
+    """Mises à jour incrémentales identiques à une reconstruction"""
+
+    def test_incremental_matches_rebuild(self, tmp_path):
+        rng = random.Random(7)
+        path = tmp_path / "unified_tasks.json"
+        path.write_text(json.dumps([_task(i, rng) for i in range(30)]), encoding="utf-8")
+        store = TaskStore(str(path))
+        stats = TaskStatistics(store)
+        stats.summary()
+
+        for step in range(60):
+            store.put(_task(rng.randrange(40), rng))
+        incremental = stats.summary()
+        stats.rebuild()
+
+        assert incremental == stats.summary()
+        assert stats.stats["incremental_updates"] > 0
+        assert incremental["total"] == store.count()
+
+    def test_breakdowns(self, tmp_path):
+        path = tmp_path / "unified_tasks.json"
+        tasks = [
+            {"id": "a", "statut": "completed", "priorite": "high", "origine_meeting": {"departement": "IT"}},
+            {"id": "b", "statut": "pending", "priorite": "high", "origine_meeting": {"departement": "IT"}},
+            {"id": "c", "statut": "completed", "priorite": "low", "tags": ["api"]},
+        ]
+        path.write_text(json.dumps(tasks), encoding="utf-8")
+        store = TaskStore(str(path))
+        summary = TaskStatistics(store).summary()
+
+        assert summary["status_by_priority"]["completed"] == {"high": 1, "low": 1}
+        assert summary["department_completion"]["IT"]["completion_rate"] == 50.0
+        assert summary["tags"] == {"api": 1} and summary["tasks_with_tags"] == 1
+        assert summary["completion_rate"] == round(2 / 3 * 100, 1)
@@ -0,0 +1,178 @@
+"""
+Tests du stockage résident indexé des tâches unifiées
+"""
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from task_store import TaskStore
+from task_persistence import JournalPersistence
+
+
+def _write(path, tasks):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(tasks, f)
+
+
+def _compaction_suspendue(tmp_path, monkeypatch):
+    """Store en mode journal dont la compaction s'arrête après l'écriture du snapshot fusionné"""
+    path = tmp_path / "unified_tasks.json"
+    _write(path, [])
+    persistence = JournalPersistence(str(path), compaction_threshold=1)
+    store = TaskStore(str(path), persistence=persistence)
+    ecrit, reprise = threading.Event(), threading.Event()
+    prepare = persistence.prepare_compacted_snapshot
+
+    def prepare_suspendue(tasks):
+        tmp = prepare(tasks)
+        ecrit.set()
+        reprise.wait(5)
+        return tmp
+
+    monkeypatch.setattr(persistence, "prepare_compacted_snapshot", prepare_suspendue)
+    store.put({"id": "a", "statut": "pending"})
+    store.persist_record({"op": "add", "task": {"id": "a", "statut": "pending"}})
+    assert ecrit.wait(5) and store._compacting
+    return path, store, reprise
+
+
+def _attendre_compaction(store):
+    for _ in range(500):
+        if not store._compacting:
+            return
+        time.sleep(0.01)
+
+
+class TestTaskStore:
+    """Tests de l'index principal, des index secondaires et du rechargement"""
+
+    def test_get_and_secondary_indexes(self, tmp_path):
+        path = tmp_path / "unified_tasks.json"
+        _write(path, [
+            {"id": "a", "statut": "pending", "source": "email", "priorite": "high"},
+            {"id": "b", "statut": "completed", "source": "meeting", "priorite": "low", "validated": True},
+            {"id": "c", "statut": "pending", "source": "meeting", "priorite": "high"},
+        ])
+        store = TaskStore(str(path))
+
+        assert store.get("b")["statut"] == "completed"
+        assert store.ids_where("statut", "pending") == {"a", "c"}
+        assert [t["id"] for t in store.where("priorite", "high")] == ["a", "c"]
+        assert store.ids_where("validated", True) == {"b"}
+        assert store.index_values("source") == {"email": 1, "meeting": 2}
+
+    def test_put_updates_indexes_and_persist_does_not_reload(self, tmp_path):
+        path = tmp_path / "unified_tasks.json"
+        _write(path, [{"id": "a", "statut": "pending"}])
+        store = TaskStore(str(path))
+
+        store.put({"id": "a", "statut": "completed"})
+        store.put({"id": "b", "statut": "pending"})
+        store.persist()
+
+        assert store.ids_where("statut", "pending") == {"b"}
+        assert store.ids_where("statut", "completed") == {"a"}
+        assert store.count() == 2
+        assert store.stats["loads"] == 1
+        with open(path, encoding="utf-8") as f:
+            assert [t["id"] for t in json.load(f)] == ["a", "b"]
+
+    def test_reload_when_file_changes_on_disk(self, tmp_path):
+        path = tmp_path / "unified_tasks.json"
+        _write(path, [{"id": "a", "statut": "pending"}])
+        store = TaskStore(str(path))
+        assert store.count() == 1
+
+        _write(path, [{"id": "a", "statut": "pending"}, {"id": "z", "statut": "pending"}])
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert store.get("z") is not None
+        assert store.stats["reloads_detected"] == 1
+
+
+class TestJournalPersistence:
+    """Tests du journal append-only, du rejeu et de la compaction"""
+
+    def test_record_appends_and_replay_restores_state(self, tmp_path):
+        path = tmp_path / "unified_tasks.json"
+        _write(path, [{"id": "a", "statut": "pending", "history": []}])
+        persistence = JournalPersistence(str(path))
+        store = TaskStore(str(path), persistence=persistence)
+
+        store.put({"id": "a", "statut": "completed", "history": [{"action": "completed"}]})
+        store.persist_record({"op": "update", "id": "a", "set": {"statut": "completed"},
+                              "history": {"action": "completed"}})
+        store.put({"id": "b", "statut": "pending"})
+        store.persist_record({"op": "add", "task": {"id": "b", "statut": "pending"}})
+
+        # Le snapshot n'est pas réécrit, seul le journal grossit
+        with open(path, encoding="utf-8") as f:
+            assert len(json.load(f)) == 1
+        assert persistence.stats["records_appended"] == 2
+
+        recovered = TaskStore(str(path), persistence=JournalPersistence(str(path)))
+        assert recovered.get("a")["statut"] == "completed"
+        assert recovered.get("a")["history"] == [{"action": "completed"}]
+        assert recovered.ids_where("statut", "pending") == {"b"}
+
+    def test_compaction_merges_journal_into_snapshot(self, tmp_path):
+        path = tmp_path / "unified_tasks.json"
+        _write(path, [])
+        persistence = JournalPersistence(str(path), compaction_threshold=1)
+        store = TaskStore(str(path), persistence=persistence)
+
+        store.put({"id": "a", "statut": "pending"})
+        store.persist_record({"op": "add", "task": {"id": "a", "statut": "pending"}})
+        for _ in range(100):
+            if not store._compacting:
+                break
+            time.sleep(0.01)
+
+        with open(path, encoding="utf-8") as f:
+            assert [t["id"] for t in json.load(f)] == ["a"]
+        assert not os.path.exists(persistence.journal_path)
+        assert not os.path.exists(persistence.compacting_path)
+        assert store.stats["reloads_detected"] == 0
+
+    def test_replay_of_interrupted_compaction_is_idempotent(self, tmp_path):
+        path = tmp_path / "unified_tasks.json"
+        entry = {"action": "validated"}
+        _write(path, [{"id": "a", "validated": True, "history": [entry]}])
+        persistence = JournalPersistence(str(path))
+        with open(persistence.compacting_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "update", "id": "a", "set": {"validated": True},
+                                "history": entry}) + "\n")
+            f.write('{"op": "upd')  # ligne tronquée par un crash
+
+        task = persistence.load()[0]
+        assert task["history"] == [entry]
+
+    def test_full_rewrite_during_compaction_is_kept(self, tmp_path, monkeypatch):
+        path, store, reprise = _compaction_suspendue(tmp_path, monkeypatch)
+
+        # Équivalent de UnifiedTaskManager.save_all_tasks pendant la compaction
+        with store.lock:
+            store.replace_all([{"id": "b", "statut": "completed"}])
+            store.persist()
+        reprise.set()
+        _attendre_compaction(store)
+
+        assert [t["id"] for t in JournalPersistence(str(path)).load()] == ["b"]
+        assert store.persistence.stats["compactions_discarded"] == 1
+        assert not [nom for nom in os.listdir(tmp_path) if nom.endswith(".tmp")]
+
+    def test_external_write_during_compaction_is_reloaded(self, tmp_path, monkeypatch):
+        path, store, reprise = _compaction_suspendue(tmp_path, monkeypatch)
+
+        # Un autre worker ajoute une tâche pendant que la compaction est en cours
+        JournalPersistence(str(path)).record({"op": "add", "task": {"id": "c", "statut": "pending"}}, list)
+        reprise.set()
+        _attendre_compaction(store)
+
+        assert [t["id"] for t in store.all()] == ["a", "c"]
@@ -0,0 +1,109 @@
+"""
+Tests du nettoyage et de la mise au budget des textes envoyés au modèle
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "utils"))
+
+from token_budget import (
+    MARQUEUR_TRONCATURE,
+    budget_entree,
+    decouper_au_budget,
+    estimer_tokens,
+    mesurer_reduction,
+    nettoyer_texte,
+    preparer_entree,
+    preparer_morceaux,
+    statistiques_tokens,
+    tronquer_au_budget,
+)
+
+EMAIL_THREAD = """Bonjour Ahmed,
+
+Merci de préparer le rapport avant vendredi.
+
+Cordialement,
+Sara Martin
+Directrice Finance
+
+Ce message et ses pièces jointes sont confidentiels et destinés exclusivement à leur destinataire.
+
+Le lun. 4 août 2025 à 10:00, Ahmed <ahmed@entreprise.com> a écrit :
+> Salut Sara,
+> voici le brouillon du rapport.
+"""
+
+
+class TestNettoyage:
+    """Historique cité, signature et mentions légales retirés"""
+
+    def test_thread_is_reduced_to_the_new_message(self):
+        assert nettoyer_texte(EMAIL_THREAD) == "Bonjour Ahmed,\n\nMerci de préparer le rapport avant vendredi."
+
+    def test_forward_without_comment_keeps_forwarded_content(self):
+        texte = "---------- Forwarded message ---------\nFrom: a\nDate: hier\n\nMerci de valider la facture 123."
+        assert "valider la facture" in nettoyer_texte(texte)
+
+    def test_signature_separator_and_mobile_footer(self):
+        texte = "Peux-tu relancer le fournisseur demain ?\n\nEnvoyé de mon iPhone"
+        assert nettoyer_texte(texte) == "Peux-tu relancer le fournisseur demain ?"
+        assert nettoyer_texte("Le serveur redémarre ce soir à 22h.\n-- \nJean\n06 00 00 00 00") == \
+            "Le serveur redémarre ce soir à 22h."
+
+    def test_politeness_inside_body_keeps_following_requests(self):
+        texte = ("Bonjour Jean, j espere que tu vas bien.\nMerci !\nPeux-tu envoyer le rapport financier avant "
+                 "vendredi ?\nAppelle aussi le client Durand.\nCordialement\nMarie")
+        nettoye = nettoyer_texte(texte)
+        assert "rapport financier" in nettoye and "client Durand" in nettoye
+        assert not nettoye.endswith("Marie")
+        # Sans formule finale, rien n'est coupé
+        assert nettoyer_texte(texte.rsplit("\nCordialement", 1)[0]) == texte.rsplit("\nCordialement", 1)[0]
+
+    def test_quoted_speech_is_not_a_reply_header(self):
+        texte = ("Bonjour,\nVoici le point du jour pour l equipe.\nLe client a écrit :\n"
+                 "il faut livrer le module B lundi.\nMerci de préparer la démo.")
+        assert nettoyer_texte(texte) == texte
+        cite = "Merci de préparer la démo pour lundi.\nLe client a écrit :\n> ancienne demande"
+        assert nettoyer_texte(cite) == "Merci de préparer la démo pour lundi."
+
+    def test_plain_email_is_unchanged(self):
+        texte = "Merci de planifier la réunion de validation jeudi."
+        assert nettoyer_texte(texte) == texte
+        assert mesurer_reduction(texte) == {"avant": estimer_tokens(texte), "apres": estimer_tokens(texte)}
+
+    def test_reduction_is_measured(self):
+        mesure = mesurer_reduction(EMAIL_THREAD)
+        assert mesure["apres"] < mesure["avant"] / 3
+
+
+class TestBudget:
+    """Troncature (appel unique) et découpage (extraction par morceaux)"""
+
+    TEXTE_LONG = "\n\n".join(f"Paragraphe {i} : " + "mot " * 150 for i in range(30))
+
+    def test_truncation_keeps_head_and_tail(self):
+        tronque = tronquer_au_budget(self.TEXTE_LONG, 200)
+        assert estimer_tokens(tronque) <= 200
+        assert tronque.startswith("Paragraphe 0") and MARQUEUR_TRONCATURE in tronque
+        assert tronque.rstrip().endswith("mot")
+
+    def test_chunks_fit_budget_and_keep_everything(self):
+        morceaux = decouper_au_budget(self.TEXTE_LONG, 500)
+        assert len(morceaux) > 1
+        assert all(estimer_tokens(morceau) <= 500 for morceau in morceaux)
+        assert all(f"Paragraphe {i} :" in "".join(morceaux) for i in range(30))
+
+    def test_budget_per_call_type_and_env_override(self, monkeypatch):
+        assert budget_entree("filtrage") < budget_entree("fusionnee")
+        monkeypatch.setenv("LLM_INPUT_BUDGET_FILTRAGE", "42")
+        assert budget_entree("filtrage") == 42
+
+    def test_preparation_records_savings(self):
+        avant = statistiques_tokens()
+        assert preparer_entree(EMAIL_THREAD, "filtrage").startswith("Bonjour Ahmed")
+        assert len(preparer_morceaux(self.TEXTE_LONG, "explicite")) > 1
+        apres = statistiques_tokens()
+        assert apres["appels"] > avant["appels"] + 1
+        assert apres["decoupages"] == avant["decoupages"] + 1
+        assert apres["tokens_apres"] - avant["tokens_apres"] < apres["tokens_avant"] - avant["tokens_avant"]
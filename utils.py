@@ -6,11 +6,16 @@ Utility functions for AI Task Extraction System
 import json
 import os
 import re
+import sys
 import unicodedata
 from datetime import datetime
 from typing import List, Dict, Any
 from config import LOG_FILE
 
+# Règles de filtrage partagées avec main.py, le TaskStore et le backend SQLite
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src", "utils"))
+from task_query import normalize_filter_value, parse_date_string, extract_department_from_task
+
 def est_doublon(nouvelle_tache, anciennes_taches):
     """Vérifie si une tâche est déjà présente"""
     for t in anciennes_taches:
@@ -44,52 +49,6 @@ def ecrire_log(email_objet, statut, resultat_ia, nb_taches=0, erreur=None):
     with open(LOG_FILE, "w", encoding="utf-8") as f:
         json.dump(logs, f, indent=4, ensure_ascii=False)
 
-def normalize_filter_value(field, value):
-    """
-    🔧 Normalise les valeurs de filtre pour accepter les variantes
-    Solution simple pour filtrage intelligent
-    """
-    if not value:
-        return ""
-
-    value_lower = value.lower().strip()
-
-    # Mappings pour filtrage intelligent
-    STATUS_MAPPING = {
-        "à faire": "pending",
-        "a faire": "pending",
-        "en cours": "in_progress",
-        "en_cours": "in_progress",
-        "terminé": "completed",
-        "termine": "completed",
-        "fini": "completed",
-        "annulé": "cancelled",
-        "annule": "cancelled"
-    }
-
-    PRIORITY_MAPPING = {
-        "haute": "high",
-        "elevé": "high",
-        "élevé": "high",
-        "urgent": "high",
-        "moyenne": "medium",
-        "normale": "medium",
-        "normal": "medium",
-        "moyen": "medium",
-        "critique": "critical",
-        "prioritaire": "critical",
-        "basse": "low",
-        "faible": "low",
-        "bas": "low"
-    }
-
-    if field == "status":
-        return STATUS_MAPPING.get(value_lower, value_lower)
-    elif field == "priority":
-        return PRIORITY_MAPPING.get(value_lower, value_lower)
-    else:
-        return value_lower
-
 def smart_filter_match(task_value, filter_value, field_type):
     """
     🧠 Comparaison intelligente pour le filtrage
@@ -104,30 +63,6 @@ def smart_filter_match(task_value, filter_value, field_type):
 
     return normalized_task == normalized_filter
 
-def parse_date_string(date_str):
-    """
-    📅 Parse une date en format YYYY-MM-DD ou ISO
-    Retourne None si parsing échoue
-    """
-    if not date_str or date_str == "null":
-        return None
-
-    try:
-        # Essayer format YYYY-MM-DD
-        if len(date_str) == 10 and date_str.count('-') == 2:
-            return datetime.strptime(date_str, "%Y-%m-%d")
-
-        # Essayer format ISO complet
-        if 'T' in date_str:
-            # Enlever les microsecondes si présentes
-            if '.' in date_str:
-                date_str = date_str.split('.')[0]
-            return datetime.fromisoformat(date_str.replace('Z', ''))
-
-        return None
-    except:
-        return None
-
 def filter_by_date_range(tasks, deadline_before=None, deadline_after=None, created_after=None, created_before=None):
     """
     📅 Filtrer les tâches par plages de dates
@@ -193,33 +128,6 @@ def filter_by_source(tasks, source):
     source_lower = source.lower().strip()
     return [task for task in tasks if task.get('source', '').lower() == source_lower]
 
-def extract_department_from_task(task):
-    """
-    🏢 Extraire le département d'une tâche depuis les métadonnées
-    """
-    metadata = task.get('source_metadata', {})
-
-    # Pour les emails
-    if 'original_email' in metadata:
-        email_data = metadata['original_email']
-
-        if isinstance(email_data, dict) and 'departement' in email_data:
-            dept = email_data['departement']
-
-            if isinstance(dept, dict) and 'nom' in dept:
-                return dept['nom']
-            elif isinstance(dept, str):
-                return dept
-
-    # Pour les meetings
-    if 'meeting' in metadata or task.get('origine_meeting'):
-        meeting_data = task.get('origine_meeting', {})
-        dept = meeting_data.get('departement')
-        if dept:
-            return dept
-
-    return None
-
 def filter_by_department(tasks, department):
     """
     🏢 Filtrer les tâches par département